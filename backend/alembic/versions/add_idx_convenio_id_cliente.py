@@ -0,0 +1,27 @@
+"""Index convenio.id_cliente for the contract available-items query
+
+Revision ID: add_idx_convenio_id_cliente
+Revises: add_report_version
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+revision = "add_idx_convenio_id_cliente"
+down_revision = "add_report_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # idx_convenio_cliente quedó creado sobre clientes(id_cliente), no sobre
+    # convenio: la búsqueda de convenios por cliente no tenía índice.
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_convenio_id_cliente ON convenio(id_cliente)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_convenio_id_cliente")
@@ -0,0 +1,198 @@
+"""Partition the log table by month and add hourly log rollups
+
+Revision ID: add_log_particiones
+Revises: add_idx_convenio_id_cliente
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision = "add_log_particiones"
+down_revision = "add_idx_convenio_id_cliente"
+branch_labels = None
+depends_on = None
+
+# Particiones mensuales log_pYYYYMM. La partición por defecto recoge lo que
+# llegue a un mes sin partición (si el mantenimiento no corrió a tiempo) y
+# crear_particion_log mueve esas filas al crear la partición del mes.
+FUNCION_CREAR = """
+CREATE OR REPLACE FUNCTION public.crear_particion_log(mes DATE)
+ RETURNS text
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    desde TIMESTAMP := date_trunc('month', mes);
+    hasta TIMESTAMP := date_trunc('month', mes) + INTERVAL '1 month';
+    nombre TEXT := 'log_p' || to_char(mes, 'YYYYMM');
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE log INCLUDING DEFAULTS)', nombre);
+    EXECUTE format(
+        'WITH movidas AS (DELETE FROM log_default'
+        ' WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *)'
+        ' INSERT INTO %I SELECT * FROM movidas',
+        desde, hasta, nombre
+    );
+    EXECUTE format(
+        'ALTER TABLE log ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        nombre, desde, hasta
+    );
+    RETURN nombre;
+END;
+$function$;
+"""
+
+FUNCION_ASEGURAR = """
+CREATE OR REPLACE FUNCTION public.asegurar_particiones_log(meses_adelante INTEGER)
+ RETURNS SETOF text
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    nombre TEXT;
+BEGIN
+    FOR i IN 0..meses_adelante LOOP
+        nombre := crear_particion_log(
+            (date_trunc('month', now()) + make_interval(months => i))::date
+        );
+        IF nombre IS NOT NULL THEN
+            RETURN NEXT nombre;
+        END IF;
+    END LOOP;
+END;
+$function$;
+"""
+
+# Retención: se eliminan particiones completas (sin DELETE ni VACUUM) y el
+# resumen por hora del mismo período.
+FUNCION_PURGAR = """
+CREATE OR REPLACE FUNCTION public.purgar_particiones_log(meses_retencion INTEGER)
+ RETURNS SETOF text
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    limite DATE := (
+        date_trunc('month', now()) - make_interval(months => meses_retencion)
+    )::date;
+    particion RECORD;
+BEGIN
+    FOR particion IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'log'::regclass
+          AND c.relname ~ '^log_p[0-9]{6}$'
+        ORDER BY c.relname
+    LOOP
+        IF to_date(substr(particion.relname, 6), 'YYYYMM') < limite THEN
+            EXECUTE format('DROP TABLE %I', particion.relname);
+            RETURN NEXT particion.relname;
+        END IF;
+    END LOOP;
+    DELETE FROM log_resumen_hora WHERE hora < limite;
+END;
+$function$;
+"""
+
+COLUMNAS = (
+    "id, timestamp, nivel, tipo, mensaje, detalle, ip, usuario_id, endpoint,"
+    " method, status_code, usuario_nombre, navegador"
+)
+
+
+def _crear_log_particionada() -> None:
+    op.execute("CREATE SEQUENCE IF NOT EXISTS log_id_seq")
+    op.execute(
+        "CREATE TABLE log ("
+        "    id INTEGER NOT NULL DEFAULT nextval('log_id_seq'),"
+        "    timestamp TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,"
+        "    nivel VARCHAR(20) NOT NULL,"
+        "    tipo VARCHAR(20) NOT NULL,"
+        "    mensaje VARCHAR(500) NOT NULL,"
+        "    detalle VARCHAR(2000),"
+        "    ip VARCHAR(50),"
+        "    usuario_id INTEGER,"
+        "    endpoint VARCHAR(200),"
+        "    method VARCHAR(10),"
+        "    status_code INTEGER,"
+        "    usuario_nombre VARCHAR(100),"
+        "    navegador VARCHAR(100),"
+        "    PRIMARY KEY (id, timestamp)"
+        ") PARTITION BY RANGE (timestamp)"
+    )
+    op.execute("ALTER SEQUENCE log_id_seq OWNED BY log.id")
+    op.execute("CREATE TABLE log_default PARTITION OF log DEFAULT")
+    op.execute("CREATE INDEX ix_log_timestamp ON log (timestamp)")
+    op.execute("CREATE INDEX ix_log_nivel_timestamp ON log (nivel, timestamp)")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    tipo_log = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('log')")
+    ).scalar()
+
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS log_resumen_hora ("
+        "    hora TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        "    nivel VARCHAR(20) NOT NULL,"
+        "    tipo VARCHAR(20) NOT NULL,"
+        "    cantidad BIGINT NOT NULL DEFAULT 0,"
+        "    PRIMARY KEY (hora, nivel, tipo)"
+        ")"
+    )
+
+    if tipo_log != "p":
+        if tipo_log is not None:
+            # La tabla actual se renombra y sus filas pasan a la particionada
+            op.execute("ALTER TABLE log RENAME TO log_sin_particionar")
+            op.execute(
+                "ALTER TABLE log_sin_particionar "
+                "RENAME CONSTRAINT log_pkey TO log_sin_particionar_pkey"
+            )
+            op.execute("DROP INDEX IF EXISTS ix_log_id")
+            op.execute("ALTER SEQUENCE IF EXISTS log_id_seq OWNED BY NONE")
+        _crear_log_particionada()
+
+    op.execute(FUNCION_CREAR)
+    op.execute(FUNCION_ASEGURAR)
+    op.execute(FUNCION_PURGAR)
+
+    if tipo_log not in (None, "p"):
+        op.execute(
+            "SELECT crear_particion_log(mes::date) FROM generate_series("
+            "    (SELECT date_trunc('month', min(timestamp)) FROM log_sin_particionar),"
+            "    date_trunc('month', now()),"
+            "    INTERVAL '1 month'"
+            ") AS mes"
+        )
+        op.execute(
+            f"INSERT INTO log ({COLUMNAS}) SELECT {COLUMNAS} FROM log_sin_particionar"
+        )
+        op.execute("DROP TABLE log_sin_particionar")
+        op.execute(
+            "INSERT INTO log_resumen_hora (hora, nivel, tipo, cantidad) "
+            "SELECT date_trunc('hour', timestamp), nivel, tipo, count(*) FROM log "
+            "GROUP BY 1, 2, 3 "
+            "ON CONFLICT (hora, nivel, tipo) DO UPDATE SET cantidad = excluded.cantidad"
+        )
+    op.execute("SELECT asegurar_particiones_log(2)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER SEQUENCE log_id_seq OWNED BY NONE")
+    op.execute("CREATE TABLE log_plano (LIKE log INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO log_plano ({COLUMNAS}) SELECT {COLUMNAS} FROM log")
+    op.execute("DROP TABLE log")
+    op.execute("ALTER TABLE log_plano RENAME TO log")
+    op.execute("ALTER TABLE log ADD PRIMARY KEY (id)")
+    op.execute("ALTER SEQUENCE log_id_seq OWNED BY log.id")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_log_id ON log (id)")
+    op.execute("DROP FUNCTION IF EXISTS purgar_particiones_log(INTEGER)")
+    op.execute("DROP FUNCTION IF EXISTS asegurar_particiones_log(INTEGER)")
+    op.execute("DROP FUNCTION IF EXISTS crear_particion_log(DATE)")
+    op.drop_table("log_resumen_hora")
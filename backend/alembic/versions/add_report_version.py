@@ -0,0 +1,87 @@
+"""Create report_version counters for the report cache
+
+Revision ID: add_report_version
+Revises: add_stock_dependencia
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+revision = "add_report_version"
+down_revision = "add_stock_dependencia"
+branch_labels = None
+depends_on = None
+
+# Tablas leídas por reportes_service (ver TABLAS_POR_REPORTE en report_cache)
+TABLAS = (
+    "clientes",
+    "clientes_persona_natural",
+    "clientes_persona_juridica",
+    "cliente_tcp",
+    "dependencia",
+    "productos",
+    "stock_dependencia",
+    "movimiento",
+    "tipo_movimiento",
+    "contrato",
+    "estado_contrato",
+    "tipo_contrato",
+    "moneda",
+    "solicitud_servicio",
+    "etapas",
+    "persona_etapa",
+    "persona_liquidacion",
+    "liquidacion",
+    "productos_en_liquidacion",
+)
+
+# Trigger de restricción diferido: corre al confirmar la transacción (el
+# bloqueo sobre la fila del contador dura solo el commit) y la marca local
+# de la transacción hace que se incremente una vez por tabla, no por fila.
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION public.incrementar_report_version()
+ RETURNS trigger
+ LANGUAGE plpgsql
+AS $function$
+BEGIN
+    IF current_setting('report_version.' || TG_TABLE_NAME, true) = '1' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config('report_version.' || TG_TABLE_NAME, '1', true);
+    INSERT INTO report_version (tabla, version, fecha_actualizacion)
+    VALUES (TG_TABLE_NAME, 1, NOW())
+    ON CONFLICT (tabla) DO UPDATE
+        SET version = report_version.version + 1,
+            fecha_actualizacion = NOW();
+    RETURN NULL;
+END;
+$function$;
+"""
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS report_version ("
+        "    tabla VARCHAR(63) PRIMARY KEY,"
+        "    version BIGINT NOT NULL DEFAULT 0,"
+        "    fecha_actualizacion TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL"
+        ")"
+    )
+    op.execute(TRIGGER_FUNCTION)
+    for tabla in TABLAS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_report_version ON {tabla}")
+        op.execute(
+            f"CREATE CONSTRAINT TRIGGER trg_report_version "
+            f"AFTER INSERT OR UPDATE OR DELETE ON {tabla} "
+            f"DEFERRABLE INITIALLY DEFERRED "
+            f"FOR EACH ROW EXECUTE FUNCTION incrementar_report_version()"
+        )
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_report_version ON {tabla}")
+    op.execute("DROP FUNCTION IF EXISTS incrementar_report_version()")
+    op.drop_table("report_version")
@@ -0,0 +1,54 @@
+"""Create stock_dependencia materialized stock balance
+
+Revision ID: add_stock_dependencia
+Revises: fill_denom_deps
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+revision = "add_stock_dependencia"
+down_revision = "fill_denom_deps"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS stock_dependencia ("
+        "    id_producto INTEGER NOT NULL"
+        "        REFERENCES productos(id_producto) ON DELETE CASCADE,"
+        "    id_dependencia INTEGER NOT NULL,"
+        "    cantidad_entrada INTEGER NOT NULL DEFAULT 0,"
+        "    cantidad_salida INTEGER NOT NULL DEFAULT 0,"
+        "    stock INTEGER NOT NULL DEFAULT 0,"
+        "    fecha_actualizacion TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,"
+        "    PRIMARY KEY (id_producto, id_dependencia)"
+        ")"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_stock_dependencia_dependencia "
+        "ON stock_dependencia (id_dependencia)"
+    )
+    # Backfill desde los movimientos confirmados existentes
+    op.execute(
+        "INSERT INTO stock_dependencia ("
+        "    id_producto, id_dependencia, cantidad_entrada, cantidad_salida, stock"
+        ") "
+        "SELECT m.id_producto, m.id_dependencia, "
+        "       SUM(CASE WHEN tm.factor > 0 THEN m.cantidad ELSE 0 END), "
+        "       SUM(CASE WHEN tm.factor < 0 THEN m.cantidad ELSE 0 END), "
+        "       SUM(m.cantidad * tm.factor) "
+        "FROM movimiento m "
+        "JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento "
+        "WHERE m.estado = 'confirmado' "
+        "GROUP BY m.id_producto, m.id_dependencia "
+        "ON CONFLICT (id_producto, id_dependencia) DO NOTHING"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_stock_dependencia_dependencia")
+    op.drop_table("stock_dependencia")
@@ -3,12 +3,17 @@ import sys
 import logging
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.routes import api_router
-from src.database.connection import set_current_db
+from src.database.connection import engine_registry, get_pool_stats, set_current_db
 from src.middleware.logging import LoggingMiddleware
+from src.services.log_writer import log_writer
+from src.utils.dependencies import get_usuario_casa_matriz
+from src.utils.render_executor import render_executor
+from src.services.password_executor import password_executor
+from src.utils.report_cache import report_cache
 from src.core.exceptions import (
     AppError,
     NotFoundError,
@@ -93,7 +98,8 @@ else:
 
 logging.info(f"CORS_ORIGINS loaded: {cors_origins}")
 
-# app.add_middleware(LoggingMiddleware)
+if os.getenv("LOG_REQUESTS", "true").lower() in ("1", "true", "yes"):
+    app.add_middleware(LoggingMiddleware)
 
 app.include_router(api_router)
 
@@ -111,6 +117,8 @@ async def database_middleware(request: Request, call_next):
             if not SECRET_KEY:
                 raise RuntimeError("SECRET_KEY environment variable is required")
             payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            # Compartido con require_auth para no decodificar el token dos veces
+            request.state.jwt_payload = payload
             base_datos = payload.get("base_datos")
             if base_datos:
                 from urllib.parse import urlparse
@@ -134,6 +142,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -147,6 +156,42 @@ async def health_check():
     return {"status": "healthy"}
 
 
+# Las métricas nombran las bases de todos los tenants: solo casa matriz
+solo_casa_matriz = [Depends(get_usuario_casa_matriz)]
+
+
+@app.get("/health/db", dependencies=solo_casa_matriz)
+async def health_db():
+    """Estado de los pools de conexiones por base de datos."""
+    return get_pool_stats()
+
+
+@app.get("/health/reportes", dependencies=solo_casa_matriz)
+async def health_reportes():
+    """Cola y métricas del pool de generación de PDFs y de la caché."""
+    return {**render_executor.stats(), "cache": report_cache.stats()}
+
+
+@app.get("/health/auth", dependencies=solo_casa_matriz)
+async def health_auth():
+    """Cola y métricas del pool de bcrypt (login, registro, cambio de clave)."""
+    return password_executor.stats()
+
+
+@app.on_event("startup")
+async def iniciar_log_writer():
+    log_writer.iniciar()
+
+
+@app.on_event("shutdown")
+async def cerrar_engines():
+    # Primero vaciar la cola de logs, que todavía necesita los engines
+    await log_writer.detener()
+    await engine_registry.dispose_all()
+    render_executor.shutdown()
+    password_executor.shutdown()
+
+
 @app.exception_handler(AppError)
 async def app_error_handler(request: Request, exc: AppError):
     status_map = {
@@ -158,7 +203,11 @@ async def app_error_handler(request: Request, exc: AppError):
     logging.getLogger(__name__).warning(
         f"AppError handled: type={type(exc).__name__}, status={status}, detail={exc.message}"
     )
-    return JSONResponse(status_code=status, content={"detail": exc.message})
+    return JSONResponse(
+        status_code=status,
+        content={"detail": exc.message},
+        headers=getattr(exc, "headers", None),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+"""Benchmark de DashboardService.get_stats frente al tamaño del catálogo.
+
+Inserta N productos sintéticos (con un movimiento confirmado cada uno y su
+saldo en stock_dependencia) dentro de una transacción que se revierte al
+final, y mide número de sentencias SQL y latencia de ``get_stats``. Con el
+cálculo basado en agregados agrupados el número de sentencias debe
+mantenerse constante al crecer N.
+
+Uso (desde backend/):
+    python scripts/bench_dashboard_stats.py --tamanos 100 1000 5000 --repeticiones 5
+"""
+
+import argparse
+import asyncio
+import statistics
+from datetime import datetime
+
+from bench_utils import contar_sentencias, cronometro
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.connection import DATABASE_URL
+from src.repository.stock_repo import stock_repo
+from src.services.dashboard_service import DashboardService
+
+
+async def _sembrar_productos(session: AsyncSession, cantidad: int) -> None:
+    """Inserta productos, movimientos confirmados y su saldo sin hacer commit."""
+    ids = (
+        await session.exec(
+            text("""
+            SELECT
+                (SELECT id_subcategoria FROM subcategorias ORDER BY 1 LIMIT 1),
+                (SELECT id_moneda FROM moneda ORDER BY 1 LIMIT 1),
+                (SELECT id_tipo_movimiento FROM tipo_movimiento
+                 WHERE factor > 0 ORDER BY 1 LIMIT 1),
+                (SELECT factor FROM tipo_movimiento
+                 WHERE factor > 0 ORDER BY id_tipo_movimiento LIMIT 1),
+                (SELECT id_dependencia FROM dependencia ORDER BY 1 LIMIT 1)
+        """)
+        )
+    ).one()
+    if any(v is None for v in ids):
+        raise SystemExit(
+            "La BD necesita al menos una subcategoría, moneda, tipo de "
+            "movimiento de entrada y dependencia para sembrar productos."
+        )
+    id_subcategoria, id_moneda, id_tipo_entrada, factor, id_dependencia = ids
+
+    movimientos = await session.exec(
+        text("""
+        WITH nuevos AS (
+            INSERT INTO productos (
+                codigo, id_subcategoria, nombre, moneda_compra, precio_compra,
+                moneda_venta, precio_venta, precio_minimo
+            )
+            SELECT 'BENCH-' || g, :id_subcategoria, 'Producto bench ' || g,
+                   :id_moneda, 10, :id_moneda, 15, 12
+            FROM generate_series(1, :cantidad) AS g
+            RETURNING id_producto
+        )
+        INSERT INTO movimiento (
+            id_tipo_movimiento, id_dependencia, id_producto, cantidad, fecha, estado
+        )
+        SELECT :id_tipo, :id_dependencia, id_producto,
+               (id_producto % 20), :fecha, 'confirmado'
+        FROM nuevos
+        RETURNING id_producto, cantidad
+    """),
+        params={
+            "id_subcategoria": id_subcategoria,
+            "id_moneda": id_moneda,
+            "id_tipo": id_tipo_entrada,
+            "id_dependencia": id_dependencia,
+            "cantidad": cantidad,
+            "fecha": datetime.now(),
+        },
+    )
+    # El dashboard lee el saldo materializado, no los movimientos
+    await stock_repo.aplicar_movimientos(
+        session,
+        [
+            (id_producto, id_dependencia, cantidad, factor)
+            for id_producto, cantidad in movimientos.all()
+        ],
+    )
+
+
+async def main(tamanos: list[int], repeticiones: int) -> None:
+    engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+    print(f"{'productos':>10} {'sentencias':>11} {'media ms':>10} {'max ms':>10}")
+    for tamano in tamanos:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            session = AsyncSession(bind=conn, expire_on_commit=False)
+            try:
+                await _sembrar_productos(session, tamano)
+
+                tiempos = []
+                sentencias = 0
+                for _ in range(repeticiones):
+                    with contar_sentencias(engine) as contador, cronometro() as t:
+                        await DashboardService.get_stats(session)
+                    tiempos.append(t["ms"])
+                    sentencias = contador.total
+
+                print(
+                    f"{tamano:>10} {sentencias:>11} "
+                    f"{statistics.mean(tiempos):>10.1f} {max(tiempos):>10.1f}"
+                )
+            finally:
+                await session.close()
+                await trans.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tamanos", type=int, nargs="+", default=[100, 1000, 5000, 10000]
+    )
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tamanos, args.repeticiones))
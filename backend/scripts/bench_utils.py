@@ -0,0 +1,58 @@
+"""Utilidades compartidas por los scripts de benchmark (scripts/bench_*.py)."""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Permite ejecutar los scripts como ``python scripts/bench_x.py`` desde backend/
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class ContadorSentencias:
+    """Cuenta las sentencias SQL que se envían a la base de datos."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.sentencias: List[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        self.sentencias.append(statement)
+
+
+@contextmanager
+def contar_sentencias(engine: AsyncEngine) -> Iterator[ContadorSentencias]:
+    """Context manager que registra cada ``execute`` sobre el engine dado."""
+    contador = ContadorSentencias()
+    event.listen(engine.sync_engine, "before_cursor_execute", contador)
+    try:
+        yield contador
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", contador)
+
+
+@contextmanager
+def cronometro() -> Iterator[dict]:
+    """Mide el tiempo transcurrido en milisegundos (``resultado["ms"]``)."""
+    resultado = {"ms": 0.0}
+    inicio = time.perf_counter()
+    try:
+        yield resultado
+    finally:
+        resultado["ms"] = (time.perf_counter() - inicio) * 1000
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil ``p`` (0-100) por el método del rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[idx]
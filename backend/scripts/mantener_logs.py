@@ -0,0 +1,75 @@
+"""Crea las particiones próximas de la tabla `log` y elimina las vencidas.
+
+Pensado para ejecutarse una vez al día (cron). Con ``--todas`` recorre las
+bases registradas en ``conexion_database``; si no, solo ``--db``. La
+retención y los meses por adelantado se leen de LOG_RETENCION_MESES y
+LOG_MESES_ADELANTE salvo que se indiquen aquí. Sale con código 1 si alguna
+base falló.
+
+Uso (desde backend/):
+    python scripts/mantener_logs.py --todas
+    python scripts/mantener_logs.py --db caguayosa --retencion 12
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.connection import AUTH_DATABASE, engine_registry  # noqa: E402
+from src.services.log_mantenimiento import (  # noqa: E402
+    LOG_MESES_ADELANTE,
+    LOG_RETENCION_MESES,
+    mantener_logs_en,
+)
+from src.services.replicacion_service import ReplicacionService  # noqa: E402
+
+
+async def main(args) -> int:
+    if args.todas:
+        bases = [
+            s["nombre_database"] for s in await ReplicacionService.get_sucursales()
+        ]
+    else:
+        bases = [args.db]
+
+    try:
+        resultados = await mantener_logs_en(bases, args.adelante, args.retencion)
+    finally:
+        await engine_registry.dispose_all()
+
+    fallidas = 0
+    for db_name, resultado in resultados.items():
+        if "error" in resultado:
+            fallidas += 1
+            print(f"❌ {db_name}: {resultado['error']}")
+            continue
+        creadas = ", ".join(resultado["creadas"]) or "-"
+        eliminadas = ", ".join(resultado["eliminadas"]) or "-"
+        print(f"✅ {db_name}: creadas {creadas}; eliminadas {eliminadas}")
+    return 1 if fallidas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=AUTH_DATABASE, help="Base de datos a mantener")
+    parser.add_argument(
+        "--todas",
+        action="store_true",
+        help="Mantener todas las bases de conexion_database",
+    )
+    parser.add_argument(
+        "--retencion",
+        type=int,
+        default=LOG_RETENCION_MESES,
+        help="Meses completos de logs a conservar además del actual",
+    )
+    parser.add_argument(
+        "--adelante",
+        type=int,
+        default=LOG_MESES_ADELANTE,
+        help="Meses futuros con partición ya creada",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
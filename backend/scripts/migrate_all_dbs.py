@@ -1,9 +1,27 @@
-"""Run alembic migrations on all databases on the server."""
+"""Run alembic migrations on all databases on the server.
 
+Each database is inspected once (tables + current alembic revision) and the
+ones already at head are skipped. The rest are migrated in parallel by a
+pool of worker processes (alembic's ``context`` is process-global, so
+threads cannot be used). A failing database does not stop the others; a
+summary with the duration of each database is printed at the end and the
+exit code is 1 if any of them failed.
+
+Usage (from backend/):
+    python scripts/migrate_all_dbs.py --workers 4
+    python scripts/migrate_all_dbs.py --dry-run
+"""
+
+import argparse
 import os
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
 from alembic.config import Config
 from alembic import command
+from alembic.script import ScriptDirectory
 import psycopg2
 from dotenv import load_dotenv
 
@@ -51,68 +69,165 @@ def get_all_databases() -> list[str]:
     return databases
 
 
-def db_state(conn, db_name: str) -> str:
-    """Check database state: 'empty', 'has_tables', or 'has_alembic'."""
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT EXISTS ("
-        "  SELECT FROM information_schema.tables "
-        "  WHERE table_name = 'alembic_version'"
-        ")"
+def connect(db_name: str):
+    return psycopg2.connect(
+        host=ADMIN_DB_HOST,
+        port=ADMIN_DB_PORT,
+        user=ADMIN_DB_USER,
+        password=ADMIN_DB_PASSWORD,
+        dbname=db_name,
     )
-    has_alembic = cur.fetchone()[0]
-    if has_alembic:
-        cur.close()
-        return "has_alembic"
 
-    cur.execute(
-        "SELECT EXISTS ("
-        "  SELECT FROM information_schema.tables "
-        "  WHERE table_schema = 'public'"
-        ")"
+
+def alembic_config(db_name: str) -> Config:
+    db_url = (
+        f"postgresql+asyncpg://{ADMIN_DB_USER}:{ADMIN_DB_PASSWORD}"
+        f"@{ADMIN_DB_HOST}:{ADMIN_DB_PORT}/{db_name}"
     )
-    has_any_table = cur.fetchone()[0]
-    cur.close()
+    alembic_cfg = Config(ALEMBIC_CFG_PATH)
+    alembic_cfg.set_main_option("sqlalchemy.url", db_url)
+    return alembic_cfg
+
+
+def db_state(db_name: str) -> tuple[str, str | None]:
+    """Inspect a database over a single connection.
+
+    Returns (state, revision) where state is 'empty', 'has_tables' or
+    'has_alembic' and revision is the value stored in alembic_version.
+    """
+    conn = connect(db_name)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT to_regclass('alembic_version') IS NOT NULL, EXISTS ("
+            "  SELECT FROM information_schema.tables "
+            "  WHERE table_schema = 'public'"
+            ")"
+        )
+        has_alembic, has_any_table = cur.fetchone()
+        revision = None
+        if has_alembic:
+            cur.execute("SELECT version_num FROM alembic_version")
+            row = cur.fetchone()
+            revision = row[0] if row else None
+        cur.close()
+    finally:
+        conn.close()
+    if has_alembic:
+        return "has_alembic", revision
     if has_any_table:
-        return "has_tables"
-    return "empty"
+        return "has_tables", None
+    return "empty", None
+
+
+def migrate_database(db_name: str, state: str) -> dict:
+    """Bring one database to head (runs in a worker process)."""
+    start = time.perf_counter()
+    try:
+        alembic_cfg = alembic_config(db_name)
+        if state == "has_tables":
+            command.stamp(alembic_cfg, "head")
+            action = "stamped as head, tables already exist"
+        else:
+            command.upgrade(alembic_cfg, "head")
+            action = "migrated" if state == "has_alembic" else "created from scratch"
+        error = None
+    except Exception as e:
+        action, error = "failed", f"{type(e).__name__}: {e}"
+    return {
+        "db": db_name,
+        "action": action,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def failed_result(db_name: str, error: BaseException) -> dict:
+    return {
+        "db": db_name,
+        "action": "failed",
+        "error": f"{type(error).__name__}: {error}",
+        "seconds": 0.0,
+    }
+
+
+def print_summary(results: list[dict], skipped: list[str], total: float) -> None:
+    failed = [r for r in results if r["error"]]
+    print(f"\n{'database':<32}{'result':<42}{'seconds':>8}")
+    for r in sorted(results, key=lambda r: r["seconds"], reverse=True):
+        print(f"{r['db']:<32}{r['action']:<42}{r['seconds']:>8.1f}")
+    print(
+        f"\n{len(results) - len(failed)} migrated, {len(skipped)} already at head, "
+        f"{len(failed)} failed in {total:.1f}s"
+    )
+    for r in failed:
+        print(f"  ❌ {r['db']}: {r['error']}")
 
 
 def main():
-    databases = get_all_databases()
-    print(f"Migrating {len(databases)} database(s)...")
-    for db_name in databases:
-        conn = psycopg2.connect(
-            host=ADMIN_DB_HOST,
-            port=ADMIN_DB_PORT,
-            user=ADMIN_DB_USER,
-            password=ADMIN_DB_PASSWORD,
-            dbname=db_name,
-        )
-        state = db_state(conn, db_name)
-        conn.close()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("MIGRATE_WORKERS", "4")),
+        help="databases migrated at the same time",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only show what would be done"
+    )
+    args = parser.parse_args()
 
-        db_url = (
-            f"postgresql+asyncpg://{ADMIN_DB_USER}:{ADMIN_DB_PASSWORD}"
-            f"@{ADMIN_DB_HOST}:{ADMIN_DB_PORT}/{db_name}"
-        )
-        alembic_cfg = Config(ALEMBIC_CFG_PATH)
-        alembic_cfg.set_main_option("sqlalchemy.url", db_url)
-
-        try:
-            if state == "has_alembic":
-                command.upgrade(alembic_cfg, "head")
-                print(f"  ✅ {db_name} (migrated)")
-            elif state == "has_tables":
-                command.stamp(alembic_cfg, "head")
-                print(f"  ✅ {db_name} (stamped as head, tables already exist)")
+    start = time.perf_counter()
+    heads = set(ScriptDirectory.from_config(Config(ALEMBIC_CFG_PATH)).get_heads())
+    databases = get_all_databases()
+    print(f"Inspecting {len(databases)} database(s)...")
+
+    pending: list[tuple[str, str]] = []
+    skipped: list[str] = []
+    results: list[dict] = []
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1) * 2) as pool:
+        futures = {pool.submit(db_state, db): db for db in databases}
+        for future in as_completed(futures):
+            db_name = futures[future]
+            try:
+                state, revision = future.result()
+            except Exception as e:
+                results.append(failed_result(db_name, e))
+                continue
+            if state == "has_alembic" and revision in heads:
+                skipped.append(db_name)
             else:
-                command.upgrade(alembic_cfg, "head")
-                print(f"  ✅ {db_name} (created from scratch)")
-        except Exception as e:
-            print(f"  ❌ {db_name}: {e}")
+                pending.append((db_name, state))
 
-    print("Done.")
+    pending.sort()
+    print(
+        f"{len(skipped)} already at head, {len(pending)} to migrate "
+        f"with {args.workers} worker(s)"
+    )
+    if args.dry_run:
+        for db_name, state in pending:
+            print(f"  - {db_name} ({state})")
+        return
+
+    try:
+        with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+            futures = {
+                pool.submit(migrate_database, db, state): db for db, state in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # A worker that dies (OOM, signal) breaks the pool: every
+                    # database still running in it fails with BrokenProcessPool
+                    result = failed_result(futures[future], e)
+                results.append(result)
+                icon = "❌" if result["error"] else "✅"
+                print(f"  {icon} {result['db']} ({result['action']})", flush=True)
+    finally:
+        print_summary(results, skipped, time.perf_counter() - start)
+    if any(r["error"] for r in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
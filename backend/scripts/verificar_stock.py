@@ -0,0 +1,58 @@
+"""Verifica (y opcionalmente reconstruye) el saldo materializado de stock.
+
+Compara ``stock_dependencia`` con ``SUM(cantidad * factor)`` de los
+movimientos confirmados y lista las diferencias. Con ``--reconstruir`` regenera
+la tabla completa cuando hay deriva. Sale con código 1 si quedan diferencias.
+
+Uso (desde backend/):
+    python scripts/verificar_stock.py [--db nombre_bd] [--reconstruir]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database.connection import AUTH_DATABASE, get_auth_session  # noqa: E402
+from src.services.existencia_service import ExistenciaService  # noqa: E402
+
+
+async def main(db_name: str, reconstruir: bool) -> int:
+    async for session in get_auth_session(db_name):
+        resultado = await ExistenciaService.verificar_stock(session)
+        diferencias = resultado["diferencias"]
+
+        if not diferencias:
+            print(f"✅ {db_name}: stock_dependencia consistente")
+            return 0
+
+        print(f"⚠️  {db_name}: {len(diferencias)} saldo(s) con deriva")
+        for d in diferencias[:50]:
+            print(
+                f"  producto={d['id_producto']} dependencia={d['id_dependencia']} "
+                f"registrado={d['stock_registrado']} calculado={d['stock_calculado']}"
+            )
+        if len(diferencias) > 50:
+            print(f"  ... y {len(diferencias) - 50} más")
+
+        if not reconstruir:
+            return 1
+
+        reconstruido = await ExistenciaService.reconstruir_stock(session)
+        print(f"🔧 {db_name}: reconstruidas {reconstruido['filas']} fila(s)")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=AUTH_DATABASE, help="Base de datos a revisar")
+    parser.add_argument(
+        "--reconstruir",
+        action="store_true",
+        help="Regenerar stock_dependencia si se detecta deriva",
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.db, args.reconstruir)))
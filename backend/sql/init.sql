@@ -608,6 +608,7 @@ CREATE INDEX idx_detalle_venta_venta ON detalle_ventas(id_venta);
 CREATE INDEX idx_detalle_venta_producto ON detalle_ventas(id_producto);
 CREATE INDEX idx_clientes_nit ON clientes(nit);
 CREATE INDEX idx_convenio_cliente ON clientes(id_cliente);
+CREATE INDEX idx_convenio_id_cliente ON convenio(id_cliente);
 CREATE INDEX idx_dependencia_padre ON dependencia(codigo_padre);
 CREATE INDEX idx_dependencia_tipo ON dependencia(id_tipo_dependencia);
 CREATE INDEX idx_usuarios_grupo ON usuarios(id_grupo);
@@ -1182,8 +1183,11 @@ CREATE TABLE cuenta_dependencias (
 -- Sistema de logging centralizado para auditoría
 -- =====================================================
 
+-- Particionada por mes (log_pYYYYMM). log_default recoge lo que llegue a un
+-- mes sin partición; scripts/mantener_logs.py crea las de los próximos meses
+-- y elimina las que superan la retención.
 CREATE TABLE IF NOT EXISTS log (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
     nivel VARCHAR(20) NOT NULL,
     tipo VARCHAR(20) NOT NULL,
@@ -1195,9 +1199,165 @@ CREATE TABLE IF NOT EXISTS log (
     method VARCHAR(10),
     status_code INTEGER,
     usuario_nombre VARCHAR(100),
-    navegador VARCHAR(100)
+    navegador VARCHAR(100),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE IF NOT EXISTS log_default PARTITION OF log DEFAULT;
+
+CREATE INDEX IF NOT EXISTS ix_log_timestamp ON log(timestamp);
+CREATE INDEX IF NOT EXISTS ix_log_nivel_timestamp ON log(nivel, timestamp);
+
+-- Cantidad de registros por hora, nivel y tipo (la mantiene el escritor de
+-- logs en el mismo INSERT; /logs/stats lee de aquí)
+CREATE TABLE IF NOT EXISTS log_resumen_hora (
+    hora TIMESTAMP NOT NULL,
+    nivel VARCHAR(20) NOT NULL,
+    tipo VARCHAR(20) NOT NULL,
+    cantidad BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hora, nivel, tipo)
+);
+
+CREATE OR REPLACE FUNCTION crear_particion_log(mes DATE)
+RETURNS text
+LANGUAGE plpgsql
+AS '
+DECLARE
+    desde TIMESTAMP := date_trunc(''month'', mes);
+    hasta TIMESTAMP := date_trunc(''month'', mes) + INTERVAL ''1 month'';
+    nombre TEXT := ''log_p'' || to_char(mes, ''YYYYMM'');
+BEGIN
+    IF to_regclass(nombre) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format(''CREATE TABLE %I (LIKE log INCLUDING DEFAULTS)'', nombre);
+    EXECUTE format(
+        ''WITH movidas AS (DELETE FROM log_default''
+        '' WHERE "timestamp" >= %L AND "timestamp" < %L RETURNING *)''
+        '' INSERT INTO %I SELECT * FROM movidas'',
+        desde, hasta, nombre
+    );
+    EXECUTE format(
+        ''ALTER TABLE log ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)'',
+        nombre, desde, hasta
+    );
+    RETURN nombre;
+END;
+';
+
+CREATE OR REPLACE FUNCTION asegurar_particiones_log(meses_adelante INTEGER)
+RETURNS SETOF text
+LANGUAGE plpgsql
+AS '
+DECLARE
+    nombre TEXT;
+BEGIN
+    FOR i IN 0..meses_adelante LOOP
+        nombre := crear_particion_log(
+            (date_trunc(''month'', now()) + make_interval(months => i))::date
+        );
+        IF nombre IS NOT NULL THEN
+            RETURN NEXT nombre;
+        END IF;
+    END LOOP;
+END;
+';
+
+CREATE OR REPLACE FUNCTION purgar_particiones_log(meses_retencion INTEGER)
+RETURNS SETOF text
+LANGUAGE plpgsql
+AS '
+DECLARE
+    limite DATE := (
+        date_trunc(''month'', now()) - make_interval(months => meses_retencion)
+    )::date;
+    particion RECORD;
+BEGIN
+    FOR particion IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = ''log''::regclass
+          AND c.relname ~ ''^log_p[0-9]{6}$''
+        ORDER BY c.relname
+    LOOP
+        IF to_date(substr(particion.relname, 6), ''YYYYMM'') < limite THEN
+            EXECUTE format(''DROP TABLE %I'', particion.relname);
+            RETURN NEXT particion.relname;
+        END IF;
+    END LOOP;
+    DELETE FROM log_resumen_hora WHERE hora < limite;
+END;
+';
+
+SELECT asegurar_particiones_log(2);
+
+-- =====================================================
+-- SALDO MATERIALIZADO DE STOCK POR DEPENDENCIA
+-- Se actualiza al confirmar/cancelar/eliminar movimientos
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS stock_dependencia (
+    id_producto INTEGER NOT NULL REFERENCES productos(id_producto) ON DELETE CASCADE,
+    id_dependencia INTEGER NOT NULL,  -- Sin FK hacia foreign table dependencia
+    cantidad_entrada INTEGER NOT NULL DEFAULT 0,
+    cantidad_salida INTEGER NOT NULL DEFAULT 0,
+    stock INTEGER NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id_producto, id_dependencia)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_dependencia_dependencia ON stock_dependencia(id_dependencia);
+
+-- =====================================================
+-- VERSIONES DE DATOS PARA LA CACHE DE REPORTES
+-- Un trigger diferido incrementa el contador de la tabla
+-- una vez por transaccion que la modifica
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS report_version (
+    tabla VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+CREATE OR REPLACE FUNCTION incrementar_report_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS '
+BEGIN
+    IF current_setting(''report_version.'' || TG_TABLE_NAME, true) = ''1'' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM set_config(''report_version.'' || TG_TABLE_NAME, ''1'', true);
+    INSERT INTO report_version (tabla, version, fecha_actualizacion)
+    VALUES (TG_TABLE_NAME, 1, NOW())
+    ON CONFLICT (tabla) DO UPDATE
+        SET version = report_version.version + 1,
+            fecha_actualizacion = NOW();
+    RETURN NULL;
+END;
+';
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON clientes DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON clientes_persona_natural DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON clientes_persona_juridica DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON cliente_tcp DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON dependencia DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON productos DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON stock_dependencia DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON movimiento DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON tipo_movimiento DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON contrato DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON estado_contrato DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON tipo_contrato DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON moneda DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON solicitud_servicio DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON etapas DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON persona_etapa DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON persona_liquidacion DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON liquidacion DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+CREATE CONSTRAINT TRIGGER trg_report_version AFTER INSERT OR UPDATE OR DELETE ON productos_en_liquidacion DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION incrementar_report_version();
+
 -- =====================================================
 -- DATOS BASE PARA RECEPCIONES (Convenio/Anexo de la empresa)
 -- =====================================================
@@ -1,13 +1,24 @@
 import os
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
 from contextvars import ContextVar
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from src.core.exceptions import AppError
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Context variable to store the database name for the current request
 _current_db: ContextVar[str] = ContextVar(
     "current_db", default=os.getenv("AUTH_DATABASE", "caguayo_inventario")
@@ -19,6 +30,15 @@ def set_current_db(db_name: str):
     _current_db.set(db_name)
 
 
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    valor = os.getenv(name, str(default)).strip().lower()
+    return valor in ("1", "true", "yes", "si")
+
+
 # Ensure we use the async driver
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -33,48 +53,305 @@ elif DATABASE_URL.startswith("postgresql+psycopg://"):
 
 AUTH_DATABASE = os.getenv("AUTH_DATABASE", "caguayo_inventario")
 
-# Default engine for auth database
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,
-    future=True,
-    connect_args={"server_settings": {"client_encoding": "utf8"}},
+# Configuración de pools. La BD central recibe más tráfico (login, catálogos
+# compartidos) que cada sucursal, por eso tiene límites propios.
+DB_ECHO = _env_bool("DB_ECHO", False)
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+DB_AUTH_POOL_SIZE = _env_int("DB_AUTH_POOL_SIZE", 10)
+DB_AUTH_MAX_OVERFLOW = _env_int("DB_AUTH_MAX_OVERFLOW", 10)
+DB_TENANT_POOL_SIZE = _env_int("DB_TENANT_POOL_SIZE", 3)
+DB_TENANT_MAX_OVERFLOW = _env_int("DB_TENANT_MAX_OVERFLOW", 5)
+# Presupuesto global: suma de (pool_size + max_overflow) de todos los engines.
+# Debe quedar por debajo de max_connections del servidor Postgres.
+DB_MAX_CONNECTIONS = _env_int("DB_MAX_CONNECTIONS", 80)
+
+
+def _url_for_db(db_name: str) -> str:
+    """Devuelve DATABASE_URL apuntando a otra base de datos del mismo servidor."""
+    base, _, _ = DATABASE_URL.rpartition("/")
+    return f"{base}/{db_name}"
+
+
+@dataclass
+class PoolMetrics:
+    """Métricas de espera al obtener una conexión del pool de un engine."""
+
+    checkouts: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False) -> None:
+        if timeout:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+            self.total_wait += espera
+            if espera > self.max_wait:
+                self.max_wait = espera
+
+    def as_dict(self) -> Dict[str, Any]:
+        promedio = self.total_wait / self.checkouts if self.checkouts else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(promedio * 1000, 3),
+            "wait_max_ms": round(self.max_wait * 1000, 3),
+            "wait_total_ms": round(self.total_wait * 1000, 3),
+        }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Pool que mide el tiempo de espera de cada checkout.
+
+    `_do_get` es el punto donde el pool bloquea hasta que hay una conexión
+    libre (o abre una nueva dentro del overflow), así que medirlo ahí refleja
+    la contención real del pool.
+    """
+
+    def __init__(self, *args, metrics: Optional[PoolMetrics] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics if metrics is not None else PoolMetrics()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            self.metrics.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metrics.registrar(time.perf_counter() - inicio)
+        return conn
+
+    def recreate(self):
+        # Conservar las métricas acumuladas al recrear el pool (dispose, etc.)
+        nuevo = super().recreate()
+        nuevo.metrics = self.metrics
+        return nuevo
+
+
+# SQLAlchemy nombra el logger del pool según el módulo de la clase; fuera de la
+# jerarquía "sqlalchemy" heredaría el nivel INFO de la aplicación.
+logging.getLogger(f"{__name__}.{MeteredQueuePool.__name__}").setLevel(
+    logging.INFO if DB_ECHO else logging.WARNING
 )
 
-# Cache of engines per database name
-_engines: dict[str, AsyncEngine] = {AUTH_DATABASE: engine}
 
+@dataclass
+class _EngineEntry:
+    engine: AsyncEngine
+    capacidad: int
+    metrics: PoolMetrics
+    session_factory: sessionmaker
+    ultimo_uso: float = field(default_factory=time.monotonic)
 
-def _get_engine_for_db(db_name: str) -> AsyncEngine:
-    """Get or create an async engine for the given database name."""
-    if db_name not in _engines:
-        db_url = DATABASE_URL.replace(DATABASE_URL.split("/")[-1], db_name)
-        _engines[db_name] = create_async_engine(
-            db_url,
-            echo=False,
+
+class EngineRegistry:
+    """Registro acotado de engines por base de datos (uno por sucursal).
+
+    - Cada engine tiene su propio pool con límites configurables.
+    - La suma de capacidades (pool_size + max_overflow) no supera
+      `max_connections`; al registrar una base nueva se desalojan, en orden
+      LRU, engines de sucursal sin conexiones en uso y se cierran con
+      `dispose()`.
+    - El engine de la BD central nunca se desaloja.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DB_MAX_CONNECTIONS,
+        pool_size: int = DB_TENANT_POOL_SIZE,
+        max_overflow: int = DB_TENANT_MAX_OVERFLOW,
+    ):
+        self.max_connections = max_connections
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self._entries: "OrderedDict[str, _EngineEntry]" = OrderedDict()
+        self._fijos: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pending_dispose: Set[asyncio.Task] = set()
+        self.evictions = 0
+
+    def _crear_engine(
+        self, url: str, pool_size: int, max_overflow: int
+    ) -> AsyncEngine:
+        return create_async_engine(
+            url,
+            echo=DB_ECHO,
             future=True,
+            poolclass=MeteredQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
             connect_args={"server_settings": {"client_encoding": "utf8"}},
         )
-    return _engines[db_name]
+
+    def _registrar(self, db_name: str, engine: AsyncEngine, capacidad: int):
+        # La fábrica de sesiones se crea una sola vez por engine y se reutiliza
+        # en cada request (get_session / get_auth_session).
+        entry = _EngineEntry(
+            engine=engine,
+            capacidad=capacidad,
+            metrics=getattr(engine.pool, "metrics", None) or PoolMetrics(),
+            session_factory=sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            ),
+        )
+        self._entries[db_name] = entry
+        return entry
+
+    def registrar_fijo(
+        self, db_name: str, url: str, pool_size: int, max_overflow: int
+    ) -> AsyncEngine:
+        """Registra un engine que nunca se desaloja (BD central)."""
+        with self._lock:
+            engine = self._crear_engine(url, pool_size, max_overflow)
+            self._registrar(db_name, engine, pool_size + max_overflow)
+            self._fijos.add(db_name)
+            return engine
+
+    def registrar_engine(
+        self, db_name: str, engine: AsyncEngine, capacidad: int = 0
+    ) -> None:
+        """Registra un engine creado fuera del registro (scripts, pruebas).
+
+        No se desaloja y cuenta `capacidad` conexiones en el presupuesto.
+        """
+        with self._lock:
+            self._registrar(db_name, engine, capacidad)
+            self._fijos.add(db_name)
+
+    def _get_entry(self, db_name: str) -> _EngineEntry:
+        with self._lock:
+            entry = self._entries.get(db_name)
+            if entry is not None:
+                self._entries.move_to_end(db_name)
+                entry.ultimo_uso = time.monotonic()
+                return entry
+
+            capacidad = self.pool_size + self.max_overflow
+            self._liberar_capacidad(capacidad)
+
+            engine = self._crear_engine(
+                _url_for_db(db_name), self.pool_size, self.max_overflow
+            )
+            entry = self._registrar(db_name, engine, capacidad)
+            logger.info(
+                f"Engine creado para BD '{db_name}' "
+                f"(pool_size={self.pool_size}, max_overflow={self.max_overflow}, "
+                f"en uso={self.capacidad_en_uso()}/{self.max_connections})"
+            )
+            return entry
+
+    def get(self, db_name: str) -> AsyncEngine:
+        """Devuelve el engine de `db_name`, creándolo si hace falta."""
+        return self._get_entry(db_name).engine
+
+    def get_session_factory(self, db_name: str) -> sessionmaker:
+        """Devuelve la fábrica de sesiones (cacheada) del engine de `db_name`."""
+        return self._get_entry(db_name).session_factory
+
+    def capacidad_en_uso(self) -> int:
+        return sum(e.capacidad for e in self._entries.values())
+
+    def _liberar_capacidad(self, necesaria: int) -> None:
+        """Desaloja engines LRU ociosos hasta que quepa `necesaria`."""
+        for db_name in list(self._entries.keys()):
+            if self.capacidad_en_uso() + necesaria <= self.max_connections:
+                return
+            if db_name in self._fijos:
+                continue
+            entry = self._entries[db_name]
+            if entry.engine.pool.checkedout() > 0:
+                continue
+            del self._entries[db_name]
+            self.evictions += 1
+            self._dispose(entry.engine)
+            logger.info(f"Engine de BD '{db_name}' desalojado (LRU)")
+
+        if self.capacidad_en_uso() + necesaria > self.max_connections:
+            raise AppError(
+                "Límite de conexiones a base de datos alcanzado, intente más tarde",
+                status_code=503,
+            )
+
+    def _dispose(self, engine: AsyncEngine) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # Sin loop activo no hay conexiones async abiertas que cerrar
+            engine.sync_engine.dispose(close=False)
+            return
+        task = loop.create_task(engine.dispose())
+        self._pending_dispose.add(task)
+        task.add_done_callback(self._pending_dispose.discard)
+
+    async def dispose_all(self) -> None:
+        """Cierra todos los engines (apagado de la aplicación)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._fijos.clear()
+        for entry in entries:
+            await entry.engine.dispose()
+        if self._pending_dispose:
+            await asyncio.gather(*self._pending_dispose, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de los pools y métricas de espera por base de datos."""
+        with self._lock:
+            bases = {}
+            for db_name, entry in self._entries.items():
+                pool = entry.engine.pool
+                bases[db_name] = {
+                    "pool_size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "overflow": pool.overflow(),
+                    "capacidad": entry.capacidad,
+                    **entry.metrics.as_dict(),
+                }
+            return {
+                "max_connections": self.max_connections,
+                "capacidad_en_uso": self.capacidad_en_uso(),
+                "engines": len(self._entries),
+                "evictions": self.evictions,
+                "bases": bases,
+            }
+
+
+engine_registry = EngineRegistry()
+
+# Default engine for auth database
+engine = engine_registry.registrar_fijo(
+    AUTH_DATABASE, DATABASE_URL, DB_AUTH_POOL_SIZE, DB_AUTH_MAX_OVERFLOW
+)
+
+
+def _get_engine_for_db(db_name: str) -> AsyncEngine:
+    """Get or create an async engine for the given database name."""
+    return engine_registry.get(db_name)
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Métricas de los pools de conexiones (para /health/db)."""
+    return engine_registry.stats()
 
 
 async def get_session() -> AsyncSession:
     """Get session for the user's selected database (from ContextVar)."""
-    db_name = _current_db.get()
-    target_engine = _get_engine_for_db(db_name)
-    async_session = sessionmaker(
-        target_engine, class_=AsyncSession, expire_on_commit=False
-    )
+    async_session = engine_registry.get_session_factory(_current_db.get())
     async with async_session() as session:
         yield session
 
 
 async def get_auth_session(db_name: Optional[str] = None) -> AsyncSession:
     """Get session for authentication database."""
-    auth_db = db_name or AUTH_DATABASE
-    target_engine = _get_engine_for_db(auth_db)
-    async_session = sessionmaker(
-        target_engine, class_=AsyncSession, expire_on_commit=False
-    )
+    async_session = engine_registry.get_session_factory(db_name or AUTH_DATABASE)
     async with async_session() as session:
         yield session
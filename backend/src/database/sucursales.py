@@ -0,0 +1,53 @@
+"""Acceso a las bases de datos de otras sucursales desde un request.
+
+Reemplaza las conexiones psycopg2 que se abrían (y cerraban) en cada
+llamada: todo pasa por los engines asyncpg de `engine_registry`, que ya
+mantienen un pool por base de datos con presupuesto global de conexiones.
+
+- `transaccion_en(db)` entrega una conexión del pool de esa base dentro de
+  una transacción (commit al salir, rollback si hay excepción).
+- `en_cada_base(bases, fn)` ejecuta `fn(conn)` en varias bases a la vez,
+  cada una en su transacción, con concurrencia limitada para no pedir más
+  engines de los que caben en el presupuesto. Devuelve el error de cada base
+  en vez de cortar en la primera.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.connection import engine_registry
+
+MAX_CONCURRENCIA_SUCURSALES = int(os.getenv("SUCURSALES_MAX_CONCURRENCIA", "4"))
+
+
+@asynccontextmanager
+async def transaccion_en(db_name: str) -> AsyncIterator[AsyncConnection]:
+    """Conexión del pool de `db_name` dentro de una transacción."""
+    async with engine_registry.get(db_name).begin() as conn:
+        yield conn
+
+
+async def en_cada_base(
+    bases: Iterable[str],
+    fn: Callable[[AsyncConnection], Awaitable[None]],
+    max_concurrencia: int = MAX_CONCURRENCIA_SUCURSALES,
+) -> Dict[str, Optional[Exception]]:
+    """Ejecuta `fn` en cada base (una transacción por base); base -> error."""
+    semaforo = asyncio.Semaphore(max_concurrencia)
+
+    async def _en(db_name: str) -> Optional[Exception]:
+        async with semaforo:
+            try:
+                async with transaccion_en(db_name) as conn:
+                    await fn(conn)
+            except Exception as e:
+                return e
+        return None
+
+    bases = list(dict.fromkeys(bases))
+    errores = await asyncio.gather(*[_en(b) for b in bases])
+    return dict(zip(bases, errores))
@@ -74,6 +74,9 @@ from .movimientos_dto import (
     DestinoAjuste,
     AjusteCreate,
     MovimientoAjusteRead,
+    ConfirmacionLoteCreate,
+    ResultadoConfirmacion,
+    ConfirmacionLoteRead,
 )
 from .cuentas_dto import (
     CuentaBase,
@@ -269,6 +272,9 @@ __all__ = [
     "DestinoAjuste",
     "AjusteCreate",
     "MovimientoAjusteRead",
+    "ConfirmacionLoteCreate",
+    "ResultadoConfirmacion",
+    "ConfirmacionLoteRead",
     "TipoDependenciaBase",
     "TipoDependenciaCreate",
     "TipoDependenciaRead",
@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from .ubicaciones_dto import ProvinciaRead, MunicipioRead
 from .cuentas_dto import CuentaRead, CuentaDependenciaCreate, CuentaDependenciaRead
 
@@ -75,6 +75,7 @@ class DependenciaRead(SQLModel):
     cuentas: List[CuentaRead] = []
     cuentas_dependencias: List[CuentaDependenciaRead] = []
     tablas_creadas: Optional[List[str]] = None
+    replicacion: Optional[Dict[str, Any]] = None
 
 
 class DependenciaConCuentasRead(SQLModel):
@@ -119,4 +120,4 @@ class DependenciaUpdate(SQLModel):
     puerto: Optional[int] = None
     id_provincia: Optional[int] = None
     id_municipio: Optional[int] = None
-    descripcion: Optional[str] = None
\ No newline at end of file
+    descripcion: Optional[str] = None
@@ -107,3 +107,20 @@ class MovimientoAjusteRead(SQLModel):
     cantidad: int
     id_dependencia: int
     dependencia_nombre: Optional[str] = None
+
+
+class ConfirmacionLoteCreate(SQLModel):
+    ids: list[int] = Field(min_length=1, max_length=5000)
+
+
+class ResultadoConfirmacion(SQLModel):
+    id_movimiento: int
+    confirmado: bool
+    estado: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ConfirmacionLoteRead(SQLModel):
+    confirmados: int
+    fallidos: int
+    resultados: list[ResultadoConfirmacion]
@@ -6,11 +6,16 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
+from src.services.log_writer import log_writer
+
 logger = logging.getLogger(__name__)
 
 EXCLUDED_PATHS = {"/", "/health", "/docs", "/openapi.json", "/redoc"}
 EXCLUDED_PREFIXES = ("/docs", "/api/v1/logs")
 
+# Máximo de bytes de una respuesta de error que se leen para extraer el detail
+MAX_BODY_LOG = 64 * 1024
+
 
 def get_user_from_token(request: Request) -> tuple[Optional[int], Optional[str]]:
     """Decodifica el token JWT y retorna (usuario_id, usuario_nombre)"""
@@ -87,41 +92,48 @@ def generate_log_message(
     return f"Estado: {status_code}"
 
 
-async def read_response_body(response: Response) -> tuple[bytes, Response]:
-    """Lee el cuerpo de la respuesta y la restaura para poder enviarla."""
-    if hasattr(response, "body_iterator") and response.body_iterator is not None:
-        try:
-            body = b""
-            async for chunk in response.body_iterator:
-                body += chunk
-
-            # Restaurar el body iterator para que la respuesta pueda enviarse
-            async def body_generator():
-                yield body
-
-            from starlette.responses import StreamingResponse
-
-            if isinstance(response, StreamingResponse):
-                new_response = StreamingResponse(
-                    content=body_generator(),
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.media_type,
-                )
-            else:
-                new_response = response.__class__(
-                    content=body,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    media_type=response.media_type,
-                )
-                new_response.body_iterator = body_generator()
-
-            return body, new_response
-        except Exception:
-            pass
-
-    return b"", response
+async def read_response_body(
+    response: Response, limite: int = MAX_BODY_LOG
+) -> tuple[bytes, Response]:
+    """Lee hasta `limite` bytes del cuerpo de la respuesta sin perder el resto.
+
+    Los fragmentos leídos se reinyectan delante del iterador original, así la
+    respuesta se sigue enviando en streaming. Si el cuerpo supera el límite
+    se devuelve b"" (no se intenta interpretar un JSON incompleto).
+    """
+    if not hasattr(response, "body_iterator") or response.body_iterator is None:
+        return b"", response
+
+    iterador = response.body_iterator
+    leidos: list[bytes] = []
+    total = 0
+    completo = True
+    try:
+        while True:
+            try:
+                chunk = await iterador.__anext__()
+            except StopAsyncIteration:
+                break
+            if isinstance(chunk, str):
+                chunk = chunk.encode(response.charset or "utf-8")
+            leidos.append(chunk)
+            total += len(chunk)
+            if total > limite:
+                completo = False
+                break
+    except Exception as e:
+        logger.debug(f"Error reading response body: {e}")
+        completo = False
+
+    async def body_generator():
+        for chunk in leidos:
+            yield chunk
+        if not completo:
+            async for chunk in iterador:
+                yield chunk
+
+    response.body_iterator = body_generator()
+    return (b"".join(leidos) if completo else b""), response
 
 
 class LoggingMiddleware(BaseHTTPMiddleware):
@@ -222,47 +234,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             "usuario_nombre": usuario_nombre,
         }
 
-        try:
-            from src.database.connection import get_session
-            from src.models.log import LogEntry
-
-            async for db in get_session():
-                db_obj = LogEntry(**log_data)
-                db.add(db_obj)
-                await db.commit()
-                await db.refresh(db_obj)
-
-                try:
-                    from src.services.log_sse import broadcast_log
-
-                    broadcast_data = {
-                        "id": db_obj.id,
-                        "timestamp": db_obj.timestamp.isoformat(),
-                        "nivel": db_obj.nivel,
-                        "tipo": db_obj.tipo,
-                        "mensaje": db_obj.mensaje,
-                        "detalle": db_obj.detalle,
-                        "ip": db_obj.ip,
-                        "navegador": db_obj.navegador,
-                        "usuario_id": db_obj.usuario_id,
-                        "usuario_nombre": db_obj.usuario_nombre,
-                        "endpoint": db_obj.endpoint,
-                        "method": db_obj.method,
-                        "status_code": db_obj.status_code,
-                    }
-                    await broadcast_log(broadcast_data)
-                except Exception as be:
-                    logger.debug(f"Broadcast error: {be}")
-                break
-        except Exception as e:
-            error_str = str(e)
-            if (
-                "no existe la relación" in error_str
-                or "UndefinedTableError" in error_str
-                or "log" in error_str
-            ):
-                logger.debug(f"Tabla log no existe en tenant, saltando logging: {e}")
-            else:
-                logger.error(f"Error saving log: {e}")
+        # La escritura en BD la hace log_writer en segundo plano
+        log_writer.enviar(log_data)
 
         return response
@@ -41,7 +41,7 @@ from .precio_item_anexo import PrecioItemAnexo
 from .item_factura import ItemFactura
 from .item_venta_efectivo import ItemVentaEfectivo
 from .cuenta_dependencia import CuentaDependencia
-from .log import LogEntry
+from .log import LogEntry, LogResumenHora
 from .pago import Pago
 from .servicio import (
     Servicio,
@@ -56,6 +56,7 @@ from .servicio import (
     PersonaLiquidacion,
 )
 from .datos_generales_dependencia import DatosGeneralesDependencia
+from .stock_dependencia import StockDependencia
 
 __all__ = [
     "SQLModel",
@@ -109,6 +110,7 @@ __all__ = [
     "ItemVentaEfectivo",
     "CuentaDependencia",
     "LogEntry",
+    "LogResumenHora",
     "Pago",
     "Servicio",
     "SolicitudServicio",
@@ -121,4 +123,5 @@ __all__ = [
     "PagoFacturaServicio",
     "PersonaLiquidacion",
     "DatosGeneralesDependencia",
+    "StockDependencia",
 ]
@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
 from datetime import datetime
+from sqlalchemy import BigInteger
 
 
 class LogEntry(SQLModel, table=True):
@@ -21,3 +22,14 @@ class LogEntry(SQLModel, table=True):
     status_code: Optional[int] = Field(default=None)
     usuario_nombre: Optional[str] = Field(default=None, max_length=100)
     navegador: Optional[str] = Field(default=None, max_length=100)
+
+
+class LogResumenHora(SQLModel, table=True):
+    """Cantidad de registros de `log` por hora, nivel y tipo (para /logs/stats)."""
+
+    __tablename__ = "log_resumen_hora"
+
+    hora: datetime = Field(primary_key=True)
+    nivel: str = Field(primary_key=True, max_length=20)
+    tipo: str = Field(primary_key=True, max_length=20)
+    cantidad: int = Field(default=0, sa_type=BigInteger)
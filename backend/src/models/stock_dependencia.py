@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime, timezone
+
+
+class StockDependencia(SQLModel, table=True):
+    """Saldo materializado de stock por (producto, dependencia).
+
+    Se mantiene de forma incremental al confirmar, cancelar o eliminar
+    movimientos (ver ``stock_repo``) y equivale a
+    ``SUM(cantidad * factor)`` de los movimientos confirmados.
+    """
+
+    __tablename__ = "stock_dependencia"
+
+    id_producto: int = Field(foreign_key="productos.id_producto", primary_key=True)
+    id_dependencia: int = Field(primary_key=True)
+    cantidad_entrada: int = Field(default=0)
+    cantidad_salida: int = Field(default=0)
+    stock: int = Field(default=0)
+    fecha_actualizacion: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc).replace(tzinfo=None)
+    )
@@ -1,13 +1,25 @@
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List, Optional, Type, TypeVar, Generic, Any
-from sqlalchemy import text
+from typing import Dict, Iterable, List, Optional, Type, TypeVar, Generic, Any
+from sqlalchemy import inspect, text
 
 ModelType = TypeVar("ModelType")
 CreateSchemaType = TypeVar("CreateSchemaType")
 UpdateSchemaType = TypeVar("UpdateSchemaType")
 
 
+async def get_by_ids(
+    db: AsyncSession, model: Type[ModelType], ids: Iterable[Any]
+) -> Dict[Any, ModelType]:
+    """Carga varias filas por clave primaria en una sola consulta (id -> fila)."""
+    ids = {id for id in ids if id is not None}
+    if not ids:
+        return {}
+    pk = inspect(model).primary_key[0]
+    results = await db.exec(select(model).where(pk.in_(ids)))
+    return {getattr(obj, pk.key): obj for obj in results.all()}
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
@@ -106,3 +118,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 statement = statement.options(option)
         results = await db.exec(statement)
         return list(results.all())
+
+    async def get_by_ids(
+        self, db: AsyncSession, ids: Iterable[Any]
+    ) -> Dict[Any, ModelType]:
+        return await get_by_ids(db, self.model, ids)
@@ -1,7 +1,9 @@
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import selectinload
-from typing import List, Optional, Any
+from sqlalchemy import and_, case, func, or_, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncResult
+from sqlalchemy.orm import aliased, selectinload
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime
 from src.repository.base import CRUDBase
@@ -12,7 +14,10 @@ from src.models.contrato import (
     Factura,
     VentaEfectivo,
 )
+from src.models.anexo import Anexo
+from src.models.convenio import Convenio
 from src.models.item_anexo import ItemAnexo
+from src.models.precio_item_anexo import PrecioItemAnexo
 from src.models.item_factura import ItemFactura
 from src.models.item_venta_efectivo import ItemVentaEfectivo
 from src.models.producto import Productos
@@ -47,30 +52,36 @@ def normalize_id(value: Any) -> Any:
     return value
 
 
+def paginar(statement, columna_id, skip: int, limit: int, despues_de: Optional[int]):
+    """Ordena por id descendente y pagina por cursor (keyset) o por offset.
+
+    Con `despues_de` (el último id de la página anterior) se usa
+    `WHERE id < despues_de`, que aprovecha la PK y no recorre las filas
+    saltadas; `skip` queda solo por compatibilidad con los clientes actuales.
+    """
+    if despues_de is not None:
+        statement = statement.where(columna_id < despues_de)
+    elif skip:
+        statement = statement.offset(skip)
+    return statement.order_by(columna_id.desc()).limit(limit)
+
+
 class ContratoRepository(CRUDBase[Contrato, ContratoCreate, ContratoUpdate]):
     async def get_all_with_details(
         self,
         db: AsyncSession,
         skip: int = 0,
-        limit: int = 10000,
+        limit: int = 100,
         id_cliente: Optional[int] = None,
+        despues_de: Optional[int] = None,
     ) -> List[Contrato]:
-        statement = (
-            select(Contrato)
-            .options(
-                selectinload(Contrato.estado),
-                selectinload(Contrato.tipo_contrato),
-                selectinload(Contrato.moneda),
-                selectinload(Contrato.cliente),
-            )
-        )
+        # Las relaciones las resuelve map_contratos_to_read en bloque
+        statement = select(Contrato)
 
         if id_cliente is not None:
             statement = statement.where(Contrato.id_cliente == id_cliente)
 
-        statement = (
-            statement.offset(skip).limit(limit).order_by(Contrato.id_contrato.desc())
-        )
+        statement = paginar(statement, Contrato.id_contrato, skip, limit, despues_de)
         results = await db.exec(statement)
         return results.all()
 
@@ -79,6 +90,76 @@ class ContratoRepository(CRUDBase[Contrato, ContratoCreate, ContratoUpdate]):
     ) -> Optional[Contrato]:
         return await db.get(Contrato, id_contrato)
 
+    async def stream_items_disponibles(
+        self, db: AsyncSession, id_contrato: int
+    ) -> AsyncResult:
+        """Items de los anexos del cliente del contrato con precio en su moneda.
+
+        Una sola consulta contrato -> convenio -> anexo -> item_anexo ->
+        productos; si el item no está en la moneda del contrato se toma el
+        primer precio alternativo en esa moneda (precio_item_anexo) y sin él
+        el item se descarta. Se lee con un cursor del lado del servidor.
+        """
+        precio = aliased(PrecioItemAnexo)
+        primer_precio = (
+            select(func.min(PrecioItemAnexo.id_precio_item_anexo))
+            .where(
+                PrecioItemAnexo.id_item_anexo == ItemAnexo.id_item_anexo,
+                PrecioItemAnexo.id_moneda == Contrato.id_moneda,
+            )
+            .correlate(ItemAnexo, Contrato)
+            .scalar_subquery()
+        )
+        misma_moneda = ItemAnexo.id_moneda == Contrato.id_moneda
+
+        statement = (
+            select(
+                ItemAnexo.id_item_anexo,
+                ItemAnexo.id_anexo,
+                Anexo.nombre_anexo,
+                ItemAnexo.id_producto,
+                ItemAnexo.entrada,
+                ItemAnexo.vendido,
+                case(
+                    (misma_moneda, ItemAnexo.precio_venta),
+                    else_=precio.precio_venta,
+                ).label("precio_venta"),
+                case(
+                    (misma_moneda, ItemAnexo.precio_compra),
+                    # Un precio alternativo de compra en 0 es "sin cargar":
+                    # se mantiene el del item, como hacía la versión anterior
+                    else_=func.coalesce(
+                        func.nullif(precio.precio_compra, 0), ItemAnexo.precio_compra
+                    ),
+                ).label("precio_compra"),
+                Contrato.id_moneda,
+                ItemAnexo.codigo,
+                Productos.codigo.label("producto_codigo"),
+                Productos.nombre.label("producto_nombre"),
+                Productos.descripcion.label("producto_descripcion"),
+                Productos.precio_venta.label("producto_precio_venta"),
+                Productos.precio_minimo.label("producto_precio_minimo"),
+            )
+            .select_from(Contrato)
+            .join(Convenio, Convenio.id_cliente == Contrato.id_cliente)
+            .join(Anexo, Anexo.id_convenio == Convenio.id_convenio)
+            .join(ItemAnexo, ItemAnexo.id_anexo == Anexo.id_anexo)
+            .join(Productos, Productos.id_producto == ItemAnexo.id_producto)
+            .outerjoin(
+                precio,
+                and_(
+                    ~misma_moneda,
+                    precio.id_precio_item_anexo == primer_precio,
+                ),
+            )
+            .where(
+                Contrato.id_contrato == id_contrato,
+                or_(misma_moneda, precio.id_precio_item_anexo.is_not(None)),
+            )
+            .order_by(Anexo.id_anexo, ItemAnexo.id_item_anexo)
+        )
+        return await db.stream(statement)
+
     async def create(
         self,
         db: AsyncSession,
@@ -138,6 +219,19 @@ class SuplementoRepository(CRUDBase[Suplemento, SuplementoCreate, SuplementoUpda
         results = await db.exec(statement)
         return results.all()
 
+    async def get_all_with_details(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
+    ) -> List[Suplemento]:
+        statement = paginar(
+            select(Suplemento), Suplemento.id_suplemento, skip, limit, despues_de
+        )
+        results = await db.exec(statement)
+        return results.all()
+
     async def get_by_id_with_details(
         self, db: AsyncSession, id_suplemento: int
     ) -> Optional[Suplemento]:
@@ -188,16 +282,15 @@ class SuplementoRepository(CRUDBase[Suplemento, SuplementoCreate, SuplementoUpda
 
 class FacturaRepository(CRUDBase[Factura, FacturaCreate, FacturaUpdate]):
     async def get_all_with_details(
-        self, db: AsyncSession, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
     ) -> List[Factura]:
-        statement = (
-            select(Factura)
-            .options(
-                selectinload(Factura.items_factura).selectinload(ItemFactura.producto)
-            )
-            .offset(skip)
-            .limit(limit)
-            .order_by(Factura.id_factura.desc())
+        # Items y productos los carga map_facturas_to_read en bloque
+        statement = paginar(
+            select(Factura), Factura.id_factura, skip, limit, despues_de
         )
         results = await db.exec(statement)
         return results.all()
@@ -205,13 +298,7 @@ class FacturaRepository(CRUDBase[Factura, FacturaCreate, FacturaUpdate]):
     async def get_by_id_with_details(
         self, db: AsyncSession, id_factura: int
     ) -> Optional[Factura]:
-        statement = (
-            select(Factura)
-            .options(
-                selectinload(Factura.items_factura).selectinload(ItemFactura.producto)
-            )
-            .where(Factura.id_factura == id_factura)
-        )
+        statement = select(Factura).where(Factura.id_factura == id_factura)
         results = await db.exec(statement)
         return results.first()
 
@@ -220,9 +307,6 @@ class FacturaRepository(CRUDBase[Factura, FacturaCreate, FacturaUpdate]):
     ) -> List[Factura]:
         statement = (
             select(Factura)
-            .options(
-                selectinload(Factura.items_factura).selectinload(ItemFactura.producto)
-            )
             .where(Factura.id_contrato == id_contrato)
             .order_by(Factura.id_factura.desc())
         )
@@ -272,14 +356,19 @@ class VentaEfectivoRepository(
     CRUDBase[VentaEfectivo, VentaEfectivoCreate, VentaEfectivoUpdate]
 ):
     async def get_all_with_details(
-        self, db: AsyncSession, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
     ) -> List[VentaEfectivo]:
-        statement = (
-            select(VentaEfectivo)
-            .options(selectinload(VentaEfectivo.items_venta_efectivo))
-            .offset(skip)
-            .limit(limit)
-            .order_by(VentaEfectivo.id_venta_efectivo.desc())
+        # Items y dependencias los carga map_ventas_efectivo_to_read en bloque
+        statement = paginar(
+            select(VentaEfectivo),
+            VentaEfectivo.id_venta_efectivo,
+            skip,
+            limit,
+            despues_de,
         )
         results = await db.exec(statement)
         return results.all()
@@ -287,10 +376,8 @@ class VentaEfectivoRepository(
     async def get_by_id_with_details(
         self, db: AsyncSession, id_venta_efectivo: int
     ) -> Optional[VentaEfectivo]:
-        statement = (
-            select(VentaEfectivo)
-            .options(selectinload(VentaEfectivo.items_venta_efectivo))
-            .where(VentaEfectivo.id_venta_efectivo == id_venta_efectivo)
+        statement = select(VentaEfectivo).where(
+            VentaEfectivo.id_venta_efectivo == id_venta_efectivo
         )
         results = await db.exec(statement)
         return results.first()
@@ -349,6 +436,76 @@ class ItemAnexoRepository(CRUDBase[ItemAnexo, ItemAnexoCreate, dict]):
         results = await db.exec(statement)
         return results.all()
 
+    async def bloquear_disponibles(
+        self,
+        db: AsyncSession,
+        ids_producto: List[int],
+        saltar_bloqueados: bool = False,
+    ) -> List[Any]:
+        """Filas con stock de los productos, en orden FIFO y bloqueadas.
+
+        Una sola consulta `SELECT ... FOR UPDATE` ordenada por producto,
+        anexo e item: todas las transacciones bloquean en el mismo orden y
+        no se cruzan. Con `saltar_bloqueados` se usa SKIP LOCKED y se omiten
+        las filas que otra transacción está asignando en ese momento.
+        """
+        if not ids_producto:
+            return []
+        statement = (
+            select(
+                ItemAnexo.id_item_anexo,
+                ItemAnexo.id_anexo,
+                ItemAnexo.id_producto,
+                ItemAnexo.entrada,
+                ItemAnexo.vendido,
+            )
+            .where(
+                ItemAnexo.id_producto.in_(ids_producto),
+                ItemAnexo.entrada > ItemAnexo.vendido,
+            )
+            .order_by(
+                ItemAnexo.id_producto.asc(),
+                ItemAnexo.id_anexo.asc(),
+                ItemAnexo.id_item_anexo.asc(),
+            )
+            .with_for_update(skip_locked=saltar_bloqueados)
+        )
+        results = await db.exec(statement)
+        return results.all()
+
+    async def get_primeros_por_anexo_producto(
+        self, db: AsyncSession, pares: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], ItemAnexo]:
+        """Primer item_anexo de cada ``(id_anexo, id_producto)`` en una consulta."""
+        pares = set(pares)
+        if not pares:
+            return {}
+        statement = (
+            select(ItemAnexo)
+            .where(tuple_(ItemAnexo.id_anexo, ItemAnexo.id_producto).in_(list(pares)))
+            .order_by(ItemAnexo.id_item_anexo.desc())
+        )
+        results = await db.exec(statement)
+        # Orden descendente: el último en escribirse es el de menor id
+        return {(i.id_anexo, i.id_producto): i for i in results.all()}
+
+    async def sumar_vendido(self, db: AsyncSession, deltas: Dict[int, int]) -> None:
+        """Suma `deltas[id_item_anexo]` a vendido con un único UPDATE."""
+        if not deltas:
+            return
+        statement = (
+            update(ItemAnexo)
+            .where(ItemAnexo.id_item_anexo.in_(list(deltas)))
+            .values(
+                vendido=ItemAnexo.vendido
+                + case(deltas, value=ItemAnexo.id_item_anexo, else_=0)
+            )
+            # Los ItemAnexo ya cargados en la sesión quedan expirados (en
+            # PostgreSQL los ids afectados vuelven en el mismo UPDATE)
+            .execution_options(synchronize_session="fetch")
+        )
+        await db.exec(statement)
+
     async def create_items(
         self, db: AsyncSession, id_anexo: int, items_data: List[ItemAnexoCreate]
     ) -> List[ItemAnexo]:
@@ -379,6 +536,19 @@ class ItemFacturaRepository(CRUDBase[ItemFactura, ItemFacturaCreate, dict]):
         results = await db.exec(statement)
         return results.all()
 
+    async def get_by_facturas(
+        self, db: AsyncSession, ids_factura: List[int]
+    ) -> List[ItemFactura]:
+        if not ids_factura:
+            return []
+        statement = (
+            select(ItemFactura)
+            .where(ItemFactura.id_factura.in_(ids_factura))
+            .order_by(ItemFactura.id_item_factura)
+        )
+        results = await db.exec(statement)
+        return results.all()
+
     async def create_items(
         self,
         db: AsyncSession,
@@ -425,6 +595,20 @@ class ItemVentaEfectivoRepository(
         results = await db.exec(statement)
         return results.all()
 
+    async def get_by_ventas(
+        self, db: AsyncSession, ids_venta: List[int]
+    ) -> List[ItemVentaEfectivo]:
+        if not ids_venta:
+            return []
+        statement = (
+            select(ItemVentaEfectivo)
+            .where(ItemVentaEfectivo.id_venta_efectivo.in_(ids_venta))
+            .options(selectinload(ItemVentaEfectivo.producto))
+            .order_by(ItemVentaEfectivo.id_item_venta_efectivo)
+        )
+        results = await db.exec(statement)
+        return results.all()
+
     async def create_items(
         self,
         db: AsyncSession,
@@ -1,7 +1,8 @@
 from sqlmodel import select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from sqlalchemy import text
+from src.repository.stock_repo import stock_repo
 
 
 class ExistenciaRepository:
@@ -58,46 +59,23 @@ class ExistenciaRepository:
     async def get_existencias_movimientos(
         self, db: AsyncSession, id_dependencia: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Obtiene existencias por movimientos (entradas - salidas confirmadas)."""
+        """Obtiene existencias por movimientos (entradas - salidas confirmadas).
 
-        base_query = """
-            SELECT 
-                m.id_producto,
-                m.id_dependencia,
-                SUM(CASE WHEN tm.factor > 0 THEN m.cantidad ELSE 0 END) as cantidad_entrada,
-                SUM(CASE WHEN tm.factor < 0 THEN m.cantidad ELSE 0 END) as cantidad_salida,
-                SUM(CASE WHEN tm.factor > 0 THEN m.cantidad ELSE -m.cantidad END) as stock
-            FROM movimiento m
-            JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
-            WHERE m.estado = 'confirmado'
+        Lee el saldo materializado en ``stock_dependencia``.
         """
-
-        if id_dependencia:
-            base_query += " AND m.id_dependencia = :id_dependencia"
-
-        base_query += " GROUP BY m.id_producto, m.id_dependencia"
-
-        params = {}
-        if id_dependencia:
-            params = {"id_dependencia": id_dependencia}
-
-        result = await db.exec(text(base_query), params=params)
-        rows = result.all()
-
-        existencias = []
-        for row in rows:
-            existencias.append(
-                {
-                    "id_producto": row[0],
-                    "id_dependencia": row[1],
-                    "cantidad_entrada": row[2] or 0,
-                    "cantidad_salida": row[3] or 0,
-                    "stock": row[4] or 0,
-                    "tipo": "MOVIMIENTO",
-                }
-            )
-
-        return existencias
+        filas = await stock_repo.get_existencias(db, id_dependencia)
+
+        return [
+            {
+                "id_producto": fila["id_producto"],
+                "id_dependencia": fila["id_dependencia"],
+                "cantidad_entrada": fila["cantidad_entrada"] or 0,
+                "cantidad_salida": fila["cantidad_salida"] or 0,
+                "stock": fila["stock"] or 0,
+                "tipo": "MOVIMIENTO",
+            }
+            for fila in filas
+        ]
 
     async def get_existencia_hibrida(
         self,
@@ -166,7 +144,7 @@ class ExistenciaRepository:
 
         Usa la misma lógica que get_existencia_hibrida para mantener consistencia:
         - Konsignación: entrada - vendido (directo de item_anexo)
-        - Movimientos: entradas - salidas confirmadas
+        - Movimientos: entradas - salidas confirmadas (saldo en stock_dependencia)
         """
 
         # Konsignación - stock = entrada - vendido
@@ -188,23 +166,8 @@ class ExistenciaRepository:
         kons_result = await db.exec(konsignacion_query, params=params)
         stock_kons = kons_result.scalar() or 0
 
-        # Movimientos - misma lógica que get_existencia_hibrida
-        mov_params = {"id_producto": id_producto}
-        mov_query = """
-            SELECT COALESCE(SUM(
-                CASE WHEN tm.factor > 0 THEN m.cantidad ELSE -m.cantidad END
-            ), 0) as stock
-            FROM movimiento m
-            JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
-            WHERE m.id_producto = :id_producto AND m.estado = 'confirmado'
-        """
-
-        if id_dependencia:
-            mov_query += " AND m.id_dependencia = :id_dependencia"
-            mov_params["id_dependencia"] = id_dependencia
-
-        mov_result = await db.exec(text(mov_query), params=mov_params)
-        stock_mov = mov_result.scalar() or 0
+        # Movimientos - saldo materializado (stock_dependencia)
+        stock_mov = await stock_repo.get_stock(db, id_producto, id_dependencia)
 
         tiene_konsignacion = await self._producto_tiene_item_anexo(db, id_producto)
 
@@ -292,5 +255,67 @@ class ExistenciaRepository:
             else f"Insuficiente. Disponible: {disponible} (físico: {stock_total}, comprometido: {stock_comprometido})",
         }
 
+    async def disponibilidad_lote(
+        self,
+        db: AsyncSession,
+        claves: Iterable[Tuple[int, int]],
+        excluir_movimientos: List[int],
+    ) -> Dict[Tuple[int, int], Dict[str, Any]]:
+        """Datos de validar_disponibilidad para varios ``(id_producto, id_dependencia)``
+        en una sola consulta.
+
+        El comprometido excluye `excluir_movimientos` (los que se confirman
+        juntos). Devuelve por clave: stock_konsignacion (del producto en todos
+        los anexos), usa_konsignacion, stock_movimientos (de la dependencia) y
+        stock_comprometido.
+        """
+        claves = sorted(set(claves))
+        if not claves:
+            return {}
+        result = await db.exec(
+            text("""
+            SELECT
+                c.id_producto,
+                c.id_dependencia,
+                COALESCE(k.stock, 0) AS stock_konsignacion,
+                k.id_producto IS NOT NULL AS usa_konsignacion,
+                COALESCE(s.stock, 0) AS stock_movimientos,
+                COALESCE(p.cantidad, 0) AS stock_comprometido
+            FROM unnest(
+                CAST(:productos AS INTEGER[]),
+                CAST(:dependencias AS INTEGER[])
+            ) AS c(id_producto, id_dependencia)
+            LEFT JOIN (
+                SELECT ia.id_producto, SUM(ia.entrada) - SUM(ia.vendido) AS stock
+                FROM item_anexo ia
+                WHERE ia.id_producto = ANY(CAST(:productos AS INTEGER[]))
+                GROUP BY ia.id_producto
+            ) k ON k.id_producto = c.id_producto
+            LEFT JOIN stock_dependencia s
+                ON s.id_producto = c.id_producto
+               AND s.id_dependencia = c.id_dependencia
+            LEFT JOIN (
+                SELECT m.id_producto, m.id_dependencia, SUM(m.cantidad) AS cantidad
+                FROM movimiento m
+                JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+                WHERE m.id_producto = ANY(CAST(:productos AS INTEGER[]))
+                  AND m.estado = 'pendiente'
+                  AND tm.factor < 0
+                  AND m.id_movimiento <> ALL(CAST(:excluir AS INTEGER[]))
+                GROUP BY m.id_producto, m.id_dependencia
+            ) p ON p.id_producto = c.id_producto
+               AND p.id_dependencia = c.id_dependencia
+        """),
+            params={
+                "productos": [c[0] for c in claves],
+                "dependencias": [c[1] for c in claves],
+                "excluir": list(excluir_movimientos),
+            },
+        )
+        return {
+            (fila["id_producto"], fila["id_dependencia"]): dict(fila)
+            for fila in result.mappings().all()
+        }
+
 
 existencia_repo = ExistenciaRepository()
@@ -60,6 +60,29 @@ class MovimientoRepository(CRUDBase[Movimiento, MovimientoCreate, MovimientoUpda
     async def get(self, db: AsyncSession, id: int) -> Optional[Movimiento]:
         return await self._get_with_relations(db, id)
 
+    async def get_para_confirmar(
+        self, db: AsyncSession, ids: List[int]
+    ) -> List[Movimiento]:
+        """Movimientos con tipo y producto, bloqueados hasta el fin de la transacción.
+
+        El bloqueo evita que dos confirmaciones simultáneas apliquen dos veces
+        el mismo movimiento.
+        """
+        if not ids:
+            return []
+        statement = (
+            select(Movimiento)
+            .options(
+                selectinload(Movimiento.tipo_movimiento),  # type: ignore
+                selectinload(Movimiento.producto),  # type: ignore
+            )
+            .where(Movimiento.id_movimiento.in_(ids))
+            .order_by(Movimiento.id_movimiento)
+            .with_for_update(of=Movimiento)
+        )
+        results = await db.exec(statement)
+        return list(results.all())
+
     async def create(self, db: AsyncSession, *, obj_in: MovimientoCreate) -> Movimiento:
         obj_data = obj_in.dict()
         db_obj = self.model(**obj_data)
@@ -118,10 +141,13 @@ class MovimientoRepository(CRUDBase[Movimiento, MovimientoCreate, MovimientoUpda
         return list(results.all())
 
     async def get_productos_con_stock(self, db: AsyncSession) -> List[Movimiento]:
-        """Obtener movimientos confirmados de tipo entrada (RECEPCION/compra) con cantidad > 0."""
+        """Obtener movimientos confirmados de tipo entrada (RECEPCION/compra) con cantidad > 0.
+
+        Solo carga el producto: los listados de stock no usan el resto de relaciones.
+        """
         statement = (
             select(Movimiento)
-            .options(*self._get_selectinload_options())
+            .options(selectinload(Movimiento.producto))  # type: ignore
             .join(TipoMovimiento)
             .where(Movimiento.estado == "confirmado")
             .where(Movimiento.cantidad > 0)
@@ -136,7 +162,7 @@ class MovimientoRepository(CRUDBase[Movimiento, MovimientoCreate, MovimientoUpda
         """Obtener productos con movimientos de entrada en una dependencia específica."""
         statement = (
             select(Movimiento)
-            .options(*self._get_selectinload_options())
+            .options(selectinload(Movimiento.producto))  # type: ignore
             .join(TipoMovimiento)
             .where(Movimiento.id_dependencia == id_dependencia)
             .where(Movimiento.estado == "confirmado")
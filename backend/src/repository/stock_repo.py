@@ -0,0 +1,198 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+# Agregado de referencia: stock calculado desde el histórico de movimientos.
+_STOCK_DESDE_MOVIMIENTOS = """
+    SELECT
+        m.id_producto,
+        m.id_dependencia,
+        SUM(CASE WHEN tm.factor > 0 THEN m.cantidad ELSE 0 END) AS cantidad_entrada,
+        SUM(CASE WHEN tm.factor < 0 THEN m.cantidad ELSE 0 END) AS cantidad_salida,
+        SUM(m.cantidad * tm.factor) AS stock
+    FROM movimiento m
+    JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+    WHERE m.estado = 'confirmado'
+    GROUP BY m.id_producto, m.id_dependencia
+"""
+
+
+class StockRepository:
+    """Repository del saldo materializado de stock (tabla ``stock_dependencia``).
+
+    Cada fila guarda entradas, salidas y stock de un producto en una
+    dependencia. Se actualiza en la misma transacción que confirma, cancela o
+    elimina el movimiento, por lo que las lecturas de stock son búsquedas por
+    clave primaria en lugar de sumas sobre toda la tabla ``movimiento``.
+    """
+
+    async def aplicar_movimiento(
+        self,
+        db: AsyncSession,
+        id_producto: int,
+        id_dependencia: int,
+        cantidad: int,
+        factor: int,
+    ) -> None:
+        """Aplica el efecto de un movimiento confirmado.
+
+        Para revertirlo (cancelación o eliminación) basta con pasar la
+        cantidad en negativo.
+        """
+        await self.aplicar_movimientos(
+            db, [(id_producto, id_dependencia, cantidad, factor)]
+        )
+
+    async def aplicar_movimientos(
+        self,
+        db: AsyncSession,
+        movimientos: Iterable[Tuple[int, int, int, int]],
+    ) -> None:
+        """Aplica varios movimientos ``(id_producto, id_dependencia, cantidad, factor)``
+        con un único ``INSERT ... ON CONFLICT`` agrupado por clave.
+
+        No hace commit: el llamador controla la transacción.
+        """
+        deltas: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0, 0])
+        for id_producto, id_dependencia, cantidad, factor in movimientos:
+            delta = deltas[(id_producto, id_dependencia)]
+            if factor > 0:
+                delta[0] += cantidad
+            elif factor < 0:
+                delta[1] += cantidad
+            delta[2] += cantidad * factor
+
+        if not deltas:
+            return
+
+        claves = list(deltas.keys())
+        await db.exec(
+            text("""
+            INSERT INTO stock_dependencia (
+                id_producto, id_dependencia, cantidad_entrada,
+                cantidad_salida, stock, fecha_actualizacion
+            )
+            SELECT d.id_producto, d.id_dependencia, d.entrada, d.salida, d.stock,
+                   timezone('utc', now())
+            FROM unnest(
+                CAST(:productos AS INTEGER[]),
+                CAST(:dependencias AS INTEGER[]),
+                CAST(:entradas AS INTEGER[]),
+                CAST(:salidas AS INTEGER[]),
+                CAST(:stocks AS INTEGER[])
+            ) AS d(id_producto, id_dependencia, entrada, salida, stock)
+            ON CONFLICT (id_producto, id_dependencia) DO UPDATE SET
+                cantidad_entrada = stock_dependencia.cantidad_entrada
+                    + EXCLUDED.cantidad_entrada,
+                cantidad_salida = stock_dependencia.cantidad_salida
+                    + EXCLUDED.cantidad_salida,
+                stock = stock_dependencia.stock + EXCLUDED.stock,
+                fecha_actualizacion = EXCLUDED.fecha_actualizacion
+        """),
+            params={
+                "productos": [k[0] for k in claves],
+                "dependencias": [k[1] for k in claves],
+                "entradas": [deltas[k][0] for k in claves],
+                "salidas": [deltas[k][1] for k in claves],
+                "stocks": [deltas[k][2] for k in claves],
+            },
+        )
+
+    async def get_stock(
+        self,
+        db: AsyncSession,
+        id_producto: int,
+        id_dependencia: Optional[int] = None,
+    ) -> int:
+        """Stock de un producto, en una dependencia o en todas."""
+        query = """
+            SELECT COALESCE(SUM(s.stock), 0)
+            FROM stock_dependencia s
+            WHERE s.id_producto = :id_producto
+        """
+        params: Dict[str, Any] = {"id_producto": id_producto}
+        if id_dependencia:
+            query += " AND s.id_dependencia = :id_dependencia"
+            params["id_dependencia"] = id_dependencia
+
+        result = await db.exec(text(query), params=params)
+        return int(result.scalar() or 0)
+
+    async def get_existencias(
+        self, db: AsyncSession, id_dependencia: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Filas del saldo de stock, opcionalmente de una sola dependencia."""
+        query = """
+            SELECT s.id_producto, s.id_dependencia,
+                   s.cantidad_entrada, s.cantidad_salida, s.stock
+            FROM stock_dependencia s
+        """
+        params: Dict[str, Any] = {}
+        if id_dependencia:
+            query += " WHERE s.id_dependencia = :id_dependencia"
+            params["id_dependencia"] = id_dependencia
+        query += " ORDER BY s.id_producto, s.id_dependencia"
+
+        result = await db.exec(text(query), params=params)
+        return [dict(row) for row in result.mappings().all()]
+
+    async def verificar(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Compara el saldo materializado con el recalculado desde movimientos.
+
+        Returns:
+            Lista de (producto, dependencia) con diferencias. Vacía si no hay deriva.
+        """
+        result = await db.exec(
+            text(f"""
+            WITH calculado AS ({_STOCK_DESDE_MOVIMIENTOS})
+            SELECT
+                COALESCE(c.id_producto, s.id_producto) AS id_producto,
+                COALESCE(c.id_dependencia, s.id_dependencia) AS id_dependencia,
+                COALESCE(s.stock, 0) AS stock_registrado,
+                COALESCE(c.stock, 0) AS stock_calculado,
+                COALESCE(s.cantidad_entrada, 0) AS entrada_registrada,
+                COALESCE(c.cantidad_entrada, 0) AS entrada_calculada,
+                COALESCE(s.cantidad_salida, 0) AS salida_registrada,
+                COALESCE(c.cantidad_salida, 0) AS salida_calculada
+            FROM calculado c
+            FULL OUTER JOIN stock_dependencia s
+              ON s.id_producto = c.id_producto
+             AND s.id_dependencia = c.id_dependencia
+            WHERE COALESCE(s.stock, 0) <> COALESCE(c.stock, 0)
+               OR COALESCE(s.cantidad_entrada, 0) <> COALESCE(c.cantidad_entrada, 0)
+               OR COALESCE(s.cantidad_salida, 0) <> COALESCE(c.cantidad_salida, 0)
+            ORDER BY 1, 2
+        """)
+        )
+        return [dict(row) for row in result.mappings().all()]
+
+    async def reconstruir(self, db: AsyncSession) -> int:
+        """Regenera el saldo completo desde los movimientos confirmados.
+
+        Bloquea la tabla durante la reconstrucción para que ninguna
+        confirmación concurrente aplique deltas sobre datos a medio regenerar.
+        No hace commit.
+
+        Returns:
+            Número de filas (producto, dependencia) generadas
+        """
+        await db.exec(text("LOCK TABLE stock_dependencia IN EXCLUSIVE MODE"))
+        await db.exec(text("DELETE FROM stock_dependencia"))
+        result = await db.exec(
+            text(f"""
+            INSERT INTO stock_dependencia (
+                id_producto, id_dependencia, cantidad_entrada,
+                cantidad_salida, stock, fecha_actualizacion
+            )
+            SELECT c.id_producto, c.id_dependencia, c.cantidad_entrada,
+                   c.cantidad_salida, c.stock, timezone('utc', now())
+            FROM ({_STOCK_DESDE_MOVIMIENTOS}) AS c
+        """)
+        )
+        return result.rowcount or 0
+
+
+stock_repo = StockRepository()
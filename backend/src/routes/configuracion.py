@@ -307,7 +307,7 @@ async def crear_tipo_dependencia(
 
     from src.services.replicacion_service import ReplicacionService
 
-    ReplicacionService.replicar_tipo_dependencia(
+    await ReplicacionService.replicar_tipo_dependencia(
         {
             "id_tipo_dependencia": db_obj.id_tipo_dependencia,
             "nombre": db_obj.nombre,
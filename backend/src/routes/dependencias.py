@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -31,6 +32,7 @@ from src.dto import (
 from src.services.cuenta_service import cuenta_service
 from src.services.cuenta_dependencia_service import cuenta_dependencia_service
 from src.services.database_service import DatabaseService
+from src.services.jerarquia_service import JerarquiaService, jerarquia_cache
 from src.repository.base import CRUDBase
 from sqlmodel import select, func
 
@@ -53,37 +55,7 @@ async def validar_ciclo_dependencia(
     Valida que no se cree un ciclo en la jerarquía de dependencias.
     Retorna True si hay ciclo, False si no hay ciclo.
     """
-    if not nuevo_padre_id:
-        return False
-
-    # No puede ser su propio padre
-    if dependencia_id == nuevo_padre_id:
-        return True
-
-    # Verificar hacia arriba en la jerarquía
-    actual_id = nuevo_padre_id
-    visitados = set()
-
-    while actual_id:
-        if actual_id in visitados:
-            # Ciclo detectado
-            return True
-        visitados.add(actual_id)
-
-        # Obtener el padre del actual
-        statement = select(Dependencia.codigo_padre).where(
-            Dependencia.id_dependencia == actual_id
-        )
-        result = await db.exec(statement)
-        padre_id = result.first()
-
-        # Si el padre es la dependencia que estamos validando, hay ciclo
-        if padre_id == dependencia_id:
-            return True
-
-        actual_id = padre_id
-
-    return False
+    return await JerarquiaService.formaria_ciclo(db, dependencia_id, nuevo_padre_id)
 
 
 @router.get("", response_model=List[DependenciaRead])
@@ -118,8 +90,21 @@ async def listar_dependencias(
 @router.get("/jerarquia", response_model=List[DependenciaRead])
 async def listar_dependencias_jerarquia(
     padre_id: int = Query(None, description="ID de la dependencia padre"),
+    recursivo: bool = Query(
+        False, description="Incluir todo el subárbol, no solo los hijos directos"
+    ),
     db: AsyncSession = Depends(get_session),
 ):
+    arbol = await jerarquia_cache.arbol(db)
+    if not recursivo:
+        ids = arbol.hijos_de(padre_id or None)
+    elif padre_id:
+        ids = arbol.descendientes(padre_id)[1:]
+    else:
+        ids = arbol.descendientes(None)
+    if not ids:
+        return []
+
     statement = select(Dependencia).options(
         selectinload(Dependencia.tipo_dependencia),
         selectinload(Dependencia.provincia),
@@ -129,13 +114,11 @@ async def listar_dependencias_jerarquia(
             CuentaDependencia.moneda
         ),
     )
-    if padre_id:
-        statement = statement.where(Dependencia.codigo_padre == padre_id)
-    else:
-        statement = statement.where(Dependencia.codigo_padre.is_(None))
+    statement = statement.where(Dependencia.id_dependencia.in_(ids))
     results = await db.exec(statement)
-    dependencias = results.all()
-    return [DependenciaRead.model_validate(d) for d in dependencias]
+    por_id = {d.id_dependencia: d for d in results.all()}
+    # Orden del árbol (preorden) en vez del de la consulta
+    return [DependenciaRead.model_validate(por_id[i]) for i in ids if i in por_id]
 
 
 @router.get("/bases-de-datos", tags=["bases-de-datos"])
@@ -199,6 +182,7 @@ async def crear_dependencia(
 
     try:
         db_obj = await dependencia_repo.create(db, obj_in=data.dependencia)
+        jerarquia_cache.invalidar()
     except IntegrityError as e:
         error_msg = str(e.orig)
         if "dependencia_nit_key" in error_msg:
@@ -230,6 +214,7 @@ async def crear_dependencia(
             cuentas_creadas.append(cuenta_obj)
 
     tablas_creadas = None
+    replicacion = None
 
     if data.base_datos_existente:
         db_obj.base_datos = data.base_datos_existente
@@ -242,13 +227,16 @@ async def crear_dependencia(
             )
         except Exception as e:
             await dependencia_repo.remove(db, id=db_obj.id_dependencia)
+            jerarquia_cache.invalidar()
             raise HTTPException(
                 status_code=500,
                 detail=f"Error al crear la base de datos: {str(e)}",
             )
 
         # Sincronizar datos de referencia desde caguayosa a la nueva BD
-        DatabaseService.replicar_datos_desde_central(data.dependencia.base_datos)
+        replicacion = DatabaseService.replicar_datos_desde_central(
+            data.dependencia.base_datos
+        )
 
         # Insertar usuario admin con id_dependencia apuntando a la nueva dependencia
         DatabaseService.insertar_admin_en_db(
@@ -257,39 +245,49 @@ async def crear_dependencia(
 
     from src.services.replicacion_service import ReplicacionService
 
-    ReplicacionService.replicar_dependencia(
-        {
-            "id_dependencia": db_obj.id_dependencia,
-            "id_tipo_dependencia": db_obj.id_tipo_dependencia,
-            "codigo_padre": db_obj.codigo_padre,
-            "nombre": db_obj.nombre,
-            "direccion": db_obj.direccion,
-            "telefono": db_obj.telefono,
-            "email": db_obj.email,
-            "web": db_obj.web,
-            "base_datos": db_obj.base_datos,
-            "host": db_obj.host,
-            "puerto": db_obj.puerto,
-            "id_provincia": db_obj.id_provincia,
-            "id_municipio": db_obj.id_municipio,
-            "descripcion": db_obj.descripcion,
-        },
-        "INSERT",
-    )
-    for cuenta_obj in cuentas_creadas:
-        ReplicacionService.replicar_cuenta_dependencia(
+    # Dependencia y cuentas en una sola transacción por sucursal
+    operaciones = [
+        (
+            "dependencia",
             {
-                "id_cuenta": cuenta_obj.id_cuenta,
-                "id_dependencia": cuenta_obj.id_dependencia,
-                "id_moneda": cuenta_obj.id_moneda,
-                "titular": cuenta_obj.titular,
-                "banco": cuenta_obj.banco,
-                "sucursal": cuenta_obj.sucursal,
-                "numero_cuenta": cuenta_obj.numero_cuenta,
-                "direccion": cuenta_obj.direccion,
+                "id_dependencia": db_obj.id_dependencia,
+                "id_tipo_dependencia": db_obj.id_tipo_dependencia,
+                "codigo_padre": db_obj.codigo_padre,
+                "nombre": db_obj.nombre,
+                "direccion": db_obj.direccion,
+                "telefono": db_obj.telefono,
+                "email": db_obj.email,
+                "web": db_obj.web,
+                "base_datos": db_obj.base_datos,
+                "host": db_obj.host,
+                "puerto": db_obj.puerto,
+                "id_provincia": db_obj.id_provincia,
+                "id_municipio": db_obj.id_municipio,
+                "descripcion": db_obj.descripcion,
             },
             "INSERT",
+            None,
+        )
+    ]
+    for cuenta_obj in cuentas_creadas:
+        operaciones.append(
+            (
+                "cuenta_dependencias",
+                {
+                    "id_cuenta": cuenta_obj.id_cuenta,
+                    "id_dependencia": cuenta_obj.id_dependencia,
+                    "id_moneda": cuenta_obj.id_moneda,
+                    "titular": cuenta_obj.titular,
+                    "banco": cuenta_obj.banco,
+                    "sucursal": cuenta_obj.sucursal,
+                    "numero_cuenta": cuenta_obj.numero_cuenta,
+                    "direccion": cuenta_obj.direccion,
+                },
+                "INSERT",
+                None,
+            )
         )
+    await ReplicacionService.replicar_lote(operaciones)
 
     # Registrar la nueva BD en conexion_database DESPUÉS del PUSH,
     # para que el PUSH no replique duplicados a la BD recién creada
@@ -323,6 +321,7 @@ async def crear_dependencia(
     db_obj_full = results.first()
     response = DependenciaRead.model_validate(db_obj_full)
     response.tablas_creadas = tablas_creadas
+    response.replicacion = replicacion
     return response
 
 
@@ -513,6 +512,7 @@ async def actualizar_dependencia(
             )
 
     await dependencia_repo.update(db, db_obj=db_obj, obj_in=data)
+    jerarquia_cache.invalidar()
 
     # Recargar el objeto con las relaciones
     statement = (
@@ -554,6 +554,7 @@ async def eliminar_dependencia(
 
     await db.delete(dep)
     await db.commit()
+    jerarquia_cache.invalidar()
 
     db_dropped = False
     if db_name:
@@ -570,6 +571,43 @@ async def eliminar_dependencia(
     }
 
 
+@router.post("/{dependencia_id}/replicar")
+async def replicar_dependencia(
+    dependencia_id: int,
+    db: AsyncSession = Depends(get_session),
+):
+    """Sincroniza las tablas de referencia de la central con la BD de la
+    dependencia: upsert de filas nuevas o modificadas y borrado solo de las
+    que ya no están en la central. Devuelve filas, borradas y milisegundos por
+    tabla.
+
+    Solo modo incremental: la réplica completa vacía las tablas y en una BD
+    en uso los ON DELETE CASCADE / SET NULL (productos, usuarios...) se
+    llevarían datos que el COPY no repone. Queda para la creación de la BD.
+    """
+    dep = await db.get(Dependencia, dependencia_id)
+    if not dep:
+        raise HTTPException(status_code=404, detail="Dependencia no encontrada")
+    if not dep.base_datos:
+        raise HTTPException(
+            status_code=400, detail="La dependencia no tiene base de datos propia"
+        )
+
+    try:
+        # psycopg2 es bloqueante: fuera del event loop
+        return await asyncio.to_thread(
+            DatabaseService.replicar_datos_desde_central, dep.base_datos, True
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al replicar datos de referencia: {str(e)}",
+        )
+    finally:
+        # La réplica puede haber tocado la tabla dependencia de esa base
+        jerarquia_cache.invalidar(dep.base_datos)
+
+
 @router.get("/tipos", response_model=List[TipoDependenciaRead])
 async def listar_tipos_dependencia(
     skip: int = Query(0, ge=0),
@@ -139,6 +139,19 @@ async def validar_multiple(
         )
 
 
+@existencias_router.get("/stock/verificar")
+async def verificar_stock(
+    db: AsyncSession = Depends(get_session),
+):
+    """Compara el saldo materializado de stock con los movimientos confirmados."""
+    try:
+        return await ExistenciaService.verificar_stock(db)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error al verificar stock: {str(e)}"
+        )
+
+
 @existencias_router.get("/resumen")
 async def get_resumen_existencias(
     id_dependencia: int = Query(None, description="ID de dependencia"),
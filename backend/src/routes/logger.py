@@ -1,26 +1,48 @@
+from collections import defaultdict
 from typing import List, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, Header, Query, Request
 from fastapi.responses import StreamingResponse
 from src.services.log_sse import broadcast_log, sse_events
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import func, desc
 from src.database.connection import get_session
-from src.models.log import LogEntry
+from src.models.log import LogEntry, LogResumenHora
+from src.services.log_writer import insertar_logs
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
 
+def _lista(valor: Optional[str]) -> Optional[List[str]]:
+    return valor.split(",") if valor else None
+
+
 @router.get("/stream")
-async def stream_logs():
+async def stream_logs(
+    nivel: Optional[str] = Query(
+        None, description="Niveles separados por coma: INFO,WARNING,ERROR"
+    ),
+    tipo: Optional[str] = Query(
+        None, description="Tipos separados por coma: REQUEST,ERROR,BUSINESS"
+    ),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    desde_id: Optional[int] = Query(
+        None, description="Reanudar desde este id (alternativa a Last-Event-ID)"
+    ),
+):
     """SSE endpoint for real-time log streaming"""
     return StreamingResponse(
-        sse_events(),
+        sse_events(
+            niveles=_lista(nivel),
+            tipos=_lista(tipo),
+            last_event_id=last_event_id if last_event_id is not None else desde_id,
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
         },
     )
 
@@ -128,32 +150,27 @@ async def get_log_stats(
 
     ahora = datetime.now()
     hace_24h = ahora - timedelta(hours=24)
-    hace_7d = ahora - timedelta(days=7)
-
-    # Total últimos 7 días
-    statement_total = select(func.count(LogEntry.id)).where(
-        LogEntry.timestamp >= hace_7d
-    )
-    result = await db.exec(statement_total)
-    total = result.one() or 0
-
-    # Por nivel
-    statement_nivel = (
-        select(LogEntry.nivel, func.count(LogEntry.id))
-        .where(LogEntry.timestamp >= hace_7d)
-        .group_by(LogEntry.nivel)
-    )
-    results_nivel = await db.exec(statement_nivel)
-    por_nivel = {row[0]: row[1] for row in results_nivel.all()}
-
-    # Por tipo
-    statement_tipo = (
-        select(LogEntry.tipo, func.count(LogEntry.id))
-        .where(LogEntry.timestamp >= hace_7d)
-        .group_by(LogEntry.tipo)
+    # El resumen es por hora: se cuenta desde el inicio de la hora de hace 7 días
+    hace_7d = (ahora - timedelta(days=7)).replace(minute=0, second=0, microsecond=0)
+
+    # Totales de los últimos 7 días desde el resumen por hora (no recorre `log`)
+    statement_resumen = (
+        select(
+            LogResumenHora.nivel,
+            LogResumenHora.tipo,
+            func.sum(LogResumenHora.cantidad),
+        )
+        .where(LogResumenHora.hora >= hace_7d)
+        .group_by(LogResumenHora.nivel, LogResumenHora.tipo)
     )
-    results_tipo = await db.exec(statement_tipo)
-    por_tipo = {row[0]: row[1] for row in results_tipo.all()}
+    results_resumen = await db.exec(statement_resumen)
+    total = 0
+    por_nivel = defaultdict(int)
+    por_tipo = defaultdict(int)
+    for nivel, tipo, cantidad in results_resumen.all():
+        total += int(cantidad)
+        por_nivel[nivel] += int(cantidad)
+        por_tipo[tipo] += int(cantidad)
 
     # Últimos errores
     statement_errores = (
@@ -168,8 +185,8 @@ async def get_log_stats(
 
     return LogStatsResponse(
         total=total,
-        por_nivel=por_nivel,
-        por_tipo=por_tipo,
+        por_nivel=dict(por_nivel),
+        por_tipo=dict(por_tipo),
         ultimos_errores=[
             LogEntryResponse.model_validate(e.model_dump()) for e in ultimos_errores
         ],
@@ -217,26 +234,9 @@ async def create_log(
         "usuario_nombre": usuario_nombre,
     }
 
-    db_obj = LogEntry(**log_data)
-    db.add(db_obj)
+    fila = (await insertar_logs(db, [{**log_data, "timestamp": datetime.now()}]))[0]
     await db.commit()
-    await db.refresh(db_obj)
-
-    broadcast_data = {
-        "id": db_obj.id,
-        "timestamp": db_obj.timestamp.isoformat(),
-        "nivel": db_obj.nivel,
-        "tipo": db_obj.tipo,
-        "mensaje": db_obj.mensaje,
-        "detalle": db_obj.detalle,
-        "ip": db_obj.ip,
-        "navegador": db_obj.navegador,
-        "usuario_id": db_obj.usuario_id,
-        "usuario_nombre": db_obj.usuario_nombre,
-        "endpoint": db_obj.endpoint,
-        "method": db_obj.method,
-        "status_code": db_obj.status_code,
-    }
-    await broadcast_log(broadcast_data)
+
+    await broadcast_log({**fila, "timestamp": fila["timestamp"].isoformat()})
 
     return {"success": True}
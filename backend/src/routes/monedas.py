@@ -25,7 +25,7 @@ async def crear_moneda(
     moneda_obj = await moneda_service.create(db, moneda)
     from src.services.replicacion_service import ReplicacionService
 
-    ReplicacionService.replicar_moneda(
+    await ReplicacionService.replicar_moneda(
         {
             "id_moneda": moneda_obj.id_moneda,
             "nombre": moneda_obj.nombre,
@@ -1,4 +1,5 @@
-from typing import List
+from collections import defaultdict
+from typing import Dict, List
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -12,6 +13,8 @@ from src.dto import (
     TipoMovimientoRead,
     AjusteCreate,
     MovimientoAjusteRead,
+    ConfirmacionLoteCreate,
+    ConfirmacionLoteRead,
 )
 
 logger = logging.getLogger(__name__)
@@ -177,31 +180,28 @@ async def crear_ajuste(
         )
         result = await MovimientoService.crear_ajuste(db, ajuste_servicio)
 
-        # Si hay destinos en otras DBs, crear movimientos directamente
-        for destino in destinos_otra_db:
-            if destino.nombre_database and result and len(result) > 0:
-                try:
-                    origen_data = {
+        # Si hay destinos en otras DBs, crear sus movimientos agrupados por
+        # base (un INSERT y una transacción por base destino)
+        por_db: Dict[str, List[dict]] = defaultdict(list)
+        if result:
+            for destino in destinos_otra_db:
+                por_db[destino.nombre_database].append(
+                    {
                         "id_dependencia": destino.id_dependencia,
                         "id_producto": ajuste.id_producto,
                         "cantidad": destino.cantidad,
                         "observacion": ajuste.observacion,
                         "codigo": ajuste.codigo or "",
                     }
-                    mov_creado = MovimientoService.crear_movimiento_en_otra_db(
-                        destino.nombre_database,
-                        origen_data,
-                    )
-                    logger.info(
-                        f"Movimiento creado en {destino.nombre_database}: {mov_creado}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error al crear en {destino.nombre_database}: {e}")
-                    logger.info(
-                        f"Movimiento creado en {destino.nombre_database}: {mov_creado}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error al crear en {destino.nombre_database}: {e}")
+                )
+        for nombre_database, movimientos in por_db.items():
+            try:
+                creados = await MovimientoService.crear_movimientos_en_otra_db(
+                    nombre_database, movimientos
+                )
+                logger.info(f"Movimientos creados en {nombre_database}: {creados}")
+            except Exception as e:
+                logger.error(f"Error al crear en {nombre_database}: {e}")
 
         return result
     except ValueError as e:
@@ -247,6 +247,27 @@ async def obtener_origen_movimiento(
     return origen
 
 
+@router.post("/confirmar-lote", response_model=ConfirmacionLoteRead)
+async def confirmar_movimientos_lote(
+    lote: ConfirmacionLoteCreate,
+    db: AsyncSession = Depends(get_session),
+):
+    """Confirmar varios movimientos pendientes en una sola transacción.
+
+    Devuelve el resultado de cada id; los que fallan quedan pendientes.
+    """
+    try:
+        return await MovimientoService.confirmar_movimientos(db, lote.ids)
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error("Error al confirmar movimientos en lote", exc_info=True)
+        raise HTTPException(
+            status_code=500, detail=f"Error al confirmar movimientos: {str(e)}"
+        )
+
+
 @router.put("/{movimiento_id}/confirmar", response_model=MovimientoRead)
 async def confirmar_movimiento(
     movimiento_id: int,
@@ -1,14 +1,19 @@
 import logging
 from datetime import date
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
-from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.connection import get_auth_session, get_session
 from src.dto.auth_dto import UsuarioInfo
 from src.services.auth_service import get_current_user
+from src.services.consolidado_service import (
+    TIMEOUT_SUCURSAL,
+    SucursalesNoDisponiblesError,
+    get_existencias_consolidadas,
+    get_ventas_consolidadas,
+)
 from src.services.reportes_service import (
     get_existencias,
     get_informe_desempeno,
@@ -21,7 +26,11 @@ from src.services.reportes_service import (
     get_reporte_mincult,
     get_reporte_onat,
     get_resumen_liquidaciones,
+    stream_movimientos_dependencia,
+    stream_movimientos_producto,
 )
+from src.utils.dependencies import get_usuario_casa_matriz
+from src.utils.exportacion import PATRON_FORMATO, respuesta_exportacion
 from src.utils.logger import AppLogger
 from src.utils.pdf_generator import (
     generar_pdf_clientes,
@@ -35,10 +44,14 @@ from src.utils.pdf_generator import (
     generar_pdf_proveedores_dependencia,
     generar_pdf_proyectos,
 )
+from src.utils.render_executor import RenderTimeoutError, render_executor
+from src.utils.report_cache import ConsultaReporte, report_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/reportes", tags=["reportes"])
 
+DESCRIPCION_FORMATO = "csv o jsonl: exporta todas las filas en streaming"
+
 # Usuario dummy para cuando los previews se acceden sin token
 DUMMY_USER = UsuarioInfo(
     id_usuario=0,
@@ -66,6 +79,81 @@ async def get_optional_user(
     return DUMMY_USER
 
 
+def _filtros(**valores) -> dict:
+    """Filtros del reporte en forma serializable (clave de caché y log)."""
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in valores.items()}
+
+
+async def _consultar_cache(
+    db: AsyncSession,
+    reporte: str,
+    filtros: dict,
+    if_none_match: Optional[str],
+    current_user: UsuarioInfo,
+    accion: str,
+    extra_clave: Optional[dict] = None,
+    **kwargs,
+) -> ConsultaReporte:
+    """Busca el reporte en caché; un acierto se registra como la exportación."""
+    consulta = await report_cache.consultar(
+        db, reporte, {**filtros, **(extra_clave or {})}, if_none_match, **kwargs
+    )
+    if consulta.desde_cache:
+        await AppLogger.log_action(
+            modulo="reportes",
+            accion=accion,
+            detalle={**filtros, "cache": True},
+            usuario_id=current_user.id_usuario,
+            usuario_nombre=f"{current_user.nombre} {current_user.primer_apellido}",
+        )
+    return consulta
+
+
+async def _registrar_exportacion(
+    current_user: UsuarioInfo, accion: str, detalle: dict
+) -> None:
+    await AppLogger.log_action(
+        modulo="reportes",
+        accion=accion,
+        detalle=detalle,
+        usuario_id=current_user.id_usuario,
+        usuario_nombre=f"{current_user.nombre} {current_user.primer_apellido}",
+    )
+
+
+async def _consultar_cache_pdf(
+    db: AsyncSession,
+    reporte: str,
+    filtros: dict,
+    if_none_match: Optional[str],
+    current_user: UsuarioInfo,
+    accion: str,
+    nombre_archivo: str,
+    firma: Tuple[str, str, str],
+) -> ConsultaReporte:
+    aprobado_por_nombre, aprobado_por_cargo, notas = firma
+    # El PDF impreso incluye quién lo emite, las firmas, las notas y la fecha
+    extra_clave = {
+        "usuario": f"{current_user.nombre} {current_user.primer_apellido}",
+        "aprobado_por_nombre": aprobado_por_nombre,
+        "aprobado_por_cargo": aprobado_por_cargo,
+        "notas": notas,
+        "emision": date.today().isoformat(),
+    }
+    return await _consultar_cache(
+        db,
+        reporte,
+        filtros,
+        if_none_match,
+        current_user,
+        accion,
+        extra_clave=extra_clave,
+        extension=".pdf",
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={nombre_archivo}"},
+    )
+
+
 # ---------------------------------------------------------------------------
 # Endpoint auxiliar: listado de personas para dropdowns del frontend
 # ---------------------------------------------------------------------------
@@ -107,16 +195,33 @@ async def obtener_reporte_proveedores_dependencia(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "proveedores-dependencia",
+            _filtros(
+                id_dependencia=id_dependencia,
+                tipo_entidad=tipo_entidad,
+                id_provincia=id_provincia,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_proveedores_dependencia",
+            nombre_archivo=f"proveedores_{id_dependencia}.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         proveedores, dependencia_info = await get_proveedores_por_dependencia(
             db, id_dependencia, tipo_entidad, id_provincia
         )
 
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
-
         await AppLogger.log_action(
             modulo="reportes",
             accion="export_proveedores_dependencia",
@@ -129,7 +234,8 @@ async def obtener_reporte_proveedores_dependencia(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_proveedores_dependencia(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_proveedores_dependencia,
             proveedores,
             dependencia_info,
             tipo_entidad,
@@ -139,13 +245,10 @@ async def obtener_reporte_proveedores_dependencia(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=proveedores_{id_dependencia}.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte proveedores-dependencia: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte proveedores-dependencia: {e}")
         raise HTTPException(
@@ -159,13 +262,26 @@ async def obtener_reporte_existencias(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
-        existencias, dependencia_info = await get_existencias(db, id_dependencia)
-
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "existencias",
+            _filtros(id_dependencia=id_dependencia),
+            if_none_match,
+            current_user,
+            accion="export_existencias",
+            nombre_archivo=f"existencias_{id_dependencia}.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
+        existencias, dependencia_info = await get_existencias(db, id_dependencia)
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -175,7 +291,8 @@ async def obtener_reporte_existencias(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_existencias(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_existencias,
             existencias,
             dependencia_info,
             usuario_actual,
@@ -184,13 +301,10 @@ async def obtener_reporte_existencias(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=existencias_{id_dependencia}.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte existencias: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte existencias: {e}")
         raise HTTPException(
@@ -206,16 +320,33 @@ async def obtener_reporte_movimientos_dependencia(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "movimientos-dependencia",
+            _filtros(
+                id_dependencia=id_dependencia,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_movimientos_dependencia",
+            nombre_archivo=f"movimientos_dependencia_{id_dependencia}.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         movimientos, dependencia_info = await get_movimientos_dependencia(
             db, id_dependencia, fecha_inicio, fecha_fin
         )
 
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
-
         await AppLogger.log_action(
             modulo="reportes",
             accion="export_movimientos_dependencia",
@@ -228,7 +359,8 @@ async def obtener_reporte_movimientos_dependencia(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_movimientos_dependencia(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_movimientos_dependencia,
             movimientos,
             dependencia_info,
             fecha_inicio,
@@ -239,13 +371,10 @@ async def obtener_reporte_movimientos_dependencia(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=movimientos_dependencia_{id_dependencia}.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte movimientos-dependencia: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte movimientos-dependencia: {e}")
         raise HTTPException(
@@ -262,16 +391,34 @@ async def obtener_reporte_movimientos_producto(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "movimientos-producto",
+            _filtros(
+                id_dependencia=id_dependencia,
+                id_producto=id_producto,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_movimientos_producto",
+            nombre_archivo=f"movimientos_producto_{id_producto}.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         movimientos, dependencia_info, producto_info = await get_movimientos_producto(
             db, id_dependencia, id_producto, fecha_inicio, fecha_fin
         )
 
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
-
         await AppLogger.log_action(
             modulo="reportes",
             accion="export_movimientos_producto",
@@ -285,7 +432,8 @@ async def obtener_reporte_movimientos_producto(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_movimientos_producto(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_movimientos_producto,
             movimientos,
             producto_info,
             dependencia_info,
@@ -297,13 +445,10 @@ async def obtener_reporte_movimientos_producto(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=movimientos_producto_{id_producto}.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte movimientos-producto: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte movimientos-producto: {e}")
         raise HTTPException(
@@ -321,12 +466,26 @@ async def obtener_reporte_clientes(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
-        data, meta = await get_registro_clientes(db)
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "clientes",
+            {},
+            if_none_match,
+            current_user,
+            accion="export_clientes",
+            nombre_archivo="registro_clientes.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
+        data, meta = await get_registro_clientes(db)
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -336,7 +495,8 @@ async def obtener_reporte_clientes(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_clientes(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_clientes,
             data,
             meta,
             usuario_actual,
@@ -345,13 +505,10 @@ async def obtener_reporte_clientes(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=registro_clientes.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte clientes: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte clientes: {e}")
         raise HTTPException(
@@ -371,12 +528,26 @@ async def obtener_reporte_proyectos(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
-        data, meta = await get_registro_proyectos(db, fecha_inicio, fecha_fin)
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "proyectos",
+            _filtros(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+            if_none_match,
+            current_user,
+            accion="export_proyectos",
+            nombre_archivo="registro_proyectos.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
+        data, meta = await get_registro_proyectos(db, fecha_inicio, fecha_fin)
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -390,7 +561,8 @@ async def obtener_reporte_proyectos(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_proyectos(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_proyectos,
             data,
             meta,
             usuario_actual,
@@ -399,13 +571,10 @@ async def obtener_reporte_proyectos(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=registro_proyectos.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte proyectos: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte proyectos: {e}")
         raise HTTPException(
@@ -427,14 +596,33 @@ async def obtener_reporte_desempeno(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "desempeno",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_persona=id_persona,
+                estado=estado,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_desempeno",
+            nombre_archivo="informe_desempeno.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_informe_desempeno(
             db, fecha_inicio, fecha_fin, id_persona, estado
         )
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -448,7 +636,8 @@ async def obtener_reporte_desempeno(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_desempeno(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_desempeno,
             data,
             meta,
             usuario_actual,
@@ -457,13 +646,10 @@ async def obtener_reporte_desempeno(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=informe_desempeno.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte desempeño: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte desempeño: {e}")
         raise HTTPException(
@@ -485,14 +671,33 @@ async def obtener_reporte_onat(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "onat",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_moneda=id_moneda,
+                id_persona=id_persona,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_onat",
+            nombre_archivo="reporte_onat.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_reporte_onat(
             db, fecha_inicio, fecha_fin, id_moneda, id_persona
         )
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -506,7 +711,8 @@ async def obtener_reporte_onat(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_onat(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_onat,
             data,
             meta,
             usuario_actual,
@@ -515,11 +721,10 @@ async def obtener_reporte_onat(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=reporte_onat.pdf"},
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte ONAT: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte ONAT: {e}")
         raise HTTPException(
@@ -539,12 +744,26 @@ async def obtener_reporte_mincult(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
-        data, meta = await get_reporte_mincult(db, fecha_inicio, fecha_fin)
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "mincult",
+            _filtros(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+            if_none_match,
+            current_user,
+            accion="export_mincult",
+            nombre_archivo="reporte_mincult.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
+        data, meta = await get_reporte_mincult(db, fecha_inicio, fecha_fin)
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -558,7 +777,8 @@ async def obtener_reporte_mincult(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_mincult(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_mincult,
             data,
             meta,
             usuario_actual,
@@ -567,11 +787,10 @@ async def obtener_reporte_mincult(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=reporte_mincult.pdf"},
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte MINCULT: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte MINCULT: {e}")
         raise HTTPException(
@@ -595,14 +814,33 @@ async def obtener_reporte_liquidaciones(
     aprobado_por_nombre: str = Query("", description="Nombre de quien aprueba"),
     aprobado_por_cargo: str = Query("", description="Cargo de quien aprueba"),
     notas: str = Query("", description="Observaciones para incluir en el PDF"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        consulta = await _consultar_cache_pdf(
+            db,
+            "liquidaciones",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_cliente=id_cliente,
+                tipo_concepto=tipo_concepto,
+            ),
+            if_none_match,
+            current_user,
+            accion="export_liquidaciones",
+            nombre_archivo="resumen_liquidaciones.pdf",
+            firma=(aprobado_por_nombre, aprobado_por_cargo, notas),
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_resumen_liquidaciones(
             db, fecha_inicio, fecha_fin, id_cliente, tipo_concepto
         )
-        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
 
         await AppLogger.log_action(
             modulo="reportes",
@@ -616,7 +854,8 @@ async def obtener_reporte_liquidaciones(
             usuario_nombre=usuario_actual,
         )
 
-        pdf_buffer = generar_pdf_liquidaciones(
+        pdf_buffer = await render_executor.render(
+            generar_pdf_liquidaciones,
             data,
             meta,
             usuario_actual,
@@ -625,13 +864,10 @@ async def obtener_reporte_liquidaciones(
             notas=notas,
         )
 
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": "attachment; filename=resumen_liquidaciones.pdf"
-            },
-        )
+        return await consulta.responder(pdf_buffer.getvalue())
+    except RenderTimeoutError as e:
+        logger.error(f"Timeout en reporte liquidaciones: {e}")
+        raise HTTPException(status_code=504, detail=e.message)
     except Exception as e:
         logger.error(f"Error en reporte liquidaciones: {e}")
         raise HTTPException(
@@ -647,10 +883,22 @@ async def obtener_reporte_liquidaciones(
 @router.get("/existencias/preview")
 async def preview_existencias(
     id_dependencia: int = Query(..., description="ID de la Dependencia"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "existencias",
+            _filtros(id_dependencia=id_dependencia),
+            if_none_match,
+            current_user,
+            accion="preview_existencias",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         existencias, dependencia_info = await get_existencias(db, id_dependencia)
 
         total_cantidad = sum(float(item["cantidad"]) for item in existencias)
@@ -667,12 +915,14 @@ async def preview_existencias(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "dependencia": dependencia_info,
-            "items": existencias,
-            "total_items": len(existencias),
-            "total_cantidad": total_cantidad,
-        }
+        return await consulta.responder_json(
+            {
+                "dependencia": dependencia_info,
+                "items": existencias,
+                "total_items": len(existencias),
+                "total_cantidad": total_cantidad,
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview existencias: {e}")
         raise HTTPException(
@@ -685,10 +935,47 @@ async def preview_movimientos_dependencia(
     id_dependencia: int = Query(..., description="ID de la Dependencia"),
     fecha_inicio: date = Query(..., description="Fecha Inicio"),
     fecha_fin: date = Query(..., description="Fecha Fin"),
+    formato: Optional[str] = Query(
+        None, alias="format", pattern=PATRON_FORMATO, description=DESCRIPCION_FORMATO
+    ),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        if formato:
+            result = await stream_movimientos_dependencia(
+                db, id_dependencia, fecha_inicio, fecha_fin
+            )
+            await _registrar_exportacion(
+                current_user,
+                "exportar_movimientos_dependencia",
+                _filtros(
+                    id_dependencia=id_dependencia,
+                    fecha_inicio=fecha_inicio,
+                    fecha_fin=fecha_fin,
+                    formato=formato,
+                ),
+            )
+            return respuesta_exportacion(
+                result, formato, f"movimientos_dependencia_{id_dependencia}"
+            )
+
+        consulta = await _consultar_cache(
+            db,
+            "movimientos-dependencia",
+            _filtros(
+                id_dependencia=id_dependencia,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_movimientos_dependencia",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         movimientos, dependencia_info = await get_movimientos_dependencia(
             db, id_dependencia, fecha_inicio, fecha_fin
         )
@@ -723,13 +1010,15 @@ async def preview_movimientos_dependencia(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "dependencia": dependencia_info,
-            "items": items,
-            "total_items": len(items),
-            "total_entradas": total_entradas,
-            "total_salidas": total_salidas,
-        }
+        return await consulta.responder_json(
+            {
+                "dependencia": dependencia_info,
+                "items": items,
+                "total_items": len(items),
+                "total_entradas": total_entradas,
+                "total_salidas": total_salidas,
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview movimientos-dependencia: {e}")
         raise HTTPException(
@@ -743,10 +1032,49 @@ async def preview_movimientos_producto(
     id_producto: int = Query(..., description="ID del Producto"),
     fecha_inicio: date = Query(..., description="Fecha Inicio"),
     fecha_fin: date = Query(..., description="Fecha Fin"),
+    formato: Optional[str] = Query(
+        None, alias="format", pattern=PATRON_FORMATO, description=DESCRIPCION_FORMATO
+    ),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        if formato:
+            result = await stream_movimientos_producto(
+                db, id_dependencia, id_producto, fecha_inicio, fecha_fin
+            )
+            await _registrar_exportacion(
+                current_user,
+                "exportar_movimientos_producto",
+                _filtros(
+                    id_dependencia=id_dependencia,
+                    id_producto=id_producto,
+                    fecha_inicio=fecha_inicio,
+                    fecha_fin=fecha_fin,
+                    formato=formato,
+                ),
+            )
+            return respuesta_exportacion(
+                result, formato, f"movimientos_producto_{id_producto}"
+            )
+
+        consulta = await _consultar_cache(
+            db,
+            "movimientos-producto",
+            _filtros(
+                id_dependencia=id_dependencia,
+                id_producto=id_producto,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_movimientos_producto",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         movimientos, dependencia_info, producto_info = await get_movimientos_producto(
             db, id_dependencia, id_producto, fecha_inicio, fecha_fin
         )
@@ -782,14 +1110,16 @@ async def preview_movimientos_producto(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "dependencia": dependencia_info,
-            "producto": producto_info,
-            "items": items,
-            "total_items": len(items),
-            "total_entradas": total_entradas,
-            "total_salidas": total_salidas,
-        }
+        return await consulta.responder_json(
+            {
+                "dependencia": dependencia_info,
+                "producto": producto_info,
+                "items": items,
+                "total_items": len(items),
+                "total_entradas": total_entradas,
+                "total_salidas": total_salidas,
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview movimientos-producto: {e}")
         raise HTTPException(
@@ -804,10 +1134,26 @@ async def preview_proveedores_dependencia(
         ..., description="Tipo de Entidad (NATURAL, TCP, JURIDICA)"
     ),
     id_provincia: int = Query(None, description="Filtrar por provincia (opcional)"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "proveedores-dependencia",
+            _filtros(
+                id_dependencia=id_dependencia,
+                tipo_entidad=tipo_entidad,
+                id_provincia=id_provincia,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_proveedores_dependencia",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         proveedores, dependencia_info = await get_proveedores_por_dependencia(
             db, id_dependencia, tipo_entidad, id_provincia
         )
@@ -825,11 +1171,13 @@ async def preview_proveedores_dependencia(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "dependencia": dependencia_info,
-            "items": proveedores,
-            "total_items": len(proveedores),
-        }
+        return await consulta.responder_json(
+            {
+                "dependencia": dependencia_info,
+                "items": proveedores,
+                "total_items": len(proveedores),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview proveedores-dependencia: {e}")
         raise HTTPException(
@@ -844,10 +1192,22 @@ async def preview_proveedores_dependencia(
 
 @router.get("/clientes/preview")
 async def preview_clientes(
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "clientes",
+            {},
+            if_none_match,
+            current_user,
+            accion="preview_clientes",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_registro_clientes(db)
 
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
@@ -859,10 +1219,12 @@ async def preview_clientes(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "items": data,
-            "total_items": len(data),
-        }
+        return await consulta.responder_json(
+            {
+                "items": data,
+                "total_items": len(data),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview clientes: {e}")
         raise HTTPException(
@@ -879,10 +1241,22 @@ async def preview_clientes(
 async def preview_proyectos(
     fecha_inicio: Optional[date] = Query(None, description="Fecha Inicio"),
     fecha_fin: Optional[date] = Query(None, description="Fecha Fin"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "proyectos",
+            _filtros(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+            if_none_match,
+            current_user,
+            accion="preview_proyectos",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_registro_proyectos(db, fecha_inicio, fecha_fin)
 
         items = [
@@ -908,10 +1282,12 @@ async def preview_proyectos(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "items": items,
-            "total_items": len(items),
-        }
+        return await consulta.responder_json(
+            {
+                "items": items,
+                "total_items": len(items),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview proyectos: {e}")
         raise HTTPException(
@@ -930,10 +1306,27 @@ async def preview_desempeno(
     fecha_fin: Optional[date] = Query(None, description="Fecha Fin"),
     id_persona: Optional[int] = Query(None, description="Filtrar por creador"),
     estado: Optional[str] = Query(None, description="Estado (pagada/pendiente)"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "desempeno",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_persona=id_persona,
+                estado=estado,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_desempeno",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_informe_desempeno(
             db, fecha_inicio, fecha_fin, id_persona, estado
         )
@@ -964,13 +1357,15 @@ async def preview_desempeno(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "items": items,
-            "total_items": len(items),
-            "totales_por_persona": meta.get("totales_por_persona", {}),
-            "gran_total_cobro": meta.get("gran_total_cobro", 0),
-            "gran_total_valor": meta.get("gran_total_valor", 0),
-        }
+        return await consulta.responder_json(
+            {
+                "items": items,
+                "total_items": len(items),
+                "totales_por_persona": meta.get("totales_por_persona", {}),
+                "gran_total_cobro": meta.get("gran_total_cobro", 0),
+                "gran_total_valor": meta.get("gran_total_valor", 0),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview desempeño: {e}")
         raise HTTPException(
@@ -989,10 +1384,27 @@ async def preview_onat(
     fecha_fin: Optional[date] = Query(None, description="Fecha Fin"),
     id_moneda: Optional[int] = Query(None, description="Filtrar por moneda"),
     id_persona: Optional[int] = Query(None, description="Filtrar por creador"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "onat",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_moneda=id_moneda,
+                id_persona=id_persona,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_onat",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_reporte_onat(
             db, fecha_inicio, fecha_fin, id_moneda, id_persona
         )
@@ -1023,11 +1435,13 @@ async def preview_onat(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "items": items,
-            "total_items": len(items),
-            "totales": meta.get("totales", {}),
-        }
+        return await consulta.responder_json(
+            {
+                "items": items,
+                "total_items": len(items),
+                "totales": meta.get("totales", {}),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview ONAT: {e}")
         raise HTTPException(
@@ -1044,10 +1458,22 @@ async def preview_onat(
 async def preview_mincult(
     fecha_inicio: Optional[date] = Query(None, description="Fecha Inicio"),
     fecha_fin: Optional[date] = Query(None, description="Fecha Fin"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "mincult",
+            _filtros(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+            if_none_match,
+            current_user,
+            accion="preview_mincult",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_reporte_mincult(db, fecha_inicio, fecha_fin)
 
         usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
@@ -1063,12 +1489,14 @@ async def preview_mincult(
             usuario_nombre=usuario_actual,
         )
 
-        return {
-            "items": data,
-            "total_brackets": len(data),
-            "total_liquidaciones": meta.get("total_liquidaciones", 0),
-            "total_devengado_general": meta.get("total_devengado_general", 0),
-        }
+        return await consulta.responder_json(
+            {
+                "items": data,
+                "total_brackets": len(data),
+                "total_liquidaciones": meta.get("total_liquidaciones", 0),
+                "total_devengado_general": meta.get("total_devengado_general", 0),
+            }
+        )
     except Exception as e:
         logger.error(f"Error en preview MINCULT: {e}")
         raise HTTPException(
@@ -1089,10 +1517,27 @@ async def preview_liquidaciones(
     tipo_concepto: Optional[int] = Query(
         None, description="Filtrar por tipo de concepto"
     ),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_session),
     current_user: UsuarioInfo = Depends(get_optional_user),
 ):
     try:
+        consulta = await _consultar_cache(
+            db,
+            "liquidaciones",
+            _filtros(
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                id_cliente=id_cliente,
+                tipo_concepto=tipo_concepto,
+            ),
+            if_none_match,
+            current_user,
+            accion="preview_liquidaciones",
+        )
+        if consulta.desde_cache:
+            return consulta.respuesta
+
         data, meta = await get_resumen_liquidaciones(
             db, fecha_inicio, fecha_fin, id_cliente, tipo_concepto
         )
@@ -1123,13 +1568,93 @@ async def preview_liquidaciones(
             usuario_nombre=usuario_actual,
         )
 
+        return await consulta.responder_json(
+            {
+                "items": items,
+                "total_items": len(items),
+                "totales": meta.get("totales", {}),
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error en preview liquidaciones: {e}")
+        raise HTTPException(
+            status_code=500, detail="Error interno al generar el reporte"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Reportes consolidados: todas las sucursales de conexion_database a la vez
+# ---------------------------------------------------------------------------
+
+
+@router.get("/consolidado/existencias")
+async def consolidado_existencias(
+    timeout: float = Query(
+        TIMEOUT_SUCURSAL, gt=0, le=120, description="Segundos por sucursal"
+    ),
+    current_user: UsuarioInfo = Depends(get_usuario_casa_matriz),
+):
+    try:
+        resultado = await get_existencias_consolidadas(timeout)
+
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        await AppLogger.log_action(
+            modulo="reportes",
+            accion="consolidado_existencias",
+            detalle={
+                "total_items": len(resultado["items"]),
+                "parcial": resultado["parcial"],
+            },
+            usuario_id=current_user.id_usuario,
+            usuario_nombre=usuario_actual,
+        )
+
         return {
-            "items": items,
-            "total_items": len(items),
-            "totales": meta.get("totales", {}),
+            **resultado,
+            "total_items": len(resultado["items"]),
+            "total_cantidad": sum(
+                float(item["cantidad"]) for item in resultado["items"]
+            ),
         }
+    except SucursalesNoDisponiblesError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
-        logger.error(f"Error en preview liquidaciones: {e}")
+        logger.error(f"Error en consolidado existencias: {e}")
+        raise HTTPException(
+            status_code=500, detail="Error interno al generar el reporte"
+        )
+
+
+@router.get("/consolidado/ventas")
+async def consolidado_ventas(
+    fecha_inicio: Optional[date] = Query(None),
+    fecha_fin: Optional[date] = Query(None),
+    timeout: float = Query(
+        TIMEOUT_SUCURSAL, gt=0, le=120, description="Segundos por sucursal"
+    ),
+    current_user: UsuarioInfo = Depends(get_usuario_casa_matriz),
+):
+    try:
+        resultado = await get_ventas_consolidadas(fecha_inicio, fecha_fin, timeout)
+
+        usuario_actual = f"{current_user.nombre} {current_user.primer_apellido}"
+        await AppLogger.log_action(
+            modulo="reportes",
+            accion="consolidado_ventas",
+            detalle={
+                **_filtros(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin),
+                "total_items": len(resultado["items"]),
+                "parcial": resultado["parcial"],
+            },
+            usuario_id=current_user.id_usuario,
+            usuario_nombre=usuario_actual,
+        )
+
+        return {**resultado, "total_items": len(resultado["items"])}
+    except SucursalesNoDisponiblesError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Error en consolidado ventas: {e}")
         raise HTTPException(
             status_code=500, detail="Error interno al generar el reporte"
         )
@@ -1,7 +1,9 @@
 import logging
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from src.database.connection import get_auth_session, get_session
 from src.services.contrato_service import (
     ContratoService,
@@ -55,16 +57,51 @@ async def crear_contrato(
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 
+async def _array_json(
+    items: AsyncIterator[BaseModel], por_bloque: int = 200
+) -> AsyncIterator[bytes]:
+    """Serializa `items` como un array JSON, enviando bloques de `por_bloque`."""
+    bloque = [b"["]
+    n = 0
+    try:
+        async for item in items:
+            if n:
+                bloque.append(b",")
+            bloque.append(item.model_dump_json().encode("utf-8"))
+            n += 1
+            if n % por_bloque == 0:
+                yield b"".join(bloque)
+                bloque = []
+    except Exception:
+        # Los encabezados ya se enviaron: solo queda cortar la respuesta
+        logger.error("Error enviando la lista en streaming", exc_info=True)
+        raise
+    bloque.append(b"]")
+    yield b"".join(bloque)
+
+
+def _cursor_siguiente(response: Response, items: list, campo: str, limit: int) -> None:
+    """Con una página completa, X-Next-Cursor lleva el valor para `despues_de`."""
+    if items and len(items) >= limit:
+        response.headers["X-Next-Cursor"] = str(getattr(items[-1], campo))
+
+
 @contratos_router.get("", response_model=List[ContratoReadWithDetails])
 async def obtener_contratos(
+    response: Response,
     skip: int = 0,
-    limit: int = 10000,
+    limit: int = 100,
     id_cliente: Optional[int] = None,
+    despues_de: Optional[int] = None,
     db: AsyncSession = Depends(get_session),
 ):
     """Obtener todos los contratos, opcionalmente filtrados por id_cliente."""
     try:
-        return await ContratoService.get_all(db, skip, limit, id_cliente)
+        items = await ContratoService.get_all(
+            db, skip, limit, id_cliente, despues_de=despues_de
+        )
+        _cursor_siguiente(response, items, "id_contrato", limit)
+        return items
     except Exception as e:
         logger.error("Error al obtener contratos", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -89,12 +126,16 @@ async def obtener_items_disponibles(
     contrato_id: int,
     db: AsyncSession = Depends(get_session),
 ):
-    """Obtener items de anexos disponibles con precio en la moneda del contrato."""
+    """Obtener items de anexos disponibles con precio en la moneda del contrato.
+
+    La lista se envía como un array JSON a medida que se leen las filas.
+    """
     try:
-        return await ContratoService.get_items_disponibles(db, contrato_id)
+        items = await ContratoService.stream_items_disponibles(db, contrato_id)
     except Exception as e:
         logger.error("Error al obtener items disponibles", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
+    return StreamingResponse(_array_json(items), media_type="application/json")
 
 
 @contratos_router.put("/{contrato_id}", response_model=ContratoReadWithDetails)
@@ -177,13 +218,19 @@ async def obtener_suplementos_por_contrato(
 
 @suplementos_router.get("", response_model=List[SuplementoReadWithDetails])
 async def obtener_suplementos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    despues_de: Optional[int] = None,
     db: AsyncSession = Depends(get_session),
 ):
     """Obtener todos los suplementos."""
     try:
-        return await SuplementoService.get_all(db, skip, limit)
+        items = await SuplementoService.get_all(
+            db, skip, limit, despues_de=despues_de
+        )
+        _cursor_siguiente(response, items, "id_suplemento", limit)
+        return items
     except Exception as e:
         logger.error("Error al obtener suplementos", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -266,13 +313,19 @@ async def crear_factura(
 
 @facturas_router.get("", response_model=List[FacturaReadWithDetails])
 async def obtener_facturas(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    despues_de: Optional[int] = None,
     db: AsyncSession = Depends(get_session),
 ):
     """Obtener todas las facturas."""
     try:
-        return await FacturaService.get_all(db, skip, limit)
+        items = await FacturaService.get_all(
+            db, skip, limit, despues_de=despues_de
+        )
+        _cursor_siguiente(response, items, "id_factura", limit)
+        return items
     except Exception as e:
         logger.error("Error al obtener facturas", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -371,13 +424,19 @@ async def crear_venta_efectivo(
 
 @ventas_efectivo_router.get("", response_model=List[VentaEfectivoReadWithDetails])
 async def obtener_ventas_efectivo(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    despues_de: Optional[int] = None,
     db: AsyncSession = Depends(get_session),
 ):
     """Obtener todas las ventas en efectivo."""
     try:
-        return await VentaEfectivoService.get_all(db, skip, limit)
+        items = await VentaEfectivoService.get_all(
+            db, skip, limit, despues_de=despues_de
+        )
+        _cursor_siguiente(response, items, "id_venta_efectivo", limit)
+        return items
     except Exception as e:
         logger.error("Error al obtener ventas en efectivo", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from src.dto.auth_dto import UsuarioInfo
+
+
+@dataclass
+class _Entrada:
+    usuario: UsuarioInfo
+    expira: float
+
+
+class UsuarioCache:
+    """Cache en memoria de UsuarioInfo por token (clave: SHA-256 del token).
+
+    Evita las consultas de Sesion/Usuario/Dependencia/Grupo en cada request
+    autenticado. Cada entrada vive como máximo `ttl` segundos y nunca más que
+    la sesión en BD. Es local a cada proceso: logout y ediciones invalidan el
+    proceso que las atiende y el TTL acota el desfase en los demás workers.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entradas: int = 10000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _clave(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[UsuarioInfo]:
+        clave = self._clave(token)
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            self.misses += 1
+            return None
+        if entrada.expira <= time.monotonic():
+            del self._entradas[clave]
+            self.misses += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.hits += 1
+        return entrada.usuario
+
+    def set(
+        self,
+        token: str,
+        usuario: UsuarioInfo,
+        fecha_expiracion: Optional[datetime] = None,
+    ) -> None:
+        if self.ttl <= 0:
+            return
+        vida = self.ttl
+        if fecha_expiracion is not None:
+            restante = (
+                fecha_expiracion.replace(tzinfo=timezone.utc)
+                - datetime.now(timezone.utc)
+            ).total_seconds()
+            vida = min(vida, restante)
+        if vida <= 0:
+            return
+        clave = self._clave(token)
+        self._entradas[clave] = _Entrada(
+            usuario=usuario, expira=time.monotonic() + vida
+        )
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def invalidar_token(self, token: str) -> None:
+        self._entradas.pop(self._clave(token), None)
+
+    def invalidar_usuario(self, id_usuario: int) -> None:
+        """Elimina las entradas del usuario (en cualquier base de datos)."""
+        self._eliminar(lambda u: u.id_usuario == id_usuario)
+
+    def invalidar_grupo(self, id_grupo: int) -> None:
+        self._eliminar(lambda u: u.grupo is not None and u.grupo.id_grupo == id_grupo)
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+    def _eliminar(self, criterio) -> None:
+        for clave in [k for k, e in self._entradas.items() if criterio(e.usuario)]:
+            del self._entradas[clave]
+
+
+usuario_cache = UsuarioCache(ttl=float(os.getenv("AUTH_CACHE_TTL", "60")))
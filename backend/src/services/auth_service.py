@@ -29,6 +29,9 @@ from src.dto.auth_dto import (
     PerfilUpdateRequest,
     PerfilResponse,
 )
+from src.services.auth_cache import usuario_cache
+from src.services.password_executor import password_executor
+from src.services.jerarquia_service import JerarquiaService
 
 load_dotenv()
 
@@ -52,6 +55,18 @@ def get_password_hash(password: str) -> str:
     return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool de bcrypt (no bloquea el event loop)."""
+    return await password_executor.ejecutar(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash en el pool de bcrypt (no bloquea el event loop)."""
+    return await password_executor.ejecutar(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -77,23 +92,7 @@ async def get_dependencia_with_hijos(
     db: AsyncSession, id_dependencia: int
 ) -> List[Dependencia]:
     """Obtiene la dependencia y todas sus descendientes (hijas, nietas, etc.)"""
-    dependencias = []
-
-    async def _get_hijos(parent_id: int):
-        statement = select(Dependencia).where(Dependencia.codigo_padre == parent_id)
-        results = await db.exec(statement)
-        hijos = results.all()
-        for hijo in hijos:
-            dependencias.append(hijo)
-            await _get_hijos(hijo.id_dependencia)
-
-    # Obtener la dependencia principal
-    dep_principal = await db.get(Dependencia, id_dependencia)
-    if dep_principal:
-        dependencias.append(dep_principal)
-        await _get_hijos(id_dependencia)
-
-    return dependencias
+    return await JerarquiaService.get_subarbol(db, id_dependencia)
 
 
 async def search_by_alias(
@@ -188,7 +187,9 @@ async def login(db: AsyncSession, login_data: LoginRequest) -> Optional[LoginRes
             return None
 
         # 4. Verificar contraseña
-        if not verify_password(login_data.contrasenia, usuario.contrasenia):
+        if not await verify_password_async(
+            login_data.contrasenia, usuario.contrasenia
+        ):
             return None
 
         # 5. Obtener la dependencia desde la BD destino
@@ -303,9 +304,17 @@ async def login(db: AsyncSession, login_data: LoginRequest) -> Optional[LoginRes
     )
 
 
-async def get_current_user(db: AsyncSession, token: str) -> Optional[UsuarioInfo]:
-    """Obtiene el usuario actual basado en el token JWT"""
-    payload = decode_token(token)
+async def get_current_user(
+    db: AsyncSession, token: str, payload: Optional[dict] = None
+) -> Optional[UsuarioInfo]:
+    """Obtiene el usuario actual basado en el token JWT.
+
+    `payload` permite reutilizar el token ya decodificado por el middleware.
+    Los usuarios resueltos se guardan en `usuario_cache`, de modo que los
+    requests siguientes con el mismo token no consultan la BD.
+    """
+    if payload is None:
+        payload = decode_token(token)
     if not payload:
         return None
 
@@ -313,6 +322,10 @@ async def get_current_user(db: AsyncSession, token: str) -> Optional[UsuarioInfo
     if not usuario_id:
         return None
 
+    cached = usuario_cache.get(token)
+    if cached is not None:
+        return cached
+
     # Verificar que la sesión exista y no haya expirado
     statement = select(Sesion).where(Sesion.token == token)
     results = await db.exec(statement)
@@ -340,7 +353,7 @@ async def get_current_user(db: AsyncSession, token: str) -> Optional[UsuarioInfo
     # Obtener grupo
     grupo = await db.get(Grupo, usuario.id_grupo)
 
-    return UsuarioInfo(
+    usuario_info = UsuarioInfo(
         id_usuario=usuario.id_usuario,
         ci=usuario.ci,
         nombre=usuario.nombre,
@@ -370,6 +383,8 @@ async def get_current_user(db: AsyncSession, token: str) -> Optional[UsuarioInfo
         if grupo
         else None,
     )
+    usuario_cache.set(token, usuario_info, sesion.fecha_expiracion)
+    return usuario_info
 
 
 async def get_funcionalidades_by_token(
@@ -416,6 +431,8 @@ async def logout(db: AsyncSession, token: str) -> bool:
     results = await db.exec(statement)
     sesion = results.first()
 
+    usuario_cache.invalidar_token(token)
+
     if sesion:
         await db.delete(sesion)
         await db.commit()
@@ -445,9 +462,13 @@ async def update_perfil(
     if perfil_data.contrasenia_nueva:
         if not perfil_data.contrasenia_actual:
             return None
-        if not verify_password(perfil_data.contrasenia_actual, usuario.contrasenia):
+        if not await verify_password_async(
+            perfil_data.contrasenia_actual, usuario.contrasenia
+        ):
             return None
-        usuario.contrasenia = get_password_hash(perfil_data.contrasenia_nueva)
+        usuario.contrasenia = await get_password_hash_async(
+            perfil_data.contrasenia_nueva
+        )
 
     # Actualizar alias si se proporcionó
     if perfil_data.alias:
@@ -461,6 +482,7 @@ async def update_perfil(
 
     await db.commit()
     await db.refresh(usuario)
+    usuario_cache.invalidar_usuario(usuario.id_usuario)
 
     # Obtener dependencia y grupo
     dependencia = None
@@ -584,7 +606,7 @@ async def register(
             return None
 
         # 5. Hashear contraseña con bcrypt
-        hashed_password = get_password_hash(register_data.contrasenia)
+        hashed_password = await get_password_hash_async(register_data.contrasenia)
 
         # 6. Buscar grupo ADMINISTRADOR (id_grupo=1)
         grupo = db_target.get(Grupo, 1)
@@ -711,8 +733,10 @@ class AuthService:
         return await logout(db, token)
 
     @staticmethod
-    async def get_current_user(db: AsyncSession, token: str) -> Optional[UsuarioInfo]:
-        return await get_current_user(db, token)
+    async def get_current_user(
+        db: AsyncSession, token: str, payload: Optional[dict] = None
+    ) -> Optional[UsuarioInfo]:
+        return await get_current_user(db, token, payload)
 
     @staticmethod
     async def get_funcionalidades_by_token(
@@ -0,0 +1,213 @@
+"""Reportes consolidados sobre todas las sucursales.
+
+Cada reporte consolidado es una consulta que ya agrega en SQL por producto.
+Se lanza a la vez en todas las bases registradas en `conexion_database`
+(engines de `engine_registry`, concurrencia limitada) con un timeout por base.
+Las filas se leen en streaming y se pliegan en un acumulado por clave a medida
+que cada base termina. Así la memoria depende del número de productos
+distintos y no de filas × sucursales.
+
+Una base que falla o excede su timeout no invalida el resto. Queda informada
+en `sucursales` y el resultado se marca como `parcial`. Sus filas solo se
+suman al total si la base terminó completa, para no mezclar datos a medias.
+Si no se puede leer la lista de sucursales no hay reporte que dar: se lanza
+SucursalesNoDisponiblesError (503) en vez de devolver un consolidado vacío.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+
+from src.core.exceptions import AppError
+from src.database.connection import engine_registry
+from src.database.sucursales import MAX_CONCURRENCIA_SUCURSALES
+from src.models.detalle_venta import DetalleVenta
+from src.models.producto import Productos
+from src.models.stock_dependencia import StockDependencia
+from src.models.venta import EstadoVenta, Ventas
+from src.services.replicacion_service import ReplicacionService
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_SUCURSAL = float(os.getenv("CONSOLIDADO_TIMEOUT", "15"))
+
+
+class SucursalesNoDisponiblesError(AppError):
+    def __init__(self):
+        super().__init__(
+            message="No se pudo obtener la lista de sucursales", status_code=503
+        )
+
+
+@dataclass
+class Acumulado:
+    """Totales por producto de todas las bases que terminaron bien."""
+
+    sumas: Sequence[str]
+    filas: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def plegar(self, base: str, parcial: Dict[str, Dict[str, Any]]) -> None:
+        for codigo, fila in parcial.items():
+            total = self.filas.get(codigo)
+            if total is None:
+                self.filas[codigo] = {**fila, "sucursales": [base]}
+                continue
+            for columna in self.sumas:
+                total[columna] += fila[columna]
+            total["sucursales"].append(base)
+
+    def ordenadas(self) -> List[Dict[str, Any]]:
+        for fila in self.filas.values():
+            fila["sucursales"].sort()
+        return sorted(
+            self.filas.values(), key=lambda f: (f["descripcion"], f["codigo"])
+        )
+
+
+async def _leer_base(base: str, consulta: Select, sumas: Sequence[str]) -> dict:
+    """Agrupa en un dict (codigo -> fila) las filas de una base, en streaming."""
+    parcial: Dict[str, Dict[str, Any]] = {}
+    async with engine_registry.get(base).connect() as conn:
+        resultado = await conn.stream(consulta)
+        async for fila in resultado.mappings():
+            fila = dict(fila)
+            for columna in sumas:
+                fila[columna] = fila[columna] or 0
+            previa = parcial.get(fila["codigo"])
+            if previa is None:
+                parcial[fila["codigo"]] = fila
+            else:
+                # Mismo código con otro nombre en la sucursal: se suma igual
+                for columna in sumas:
+                    previa[columna] += fila[columna]
+    return parcial
+
+
+async def consolidar(
+    bases: Iterable[str],
+    consulta: Select,
+    sumas: Sequence[str],
+    timeout: float = TIMEOUT_SUCURSAL,
+    max_concurrencia: int = MAX_CONCURRENCIA_SUCURSALES,
+) -> Dict[str, Any]:
+    """Ejecuta `consulta` en cada base y suma las columnas `sumas` por codigo.
+
+    La consulta debe devolver `codigo`, `descripcion` y las columnas de
+    `sumas`. El timeout cuenta desde que la base obtiene su turno en el
+    semáforo, no desde el inicio del reporte.
+    """
+    acumulado = Acumulado(sumas)
+    semaforo = asyncio.Semaphore(max_concurrencia)
+
+    async def _en(base: str) -> Dict[str, Any]:
+        async with semaforo:
+            inicio = time.perf_counter()
+            estado: Dict[str, Any] = {"base": base, "estado": "ok", "filas": 0}
+            try:
+                parcial = await asyncio.wait_for(
+                    _leer_base(base, consulta, sumas), timeout
+                )
+                acumulado.plegar(base, parcial)
+                estado["filas"] = len(parcial)
+            except asyncio.TimeoutError:
+                estado["estado"] = "timeout"
+            except Exception as e:
+                estado["estado"] = "error"
+                estado["error"] = str(e)
+            estado["ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            if estado["estado"] != "ok":
+                logger.warning(
+                    f"[CONSOLIDADO] {base}: {estado['estado']} "
+                    f"{estado.get('error', '')}"
+                )
+            return estado
+
+    bases = list(dict.fromkeys(bases))
+    sucursales = [await t for t in asyncio.as_completed([_en(b) for b in bases])]
+    sucursales.sort(key=lambda s: s["base"])
+    return {
+        "items": acumulado.ordenadas(),
+        "sucursales": sucursales,
+        "parcial": any(s["estado"] != "ok" for s in sucursales),
+    }
+
+
+def consulta_existencias() -> Select:
+    return (
+        select(
+            Productos.codigo.label("codigo"),
+            Productos.nombre.label("descripcion"),
+            func.sum(StockDependencia.stock).label("cantidad"),
+        )
+        .join(Productos, StockDependencia.id_producto == Productos.id_producto)
+        .group_by(Productos.codigo, Productos.nombre)
+    )
+
+
+def consulta_ventas(
+    fecha_inicio: Optional[date] = None, fecha_fin: Optional[date] = None
+) -> Select:
+    """Unidades e importe vendidos por producto (solo ventas completadas)."""
+    consulta = (
+        select(
+            Productos.codigo.label("codigo"),
+            Productos.nombre.label("descripcion"),
+            func.sum(DetalleVenta.cantidad).label("cantidad"),
+            func.sum(DetalleVenta.subtotal).label("importe"),
+        )
+        .join(Ventas, DetalleVenta.id_venta == Ventas.id_venta)
+        .join(Productos, DetalleVenta.id_producto == Productos.id_producto)
+        .where(Ventas.estado == EstadoVenta.COMPLETADA)
+        .group_by(Productos.codigo, Productos.nombre)
+    )
+    if fecha_inicio:
+        consulta = consulta.where(
+            Ventas.fecha >= datetime.combine(fecha_inicio, datetime.min.time())
+        )
+    if fecha_fin:
+        consulta = consulta.where(
+            Ventas.fecha <= datetime.combine(fecha_fin, datetime.max.time())
+        )
+    return consulta
+
+
+async def get_bases_consolidado() -> List[str]:
+    try:
+        sucursales = await ReplicacionService.listar_sucursales()
+    except Exception as e:
+        logger.error(f"[CONSOLIDADO] Sin lista de sucursales: {e}")
+        raise SucursalesNoDisponiblesError() from e
+    return [s["nombre_database"] for s in sucursales]
+
+
+async def get_existencias_consolidadas(
+    timeout: float = TIMEOUT_SUCURSAL,
+) -> Dict[str, Any]:
+    return await consolidar(
+        await get_bases_consolidado(), consulta_existencias(), ("cantidad",), timeout
+    )
+
+
+async def get_ventas_consolidadas(
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    timeout: float = TIMEOUT_SUCURSAL,
+) -> Dict[str, Any]:
+    resultado = await consolidar(
+        await get_bases_consolidado(),
+        consulta_ventas(fecha_inicio, fecha_fin),
+        ("cantidad", "importe"),
+        timeout,
+    )
+    resultado["total_importe"] = sum(
+        (Decimal(str(f["importe"])) for f in resultado["items"]), Decimal("0")
+    )
+    return resultado
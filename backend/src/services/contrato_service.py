@@ -1,10 +1,9 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from datetime import datetime, timezone
 from decimal import Decimal
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
-from sqlalchemy.orm import selectinload
-from src.repository.base import CRUDBase
+from src.repository.base import CRUDBase, get_by_ids
 from src.repository.contratos_repo import (
     contrato_repo,
     suplemento_repo,
@@ -25,10 +24,7 @@ from src.models import (
     Moneda,
     Movimiento,
     TipoMovimiento,
-    Anexo,
     Productos,
-    ItemAnexo,
-    Convenio,
 )
 from src.dto import (
     TipoContratoCreate,
@@ -139,55 +135,73 @@ class EstadoContratoService:
         return result is not None
 
 
+async def map_contratos_to_read(
+    db: AsyncSession, contratos: List[Contrato]
+) -> List[ContratoReadWithDetails]:
+    # Una consulta por tabla relacionada para todo el listado
+    estados = await get_by_ids(db, EstadoContrato, (c.id_estado for c in contratos))
+    tipos = await get_by_ids(
+        db, TipoContrato, (c.id_tipo_contrato for c in contratos)
+    )
+    monedas = await get_by_ids(db, Moneda, (c.id_moneda for c in contratos))
+    clientes = await get_by_ids(db, Cliente, (c.id_cliente for c in contratos))
+
+    result = []
+    for contrato in contratos:
+        estado = estados.get(contrato.id_estado)
+        tipo_contrato = tipos.get(contrato.id_tipo_contrato)
+        moneda = monedas.get(contrato.id_moneda)
+        cliente = clientes.get(contrato.id_cliente)
+        result.append(
+            ContratoReadWithDetails(
+                id_contrato=contrato.id_contrato,
+                id_cliente=contrato.id_cliente,
+                nombre=contrato.nombre,
+                proforma=contrato.proforma,
+                id_estado=contrato.id_estado,
+                fecha=contrato.fecha,
+                vigencia=contrato.vigencia,
+                id_tipo_contrato=contrato.id_tipo_contrato,
+                id_moneda=contrato.id_moneda,
+                monto=contrato.monto,
+                documento_final=contrato.documento_final,
+                codigo=contrato.codigo,
+                estado=EstadoContratoRead(
+                    id_estado_contrato=estado.id_estado_contrato,
+                    nombre=estado.nombre,
+                )
+                if estado
+                else None,
+                tipo_contrato=TipoContratoRead(
+                    id_tipo_contrato=tipo_contrato.id_tipo_contrato,
+                    nombre=tipo_contrato.nombre,
+                )
+                if tipo_contrato
+                else None,
+                moneda=MonedaRead(
+                    id_moneda=moneda.id_moneda,
+                    nombre=moneda.nombre,
+                    denominacion=moneda.denominacion,
+                    simbolo=moneda.simbolo,
+                )
+                if moneda
+                else None,
+                cliente=ClienteSimpleRead(
+                    id_cliente=cliente.id_cliente,
+                    codigo=cliente.codigo,
+                    nombre=cliente.nombre,
+                )
+                if cliente
+                else None,
+            )
+        )
+    return result
+
+
 async def map_contrato_to_read(
     db: AsyncSession, contrato: Contrato
 ) -> ContratoReadWithDetails:
-    estado = await db.get(EstadoContrato, contrato.id_estado)
-    tipo_contrato = await db.get(TipoContrato, contrato.id_tipo_contrato)
-    moneda = await db.get(Moneda, contrato.id_moneda)
-    cliente = await db.get(Cliente, contrato.id_cliente)
-
-    return ContratoReadWithDetails(
-        id_contrato=contrato.id_contrato,
-        id_cliente=contrato.id_cliente,
-        nombre=contrato.nombre,
-        proforma=contrato.proforma,
-        id_estado=contrato.id_estado,
-        fecha=contrato.fecha,
-        vigencia=contrato.vigencia,
-        id_tipo_contrato=contrato.id_tipo_contrato,
-        id_moneda=contrato.id_moneda,
-        monto=contrato.monto,
-        documento_final=contrato.documento_final,
-        codigo=contrato.codigo,
-        estado=EstadoContratoRead(
-            id_estado_contrato=estado.id_estado_contrato,
-            nombre=estado.nombre,
-        )
-        if estado
-        else None,
-        tipo_contrato=TipoContratoRead(
-            id_tipo_contrato=tipo_contrato.id_tipo_contrato,
-            nombre=tipo_contrato.nombre,
-        )
-        if tipo_contrato
-        else None,
-        moneda=MonedaRead(
-            id_moneda=moneda.id_moneda,
-            nombre=moneda.nombre,
-            denominacion=moneda.denominacion,
-            simbolo=moneda.simbolo,
-        )
-        if moneda
-        else None,
-        cliente=ClienteSimpleRead(
-            id_cliente=cliente.id_cliente,
-            codigo=cliente.codigo,
-            nombre=cliente.nombre,
-        )
-        if cliente
-        else None,
-    )
+    return (await map_contratos_to_read(db, [contrato]))[0]
 
 
 class ContratoService:
@@ -214,16 +228,14 @@ class ContratoService:
     async def get_all(
         db: AsyncSession,
         skip: int = 0,
-        limit: int = 10000,
+        limit: int = 100,
         id_cliente: Optional[int] = None,
+        despues_de: Optional[int] = None,
     ) -> List[ContratoReadWithDetails]:
         contratos = await contrato_repo.get_all_with_details(
-            db, skip, limit, id_cliente
+            db, skip, limit, id_cliente, despues_de
         )
-        result = []
-        for contrato in contratos:
-            result.append(await map_contrato_to_read(db, contrato))
-        return result
+        return await map_contratos_to_read(db, contratos)
 
     @staticmethod
     async def update(
@@ -243,119 +255,83 @@ class ContratoService:
         return True
 
     @staticmethod
-    async def get_items_disponibles(
+    async def stream_items_disponibles(
         db: AsyncSession, contrato_id: int
-    ) -> List[ItemAnexoDisponible]:
-        contrato = await db.get(Contrato, contrato_id)
-        if not contrato:
-            return []
+    ) -> AsyncIterator[ItemAnexoDisponible]:
+        """Items disponibles del contrato a medida que llegan de la BD.
+
+        La consulta se ejecuta al llamar (los errores salen aquí y no a mitad
+        de la respuesta); las filas se mapean al iterar el resultado.
+        """
+        result = await contrato_repo.stream_items_disponibles(db, contrato_id)
+
+        async def _items() -> AsyncIterator[ItemAnexoDisponible]:
+            async for fila in result:
+                yield ItemAnexoDisponible(
+                    id_item_anexo=fila.id_item_anexo,
+                    id_anexo=fila.id_anexo,
+                    nombre_anexo=fila.nombre_anexo,
+                    id_producto=fila.id_producto,
+                    entrada=fila.entrada,
+                    vendido=fila.vendido,
+                    precio_venta=fila.precio_venta,
+                    precio_compra=fila.precio_compra,
+                    id_moneda=fila.id_moneda,
+                    codigo=fila.codigo,
+                    producto=ProductoSimpleRead(
+                        id_producto=fila.id_producto,
+                        codigo=fila.producto_codigo,
+                        nombre=fila.producto_nombre,
+                        descripcion=fila.producto_descripcion,
+                        precio_venta=fila.producto_precio_venta,
+                        precio_minimo=fila.producto_precio_minimo,
+                        cantidad=0,
+                    ),
+                )
 
-        moneda_contrato = contrato.id_moneda
+        return _items()
 
-        stmt_convenios = select(Convenio).where(
-            Convenio.id_cliente == contrato.id_cliente
-        )
-        result = await db.exec(stmt_convenios)
-        convenio_ids = [c.id_convenio for c in result.all()]
-        if not convenio_ids:
-            return []
-
-        stmt_anexos = (
-            select(Anexo)
-            .where(Anexo.id_convenio.in_(convenio_ids))
-            .options(
-                selectinload(Anexo.items_anexo).selectinload(ItemAnexo.precios),
+    @staticmethod
+    async def get_items_disponibles(
+        db: AsyncSession, contrato_id: int
+    ) -> List[ItemAnexoDisponible]:
+        items = await ContratoService.stream_items_disponibles(db, contrato_id)
+        return [item async for item in items]
+
+
+async def map_suplementos_to_read(
+    db: AsyncSession, suplementos: List[Suplemento]
+) -> List[SuplementoReadWithDetails]:
+    estados = await get_by_ids(db, EstadoContrato, (s.id_estado for s in suplementos))
+
+    result = []
+    for suplemento in suplementos:
+        estado = estados.get(suplemento.id_estado)
+        result.append(
+            SuplementoReadWithDetails(
+                id_suplemento=suplemento.id_suplemento,
+                id_contrato=suplemento.id_contrato,
+                nombre=suplemento.nombre,
+                id_estado=suplemento.id_estado,
+                fecha=suplemento.fecha,
+                monto=suplemento.monto,
+                documento=suplemento.documento,
+                codigo=suplemento.codigo,
+                estado=EstadoContratoRead(
+                    id_estado_contrato=estado.id_estado_contrato,
+                    nombre=estado.nombre,
+                )
+                if estado
+                else None,
             )
         )
-        result = await db.exec(stmt_anexos)
-        anexos = result.all()
-
-        items_disponibles = []
-        for anexo in anexos:
-            for item in anexo.items_anexo:
-                producto = await db.get(Productos, item.id_producto)
-                if not producto:
-                    continue
-
-                if item.id_moneda == moneda_contrato:
-                    items_disponibles.append(
-                        ItemAnexoDisponible(
-                            id_item_anexo=item.id_item_anexo,
-                            id_anexo=item.id_anexo,
-                            nombre_anexo=anexo.nombre_anexo,
-                            id_producto=item.id_producto,
-                            entrada=item.entrada,
-                            vendido=item.vendido,
-                            precio_venta=item.precio_venta,
-                            precio_compra=item.precio_compra,
-                            id_moneda=item.id_moneda,
-                            codigo=item.codigo,
-                            producto=ProductoSimpleRead(
-                                id_producto=producto.id_producto,
-                                codigo=producto.codigo,
-                                nombre=producto.nombre,
-                                descripcion=producto.descripcion,
-                                precio_venta=producto.precio_venta,
-                                precio_minimo=producto.precio_minimo,
-                                cantidad=0,
-                            ),
-                        )
-                    )
-                elif item.precios:
-                    precio_alt = next(
-                        (p for p in item.precios if p.id_moneda == moneda_contrato),
-                        None,
-                    )
-                    if precio_alt:
-                        items_disponibles.append(
-                            ItemAnexoDisponible(
-                                id_item_anexo=item.id_item_anexo,
-                                id_anexo=item.id_anexo,
-                                nombre_anexo=anexo.nombre_anexo,
-                                id_producto=item.id_producto,
-                                entrada=item.entrada,
-                                vendido=item.vendido,
-                                precio_venta=precio_alt.precio_venta,
-                                precio_compra=precio_alt.precio_compra
-                                or item.precio_compra,
-                                id_moneda=moneda_contrato,
-                                codigo=item.codigo,
-                                producto=ProductoSimpleRead(
-                                    id_producto=producto.id_producto,
-                                    codigo=producto.codigo,
-                                    nombre=producto.nombre,
-                                    descripcion=producto.descripcion,
-                                    precio_venta=producto.precio_venta,
-                                    precio_minimo=producto.precio_minimo,
-                                    cantidad=0,
-                                ),
-                            )
-                        )
-
-        return items_disponibles
+    return result
 
 
 async def map_suplemento_to_read(
     db: AsyncSession, suplemento: Suplemento
 ) -> SuplementoReadWithDetails:
-    estado = await db.get(EstadoContrato, suplemento.id_estado)
-
-    return SuplementoReadWithDetails(
-        id_suplemento=suplemento.id_suplemento,
-        id_contrato=suplemento.id_contrato,
-        nombre=suplemento.nombre,
-        id_estado=suplemento.id_estado,
-        fecha=suplemento.fecha,
-        monto=suplemento.monto,
-        documento=suplemento.documento,
-        codigo=suplemento.codigo,
-        estado=EstadoContratoRead(
-            id_estado_contrato=estado.id_estado_contrato,
-            nombre=estado.nombre,
-        )
-        if estado
-        else None,
-    )
+    return (await map_suplementos_to_read(db, [suplemento]))[0]
 
 
 class SuplementoService:
@@ -383,20 +359,19 @@ class SuplementoService:
         db: AsyncSession, id_contrato: int
     ) -> List[SuplementoReadWithDetails]:
         suplementos = await suplemento_repo.get_all_by_contrato(db, id_contrato)
-        result = []
-        for suplemento in suplementos:
-            result.append(await map_suplemento_to_read(db, suplemento))
-        return result
+        return await map_suplementos_to_read(db, suplementos)
 
     @staticmethod
     async def get_all(
-        db: AsyncSession, skip: int = 0, limit: int = 100
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
     ) -> List[SuplementoReadWithDetails]:
-        suplementos = await suplemento_repo.get_all(db)
-        result = []
-        for suplemento in suplementos:
-            result.append(await map_suplemento_to_read(db, suplemento))
-        return result
+        suplementos = await suplemento_repo.get_all_with_details(
+            db, skip, limit, despues_de
+        )
+        return await map_suplementos_to_read(db, suplementos)
 
     @staticmethod
     async def update(
@@ -416,15 +391,19 @@ class SuplementoService:
         return True
 
 
-async def map_factura_to_read(
-    db: AsyncSession, factura: Factura
-) -> FacturaReadWithDetails:
-    # Mapear items con los datos del producto
-    items_con_producto = []
-    if factura.items_factura:
-        for item in factura.items_factura:
-            producto = await db.get(Productos, item.id_producto) if item.id_producto else None
-            item_read = ItemFacturaRead(
+async def map_facturas_to_read(
+    db: AsyncSession, facturas: List[Factura]
+) -> List[FacturaReadWithDetails]:
+    # Items de todas las facturas y sus productos en dos consultas
+    items = await item_factura_repo.get_by_facturas(
+        db, [f.id_factura for f in facturas]
+    )
+    productos = await get_by_ids(db, Productos, (i.id_producto for i in items))
+    items_por_factura = {}
+    for item in items:
+        producto = productos.get(item.id_producto)
+        items_por_factura.setdefault(item.id_factura, []).append(
+            ItemFacturaRead(
                 id_item_factura=item.id_item_factura,
                 id_factura=item.id_factura,
                 id_producto=item.id_producto,
@@ -444,19 +423,28 @@ async def map_factura_to_read(
                 if producto
                 else None,
             )
-            items_con_producto.append(item_read)
-
-    return FacturaReadWithDetails(
-        id_factura=factura.id_factura,
-        id_contrato=factura.id_contrato,
-        codigo_factura=factura.codigo_factura,
-        descripcion=factura.descripcion,
-        observaciones=factura.observaciones,
-        fecha=factura.fecha,
-        monto=factura.monto,
-        pago_actual=factura.pago_actual,
-        items=items_con_producto,
-    )
+        )
+
+    return [
+        FacturaReadWithDetails(
+            id_factura=factura.id_factura,
+            id_contrato=factura.id_contrato,
+            codigo_factura=factura.codigo_factura,
+            descripcion=factura.descripcion,
+            observaciones=factura.observaciones,
+            fecha=factura.fecha,
+            monto=factura.monto,
+            pago_actual=factura.pago_actual,
+            items=items_por_factura.get(factura.id_factura, []),
+        )
+        for factura in facturas
+    ]
+
+
+async def map_factura_to_read(
+    db: AsyncSession, factura: Factura
+) -> FacturaReadWithDetails:
+    return (await map_facturas_to_read(db, [factura]))[0]
 
 
 class FacturaService:
@@ -560,23 +548,22 @@ class FacturaService:
 
     @staticmethod
     async def get_all(
-        db: AsyncSession, skip: int = 0, limit: int = 100
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
     ) -> List[FacturaReadWithDetails]:
-        facturas = await factura_repo.get_all_with_details(db, skip, limit)
-        result = []
-        for factura in facturas:
-            result.append(await map_factura_to_read(db, factura))
-        return result
+        facturas = await factura_repo.get_all_with_details(
+            db, skip, limit, despues_de
+        )
+        return await map_facturas_to_read(db, facturas)
 
     @staticmethod
     async def get_by_contrato(
         db: AsyncSession, id_contrato: int
     ) -> List[FacturaReadWithDetails]:
         facturas = await factura_repo.get_by_contrato(db, id_contrato)
-        result = []
-        for factura in facturas:
-            result.append(await map_factura_to_read(db, factura))
-        return result
+        return await map_facturas_to_read(db, facturas)
 
     @staticmethod
     async def update(
@@ -630,16 +617,20 @@ class FacturaService:
         return True
 
 
-async def map_venta_efectivo_to_read(
-    db: AsyncSession, venta: VentaEfectivo
-) -> VentaEfectivoReadWithDetails:
+async def map_ventas_efectivo_to_read(
+    db: AsyncSession, ventas: List[VentaEfectivo]
+) -> List[VentaEfectivoReadWithDetails]:
     from src.models import Dependencia
 
-    dependencia = await db.get(Dependencia, venta.id_dependencia)
-
-    items_db = await item_venta_efectivo_repo.get_by_venta(db, venta.id_venta_efectivo)
-    items_read = (
-        [
+    dependencias = await get_by_ids(
+        db, Dependencia, (v.id_dependencia for v in ventas)
+    )
+    items_por_venta = {}
+    items_db = await item_venta_efectivo_repo.get_by_ventas(
+        db, [v.id_venta_efectivo for v in ventas]
+    )
+    for item in items_db:
+        items_por_venta.setdefault(item.id_venta_efectivo, []).append(
             ItemVentaEfectivoRead(
                 id_item_venta_efectivo=item.id_item_venta_efectivo,
                 id_venta_efectivo=item.id_venta_efectivo,
@@ -654,30 +645,40 @@ async def map_venta_efectivo_to_read(
                     codigo=item.producto.codigo,
                     nombre=item.producto.nombre,
                     precio_venta=item.producto.precio_venta,
-                ) if item.producto else None,
+                )
+                if item.producto
+                else None,
             )
-            for item in items_db
-        ]
-        if items_db
-        else []
-    )
+        )
 
-    return VentaEfectivoReadWithDetails(
-        id_venta_efectivo=venta.id_venta_efectivo,
-        slip=venta.slip,
-        fecha=venta.fecha,
-        id_dependencia=venta.id_dependencia,
-        cajero=venta.cajero,
-        monto=venta.monto,
-        codigo=venta.codigo,
-        dependencia=DependenciaSimpleRead(
-            id_dependencia=dependencia.id_dependencia,
-            nombre=dependencia.nombre,
+    result = []
+    for venta in ventas:
+        dependencia = dependencias.get(venta.id_dependencia)
+        result.append(
+            VentaEfectivoReadWithDetails(
+                id_venta_efectivo=venta.id_venta_efectivo,
+                slip=venta.slip,
+                fecha=venta.fecha,
+                id_dependencia=venta.id_dependencia,
+                cajero=venta.cajero,
+                monto=venta.monto,
+                codigo=venta.codigo,
+                dependencia=DependenciaSimpleRead(
+                    id_dependencia=dependencia.id_dependencia,
+                    nombre=dependencia.nombre,
+                )
+                if dependencia
+                else None,
+                items=items_por_venta.get(venta.id_venta_efectivo, []),
+            )
         )
-        if dependencia
-        else None,
-        items=items_read,
-    )
+    return result
+
+
+async def map_venta_efectivo_to_read(
+    db: AsyncSession, venta: VentaEfectivo
+) -> VentaEfectivoReadWithDetails:
+    return (await map_ventas_efectivo_to_read(db, [venta]))[0]
 
 
 class VentaEfectivoService:
@@ -777,13 +778,15 @@ class VentaEfectivoService:
 
     @staticmethod
     async def get_all(
-        db: AsyncSession, skip: int = 0, limit: int = 100
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        despues_de: Optional[int] = None,
     ) -> List[VentaEfectivoReadWithDetails]:
-        ventas = await venta_efectivo_repo.get_all_with_details(db, skip, limit)
-        result = []
-        for venta in ventas:
-            result.append(await map_venta_efectivo_to_read(db, venta))
-        return result
+        ventas = await venta_efectivo_repo.get_all_with_details(
+            db, skip, limit, despues_de
+        )
+        return await map_ventas_efectivo_to_read(db, ventas)
 
     @staticmethod
     async def update(
@@ -4,8 +4,8 @@ from typing import List
 from sqlmodel import select, func
 from sqlalchemy.orm import selectinload
 from sqlmodel.ext.asyncio.session import AsyncSession
-from src.repository import productos_repo, categorias_repo, moneda_repo
 from src.repository.ventas_clientes_repo import ventas_repo, ventas_cliente_repo
+from src.repository.stock_repo import stock_repo
 from src.dto import (
     DashboardStats,
     ProductoStats,
@@ -13,6 +13,7 @@ from src.dto import (
     MovimientosTrends,
     VentaRead,
     ClienteRead,
+    ProductoSimpleRead,
 )
 from src.models import (
     Ventas,
@@ -22,23 +23,15 @@ from src.models import (
     TipoMovimiento,
     DetalleVenta,
     Cliente,
+    Categorias,
+    Moneda,
+    StockDependencia,
 )
 
 
 async def calcular_cantidad_producto(db: AsyncSession, producto_id: int) -> int:
     """Calcular la cantidad disponible de un producto basado en movimientos confirmados."""
-    statement = (
-        select(func.sum(Movimiento.cantidad * TipoMovimiento.factor))
-        .join(
-            TipoMovimiento,
-            Movimiento.id_tipo_movimiento == TipoMovimiento.id_tipo_movimiento,
-        )
-        .where(Movimiento.id_producto == producto_id)
-        .where(Movimiento.estado == "confirmado")
-    )
-    result = await db.exec(statement)
-    cantidad = result.first()
-    return int(cantidad) if cantidad else 0
+    return await stock_repo.get_stock(db, producto_id)
 
 
 class DashboardService:
@@ -54,32 +47,15 @@ class DashboardService:
         inicio_ayer = datetime.combine(ayer, datetime.min.time())
         fin_ayer = datetime.combine(ayer, datetime.max.time())
 
-        # Conteos principales
-        productos = await productos_repo.get_all(db)
-        total_productos = len(productos)
-
-        ventas = await ventas_repo.get_all(db)
-        total_ventas = len(ventas)
-
-        clientes = await ventas_cliente_repo.get_all(db)
-        total_clientes = len(clientes)
-
-        categorias = await categorias_repo.get_all(db)
-        total_categorias = len(categorias)
+        # Conteos principales (una sola sentencia con subconsultas escalares)
+        conteos = await DashboardService._get_conteos(db)
 
-        monedas = await moneda_repo.get_all(db)
-        total_monedas = len(monedas)
-
-        # Ventas de hoy (prioridad según usuario)
-        ventas_hoy_list = await ventas_repo.get_by_fecha_range(db, inicio_hoy, fin_hoy)
-        ventas_hoy = Decimal(str(sum(v.total for v in ventas_hoy_list)))
-        ventas_hoy_cantidad = len(ventas_hoy_list)
-
-        # Ventas de ayer para comparativa
-        ventas_ayer_list = await ventas_repo.get_by_fecha_range(
-            db, inicio_ayer, fin_ayer
+        # Resumen de ventas: estados, hoy/ayer y ticket promedio en un solo agregado
+        resumen_ventas = await DashboardService._get_resumen_ventas(
+            db, inicio_hoy, fin_hoy, inicio_ayer, fin_ayer
         )
-        ventas_ayer = Decimal(str(sum(v.total for v in ventas_ayer_list)))
+        ventas_hoy = resumen_ventas["ventas_hoy"]
+        ventas_ayer = resumen_ventas["ventas_ayer"]
 
         # Cálculo de crecimiento porcentaje
         if ventas_ayer > 0:
@@ -89,61 +65,11 @@ class DashboardService:
         else:
             ventas_crecimiento_porcentaje = 100.0 if ventas_hoy > 0 else 0.0
 
-        # Estados de ventas
-        ventas_pendientes = len(
-            [v for v in ventas if v.estado == EstadoVenta.PENDIENTE]
-        )
-        ventas_completadas = len(
-            [v for v in ventas if v.estado == EstadoVenta.COMPLETADA]
+        # Inventario - stock por producto calculado en SQL (GROUP BY id_producto)
+        inventario = await DashboardService._get_resumen_inventario(db)
+        productos_stock_bajo_dto = await DashboardService._get_productos_stock_bajo(
+            db
         )
-        ventas_anuladas = len([v for v in ventas if v.estado == EstadoVenta.ANULADA])
-
-        # Ticket promedio
-        if ventas:
-            ticket_promedio = Decimal(str(sum(v.total for v in ventas))) / Decimal(
-                len(ventas)
-            )
-        else:
-            ticket_promedio = Decimal("0")
-
-        # Inventario - Calcular cantidades basadas en movimientos
-        # Obtener productos con cantidades calculadas
-        from src.dto import ProductoSimpleRead
-
-        productos_con_cantidad = []
-        productos_agotados = 0
-        valor_inventario_compra = Decimal("0")
-        valor_inventario_venta = Decimal("0")
-
-        for p in productos:
-            cantidad = await calcular_cantidad_producto(db, p.id_producto)
-
-            # Crear DTO simple sin relaciones lazy
-            producto_dto = ProductoSimpleRead(
-                id_producto=p.id_producto,
-                codigo=p.codigo,
-                nombre=p.nombre,
-                descripcion=p.descripcion,
-                precio_venta=p.precio_venta,
-                precio_minimo=p.precio_minimo,
-                cantidad=cantidad,
-            )
-            productos_con_cantidad.append(producto_dto)
-
-            if cantidad == 0:
-                productos_agotados += 1
-
-            valor_inventario_compra += Decimal(str(p.precio_compra or 0)) * Decimal(
-                cantidad
-            )
-            valor_inventario_venta += Decimal(str(p.precio_venta or 0)) * Decimal(
-                cantidad
-            )
-
-        # Productos con stock bajo (cantidad <= 10)
-        productos_stock_bajo_dto = [
-            p for p in productos_con_cantidad if p.cantidad <= 10
-        ][:5]
 
         # Últimas ventas (con relaciones)
         ultimas_ventas_db = await ventas_repo.get_multi(
@@ -180,28 +106,184 @@ class DashboardService:
         top_productos = await DashboardService._get_top_productos(db)
 
         return DashboardStats(
-            total_productos=total_productos,
-            total_ventas=total_ventas,
-            total_clientes=total_clientes,
-            total_categorias=total_categorias,
-            total_monedas=total_monedas,
+            total_productos=conteos["total_productos"],
+            total_ventas=resumen_ventas["total_ventas"],
+            total_clientes=conteos["total_clientes"],
+            total_categorias=conteos["total_categorias"],
+            total_monedas=conteos["total_monedas"],
             ventas_hoy=ventas_hoy,
-            ventas_hoy_cantidad=ventas_hoy_cantidad,
+            ventas_hoy_cantidad=resumen_ventas["ventas_hoy_cantidad"],
             ventas_ayer=ventas_ayer,
             ventas_crecimiento_porcentaje=ventas_crecimiento_porcentaje,
-            ventas_pendientes=ventas_pendientes,
-            ventas_completadas=ventas_completadas,
-            ventas_anuladas=ventas_anuladas,
-            ticket_promedio=ticket_promedio,
+            ventas_pendientes=resumen_ventas["ventas_pendientes"],
+            ventas_completadas=resumen_ventas["ventas_completadas"],
+            ventas_anuladas=resumen_ventas["ventas_anuladas"],
+            ticket_promedio=resumen_ventas["ticket_promedio"],
             productos_stock_bajo=productos_stock_bajo_dto,
-            productos_agotados=productos_agotados,
-            valor_inventario_compra=valor_inventario_compra,
-            valor_inventario_venta=valor_inventario_venta,
+            productos_agotados=inventario["productos_agotados"],
+            valor_inventario_compra=inventario["valor_inventario_compra"],
+            valor_inventario_venta=inventario["valor_inventario_venta"],
             ultimas_ventas=ultimas_ventas,
             clientes_recientes=clientes_recientes,
             top_productos=top_productos,
         )
 
+    @staticmethod
+    def _stock_por_producto_subquery():
+        """Subconsulta con el stock de cada producto (movimientos confirmados).
+
+        Equivale a ``calcular_cantidad_producto`` para todos los productos a la
+        vez: suma el saldo materializado de cada dependencia en una sola
+        agregación ``GROUP BY id_producto``.
+        """
+        return (
+            select(
+                StockDependencia.id_producto.label("id_producto"),
+                func.sum(StockDependencia.stock).label("stock"),
+            )
+            .group_by(StockDependencia.id_producto)
+            .subquery("stock_producto")
+        )
+
+    @staticmethod
+    async def _get_conteos(db: AsyncSession) -> dict:
+        """Conteos de productos, clientes, categorías y monedas en una sentencia."""
+
+        def _contar(model):
+            return select(func.count()).select_from(model).scalar_subquery()
+
+        statement = select(
+            _contar(Productos).label("total_productos"),
+            _contar(Cliente).label("total_clientes"),
+            _contar(Categorias).label("total_categorias"),
+            _contar(Moneda).label("total_monedas"),
+        )
+        row = (await db.exec(statement)).one()
+        return {
+            "total_productos": row.total_productos or 0,
+            "total_clientes": row.total_clientes or 0,
+            "total_categorias": row.total_categorias or 0,
+            "total_monedas": row.total_monedas or 0,
+        }
+
+    @staticmethod
+    async def _get_resumen_ventas(
+        db: AsyncSession,
+        inicio_hoy: datetime,
+        fin_hoy: datetime,
+        inicio_ayer: datetime,
+        fin_ayer: datetime,
+    ) -> dict:
+        """Totales de ventas por estado y por día (hoy/ayer) en un solo agregado."""
+        es_hoy = Ventas.fecha.between(inicio_hoy, fin_hoy)
+        es_ayer = Ventas.fecha.between(inicio_ayer, fin_ayer)
+
+        statement = select(
+            func.count(Ventas.id_venta).label("total_ventas"),
+            func.coalesce(func.sum(Ventas.total), 0).label("monto_total"),
+            func.count(Ventas.id_venta).filter(es_hoy).label("ventas_hoy_cantidad"),
+            func.coalesce(func.sum(Ventas.total).filter(es_hoy), 0).label(
+                "ventas_hoy"
+            ),
+            func.coalesce(func.sum(Ventas.total).filter(es_ayer), 0).label(
+                "ventas_ayer"
+            ),
+            func.count(Ventas.id_venta)
+            .filter(Ventas.estado == EstadoVenta.PENDIENTE)
+            .label("ventas_pendientes"),
+            func.count(Ventas.id_venta)
+            .filter(Ventas.estado == EstadoVenta.COMPLETADA)
+            .label("ventas_completadas"),
+            func.count(Ventas.id_venta)
+            .filter(Ventas.estado == EstadoVenta.ANULADA)
+            .label("ventas_anuladas"),
+        )
+        row = (await db.exec(statement)).one()
+
+        total_ventas = row.total_ventas or 0
+        if total_ventas:
+            ticket_promedio = Decimal(str(row.monto_total)) / Decimal(total_ventas)
+        else:
+            ticket_promedio = Decimal("0")
+
+        return {
+            "total_ventas": total_ventas,
+            "ventas_hoy": Decimal(str(row.ventas_hoy)),
+            "ventas_hoy_cantidad": row.ventas_hoy_cantidad or 0,
+            "ventas_ayer": Decimal(str(row.ventas_ayer)),
+            "ventas_pendientes": row.ventas_pendientes or 0,
+            "ventas_completadas": row.ventas_completadas or 0,
+            "ventas_anuladas": row.ventas_anuladas or 0,
+            "ticket_promedio": ticket_promedio,
+        }
+
+    @staticmethod
+    async def _get_resumen_inventario(db: AsyncSession) -> dict:
+        """Productos agotados y valoración del inventario en un solo agregado."""
+        stock_sq = DashboardService._stock_por_producto_subquery()
+        cantidad = func.coalesce(stock_sq.c.stock, 0)
+
+        statement = select(
+            func.count(Productos.id_producto)
+            .filter(cantidad == 0)
+            .label("productos_agotados"),
+            func.coalesce(
+                func.sum(func.coalesce(Productos.precio_compra, 0) * cantidad), 0
+            ).label("valor_inventario_compra"),
+            func.coalesce(
+                func.sum(func.coalesce(Productos.precio_venta, 0) * cantidad), 0
+            ).label("valor_inventario_venta"),
+        ).select_from(
+            Productos.__table__.outerjoin(
+                stock_sq, stock_sq.c.id_producto == Productos.id_producto
+            )
+        )
+        row = (await db.exec(statement)).one()
+        return {
+            "productos_agotados": row.productos_agotados or 0,
+            "valor_inventario_compra": Decimal(str(row.valor_inventario_compra)),
+            "valor_inventario_venta": Decimal(str(row.valor_inventario_venta)),
+        }
+
+    @staticmethod
+    async def _get_productos_stock_bajo(
+        db: AsyncSession, umbral: int = 10, limit: int = 5
+    ) -> List[ProductoSimpleRead]:
+        """Productos con stock menor o igual al umbral (resuelto en SQL)."""
+        stock_sq = DashboardService._stock_por_producto_subquery()
+        cantidad = func.coalesce(stock_sq.c.stock, 0)
+
+        statement = (
+            select(
+                Productos.id_producto,
+                Productos.codigo,
+                Productos.nombre,
+                Productos.descripcion,
+                Productos.precio_venta,
+                Productos.precio_minimo,
+                cantidad.label("cantidad"),
+            )
+            .outerjoin(stock_sq, stock_sq.c.id_producto == Productos.id_producto)
+            .where(cantidad <= umbral)
+            .order_by(Productos.id_producto)
+            .limit(limit)
+        )
+        rows = (await db.exec(statement)).all()
+
+        # Crear DTO simple sin relaciones lazy
+        return [
+            ProductoSimpleRead(
+                id_producto=r.id_producto,
+                codigo=r.codigo,
+                nombre=r.nombre,
+                descripcion=r.descripcion,
+                precio_venta=r.precio_venta,
+                precio_minimo=r.precio_minimo,
+                cantidad=int(r.cantidad),
+            )
+            for r in rows
+        ]
+
     @staticmethod
     async def _get_top_productos(
         db: AsyncSession, limit: int = 5
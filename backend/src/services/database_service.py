@@ -1,10 +1,66 @@
 import os
-from typing import List
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence
 import psycopg2
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Tablas de referencia que se copian de la BD central a cada sucursal:
+# (tabla, clave primaria, columnas), padres antes que hijas.
+TABLAS_CENTRALES = (
+    ("moneda", "id_moneda", ("id_moneda", "nombre", "denominacion", "simbolo")),
+    (
+        "tipo_dependencia",
+        "id_tipo_dependencia",
+        ("id_tipo_dependencia", "nombre", "descripcion"),
+    ),
+    ("provincia", "id_provincia", ("id_provincia", "nombre")),
+    ("municipio", "id_municipio", ("id_municipio", "id_provincia", "nombre")),
+    (
+        "dependencia",
+        "id_dependencia",
+        (
+            "id_dependencia",
+            "id_tipo_dependencia",
+            "codigo_padre",
+            "nombre",
+            "denominacion",
+            "nit",
+            "reeup",
+            "direccion",
+            "telefono",
+            "email",
+            "web",
+            "id_provincia",
+            "id_municipio",
+            "base_datos",
+            "host",
+            "puerto",
+            "descripcion",
+        ),
+    ),
+    (
+        "cuenta_dependencias",
+        "id_cuenta",
+        (
+            "id_cuenta",
+            "id_dependencia",
+            "id_moneda",
+            "tipo_cuenta",
+            "titular",
+            "banco",
+            "sucursal",
+            "numero_cuenta",
+            "direccion",
+        ),
+    ),
+)
+
+# Hasta este tamaño el volcado de COPY se queda en memoria; luego va a disco
+COPY_BUFFER_BYTES = 8 * 1024 * 1024
+
 
 class DatabaseService:
     @staticmethod
@@ -226,9 +282,11 @@ class DatabaseService:
         logger = logging.getLogger(__name__)
 
         tablas_necesarias = {
+            # Particionada por mes; sin las funciones de particiones todo cae
+            # en log_default hasta que la migración add_log_particiones las cree
             "log": """
                 CREATE TABLE IF NOT EXISTS log (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
                     nivel VARCHAR(20) NOT NULL,
                     tipo VARCHAR(20) NOT NULL,
@@ -240,7 +298,22 @@ class DatabaseService:
                     method VARCHAR(10),
                     status_code INTEGER,
                     usuario_nombre VARCHAR(100),
-                    navegador VARCHAR(100)
+                    navegador VARCHAR(100),
+                    PRIMARY KEY (id, timestamp)
+                ) PARTITION BY RANGE (timestamp);
+                CREATE TABLE IF NOT EXISTS log_default PARTITION OF log DEFAULT;
+                CREATE INDEX IF NOT EXISTS ix_log_timestamp ON log(timestamp);
+                CREATE INDEX IF NOT EXISTS ix_log_nivel_timestamp
+                    ON log(nivel, timestamp);
+            """,
+            # El escritor de logs la actualiza en el mismo INSERT que `log`
+            "log_resumen_hora": """
+                CREATE TABLE IF NOT EXISTS log_resumen_hora (
+                    hora TIMESTAMP NOT NULL,
+                    nivel VARCHAR(20) NOT NULL,
+                    tipo VARCHAR(20) NOT NULL,
+                    cantidad BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (hora, nivel, tipo)
                 )
             """,
         }
@@ -293,21 +366,8 @@ class DatabaseService:
         return tablas_creadas
 
     @staticmethod
-    def replicar_datos_desde_central(base_datos: str) -> None:
-        print(f"[DB SERVICE] Replicating data from central to {base_datos}", flush=True)
-
-        central_conn = psycopg2.connect(
-            host=os.getenv("ADMIN_DB_HOST", "localhost"),
-            port=int(os.getenv("ADMIN_DB_PORT", 5432)),
-            user=os.getenv("ADMIN_DB_USER", "postgres"),
-            password=os.getenv("ADMIN_DB_PASSWORD"),
-            database="caguayosa",
-            client_encoding="utf8",
-        )
-        central_conn.autocommit = True
-        central_cur = central_conn.cursor()
-
-        local_conn = psycopg2.connect(
+    def _conectar(base_datos: str):
+        return psycopg2.connect(
             host=os.getenv("ADMIN_DB_HOST", "localhost"),
             port=int(os.getenv("ADMIN_DB_PORT", 5432)),
             user=os.getenv("ADMIN_DB_USER", "postgres"),
@@ -315,113 +375,121 @@ class DatabaseService:
             database=base_datos,
             client_encoding="utf8",
         )
-        local_conn.autocommit = True
-        local_cur = local_conn.cursor()
-
-        try:
-            # 1. Fetch ALL data from central first
-            central_cur.execute(
-                "SELECT id_moneda, nombre, denominacion, simbolo FROM moneda ORDER BY id_moneda"
-            )
-            monedas = central_cur.fetchall()
-
-            central_cur.execute(
-                "SELECT id_tipo_dependencia, nombre, descripcion FROM tipo_dependencia ORDER BY id_tipo_dependencia"
-            )
-            tipos = central_cur.fetchall()
-
-            central_cur.execute(
-                "SELECT id_provincia, nombre FROM provincia ORDER BY id_provincia"
-            )
-            provincias = central_cur.fetchall()
-
-            central_cur.execute(
-                "SELECT id_municipio, id_provincia, nombre FROM municipio ORDER BY id_municipio"
-            )
-            municipios = central_cur.fetchall()
 
-            central_cur.execute("""
-                SELECT id_dependencia, id_tipo_dependencia, codigo_padre, nombre, direccion, telefono, 
-                       email, web, id_provincia, id_municipio, descripcion, base_datos
-                FROM dependencia 
-                ORDER BY id_dependencia
-            """)
-            deps = central_cur.fetchall()
+    @staticmethod
+    def _copiar(central_cur, local_cur, consulta: str, destino: str) -> int:
+        """COPY TO desde la central y COPY FROM en la local (vía buffer que
+        pasa a disco si la tabla es grande). Devuelve las filas copiadas."""
+        with tempfile.SpooledTemporaryFile(max_size=COPY_BUFFER_BYTES) as buffer:
+            central_cur.copy_expert(f"COPY ({consulta}) TO STDOUT", buffer)
+            buffer.seek(0)
+            local_cur.copy_expert(f"COPY {destino} FROM STDIN", buffer)
+        return local_cur.rowcount
 
-            central_cur.execute("""
-                SELECT id_cuenta, id_dependencia, id_moneda, titular, banco, sucursal, numero_cuenta, direccion
-                FROM cuenta_dependencias
-                ORDER BY id_cuenta, id_dependencia
-            """)
-            cuentas = central_cur.fetchall()
-
-            # 2. DELETE in FK-safe order (children before parents)
-            local_cur.execute("DELETE FROM dependencia")
-            local_cur.execute("DELETE FROM municipio")
-            local_cur.execute("DELETE FROM provincia")
-            local_cur.execute("DELETE FROM cuenta_dependencias")
-            local_cur.execute("DELETE FROM moneda")
-            local_cur.execute("DELETE FROM tipo_dependencia")
-
-            # 3. INSERT in FK-safe order (parents before children)
-            for m in monedas:
-                local_cur.execute(
-                    "INSERT INTO moneda (id_moneda, nombre, denominacion, simbolo) VALUES (%s, %s, %s, %s)",
-                    m,
-                )
-            print(f"[DB SERVICE] Replicated {len(monedas)} monedas", flush=True)
+    @staticmethod
+    def _huellas(cur, tabla: str, pk: str, columnas: Sequence[str]) -> Dict[Any, str]:
+        cur.execute(f"SELECT {pk}, md5(ROW({', '.join(columnas)})::text) FROM {tabla}")
+        return dict(cur.fetchall())
 
-            for t in tipos:
-                local_cur.execute(
-                    "INSERT INTO tipo_dependencia (id_tipo_dependencia, nombre, descripcion) VALUES (%s, %s, %s)",
-                    t,
-                )
-            print(f"[DB SERVICE] Replicated {len(tipos)} tipo_dependencia", flush=True)
+    @staticmethod
+    def replicar_datos_desde_central(
+        base_datos: str, incremental: bool = False
+    ) -> Dict[str, Any]:
+        """Copia las tablas de referencia de la BD central a `base_datos`.
+
+        Completa: vacía las tablas locales y las recarga con COPY; solo para
+        una BD recién creada (los ON DELETE CASCADE / SET NULL de una BD en
+        uso borrarían productos y vínculos que el COPY no repone). Incremental:
+        compara un md5 por fila en ambos lados y solo envía las filas nuevas o
+        modificadas (upsert desde una tabla temporal) y borra las que ya no
+        existen en la central. En ambos modos todo ocurre en una transacción
+        de la BD local. Devuelve filas y milisegundos por tabla.
+        """
+        modo = "incremental" if incremental else "completa"
+        print(
+            f"[DB SERVICE] Replicating data from central to {base_datos} ({modo})",
+            flush=True,
+        )
+        inicio = time.perf_counter()
+        tablas: Dict[str, Dict[str, Any]] = {}
 
-            for p in provincias:
-                local_cur.execute(
-                    "INSERT INTO provincia (id_provincia, nombre) VALUES (%s, %s)", p
-                )
-            print(f"[DB SERVICE] Replicated {len(provincias)} provincias", flush=True)
+        central_conn = DatabaseService._conectar("caguayosa")
+        # Instantánea consistente de todas las tablas de la central
+        central_conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+        local_conn = DatabaseService._conectar(base_datos)
+        central_cur = central_conn.cursor()
+        local_cur = local_conn.cursor()
 
-            for m in municipios:
-                local_cur.execute(
-                    "INSERT INTO municipio (id_municipio, id_provincia, nombre) VALUES (%s, %s, %s)",
-                    m,
-                )
-            print(f"[DB SERVICE] Replicated {len(municipios)} municipios", flush=True)
-
-            for d in deps:
-                local_cur.execute(
-                    """
-                    INSERT INTO dependencia (id_dependencia, id_tipo_dependencia, codigo_padre, nombre, 
-                                          direccion, telefono, email, web, id_provincia, id_municipio, descripcion, base_datos)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                    d,
-                )
-            print(f"[DB SERVICE] Replicated {len(deps)} dependencias", flush=True)
-
-            for c in cuentas:
-                local_cur.execute(
-                    """
-                    INSERT INTO cuenta_dependencias (id_cuenta, id_dependencia, id_moneda, titular, banco, 
-                                                  sucursal, numero_cuenta, direccion)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                    c,
-                )
-            print(
-                f"[DB SERVICE] Replicated {len(cuentas)} cuenta_dependencias",
-                flush=True,
-            )
+        try:
+            if not incremental:
+                # DELETE hijas antes que padres; COPY padres antes que hijas
+                for tabla, _, _ in reversed(TABLAS_CENTRALES):
+                    local_cur.execute(f"DELETE FROM {tabla}")
+                for tabla, pk, columnas in TABLAS_CENTRALES:
+                    t0 = time.perf_counter()
+                    lista = ", ".join(columnas)
+                    filas = DatabaseService._copiar(
+                        central_cur,
+                        local_cur,
+                        f"SELECT {lista} FROM {tabla} ORDER BY {pk}",
+                        f"{tabla} ({lista})",
+                    )
+                    tablas[tabla] = {
+                        "filas": filas,
+                        "borradas": 0,
+                        "ms": round((time.perf_counter() - t0) * 1000, 1),
+                    }
+            else:
+                borrar: Dict[str, List[Any]] = {}
+                for tabla, pk, columnas in TABLAS_CENTRALES:
+                    t0 = time.perf_counter()
+                    origen = DatabaseService._huellas(central_cur, tabla, pk, columnas)
+                    destino = DatabaseService._huellas(local_cur, tabla, pk, columnas)
+                    cambiadas = [k for k, h in origen.items() if destino.get(k) != h]
+                    borrar[tabla] = [k for k in destino if k not in origen]
+                    filas = 0
+                    if cambiadas:
+                        lista = ", ".join(columnas)
+                        temporal = f"_replica_{tabla}"
+                        local_cur.execute(
+                            f"CREATE TEMP TABLE {temporal} "
+                            f"(LIKE {tabla} INCLUDING DEFAULTS) ON COMMIT DROP"
+                        )
+                        consulta = central_cur.mogrify(
+                            f"SELECT {lista} FROM {tabla} WHERE {pk} = ANY(%s)",
+                            (cambiadas,),
+                        ).decode("utf-8")
+                        DatabaseService._copiar(
+                            central_cur, local_cur, consulta, f"{temporal} ({lista})"
+                        )
+                        actualizar = ", ".join(
+                            f"{c} = EXCLUDED.{c}" for c in columnas if c != pk
+                        )
+                        local_cur.execute(
+                            f"INSERT INTO {tabla} ({lista}) "
+                            f"SELECT {lista} FROM {temporal} ORDER BY {pk} "
+                            f"ON CONFLICT ({pk}) DO UPDATE SET {actualizar}"
+                        )
+                        filas = local_cur.rowcount
+                    tablas[tabla] = {
+                        "filas": filas,
+                        "borradas": len(borrar[tabla]),
+                        "ms": round((time.perf_counter() - t0) * 1000, 1),
+                    }
+                for tabla, pk, _ in reversed(TABLAS_CENTRALES):
+                    if borrar[tabla]:
+                        t0 = time.perf_counter()
+                        local_cur.execute(
+                            f"DELETE FROM {tabla} WHERE {pk} = ANY(%s)",
+                            (borrar[tabla],),
+                        )
+                        tablas[tabla]["ms"] += round(
+                            (time.perf_counter() - t0) * 1000, 1
+                        )
 
             local_conn.commit()
-            print(
-                f"[DB SERVICE] Data replication completed for {base_datos}", flush=True
-            )
-
         except Exception as e:
+            local_conn.rollback()
             print(f"[DB SERVICE] Error replicating data: {e}", flush=True)
             raise
         finally:
@@ -430,6 +498,25 @@ class DatabaseService:
             local_cur.close()
             local_conn.close()
 
+        for tabla, datos in tablas.items():
+            print(
+                f"[DB SERVICE] {tabla}: {datos['filas']} filas, "
+                f"{datos['borradas']} borradas, {datos['ms']} ms",
+                flush=True,
+            )
+        total_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        print(
+            f"[DB SERVICE] Data replication completed for {base_datos} "
+            f"({modo}, {total_ms} ms)",
+            flush=True,
+        )
+        return {
+            "base_datos": base_datos,
+            "modo": modo,
+            "tablas": tablas,
+            "total_ms": total_ms,
+        }
+
     @staticmethod
     def insertar_admin_en_db(base_datos: str, id_dependencia: int) -> None:
         print(
@@ -1,6 +1,8 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List, Optional, Dict, Any
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from src.repository.existencia_repo import existencia_repo
+from src.repository.stock_repo import stock_repo
 
 
 class ExistenciaService:
@@ -140,7 +142,7 @@ class ExistenciaService:
         Solo lectura, no escribe en productos.
         Usa la misma lógica de exclusión que get_existencia_producto:
         - Si tiene ItemAnexo: stock = SUM(entrada - vendido) de item_anexo
-        - Si no: stock = SUM(cantidad * factor) de movimientos confirmados
+        - Si no: stock = saldo materializado en stock_dependencia
 
         Returns:
             Stock calculado
@@ -161,15 +163,7 @@ class ExistenciaService:
                 params={"id_producto": id_producto},
             )
         else:
-            r = await db.exec(
-                text("""
-                SELECT COALESCE(SUM(m.cantidad * tm.factor), 0)
-                FROM movimiento m
-                JOIN tipo_movimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
-                WHERE m.id_producto = :id_producto AND m.estado = 'confirmado'
-            """),
-                params={"id_producto": id_producto},
-            )
+            return await stock_repo.get_stock(db, id_producto)
 
         return r.scalar() or 0
 
@@ -182,6 +176,36 @@ class ExistenciaService:
         """
         return await ExistenciaService.calcular_stock_producto(db, id_producto)
 
+    @staticmethod
+    async def verificar_stock(db: AsyncSession) -> Dict[str, Any]:
+        """Detecta deriva entre stock_dependencia y los movimientos confirmados.
+
+        Returns:
+            consistente: bool - True si el saldo coincide con el histórico
+            diferencias: List[Dict] - Filas (producto, dependencia) que difieren
+        """
+        diferencias = await stock_repo.verificar(db)
+        return {
+            "consistente": len(diferencias) == 0,
+            "diferencias": diferencias,
+        }
+
+    @staticmethod
+    async def reconstruir_stock(db: AsyncSession) -> Dict[str, Any]:
+        """Regenera stock_dependencia desde los movimientos confirmados.
+
+        Bloquea la tabla mientras dura: no se expone por HTTP, solo desde
+        scripts/verificar_stock.py --reconstruir.
+
+        Returns:
+            filas: int - Número de saldos (producto, dependencia) generados
+            diferencias_corregidas: int - Filas que tenían deriva antes de reconstruir
+        """
+        diferencias = await stock_repo.verificar(db)
+        filas = await stock_repo.reconstruir(db)
+        await db.commit()
+        return {"filas": filas, "diferencias_corregidas": len(diferencias)}
+
     @staticmethod
     async def obtener_item_anexo_para_venta(
         db: AsyncSession, id_producto: int, cantidad: int
@@ -216,7 +240,11 @@ class ExistenciaService:
 
     @staticmethod
     async def registrar_venta_en_anexo(
-        db: AsyncSession, id_producto: int, cantidad: int, commit: bool = True
+        db: AsyncSession,
+        id_producto: int,
+        cantidad: int,
+        commit: bool = True,
+        saltar_bloqueados: bool = False,
     ) -> List[Dict[str, Any]]:
         """Registra una venta en el item_anexo usando FIFO.
 
@@ -225,53 +253,85 @@ class ExistenciaService:
         Returns:
             Lista de items actualizados
         """
-        from src.models.item_anexo import ItemAnexo
-        from sqlalchemy import select
+        return await ExistenciaService.registrar_ventas_en_anexo(
+            db,
+            [(id_producto, cantidad)],
+            commit=commit,
+            saltar_bloqueados=saltar_bloqueados,
+        )
 
-        actualizada = []
-        cantidad_restante = cantidad
-
-        while cantidad_restante > 0:
-            stmt = (
-                select(ItemAnexo)
-                .where(
-                    ItemAnexo.id_producto == id_producto,
-                    ItemAnexo.entrada > ItemAnexo.vendido,
-                )
-                .order_by(ItemAnexo.id_anexo.asc(), ItemAnexo.id_item_anexo.asc())
-                .limit(1)
-            )
-            result = await db.exec(stmt)
-            item = result.scalars().first()
+    @staticmethod
+    async def registrar_ventas_en_anexo(
+        db: AsyncSession,
+        ventas: Iterable[Tuple[int, int]],
+        commit: bool = True,
+        saltar_bloqueados: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Registra varias ventas ``(id_producto, cantidad)`` en item_anexo (FIFO).
 
-            if not item:
-                break
+        Las filas candidatas de todos los productos se leen y bloquean con un
+        solo SELECT ... FOR UPDATE, el reparto se calcula en memoria y vendido
+        se actualiza con un solo UPDATE. Dos confirmaciones concurrentes del
+        mismo producto se serializan en el bloqueo y no asignan dos veces el
+        mismo stock. Con `saltar_bloqueados` (SKIP LOCKED) no se espera: solo
+        se reparte entre las filas libres.
 
-            disponible = item.entrada - item.vendido
-            a_vender = min(cantidad_restante, disponible)
+        Si algún producto no alcanza no se escribe nada.
 
-            item.vendido += a_vender
-            cantidad_restante -= a_vender
+        Returns:
+            Lista de items actualizados
 
+        Raises:
+            ValueError: Si el stock de algún producto es insuficiente
+        """
+        from src.repository.contratos_repo import item_anexo_repo
+
+        pedidas: Dict[int, int] = defaultdict(int)
+        for id_producto, cantidad in ventas:
+            if cantidad > 0:
+                pedidas[id_producto] += cantidad
+        if not pedidas:
+            return []
+
+        filas = await item_anexo_repo.bloquear_disponibles(
+            db, sorted(pedidas), saltar_bloqueados=saltar_bloqueados
+        )
+
+        restantes = dict(pedidas)
+        deltas: Dict[int, int] = {}
+        actualizada = []
+        for fila in filas:
+            cantidad_restante = restantes[fila.id_producto]
+            if cantidad_restante <= 0:
+                continue
+            a_vender = min(cantidad_restante, fila.entrada - fila.vendido)
+            restantes[fila.id_producto] -= a_vender
+            deltas[fila.id_item_anexo] = a_vender
             actualizada.append(
                 {
-                    "id_item_anexo": item.id_item_anexo,
-                    "id_anexo": item.id_anexo,
-                    "vendido": item.vendido,
+                    "id_item_anexo": fila.id_item_anexo,
+                    "id_anexo": fila.id_anexo,
+                    "id_producto": fila.id_producto,
+                    "vendido": fila.vendido + a_vender,
                     "vendido_en_esta": a_vender,
                 }
             )
 
+        faltantes = {p: c for p, c in restantes.items() if c > 0}
+        if faltantes:
+            detalle = ", ".join(
+                f"producto {p}: quedan {c} uds sin asignar"
+                for p, c in sorted(faltantes.items())
+            )
+            raise ValueError(f"Stock insuficiente: {detalle}")
+
+        await item_anexo_repo.sumar_vendido(db, deltas)
+
         if commit:
             await db.commit()
         else:
             await db.flush()
 
-        if cantidad_restante > 0:
-            raise ValueError(
-                f"Stock insuficiente: quedan {cantidad_restante} uds sin asignar"
-            )
-
         return actualizada
 
     @staticmethod
@@ -0,0 +1,202 @@
+"""Jerarquía de dependencias (codigo_padre).
+
+Dos formas de recorrerla, ambas en una sola sentencia:
+
+- `WITH RECURSIVE` contra la BD para el subárbol o la cadena de ancestros de
+  una dependencia. La usan la validación de ciclos y el alcance de acceso del
+  login (`get_subarbol`), que deben ver el estado actual de la tabla.
+- Un árbol en memoria por tenant (`jerarquia_cache`) construido con una
+  lectura de (id, codigo_padre). Solo lo usa /dependencias/jerarquia para
+  mostrar el árbol; se invalida al crear, editar, eliminar o replicar
+  dependencias y el TTL acota el desfase en los demás workers.
+
+Los recorridos se cortan en MAX_NIVELES para que un ciclo ya presente en los
+datos no los deje sin fin.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, literal_column
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.connection import _current_db
+from src.models import Dependencia
+from src.repository.base import get_by_ids
+
+MAX_NIVELES = 64
+
+
+def _cte_descendientes(id_dependencia: int):
+    raiz = select(Dependencia.id_dependencia, literal_column("0").label("nivel")).where(
+        Dependencia.id_dependencia == id_dependencia
+    )
+    subarbol = raiz.cte("subarbol", recursive=True)
+    hijos = (
+        select(Dependencia.id_dependencia, subarbol.c.nivel + 1)
+        .join(subarbol, Dependencia.codigo_padre == subarbol.c.id_dependencia)
+        .where(subarbol.c.nivel < MAX_NIVELES)
+    )
+    return subarbol.union_all(hijos)
+
+
+def _cte_ancestros(id_dependencia: int):
+    inicio = select(
+        Dependencia.id_dependencia,
+        Dependencia.codigo_padre,
+        literal_column("0").label("nivel"),
+    ).where(Dependencia.id_dependencia == id_dependencia)
+    camino = inicio.cte("camino", recursive=True)
+    padres = (
+        select(Dependencia.id_dependencia, Dependencia.codigo_padre, camino.c.nivel + 1)
+        .join(camino, Dependencia.id_dependencia == camino.c.codigo_padre)
+        .where(camino.c.nivel < MAX_NIVELES)
+    )
+    return camino.union_all(padres)
+
+
+@dataclass
+class ArbolDependencias:
+    padres: Dict[int, Optional[int]] = field(default_factory=dict)
+    hijos: Dict[Optional[int], List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def desde_filas(cls, filas) -> "ArbolDependencias":
+        arbol = cls()
+        for id_dependencia, codigo_padre in sorted(filas):
+            arbol.padres[id_dependencia] = codigo_padre
+            arbol.hijos.setdefault(codigo_padre, []).append(id_dependencia)
+        return arbol
+
+    def __contains__(self, id_dependencia: int) -> bool:
+        return id_dependencia in self.padres
+
+    def hijos_de(self, id_dependencia: Optional[int]) -> List[int]:
+        """Hijos directos; con None, las dependencias raíz."""
+        return list(self.hijos.get(id_dependencia, []))
+
+    def descendientes(self, id_dependencia: Optional[int]) -> List[int]:
+        """La dependencia y todo su subárbol en preorden (None: todo el árbol)."""
+        if id_dependencia is None:
+            pila = list(reversed(self.hijos_de(None)))
+        else:
+            pila = [id_dependencia]
+        orden: List[int] = []
+        vistos = set()
+        while pila:
+            actual = pila.pop()
+            if actual in vistos or actual not in self.padres:
+                continue
+            vistos.add(actual)
+            orden.append(actual)
+            pila.extend(reversed(self.hijos.get(actual, [])))
+        return orden
+
+
+@dataclass
+class _Entrada:
+    arbol: ArbolDependencias
+    expira: float
+
+
+class JerarquiaCache:
+    """Árbol de dependencias en memoria por base de datos del tenant."""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._arboles: Dict[str, _Entrada] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def arbol(self, db: AsyncSession) -> ArbolDependencias:
+        db_name = _current_db.get()
+        entrada = self._arboles.get(db_name)
+        if entrada is not None and entrada.expira > time.monotonic():
+            self.hits += 1
+            return entrada.arbol
+        self.misses += 1
+        result = await db.exec(
+            select(Dependencia.id_dependencia, Dependencia.codigo_padre)
+        )
+        arbol = ArbolDependencias.desde_filas(result.all())
+        if self.ttl > 0:
+            self._arboles[db_name] = _Entrada(arbol, time.monotonic() + self.ttl)
+        return arbol
+
+    def invalidar(self, db_name: Optional[str] = None) -> None:
+        """Sin db_name invalida todos los tenants: las dependencias se
+        replican a todas las bases."""
+        if db_name is None:
+            self._arboles.clear()
+        else:
+            self._arboles.pop(db_name, None)
+
+    def stats(self) -> dict:
+        return {
+            "tenants": len(self._arboles),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+jerarquia_cache = JerarquiaCache(
+    ttl=float(os.getenv("JERARQUIA_CACHE_TTL", "30")),
+)
+
+
+class JerarquiaService:
+    @staticmethod
+    async def descendientes_ids(db: AsyncSession, id_dependencia: int) -> List[int]:
+        """La dependencia y su subárbol (por nivel) con una sola consulta."""
+        subarbol = _cte_descendientes(id_dependencia)
+        # Con un ciclo en los datos una misma fila aparece en varios niveles
+        result = await db.exec(
+            select(subarbol.c.id_dependencia)
+            .group_by(subarbol.c.id_dependencia)
+            .order_by(func.min(subarbol.c.nivel), subarbol.c.id_dependencia)
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def ancestros_ids(db: AsyncSession, id_dependencia: int) -> List[int]:
+        """Camino desde la dependencia (incluida) hasta la raíz."""
+        camino = _cte_ancestros(id_dependencia)
+        result = await db.exec(select(camino.c.id_dependencia).order_by(camino.c.nivel))
+        ids: List[int] = []
+        for id_actual in result.all():
+            if id_actual in ids:
+                break
+            ids.append(id_actual)
+        return ids
+
+    @staticmethod
+    async def formaria_ciclo(
+        db: AsyncSession, id_dependencia: int, nuevo_padre_id: Optional[int]
+    ) -> bool:
+        """True si colgar la dependencia de nuevo_padre_id crea un ciclo."""
+        if not nuevo_padre_id:
+            return False
+        if id_dependencia == nuevo_padre_id:
+            return True
+        ancestros = await JerarquiaService.ancestros_ids(db, nuevo_padre_id)
+        return id_dependencia in ancestros
+
+    @staticmethod
+    async def get_subarbol(db: AsyncSession, id_dependencia: int) -> List[Dependencia]:
+        """Dependencia y descendientes en preorden, leídos de la BD.
+
+        Define a qué bases accede el usuario: no pasa por jerarquia_cache,
+        cuya invalidación es local al worker y no ve las réplicas.
+        """
+        subarbol = _cte_descendientes(id_dependencia)
+        result = await db.exec(
+            select(Dependencia.id_dependencia, Dependencia.codigo_padre)
+            .join(subarbol, Dependencia.id_dependencia == subarbol.c.id_dependencia)
+            .distinct()
+        )
+        ids = ArbolDependencias.desde_filas(result.all()).descendientes(id_dependencia)
+        por_id = await get_by_ids(db, Dependencia, ids)
+        return [por_id[i] for i in ids if i in por_id]
@@ -0,0 +1,76 @@
+"""Mantenimiento de la tabla `log` particionada por mes.
+
+Las funciones SQL `asegurar_particiones_log` y `purgar_particiones_log`
+(migración add_log_particiones / sql/init.sql) crean las particiones de los
+próximos meses y eliminan las que superan la retención. Eliminar una
+partición completa es instantáneo y no deja filas muertas, a diferencia de
+un DELETE por fecha sobre una tabla única.
+
+Se ejecuta periódicamente con scripts/mantener_logs.py (p. ej. desde cron una
+vez al día). Si no corre a tiempo nada falla: los registros de un mes sin
+partición caen en `log_default` y se mueven al crear la partición.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.sucursales import transaccion_en
+
+logger = logging.getLogger(__name__)
+
+LOG_MESES_ADELANTE = int(os.getenv("LOG_MESES_ADELANTE", "2"))
+LOG_RETENCION_MESES = int(os.getenv("LOG_RETENCION_MESES", "6"))
+
+
+async def mantener_particiones_log(
+    conn: AsyncConnection,
+    meses_adelante: int = LOG_MESES_ADELANTE,
+    retencion_meses: int = LOG_RETENCION_MESES,
+) -> Dict[str, List[str]]:
+    """Crea las particiones que falten y elimina las vencidas; nombres de cada una."""
+    creadas = await conn.execute(
+        text("SELECT * FROM asegurar_particiones_log(:meses)"),
+        {"meses": meses_adelante},
+    )
+    creadas = list(creadas.scalars())
+    eliminadas = await conn.execute(
+        text("SELECT * FROM purgar_particiones_log(:meses)"),
+        {"meses": retencion_meses},
+    )
+    eliminadas = list(eliminadas.scalars())
+    return {"creadas": creadas, "eliminadas": eliminadas}
+
+
+async def mantener_logs(
+    db_name: str,
+    meses_adelante: int = LOG_MESES_ADELANTE,
+    retencion_meses: int = LOG_RETENCION_MESES,
+) -> Dict[str, List[str]]:
+    """Mantenimiento de la tabla `log` de una base (en una transacción)."""
+    async with transaccion_en(db_name) as conn:
+        return await mantener_particiones_log(conn, meses_adelante, retencion_meses)
+
+
+async def mantener_logs_en(
+    bases: Iterable[str],
+    meses_adelante: int = LOG_MESES_ADELANTE,
+    retencion_meses: int = LOG_RETENCION_MESES,
+) -> Dict[str, Dict[str, Any]]:
+    """Mantenimiento en varias bases, una tras otra; base -> resultado o error.
+
+    Una base que falla (p. ej. sin migrar todavía) no detiene a las demás.
+    """
+    resultados: Dict[str, Dict[str, Any]] = {}
+    for db_name in dict.fromkeys(bases):
+        try:
+            resultados[db_name] = await mantener_logs(
+                db_name, meses_adelante, retencion_meses
+            )
+        except Exception as e:
+            logger.warning(f"[LOGS] Mantenimiento fallido en '{db_name}': {e}")
+            resultados[db_name] = {"error": str(e)}
+    return resultados
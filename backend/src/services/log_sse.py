@@ -1,42 +1,172 @@
 import asyncio
-from typing import Dict, List
+import json
+import os
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Set, Tuple
 from fastapi import APIRouter
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
-# In-memory storage for connected SSE clients
-_sse_clients: Dict[str, List[asyncio.Queue]] = {}
+# (id del evento, nivel, tipo, datos ya serializados)
+_Evento = Tuple[int, Optional[str], Optional[str], str]
 
 
-async def sse_events(request_id: str = "default"):
-    """Server-Sent Events stream for real-time logs"""
-    queue = asyncio.Queue()
+def _normalizar(valores: Optional[Iterable[str]]) -> Optional[Set[str]]:
+    if not valores:
+        return None
+    return {v.strip().upper() for v in valores if v and v.strip()} or None
 
-    if request_id not in _sse_clients:
-        _sse_clients[request_id] = []
-    _sse_clients[request_id].append(queue)
 
-    try:
-        while True:
-            # Wait for new event
-            event = await queue.get()
-            yield f"data: {event}\n\n"
-    except asyncio.CancelledError:
-        pass
-    finally:
-        if request_id in _sse_clients:
-            _sse_clients[request_id].remove(queue)
+class _Suscriptor:
+    """Cliente SSE con buffer circular propio (descarta los más antiguos)."""
 
+    def __init__(
+        self,
+        buffer_size: int,
+        niveles: Optional[Set[str]] = None,
+        tipos: Optional[Set[str]] = None,
+    ):
+        self.buffer: Deque[_Evento] = deque(maxlen=buffer_size)
+        self.niveles = niveles
+        self.tipos = tipos
+        self.descartados = 0
+        self.nuevo = asyncio.Event()
 
-async def broadcast_log(log_data: dict):
-    """Broadcast a new log to all connected SSE clients"""
-    import json
+    def acepta(self, nivel: Optional[str], tipo: Optional[str]) -> bool:
+        if self.niveles is not None and (nivel or "").upper() not in self.niveles:
+            return False
+        if self.tipos is not None and (tipo or "").upper() not in self.tipos:
+            return False
+        return True
+
+    def encolar(self, evento: _Evento) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            self.descartados += 1
+        self.buffer.append(evento)
+        self.nuevo.set()
+
+
+class LogBroadcastHub:
+    """Difusión de logs a los clientes de /logs/stream.
+
+    Publicar nunca espera por los clientes: cada suscriptor tiene un buffer
+    acotado y, si no consume a tiempo, pierde los eventos más antiguos y
+    recibe un evento `dropped` con la cantidad perdida. Se conserva un
+    historial corto para reanudar con `Last-Event-ID`.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 256,
+        backlog_size: int = 1000,
+        heartbeat: float = 15.0,
+    ):
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self._backlog: Deque[_Evento] = deque(maxlen=backlog_size)
+        self._suscriptores: Set[_Suscriptor] = set()
+        self._ultimo_id = 0
+
+    @property
+    def clientes(self) -> int:
+        return len(self._suscriptores)
+
+    def publicar(self, log_data: dict) -> int:
+        """Publica un log a los suscriptores interesados. Devuelve el id."""
+        self._ultimo_id += 1
+        evento = (
+            self._ultimo_id,
+            log_data.get("nivel"),
+            log_data.get("tipo"),
+            json.dumps(log_data, default=str),
+        )
+        self._backlog.append(evento)
+        for suscriptor in self._suscriptores:
+            if suscriptor.acepta(evento[1], evento[2]):
+                suscriptor.encolar(evento)
+        return self._ultimo_id
+
+    def suscribir(
+        self,
+        niveles: Optional[Iterable[str]] = None,
+        tipos: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None,
+    ) -> _Suscriptor:
+        suscriptor = _Suscriptor(
+            self.buffer_size, _normalizar(niveles), _normalizar(tipos)
+        )
+        if last_event_id is not None:
+            pendientes = [e for e in self._backlog if e[0] > last_event_id]
+            primero = pendientes[0][0] if pendientes else self._ultimo_id + 1
+            # Eventos posteriores a last_event_id que ya salieron del historial
+            suscriptor.descartados += max(0, primero - last_event_id - 1)
+            for evento in pendientes:
+                if suscriptor.acepta(evento[1], evento[2]):
+                    suscriptor.encolar(evento)
+            if suscriptor.descartados:
+                suscriptor.nuevo.set()
+        self._suscriptores.add(suscriptor)
+        return suscriptor
 
-    event_data = json.dumps(log_data)
+    def desuscribir(self, suscriptor: _Suscriptor) -> None:
+        self._suscriptores.discard(suscriptor)
 
-    for request_id, queues in _sse_clients.items():
-        for queue in queues:
-            try:
-                await queue.put(event_data)
-            except Exception:
-                pass
+    async def eventos(
+        self,
+        niveles: Optional[Iterable[str]] = None,
+        tipos: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None,
+    ):
+        """Generador de frames SSE para un cliente."""
+        suscriptor = self.suscribir(niveles, tipos, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    await asyncio.wait_for(suscriptor.nuevo.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                suscriptor.nuevo.clear()
+                for frame in self._drenar(suscriptor):
+                    yield frame
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.desuscribir(suscriptor)
+
+    @staticmethod
+    def _drenar(suscriptor: _Suscriptor) -> List[str]:
+        frames = []
+        if suscriptor.descartados:
+            frames.append(
+                "event: dropped\n"
+                f"data: {json.dumps({'dropped': suscriptor.descartados})}\n\n"
+            )
+            suscriptor.descartados = 0
+        while suscriptor.buffer:
+            event_id, _, _, data = suscriptor.buffer.popleft()
+            frames.append(f"id: {event_id}\ndata: {data}\n\n")
+        return frames
+
+
+log_hub = LogBroadcastHub(
+    buffer_size=int(os.getenv("LOG_SSE_BUFFER", "256")),
+    backlog_size=int(os.getenv("LOG_SSE_BACKLOG", "1000")),
+    heartbeat=float(os.getenv("LOG_SSE_HEARTBEAT", "15")),
+)
+
+
+async def sse_events(
+    niveles: Optional[Iterable[str]] = None,
+    tipos: Optional[Iterable[str]] = None,
+    last_event_id: Optional[int] = None,
+):
+    """Server-Sent Events stream for real-time logs"""
+    async for frame in log_hub.eventos(niveles, tipos, last_event_id):
+        yield frame
+
+
+async def broadcast_log(log_data: dict):
+    """Broadcast a new log to all connected SSE clients"""
+    log_hub.publicar(log_data)
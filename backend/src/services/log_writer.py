@@ -0,0 +1,315 @@
+"""Escritor en segundo plano de la tabla `log`.
+
+LoggingMiddleware y AppLogger encolan los registros con `log_writer.enviar`
+y siguen atendiendo el request; una tarea asyncio los agrupa por base de
+datos y los inserta en lotes (INSERT multi-fila) cada `batch_size` registros o
+cada `flush_interval_ms` milisegundos, lo que ocurra primero.
+
+El mismo INSERT suma los registros a `log_resumen_hora` (por hora, nivel y
+tipo), de donde /logs/stats lee los totales sin recorrer la tabla `log`.
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql import Select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.connection import _current_db, engine_registry
+from src.models.log import LogEntry, LogResumenHora
+
+logger = logging.getLogger(__name__)
+
+# Política cuando la cola está llena:
+# - "drop": se descarta el registro nuevo y se contabiliza (por defecto).
+# - "block": quien encola espera hasta `block_timeout` segundos a que haya
+#   espacio (solo aplica a `enviar_async`) y, si no lo hay, lo descarta.
+POLITICA_DROP = "drop"
+POLITICA_BLOCK = "block"
+
+_Item = Tuple[str, dict]
+
+_LONGITUDES = {
+    c.name: c.type.length
+    for c in LogEntry.__table__.c
+    if getattr(c.type, "length", None)
+}
+
+# El INSERT multi-fila toma la lista de columnas de la primera fila: todas las
+# filas de un lote deben traer las mismas (el id lo pone la BD)
+_COLUMNAS = [c.name for c in LogEntry.__table__.c if c.name != "id"]
+
+
+def _normalizar(fila: dict) -> dict:
+    """`fila` con todas las columnas de `log` (None si falta) y nada más."""
+    return {columna: fila.get(columna) for columna in _COLUMNAS}
+
+
+# Marca de fin que `detener` encola para que la tarea escriba lo que tenga
+_FIN = object()
+
+
+def sentencia_insertar_logs(filas: List[dict]) -> Select:
+    """INSERT multi-fila en `log` que además acumula `log_resumen_hora`.
+
+    Es una sola sentencia (CTEs con INSERT): el resumen se actualiza en la
+    misma transacción que los registros y sin otro viaje a la BD. Acepta
+    filas con distintas claves (se completan con None). Devuelve las filas
+    insertadas ordenadas por id.
+    """
+    filas = [_normalizar(fila) for fila in filas]
+    nuevos = (
+        insert(LogEntry).values(filas).returning(*LogEntry.__table__.c).cte("nuevos")
+    )
+    hora = func.date_trunc("hour", nuevos.c.timestamp)
+    resumen = pg_insert(LogResumenHora).from_select(
+        ["hora", "nivel", "tipo", "cantidad"],
+        select(hora, nuevos.c.nivel, nuevos.c.tipo, func.count()).group_by(
+            hora, nuevos.c.nivel, nuevos.c.tipo
+        ),
+    )
+    resumen = resumen.on_conflict_do_update(
+        index_elements=["hora", "nivel", "tipo"],
+        set_={"cantidad": LogResumenHora.cantidad + resumen.excluded.cantidad},
+    ).cte("resumen")
+    return select(nuevos).add_cte(resumen).order_by(nuevos.c.id)
+
+
+async def insertar_logs(session: AsyncSession, filas: List[dict]) -> List[dict]:
+    """Inserta `filas` en `log` y el resumen por hora (sin commit)."""
+    result = await session.exec(sentencia_insertar_logs(filas))
+    return [dict(row._mapping) for row in result.all()]
+
+
+def _loop_actual() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LogWriter:
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+        politica: str = POLITICA_DROP,
+        block_timeout: float = 0.05,
+    ):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.politica = politica
+        self.block_timeout = block_timeout
+        self._cola: "asyncio.Queue[_Item]" = asyncio.Queue(maxsize=max_queue)
+        self._tarea: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._detenido = False
+        self.escritos = 0
+        self.descartados = 0
+        self.fallidos = 0
+        self.lotes = 0
+
+    # ------------------------------------------------------------------
+    # Encolado
+    # ------------------------------------------------------------------
+
+    def _preparar(self, log_data: dict, db_name: Optional[str]) -> _Item:
+        # Un valor demasiado largo haría fallar el lote completo, no solo su fila
+        fila = {
+            k: v[: _LONGITUDES[k]] if isinstance(v, str) and k in _LONGITUDES else v
+            for k, v in _normalizar(log_data).items()
+        }
+        # La hora del evento, no la de la escritura del lote
+        if fila["timestamp"] is None:
+            fila["timestamp"] = datetime.now()
+        return (db_name or _current_db.get(), fila)
+
+    def enviar(self, log_data: dict, db_name: Optional[str] = None) -> bool:
+        """Encola un registro sin bloquear. Devuelve False si se descartó.
+
+        Si no se indica `db_name` se usa la base de datos del request actual.
+        """
+        if self._detenido:
+            return False
+        self._asegurar_tarea()
+        try:
+            self._cola.put_nowait(self._preparar(log_data, db_name))
+            return True
+        except asyncio.QueueFull:
+            self._descartar()
+            return False
+
+    async def enviar_async(self, log_data: dict, db_name: Optional[str] = None) -> bool:
+        """Como `enviar`, pero con política "block" espera por espacio en la cola."""
+        if self.politica != POLITICA_BLOCK:
+            return self.enviar(log_data, db_name)
+        if self._detenido:
+            return False
+        self._asegurar_tarea()
+        try:
+            await asyncio.wait_for(
+                self._cola.put(self._preparar(log_data, db_name)),
+                timeout=self.block_timeout,
+            )
+            return True
+        except asyncio.TimeoutError:
+            self._descartar()
+            return False
+
+    def _descartar(self) -> None:
+        self.descartados += 1
+        if self.descartados == 1 or self.descartados % 1000 == 0:
+            logger.warning(
+                f"Cola de logs llena ({self.max_queue}), "
+                f"{self.descartados} registros descartados"
+            )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    def _asegurar_tarea(self) -> None:
+        loop = _loop_actual()
+        if loop is None:
+            return
+        if self._loop is loop and self._tarea is not None and not self._tarea.done():
+            return
+        if self._loop is not loop:
+            # La cola queda ligada al loop donde se usó; al cambiar de loop
+            # (p. ej. TestClient) se traspasan los pendientes a una nueva.
+            pendientes = self._vaciar_cola()
+            self._cola = asyncio.Queue(maxsize=self.max_queue)
+            for item in pendientes:
+                self._cola.put_nowait(item)
+            self._loop = loop
+        self._tarea = loop.create_task(self._run(), name="log-writer")
+
+    def iniciar(self) -> None:
+        """Arranca la tarea de escritura (evento startup)."""
+        self._detenido = False
+        self._asegurar_tarea()
+
+    async def detener(self, timeout: float = 10.0) -> None:
+        """Deja de aceptar registros y escribe todo lo pendiente (shutdown)."""
+        self._detenido = True
+        tarea = self._tarea
+        if tarea is not None and not tarea.done() and self._loop is _loop_actual():
+            await self._cola.put(_FIN)
+            try:
+                await asyncio.wait_for(tarea, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("El escritor de logs no terminó a tiempo")
+        self._tarea = None
+        pendientes = [item for item in self._vaciar_cola() if item is not _FIN]
+        for i in range(0, len(pendientes), self.batch_size):
+            await self._flush(pendientes[i : i + self.batch_size])
+
+    def _vaciar_cola(self) -> List[_Item]:
+        items = []
+        while True:
+            try:
+                items.append(self._cola.get_nowait())
+            except asyncio.QueueEmpty:
+                return items
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._cola.get()
+            if item is _FIN:
+                return
+            lote = [item]
+            fin = False
+            limite = loop.time() + self.flush_interval
+            while len(lote) < self.batch_size:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._cola.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                if item is _FIN:
+                    fin = True
+                    break
+                lote.append(item)
+            try:
+                await self._flush(lote)
+            except asyncio.CancelledError:
+                # Cancelado a mitad de una escritura: reencolar para detener()
+                for item in lote:
+                    try:
+                        self._cola.put_nowait(item)
+                    except asyncio.QueueFull:
+                        self._descartar()
+                raise
+            if fin:
+                return
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    async def _flush(self, lote: List[_Item]) -> None:
+        por_db: Dict[str, List[dict]] = defaultdict(list)
+        for db_name, fila in lote:
+            por_db[db_name].append(fila)
+        for db_name, filas in por_db.items():
+            await self._escribir(db_name, filas)
+
+    async def _escribir(self, db_name: str, filas: List[dict]) -> None:
+        try:
+            async_session = engine_registry.get_session_factory(db_name)
+            async with async_session() as session:
+                insertados = await insertar_logs(session, filas)
+                await session.commit()
+        except Exception as e:
+            self.fallidos += len(filas)
+            error_str = str(e)
+            if (
+                "no existe la relación" in error_str
+                or "UndefinedTableError" in error_str
+            ):
+                logger.debug(f"Tabla log no existe en '{db_name}', saltando: {e}")
+            else:
+                logger.error(f"Error guardando {len(filas)} logs en '{db_name}': {e}")
+            return
+
+        self.escritos += len(insertados)
+        self.lotes += 1
+        await self._difundir(insertados)
+
+    async def _difundir(self, insertados: List[dict]) -> None:
+        try:
+            from src.services.log_sse import broadcast_log
+
+            for fila in insertados:
+                fila["timestamp"] = fila["timestamp"].isoformat()
+                await broadcast_log(fila)
+        except Exception as be:
+            logger.debug(f"Broadcast error: {be}")
+
+    def stats(self) -> dict:
+        return {
+            "pendientes": self._cola.qsize(),
+            "escritos": self.escritos,
+            "descartados": self.descartados,
+            "fallidos": self.fallidos,
+            "lotes": self.lotes,
+        }
+
+
+log_writer = LogWriter(
+    max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("LOG_BATCH_SIZE", "200")),
+    flush_interval_ms=int(os.getenv("LOG_FLUSH_INTERVAL_MS", "500")),
+    politica=os.getenv("LOG_QUEUE_POLICY", POLITICA_DROP),
+)
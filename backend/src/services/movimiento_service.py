@@ -1,13 +1,16 @@
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 import logging
-import os
 from datetime import datetime, timezone
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select, func
+from sqlmodel import select
+from sqlalchemy import insert
 from sqlalchemy.orm import selectinload
-import psycopg2
+from src.database.sucursales import transaccion_en
 from src.repository import movimiento_repo
+from src.repository.base import get_by_ids
 from src.repository.existencia_repo import existencia_repo
+from src.repository.stock_repo import stock_repo
 from src.services.existencia_service import ExistenciaService
 from src.services.productos_en_liquidacion_service import ProductosEnLiquidacionService
 from src.models import (
@@ -27,10 +30,15 @@ from src.dto import (
     MovimientoRead,
     AjusteCreate,
     MovimientoAjusteRead,
+    ConfirmacionLoteRead,
+    ResultadoConfirmacion,
 )
 
 logger = logging.getLogger(__name__)
 
+# Tipos de movimiento que registran la venta en item_anexo (FIFO)
+TIPOS_VENTA_ANEXO = ("venta", "DONACION", "MERMA", "DEVOLUCION")
+
 
 class MovimientoService:
     @staticmethod
@@ -191,7 +199,7 @@ class MovimientoService:
                 )
 
         # Registrar venta en item_anexo (incrementa vendido)
-        if tipo.tipo in ("venta", "DONACION", "MERMA", "DEVOLUCION"):
+        if tipo.tipo in TIPOS_VENTA_ANEXO:
             await ExistenciaService.registrar_venta_en_anexo(
                 db, db_movimiento.id_producto, db_movimiento.cantidad, commit=False
             )
@@ -294,6 +302,15 @@ class MovimientoService:
         # Cambiar el estado a confirmado
         db_movimiento.estado = "confirmado"
 
+        # Actualizar el saldo materializado en la misma transacción
+        await stock_repo.aplicar_movimiento(
+            db,
+            db_movimiento.id_producto,
+            db_movimiento.id_dependencia,
+            db_movimiento.cantidad,
+            tipo.factor,
+        )
+
         # Guardar cambios
         await db.commit()
 
@@ -304,6 +321,241 @@ class MovimientoService:
 
         return MovimientoRead.from_orm(db_movimiento_con_relaciones)
 
+    @staticmethod
+    async def confirmar_movimientos(
+        db: AsyncSession, ids: List[int]
+    ) -> ConfirmacionLoteRead:
+        """Confirmar varios movimientos en una sola transacción.
+
+        Aplica lo mismo que confirmar_movimiento, pero con lecturas en bloque:
+        los movimientos (bloqueados), la disponibilidad de todos los
+        productos en una consulta agregada, los anexos, convenios, tipos de
+        convenio e item_anexo con una consulta por tabla, el reparto FIFO de
+        todas las ventas juntas y el saldo de stock en un solo upsert.
+
+        La disponibilidad se evalúa en el orden recibido, descontando lo que
+        consumen los movimientos anteriores del lote. Los que no pasan quedan
+        pendientes y se informan en el resultado; el resto se confirma. Si el
+        reparto FIFO falla por una escritura concurrente se revierte el lote
+        entero (ValueError).
+        """
+        from src.repository.contratos_repo import item_anexo_repo
+
+        ids = list(dict.fromkeys(ids))
+        movimientos = {
+            m.id_movimiento: m
+            for m in await movimiento_repo.get_para_confirmar(db, ids)
+        }
+        errores: Dict[int, str] = {}
+        pendientes = []
+        for id_mov in ids:
+            mov = movimientos.get(id_mov)
+            if mov is None:
+                errores[id_mov] = "Movimiento no encontrado"
+            elif mov.estado != "confirmado":
+                pendientes.append(mov)
+
+        salidas = [m for m in pendientes if m.tipo_movimiento.factor < 0]
+        disponibilidad = await existencia_repo.disponibilidad_lote(
+            db,
+            [(m.id_producto, m.id_dependencia) for m in salidas],
+            [m.id_movimiento for m in salidas],
+        )
+
+        # item_anexo de ajustes y recepciones, y la cadena anexo -> convenio
+        con_item = [
+            m
+            for m in pendientes
+            if m.id_anexo
+            and m.tipo_movimiento.tipo
+            in ("AJUSTE_QUITAR", "AJUSTE_AGREGAR", "compra", "RECEPCION")
+        ]
+        items = await item_anexo_repo.get_primeros_por_anexo_producto(
+            db, [(m.id_anexo, m.id_producto) for m in con_item]
+        )
+
+        consumido_kons: Dict[int, int] = defaultdict(int)
+        consumido_mov: Dict[Tuple[int, int], int] = defaultdict(int)
+        aceptados = []
+        for mov in pendientes:
+            tipo = mov.tipo_movimiento
+            clave = (mov.id_producto, mov.id_dependencia)
+            if tipo.factor < 0:
+                datos = disponibilidad[clave]
+                if datos["usa_konsignacion"]:
+                    stock = datos["stock_konsignacion"]
+                    stock -= consumido_kons[mov.id_producto]
+                else:
+                    stock = datos["stock_movimientos"] - consumido_mov[clave]
+                disponible = stock - datos["stock_comprometido"]
+                if disponible < mov.cantidad:
+                    errores[mov.id_movimiento] = (
+                        f"Stock insuficiente para '{mov.producto.nombre}'. "
+                        f"Disponible: {disponible}, Solicitado: {mov.cantidad}"
+                    )
+                    # Sigue pendiente: compromete stock para los siguientes
+                    datos["stock_comprometido"] += mov.cantidad
+                    continue
+                if tipo.tipo in TIPOS_VENTA_ANEXO and not datos["usa_konsignacion"]:
+                    errores[mov.id_movimiento] = (
+                        f"Stock insuficiente: producto {mov.id_producto}: "
+                        f"quedan {mov.cantidad} uds sin asignar"
+                    )
+                    continue
+
+            if tipo.tipo in ("AJUSTE_QUITAR", "AJUSTE_AGREGAR") and mov.id_anexo:
+                item = items.get((mov.id_anexo, mov.id_producto))
+                if item is None:
+                    errores[mov.id_movimiento] = (
+                        f"No se encontró item_anexo para el producto "
+                        f"{mov.id_producto} en el anexo {mov.id_anexo}"
+                    )
+                    continue
+                if tipo.tipo == "AJUSTE_QUITAR":
+                    if item.entrada - item.vendido < mov.cantidad:
+                        errores[mov.id_movimiento] = (
+                            f"Stock insuficiente en item_anexo: disponible "
+                            f"{item.entrada - item.vendido}, solicitado {mov.cantidad}"
+                        )
+                        continue
+                    item.vendido += mov.cantidad
+                else:
+                    item.entrada += mov.cantidad
+
+            # Lo que aportan o consumen los anteriores del lote
+            if tipo.factor < 0:
+                consumido_kons[mov.id_producto] += mov.cantidad
+                consumido_mov[clave] += mov.cantidad
+            elif tipo.factor > 0:
+                consumido_mov[clave] -= mov.cantidad
+                if tipo.tipo == "AJUSTE_AGREGAR" and mov.id_anexo:
+                    consumido_kons[mov.id_producto] -= mov.cantidad
+            aceptados.append(mov)
+
+        # Registrar ventas en item_anexo (FIFO de todos los productos juntos)
+        await ExistenciaService.registrar_ventas_en_anexo(
+            db,
+            [
+                (m.id_producto, m.cantidad)
+                for m in aceptados
+                if m.tipo_movimiento.tipo in TIPOS_VENTA_ANEXO
+            ],
+            commit=False,
+        )
+
+        anexos = await get_by_ids(
+            db,
+            Anexo,
+            (
+                m.id_anexo
+                for m in aceptados
+                if m.tipo_movimiento.tipo in ("venta", "compra", "RECEPCION")
+            ),
+        )
+        convenios = await get_by_ids(
+            db, Convenio, (a.id_convenio for a in anexos.values())
+        )
+        tipos_convenio = await get_by_ids(
+            db, TipoConvenio, (c.id_tipo_convenio for c in convenios.values())
+        )
+
+        def _convenio(id_anexo: Optional[int]) -> Optional[Convenio]:
+            anexo = anexos.get(id_anexo)
+            return convenios.get(anexo.id_convenio) if anexo else None
+
+        # ProductosEnLiquidacion de las ventas (factura y venta efectivo)
+        ventas_liq = [
+            m
+            for m in aceptados
+            if m.tipo_movimiento.tipo == "venta"
+            and m.id_anexo
+            and (m.id_factura or m.id_venta_efectivo)
+        ]
+        codigos = await ProductosEnLiquidacionService.generate_codigos(
+            db, len(ventas_liq), modulo="V"
+        )
+        for mov, codigo in zip(ventas_liq, codigos):
+            convenio = _convenio(mov.id_anexo)
+            db.add(
+                ProductosEnLiquidacion(
+                    codigo=codigo,
+                    id_producto=mov.id_producto,
+                    cantidad=mov.cantidad,
+                    precio=mov.precio_venta,
+                    id_moneda=mov.moneda_venta,
+                    tipo_compra="FACTURA" if mov.id_factura else "VENTA_EFECTIVO",
+                    id_factura=mov.id_factura,
+                    id_venta_efectivo=mov.id_venta_efectivo,
+                    id_anexo=mov.id_anexo,
+                    id_cliente=convenio.id_cliente if convenio else None,
+                    liquidada=False,
+                )
+            )
+
+        # Recepciones: marcar disponible para vender y, si el convenio es
+        # COMPRA VENTA, crear productos_en_liquidacion
+        for mov in aceptados:
+            if mov.tipo_movimiento.tipo not in ("compra", "RECEPCION"):
+                continue
+            item_anexo = items.get((mov.id_anexo, mov.id_producto))
+            if item_anexo is None:
+                continue
+            item_anexo.a_vender = True
+            convenio = _convenio(mov.id_anexo)
+            tipo_convenio = (
+                tipos_convenio.get(convenio.id_tipo_convenio) if convenio else None
+            )
+            if tipo_convenio and tipo_convenio.nombre == "COMPRA VENTA":
+                codigo_base = item_anexo.codigo or f"ANX-{mov.id_anexo}"
+                db.add(
+                    ProductosEnLiquidacion(
+                        codigo=f"{codigo_base}-LIQ-{mov.id_producto}",
+                        id_producto=mov.id_producto,
+                        cantidad=mov.cantidad,
+                        precio=item_anexo.precio_compra,
+                        id_moneda=item_anexo.id_moneda,
+                        tipo_compra=TipoCompra.ANEXO,
+                        id_anexo=mov.id_anexo,
+                        id_cliente=convenio.id_cliente,
+                        liquidada=False,
+                    )
+                )
+
+        for mov in aceptados:
+            mov.estado = "confirmado"
+        await stock_repo.aplicar_movimientos(
+            db,
+            [
+                (
+                    m.id_producto,
+                    m.id_dependencia,
+                    m.cantidad,
+                    m.tipo_movimiento.factor,
+                )
+                for m in aceptados
+            ],
+        )
+        await db.commit()
+
+        resultados = [
+            ResultadoConfirmacion(
+                id_movimiento=id_mov,
+                confirmado=id_mov not in errores,
+                estado=movimientos[id_mov].estado if id_mov in movimientos else None,
+                error=errores.get(id_mov),
+            )
+            for id_mov in ids
+        ]
+        logger.info(
+            f"Confirmación en lote: {len(aceptados)} confirmados, "
+            f"{len(errores)} con error"
+        )
+        return ConfirmacionLoteRead(
+            confirmados=len(ids) - len(errores),
+            fallidos=len(errores),
+            resultados=resultados,
+        )
+
     @staticmethod
     async def cancelar_movimiento(
         db: AsyncSession, movimiento_id: int
@@ -329,6 +581,16 @@ class MovimientoService:
         if db_movimiento.estado == "cancelado":
             return MovimientoRead.from_orm(db_movimiento)
 
+        # Si estaba confirmado, revertir su efecto en el saldo de stock
+        if db_movimiento.estado == "confirmado":
+            await stock_repo.aplicar_movimiento(
+                db,
+                db_movimiento.id_producto,
+                db_movimiento.id_dependencia,
+                -db_movimiento.cantidad,
+                db_movimiento.tipo_movimiento.factor,
+            )
+
         # Cambiar el estado a cancelado
         db_movimiento.estado = "cancelado"
 
@@ -360,6 +622,17 @@ class MovimientoService:
         if not db_movimiento:
             return None
 
+        # Si estaba confirmado, revertir su efecto en el saldo de stock
+        # (el commit de remove() persiste ambos cambios juntos)
+        if db_movimiento.estado == "confirmado":
+            await stock_repo.aplicar_movimiento(
+                db,
+                db_movimiento.id_producto,
+                db_movimiento.id_dependencia,
+                -db_movimiento.cantidad,
+                db_movimiento.tipo_movimiento.factor,
+            )
+
         # Eliminar el movimiento
         await movimiento_repo.remove(db, id=movimiento_id)
 
@@ -432,53 +705,88 @@ class MovimientoService:
         return list(productos_dict.values())
 
     @staticmethod
-    async def get_productos_con_stock(db: AsyncSession) -> List[dict]:
-        """Obtener productos que tienen stock disponible (movimientos confirmados).
+    async def _get_origen_por_producto(
+        db: AsyncSession, ids_producto: List[int]
+    ) -> Dict[int, Tuple[int, Optional[int]]]:
+        """Resolver (id_anexo, id_convenio) desde item_anexo para varios productos.
 
-        Returns lista de productos con su cantidad total disponible e info de anexo/convenio.
-        Si el movimiento no tiene id_anexo/id_convenio, busca en item_anexo.
+        Una sola consulta (DISTINCT ON id_producto) en lugar de un par
+        ItemAnexo/Anexo por movimiento.
         """
-        from src.models import Anexo
+        if not ids_producto:
+            return {}
 
-        movimientos = await movimiento_repo.get_productos_con_stock(db)
+        statement = (
+            select(ItemAnexo.id_producto, ItemAnexo.id_anexo, Anexo.id_convenio)
+            .outerjoin(Anexo, Anexo.id_anexo == ItemAnexo.id_anexo)
+            .where(ItemAnexo.id_producto.in_(ids_producto))
+            .distinct(ItemAnexo.id_producto)
+            .order_by(ItemAnexo.id_producto, ItemAnexo.id_item_anexo)
+        )
+        results = await db.exec(statement)
+        return {
+            row.id_producto: (row.id_anexo, row.id_convenio) for row in results.all()
+        }
 
-        productos_dict = {}
+    @staticmethod
+    async def _agrupar_movimientos_por_producto(
+        db: AsyncSession, movimientos: List[Movimiento]
+    ) -> Dict[int, dict]:
+        """Sumar cantidades por producto e informar su anexo/convenio de origen.
+
+        Si el movimiento no tiene id_anexo/id_convenio, se toman de item_anexo
+        (prefetch en lote de todos los productos que lo necesitan).
+        """
+        ids_sin_origen = list(
+            {
+                mov.id_producto
+                for mov in movimientos
+                if not mov.id_anexo or not mov.id_convenio
+            }
+        )
+        origenes = await MovimientoService._get_origen_por_producto(
+            db, ids_sin_origen
+        )
+
+        productos_dict: Dict[int, dict] = {}
         for mov in movimientos:
             id_anexo = mov.id_anexo
             id_convenio = mov.id_convenio
 
             if not id_anexo or not id_convenio:
-                item_stmt = (
-                    select(ItemAnexo)
-                    .where(ItemAnexo.id_producto == mov.id_producto)
-                    .limit(1)
-                )
-                item_result = await db.exec(item_stmt)
-                item = item_result.first()
-                if item:
-                    id_anexo = id_anexo or item.id_anexo
+                origen = origenes.get(mov.id_producto)
+                if origen:
+                    id_anexo = id_anexo or origen[0]
                     if not id_convenio:
-                        anexo_stmt = select(Anexo).where(
-                            Anexo.id_anexo == item.id_anexo
-                        )
-                        anexo_result = await db.exec(anexo_stmt)
-                        anexo = anexo_result.first()
-                        if anexo:
-                            id_convenio = anexo.id_convenio
+                        id_convenio = origen[1]
 
-            cantidad_ajustada = mov.cantidad
             if mov.id_producto not in productos_dict:
                 productos_dict[mov.id_producto] = {
                     "id_producto": mov.id_producto,
                     "nombre": mov.producto.nombre if mov.producto else "",
                     "descripcion": mov.producto.descripcion if mov.producto else None,
-                    "cantidad": cantidad_ajustada,
+                    "cantidad": mov.cantidad,
                     "codigo": mov.producto.codigo if mov.producto else None,
                     "id_anexo": id_anexo,
                     "id_convenio": id_convenio,
                 }
             else:
-                productos_dict[mov.id_producto]["cantidad"] += cantidad_ajustada
+                productos_dict[mov.id_producto]["cantidad"] += mov.cantidad
+
+        return productos_dict
+
+    @staticmethod
+    async def get_productos_con_stock(db: AsyncSession) -> List[dict]:
+        """Obtener productos que tienen stock disponible (movimientos confirmados).
+
+        Returns lista de productos con su cantidad total disponible e info de anexo/convenio.
+        Si el movimiento no tiene id_anexo/id_convenio, busca en item_anexo.
+        """
+        movimientos = await movimiento_repo.get_productos_con_stock(db)
+
+        productos_dict = await MovimientoService._agrupar_movimientos_por_producto(
+            db, movimientos
+        )
 
         return [p for p in productos_dict.values() if p["cantidad"] > 0]
 
@@ -565,48 +873,13 @@ class MovimientoService:
 
         Returns lista de productos con cantidad del último movimiento RECEPCION/compra.
         """
-        from src.models import Anexo
-
         movimientos = await movimiento_repo.get_productos_con_stock_por_dependencia(
             db, id_dependencia
         )
 
-        productos_dict = {}
-        for mov in movimientos:
-            id_anexo = mov.id_anexo
-            id_convenio = mov.id_convenio
-
-            if not id_anexo or not id_convenio:
-                item_stmt = (
-                    select(ItemAnexo)
-                    .where(ItemAnexo.id_producto == mov.id_producto)
-                    .limit(1)
-                )
-                item_result = await db.exec(item_stmt)
-                item = item_result.first()
-                if item:
-                    id_anexo = id_anexo or item.id_anexo
-                    if not id_convenio:
-                        anexo_stmt = select(Anexo).where(
-                            Anexo.id_anexo == item.id_anexo
-                        )
-                        anexo_result = await db.exec(anexo_stmt)
-                        anexo = anexo_result.first()
-                        if anexo:
-                            id_convenio = anexo.id_convenio
-
-            if mov.id_producto not in productos_dict:
-                productos_dict[mov.id_producto] = {
-                    "id_producto": mov.id_producto,
-                    "nombre": mov.producto.nombre if mov.producto else "",
-                    "descripcion": mov.producto.descripcion if mov.producto else None,
-                    "cantidad": mov.cantidad,
-                    "codigo": mov.producto.codigo if mov.producto else None,
-                    "id_anexo": id_anexo,
-                    "id_convenio": id_convenio,
-                }
-            else:
-                productos_dict[mov.id_producto]["cantidad"] += mov.cantidad
+        productos_dict = await MovimientoService._agrupar_movimientos_por_producto(
+            db, movimientos
+        )
 
         return list(productos_dict.values())
 
@@ -614,22 +887,11 @@ class MovimientoService:
     async def get_stock_producto_dependencia(
         db: AsyncSession, producto_id: int, dependencia_id: int
     ) -> int:
-        """Obtener la suma de cantidades de movimientos de tipo RECEPCION/compra
-        para un producto en una dependencia específica.
+        """Obtener el stock de un producto en una dependencia específica.
+
+        Lectura por clave primaria del saldo materializado (stock_dependencia).
         """
-        statement = (
-            select(func.sum(Movimiento.cantidad))
-            .join(TipoMovimiento)
-            .where(
-                Movimiento.id_producto == producto_id,
-                Movimiento.id_dependencia == dependencia_id,
-                Movimiento.estado == "confirmado",
-                TipoMovimiento.tipo.in_(["RECEPCION", "compra"]),
-            )
-        )
-        result = await db.exec(statement)
-        total = result.one_or_none()
-        return int(total) if total else 0
+        return await stock_repo.get_stock(db, producto_id, dependencia_id)
 
     @staticmethod
     async def get_origen_recepcion(
@@ -819,6 +1081,9 @@ class MovimientoService:
             db: Sesión de base de datos
             ajuste: Datos del ajuste (id_movimiento_origen O id_producto + id_dependencia_origen)
 
+        Los movimientos se crean pendientes: el saldo de stock (stock_dependencia)
+        se actualiza cuando cada uno se confirma con confirmar_movimiento.
+
         Returns:
             Lista de movimientos creados (quitar + agregar)
         """
@@ -983,83 +1248,87 @@ class MovimientoService:
         return movimientos_creados
 
     @staticmethod
-    def crear_movimiento_en_otra_db(
+    async def crear_movimientos_en_otra_db(
         nombre_database: str,
-        movimiento_data: dict,
-    ) -> dict:
-        """Crear un movimiento en otra base de datos.
+        movimientos: List[dict],
+    ) -> List[dict]:
+        """Crear movimientos AJUSTE_AGREGAR en otra base de datos.
+
+        Usa el pool de conexiones de esa base (sin bloquear el event loop) y
+        una sola transacción con un INSERT de varias filas.
 
         Args:
             nombre_database: Nombre de la base de datos destino
-            movimiento_data: Datos del movimiento a crear
+            movimientos: Datos de los movimientos a crear
 
         Returns:
-            Dictionary con los datos del movimiento creado
+            Lista con los datos de cada movimiento creado
         """
+        if not movimientos:
+            return []
+        fecha = datetime.now(timezone.utc).replace(tzinfo=None)
         try:
-            conn = psycopg2.connect(
-                host=os.getenv("ADMIN_DB_HOST", "localhost"),
-                port=int(os.getenv("ADMIN_DB_PORT", 5432)),
-                user=os.getenv("ADMIN_DB_USER", "postgres"),
-                password=os.getenv("ADMIN_DB_PASSWORD"),
-                database=nombre_database,
-                client_encoding="utf8",
-            )
-            conn.autocommit = True
-            cur = conn.cursor()
-
-            # Obtener tipo de movimiento AJUSTE_AGREGAR
-            cur.execute(
-                "SELECT id_tipo_movimiento FROM tipo_movimiento WHERE tipo = 'AJUSTE_AGREGAR' LIMIT 1"
-            )
-            result = cur.fetchone()
-            if not result:
-                cur.close()
-                conn.close()
-                raise ValueError(
-                    f"Tipo de movimiento AJUSTE_AGREGAR no encontrado en {nombre_database}"
+            async with transaccion_en(nombre_database) as conn:
+                result = await conn.execute(
+                    select(TipoMovimiento.id_tipo_movimiento)
+                    .where(TipoMovimiento.tipo == "AJUSTE_AGREGAR")
+                    .limit(1)
                 )
-            id_tipo_movimiento = result[0]
-
-            # Insertar movimiento
-            cur.execute(
-                """INSERT INTO movimiento (
-                    id_tipo_movimiento, id_dependencia, id_producto, cantidad,
-                    fecha, observacion, id_cliente, precio_compra, moneda_compra,
-                    precio_venta, moneda_venta, id_convenio, estado, codigo
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id_movimiento
-            """,
-                (
-                    id_tipo_movimiento,
-                    movimiento_data.get("id_dependencia"),
-                    movimiento_data.get("id_producto"),
-                    movimiento_data.get("cantidad"),
-                    datetime.now(timezone.utc).isoformat(),
-                    movimiento_data.get("observacion"),
-                    movimiento_data.get("id_cliente"),
-                    movimiento_data.get("precio_compra"),
-                    movimiento_data.get("moneda_compra"),
-                    movimiento_data.get("precio_venta"),
-                    movimiento_data.get("moneda_venta"),
-                    movimiento_data.get("id_convenio"),
-                    "pendiente",
-                    movimiento_data.get("codigo"),
-                ),
-            )
+                id_tipo_movimiento = result.scalar_one_or_none()
+                if id_tipo_movimiento is None:
+                    raise ValueError(
+                        f"Tipo de movimiento AJUSTE_AGREGAR no encontrado en {nombre_database}"
+                    )
 
-            id_movimiento = cur.fetchone()[0] if cur.fetchone() else None
-            cur.close()
-            conn.close()
+                # executemany + sort_by_parameter_order: los ids vuelven en el
+                # orden de `movimientos`, que el RETURNING de un INSERT no garantiza
+                result = await conn.execute(
+                    insert(Movimiento).returning(
+                        Movimiento.id_movimiento, sort_by_parameter_order=True
+                    ),
+                    [
+                        {
+                        "id_tipo_movimiento": id_tipo_movimiento,
+                        "id_dependencia": m.get("id_dependencia"),
+                        "id_producto": m.get("id_producto"),
+                        "cantidad": m.get("cantidad"),
+                        "fecha": fecha,
+                        "observacion": m.get("observacion"),
+                        "id_cliente": m.get("id_cliente"),
+                        "precio_compra": m.get("precio_compra"),
+                        "moneda_compra": m.get("moneda_compra"),
+                        "precio_venta": m.get("precio_venta"),
+                        "moneda_venta": m.get("moneda_venta"),
+                        "id_convenio": m.get("id_convenio"),
+                        "estado": "pendiente",
+                        "codigo": m.get("codigo"),
+                    }
+                        for m in movimientos
+                    ],
+                )
+                ids = result.scalars().all()
+        except Exception as e:
+            logger.error(f"Error al crear movimientos en {nombre_database}: {e}")
+            raise
 
-            return {
+        return [
+            {
                 "id_movimiento": id_movimiento,
                 "tipo": "AJUSTE_AGREGAR",
-                "cantidad": movimiento_data.get("cantidad"),
-                "id_dependencia": movimiento_data.get("id_dependencia"),
+                "cantidad": m.get("cantidad"),
+                "id_dependencia": m.get("id_dependencia"),
                 "nombre_database": nombre_database,
             }
-        except Exception as e:
-            logger.error(f"Error al crear movimiento en {nombre_database}: {e}")
-            raise
+            for m, id_movimiento in zip(movimientos, ids)
+        ]
+
+    @staticmethod
+    async def crear_movimiento_en_otra_db(
+        nombre_database: str,
+        movimiento_data: dict,
+    ) -> dict:
+        """Crear un movimiento en otra base de datos."""
+        creados = await MovimientoService.crear_movimientos_en_otra_db(
+            nombre_database, [movimiento_data]
+        )
+        return creados[0]
@@ -0,0 +1,107 @@
+"""Hash y verificación de contraseñas (bcrypt) fuera del event loop.
+
+bcrypt tarda 100-300 ms por llamada a propósito; dentro de un handler async
+congela el worker de uvicorn entero. `password_executor.ejecutar(fn, *args)`
+corre la función en un pool de hilos propio (bcrypt libera el GIL), limita
+cuántas corren a la vez y, si ya hay `max_cola` esperando, rechaza al
+instante con 429 en vez de acumular logins que el cliente va a abandonar.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from src.core.exceptions import AppError
+
+T = TypeVar("T")
+
+
+class AuthSaturadaError(AppError):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            message="Demasiados inicios de sesión simultáneos, intente de nuevo",
+            status_code=429,
+        )
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class PasswordExecutor:
+    def __init__(self, max_workers: int = 2, max_cola: int = 32, retry_after: int = 2):
+        self.max_workers = max_workers
+        self.max_cola = max_cola
+        self.retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.en_cola = 0
+        self.en_curso = 0
+        self.max_en_cola = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.total_espera = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    def _get_semaforo(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaforo is None or self._loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.max_workers)
+            self._loop = loop
+        return self._semaforo
+
+    async def ejecutar(self, fn: Callable[..., T], *args: Any) -> T:
+        """Ejecuta `fn(*args)` en el pool o lanza AuthSaturadaError (429)."""
+        semaforo = self._get_semaforo()
+        if semaforo.locked() and self.en_cola >= self.max_cola:
+            self.rechazados += 1
+            raise AuthSaturadaError(self.retry_after)
+        self.en_cola += 1
+        self.max_en_cola = max(self.max_en_cola, self.en_cola)
+        inicio = time.perf_counter()
+        try:
+            await semaforo.acquire()
+        finally:
+            self.en_cola -= 1
+        self.total_espera += time.perf_counter() - inicio
+        self.en_curso += 1
+        try:
+            loop = asyncio.get_running_loop()
+            resultado = await loop.run_in_executor(self._get_executor(), fn, *args)
+            self.completados += 1
+            return resultado
+        finally:
+            self.en_curso -= 1
+            semaforo.release()
+
+    def stats(self) -> Dict[str, Any]:
+        atendidos = self.completados + self.en_curso
+        promedio = self.total_espera / atendidos if atendidos else 0.0
+        return {
+            "max_workers": self.max_workers,
+            "max_cola": self.max_cola,
+            "en_cola": self.en_cola,
+            "en_curso": self.en_curso,
+            "max_en_cola": self.max_en_cola,
+            "completados": self.completados,
+            "rechazados": self.rechazados,
+            "espera_promedio_ms": round(promedio * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_executor = PasswordExecutor(
+    max_workers=int(os.getenv("AUTH_WORKERS", "2")),
+    max_cola=int(os.getenv("AUTH_MAX_QUEUE", "32")),
+    retry_after=int(os.getenv("AUTH_RETRY_AFTER", "2")),
+)
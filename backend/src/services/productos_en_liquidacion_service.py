@@ -33,6 +33,18 @@ class ProductosEnLiquidacionService:
             return f"{denominacion}.{anio % 100}.{modulo}.{cantidad}"
         return f"{anio % 100}.{modulo}.{cantidad}"
 
+    @staticmethod
+    async def generate_codigos(
+        db: AsyncSession, n: int, denominacion: Optional[str] = None, modulo: str = "C"
+    ) -> List[str]:
+        """`n` códigos consecutivos para registros creados en la misma transacción."""
+        if n <= 0:
+            return []
+        anio = datetime.now().year
+        cantidad = await productos_en_liquidacion_repo.get_codigo_anio(db, anio)
+        prefijo = f"{denominacion}." if denominacion else ""
+        return [f"{prefijo}{anio % 100}.{modulo}.{cantidad + i}" for i in range(n)]
+
     @staticmethod
     async def create(
         db: AsyncSession, data: ProductosEnLiquidacionCreate, denominacion: Optional[str] = None
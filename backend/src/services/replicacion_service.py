@@ -1,185 +1,185 @@
+import logging
 import os
-import psycopg2
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
 from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.sucursales import en_cada_base, transaccion_en
+from src.services.jerarquia_service import jerarquia_cache
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# (tabla, datos, operacion, condicion)
+Operacion = Tuple[str, Dict[str, Any], str, Optional[Dict[str, Any]]]
+
+
+def _sentencia(
+    tabla: str,
+    datos: Dict[str, Any],
+    operacion: str,
+    condicion: Optional[Dict[str, Any]],
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """SQL y parámetros de una operación de replicación (None si no aplica)."""
+    params = {f"v_{k}": v for k, v in datos.items()}
+    params.update({f"c_{k}": v for k, v in (condicion or {}).items()})
+    where = " AND ".join(f"{k} = :c_{k}" for k in (condicion or {}))
+    if operacion == "INSERT":
+        columnas = ", ".join(datos)
+        valores = ", ".join(f":v_{k}" for k in datos)
+        return f"INSERT INTO {tabla} ({columnas}) VALUES ({valores})", params
+    if operacion == "UPDATE":
+        set_clause = ", ".join(f"{k} = :v_{k}" for k in datos)
+        sql = f"UPDATE {tabla} SET {set_clause}"
+        return (f"{sql} WHERE {where}" if where else sql), params
+    if operacion == "DELETE" and where:
+        return f"DELETE FROM {tabla} WHERE {where}", params
+    return None
+
 
 class ReplicacionService:
     CENTRAL_DB = "caguayosa"
 
     @staticmethod
-    def get_sucursales() -> List[Dict[str, Any]]:
+    async def get_sucursales() -> List[Dict[str, Any]]:
         try:
-            conn = psycopg2.connect(
-                host=os.getenv("ADMIN_DB_HOST", "localhost"),
-                port=int(os.getenv("ADMIN_DB_PORT", 5432)),
-                user=os.getenv("ADMIN_DB_USER", "postgres"),
-                password=os.getenv("ADMIN_DB_PASSWORD"),
-                database="caguayosa",
-            )
-            cur = conn.cursor()
-
-            cur.execute("""
-                SELECT nombre_database, host, puerto, usuario, contrasenia
-                FROM conexion_database
-                ORDER BY nombre_database
-            """)
-            rows = cur.fetchall()
+            return await ReplicacionService.listar_sucursales()
+        except Exception as e:
+            logger.error(f"[REPLICACION] Error getting sucursales: {e}")
+            return []
 
+    @staticmethod
+    async def listar_sucursales() -> List[Dict[str, Any]]:
+        """Como get_sucursales, pero propaga el error si la central no responde."""
+        async with transaccion_en(ReplicacionService.CENTRAL_DB) as conn:
+            result = await conn.execute(
+                text("""
+                    SELECT nombre_database, host, puerto, usuario, contrasenia
+                    FROM conexion_database
+                    ORDER BY nombre_database
+                """)
+            )
+            rows = result.all()
             if rows:
-                cur.close()
-                conn.close()
-                return [
-                    {
-                        "nombre_database": row[0],
-                        "host": row[1],
-                        "puerto": row[2],
-                        "usuario": row[3],
-                        "contrasenia": row[4],
-                    }
-                    for row in rows
-                ]
-
-            cur.execute("""
-                SELECT datname 
-                FROM pg_database 
-                WHERE datistemplate = false 
-                AND datname != 'caguayosa'
-                AND datname != 'postgres'
-                AND datname NOT LIKE 'template%'
-                ORDER BY datname
-            """)
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
-
+                return [dict(row._mapping) for row in rows]
+
+            result = await conn.execute(
+                text("""
+                    SELECT datname
+                    FROM pg_database
+                    WHERE datistemplate = false
+                    AND datname != 'caguayosa'
+                    AND datname != 'postgres'
+                    AND datname NOT LIKE 'template%'
+                    ORDER BY datname
+                """)
+            )
             return [
                 {
-                    "nombre_database": row[0],
+                    "nombre_database": datname,
                     "host": "localhost",
                     "puerto": 5432,
                     "usuario": "postgres",
                     "contrasenia": os.getenv("ADMIN_DB_PASSWORD"),
                 }
-                for row in rows
+                for datname in result.scalars().all()
             ]
-        except Exception as e:
-            print(f"[REPLICACION] Error getting sucursales: {e}")
-            return []
 
     @staticmethod
-    def get_conexion_sucursal(
+    @asynccontextmanager
+    async def get_conexion_sucursal(
         nombre_database: str,
-    ) -> Optional[psycopg2.extensions.connection]:
-        try:
-            conn = psycopg2.connect(
-                host=os.getenv("ADMIN_DB_HOST", "localhost"),
-                port=int(os.getenv("ADMIN_DB_PORT", 5432)),
-                user=os.getenv("ADMIN_DB_USER", "postgres"),
-                password=os.getenv("ADMIN_DB_PASSWORD"),
-                database=nombre_database,
-            )
-            return conn
-        except Exception as e:
-            print(f"[REPLICACION] Error connecting to {nombre_database}: {e}")
-            return None
+    ) -> AsyncIterator[AsyncConnection]:
+        """Conexión del pool de la sucursal, en una transacción."""
+        async with transaccion_en(nombre_database) as conn:
+            yield conn
+
+    @staticmethod
+    async def replicar_lote(operaciones: Sequence[Operacion]) -> Dict[str, bool]:
+        """Aplica todas las operaciones en cada sucursal, en una transacción
+        por sucursal y con varias sucursales a la vez. Devuelve base -> éxito.
+        """
+        sentencias = [
+            (tabla, operacion, s)
+            for tabla, datos, operacion, condicion in operaciones
+            if (s := _sentencia(tabla, datos, operacion, condicion)) is not None
+        ]
+        if not sentencias:
+            return {}
+        sucursales = [
+            s["nombre_database"]
+            for s in await ReplicacionService.get_sucursales()
+            if s["nombre_database"] != ReplicacionService.CENTRAL_DB
+        ]
+
+        async def _aplicar(conn: AsyncConnection) -> None:
+            for _, _, (sql, params) in sentencias:
+                await conn.execute(text(sql), params)
+
+        errores = await en_cada_base(sucursales, _aplicar)
+        if any(tabla == "dependencia" for tabla, _, _ in sentencias):
+            jerarquia_cache.invalidar()
+        descripcion = ", ".join(f"{op} {tabla}" for tabla, op, _ in sentencias)
+        for db_name, error in errores.items():
+            if error is None:
+                logger.info(f"[REPLICACION] {descripcion} on {db_name}")
+            else:
+                logger.error(
+                    f"[REPLICACION] Error on {db_name} ({descripcion}): {error}"
+                )
+        return {db_name: error is None for db_name, error in errores.items()}
 
     @staticmethod
-    def replicar_tabla(
+    async def replicar_tabla(
         tabla: str,
         datos: Dict[str, Any],
         operacion: str = "INSERT",
         condicion: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        sucursales = ReplicacionService.get_sucursales()
-
-        for sucursal in sucursales:
-            if sucursal["nombre_database"] == ReplicacionService.CENTRAL_DB:
-                continue
-
-            conn = ReplicacionService.get_conexion_sucursal(sucursal["nombre_database"])
-            if not conn:
-                continue
-
-            cur = conn.cursor()
-            try:
-                if operacion == "INSERT":
-                    columns = ", ".join(datos.keys())
-                    placeholders = ", ".join(["%s"] * len(datos))
-                    values = list(datos.values())
-                    cur.execute(
-                        f"INSERT INTO {tabla} ({columns}) VALUES ({placeholders})",
-                        values,
-                    )
-                elif operacion == "UPDATE":
-                    set_clause = ", ".join([f"{k} = %s" for k in datos.keys()])
-                    values = list(datos.values())
-                    if condicion:
-                        where_clause = " AND ".join(
-                            [f"{k} = %s" for k in condicion.keys()]
-                        )
-                        values += list(condicion.values())
-                        cur.execute(
-                            f"UPDATE {tabla} SET {set_clause} WHERE {where_clause}",
-                            values,
-                        )
-                    else:
-                        cur.execute(f"UPDATE {tabla} SET {set_clause}", values)
-                elif operacion == "DELETE":
-                    if condicion:
-                        where_clause = " AND ".join(
-                            [f"{k} = %s" for k in condicion.keys()]
-                        )
-                        values = list(condicion.values())
-                        cur.execute(f"DELETE FROM {tabla} WHERE {where_clause}", values)
-
-                conn.commit()
-                print(
-                    f"[REPLICACION] {operacion} on {sucursal['nombre_database']}.{tabla}"
-                )
-            except Exception as e:
-                conn.rollback()
-                print(
-                    f"[REPLICACION] Error on {sucursal['nombre_database']}.{tabla}: {e}"
-                )
-            finally:
-                cur.close()
-                conn.close()
+    ) -> Dict[str, bool]:
+        return await ReplicacionService.replicar_lote(
+            [(tabla, datos, operacion, condicion)]
+        )
 
     @staticmethod
-    def replicar_moneda(
+    async def replicar_moneda(
         datos: Dict[str, Any],
         operacion: str = "INSERT",
         condicion: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        ReplicacionService.replicar_tabla("moneda", datos, operacion, condicion)
+    ) -> Dict[str, bool]:
+        return await ReplicacionService.replicar_tabla(
+            "moneda", datos, operacion, condicion
+        )
 
     @staticmethod
-    def replicar_tipo_dependencia(
+    async def replicar_tipo_dependencia(
         datos: Dict[str, Any],
         operacion: str = "INSERT",
         condicion: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        ReplicacionService.replicar_tabla(
+    ) -> Dict[str, bool]:
+        return await ReplicacionService.replicar_tabla(
             "tipo_dependencia", datos, operacion, condicion
         )
 
     @staticmethod
-    def replicar_dependencia(
+    async def replicar_dependencia(
         datos: Dict[str, Any],
         operacion: str = "INSERT",
         condicion: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        ReplicacionService.replicar_tabla("dependencia", datos, operacion, condicion)
+    ) -> Dict[str, bool]:
+        return await ReplicacionService.replicar_tabla(
+            "dependencia", datos, operacion, condicion
+        )
 
     @staticmethod
-    def replicar_cuenta_dependencia(
+    async def replicar_cuenta_dependencia(
         datos: Dict[str, Any],
         operacion: str = "INSERT",
         condicion: Optional[Dict[str, Any]] = None,
-    ) -> None:
-        ReplicacionService.replicar_tabla(
+    ) -> Dict[str, bool]:
+        return await ReplicacionService.replicar_tabla(
             "cuenta_dependencias", datos, operacion, condicion
         )
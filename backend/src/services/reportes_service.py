@@ -1,8 +1,10 @@
 from datetime import date
+from decimal import Decimal
 from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import case, func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 
 from src.models.cliente import Cliente
 from src.models.cliente_juridica import ClienteJuridica
@@ -15,6 +17,7 @@ from src.models.moneda import Moneda
 from src.models.producto import Productos
 from src.models.movimiento import Movimiento, TipoMovimiento
 from src.models.productos_en_liquidacion import ProductosEnLiquidacion
+from src.models.stock_dependencia import StockDependencia
 from src.models.servicio import (
     Etapa,
     PersonaEtapa,
@@ -95,15 +98,11 @@ async def get_existencias(db: AsyncSession, id_dependencia: int):
         select(
             Productos.codigo.label("codigo"),
             Productos.nombre.label("descripcion"),
-            func.sum(Movimiento.cantidad * TipoMovimiento.factor).label("cantidad"),
+            StockDependencia.stock.label("cantidad"),
         )
-        .join(Productos, Movimiento.id_producto == Productos.id_producto)
-        .join(
-            TipoMovimiento,
-            Movimiento.id_tipo_movimiento == TipoMovimiento.id_tipo_movimiento,
-        )
-        .filter(Movimiento.id_dependencia == id_dependencia)
-        .group_by(Productos.codigo, Productos.nombre)
+        .join(Productos, StockDependencia.id_producto == Productos.id_producto)
+        .filter(StockDependencia.id_dependencia == id_dependencia)
+        .order_by(Productos.nombre)
     )
 
     result = await db.execute(query)
@@ -116,29 +115,23 @@ async def get_existencias(db: AsyncSession, id_dependencia: int):
     return existencias, dependencia_info
 
 
-async def get_movimientos_dependencia(
-    db: AsyncSession, id_dependencia: int, fecha_inicio, fecha_fin
-):
-    result = await db.execute(
-        select(Dependencia).filter(Dependencia.id_dependencia == id_dependencia)
-    )
-    dependencia = result.scalar_one_or_none()
-    dependencia_info = (
-        {"nombre": dependencia.nombre, "direccion": dependencia.direccion}
-        if dependencia
-        else {}
-    )
+# Filas que trae cada viaje al cursor del servidor en las exportaciones
+FILAS_POR_LOTE_EXPORTACION = 1000
 
-    query = (
+_TIPO_MOVIMIENTO = case(
+    (TipoMovimiento.factor > 0, "Entrada"),
+    (TipoMovimiento.factor < 0, "Salida"),
+    else_="Neutro",
+).label("tipo")
+
+
+def _consulta_movimientos_dependencia(id_dependencia: int, fecha_inicio, fecha_fin):
+    return (
         select(
             Movimiento.fecha,
             TipoMovimiento.tipo.label("operacion"),
             Productos.nombre.label("producto"),
-            case(
-                (TipoMovimiento.factor > 0, "Entrada"),
-                (TipoMovimiento.factor < 0, "Salida"),
-                else_="Neutro",
-            ).label("tipo"),
+            _TIPO_MOVIMIENTO,
             Movimiento.cantidad,
         )
         .join(
@@ -154,6 +147,72 @@ async def get_movimientos_dependencia(
         .order_by(Movimiento.fecha.desc())
     )
 
+
+def _consulta_movimientos_producto(
+    id_dependencia: int, id_producto: int, fecha_inicio, fecha_fin
+):
+    return (
+        select(
+            Movimiento.fecha,
+            TipoMovimiento.tipo.label("operacion"),
+            _TIPO_MOVIMIENTO,
+            Movimiento.cantidad,
+        )
+        .join(
+            TipoMovimiento,
+            Movimiento.id_tipo_movimiento == TipoMovimiento.id_tipo_movimiento,
+        )
+        .filter(
+            Movimiento.id_dependencia == id_dependencia,
+            Movimiento.id_producto == id_producto,
+            Movimiento.fecha >= fecha_inicio,
+            Movimiento.fecha <= fecha_fin,
+        )
+        .order_by(Movimiento.fecha.desc())
+    )
+
+
+async def _stream(db: AsyncSession, query) -> AsyncResult:
+    """Ejecuta `query` con un cursor del servidor: las filas llegan por lotes
+    de FILAS_POR_LOTE_EXPORTACION a medida que se itera el resultado."""
+    return await db.stream(
+        query.execution_options(yield_per=FILAS_POR_LOTE_EXPORTACION)
+    )
+
+
+async def stream_movimientos_dependencia(
+    db: AsyncSession, id_dependencia: int, fecha_inicio, fecha_fin
+) -> AsyncResult:
+    return await _stream(
+        db, _consulta_movimientos_dependencia(id_dependencia, fecha_inicio, fecha_fin)
+    )
+
+
+async def stream_movimientos_producto(
+    db: AsyncSession, id_dependencia: int, id_producto: int, fecha_inicio, fecha_fin
+) -> AsyncResult:
+    return await _stream(
+        db,
+        _consulta_movimientos_producto(
+            id_dependencia, id_producto, fecha_inicio, fecha_fin
+        ),
+    )
+
+
+async def get_movimientos_dependencia(
+    db: AsyncSession, id_dependencia: int, fecha_inicio, fecha_fin
+):
+    result = await db.execute(
+        select(Dependencia).filter(Dependencia.id_dependencia == id_dependencia)
+    )
+    dependencia = result.scalar_one_or_none()
+    dependencia_info = (
+        {"nombre": dependencia.nombre, "direccion": dependencia.direccion}
+        if dependencia
+        else {}
+    )
+
+    query = _consulta_movimientos_dependencia(id_dependencia, fecha_inicio, fecha_fin)
     result = await db.execute(query)
     results = result.all()
 
@@ -192,30 +251,9 @@ async def get_movimientos_producto(
         {"codigo": producto.codigo, "nombre": producto.nombre} if producto else {}
     )
 
-    query = (
-        select(
-            Movimiento.fecha,
-            TipoMovimiento.tipo.label("operacion"),
-            case(
-                (TipoMovimiento.factor > 0, "Entrada"),
-                (TipoMovimiento.factor < 0, "Salida"),
-                else_="Neutro",
-            ).label("tipo"),
-            Movimiento.cantidad,
-        )
-        .join(
-            TipoMovimiento,
-            Movimiento.id_tipo_movimiento == TipoMovimiento.id_tipo_movimiento,
-        )
-        .filter(
-            Movimiento.id_dependencia == id_dependencia,
-            Movimiento.id_producto == id_producto,
-            Movimiento.fecha >= fecha_inicio,
-            Movimiento.fecha <= fecha_fin,
-        )
-        .order_by(Movimiento.fecha.desc())
+    query = _consulta_movimientos_producto(
+        id_dependencia, id_producto, fecha_inicio, fecha_fin
     )
-
     result = await db.execute(query)
     results = result.all()
 
@@ -659,84 +697,83 @@ async def get_reporte_onat(
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+# Escalas de ingresos del reporte MINCULT: (etiqueta, desde, hasta). Cada
+# liquidación cae en la primera escala con devengado <= hasta; la última no
+# tiene tope (hasta = None) y lo que no llega a la primera cuenta en ella.
+ESCALAS_MINCULT: List[Tuple[str, int, Optional[int]]] = [
+    ("Hasta 100", 0, 100),
+    ("De 101 a 500", 101, 500),
+    ("De 501 a 1000", 501, 1000),
+    ("De 1001 a 2000", 1001, 2000),
+    ("De 2001 a 3000", 2001, 3000),
+    ("De 3001 a 5000", 3001, 5000),
+    ("De 5001 a 10000", 5001, 10000),
+    ("De 10001 a 15000", 10001, 15000),
+    ("De 15001 a 20000", 15001, 20000),
+    ("Más de 20000", 20001, None),
+]
+
+
 async def get_reporte_mincult(
     db: AsyncSession,
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
+    escalas: Optional[List[Tuple[str, int, Optional[int]]]] = None,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    """Obtiene distribución por escalas de ingresos para MINCULT."""
-    # Definir los brackets
-    brackets = [
-        ("Hasta 100", 0, 100),
-        ("De 101 a 500", 101, 500),
-        ("De 501 a 1000", 501, 1000),
-        ("De 1001 a 2000", 1001, 2000),
-        ("De 2001 a 3000", 2001, 3000),
-        ("De 3001 a 5000", 3001, 5000),
-        ("De 5001 a 10000", 5001, 10000),
-        ("De 10001 a 15000", 10001, 15000),
-        ("De 15001 a 20000", 15001, 20000),
-        ("Más de 20000", 20001, 99999999),
-    ]
-
-    # Query base: obtener todas las liquidaciones de personas en el período
-    query = select(PersonaLiquidacion)
+    """Obtiene distribución por escalas de ingresos para MINCULT.
+
+    La clasificación, las sumas y los artistas distintos por escala se
+    calculan en la BD (una fila por escala con datos), así que la memoria no
+    depende de la cantidad de liquidaciones del período.
+    """
+    escalas = escalas or ESCALAS_MINCULT
+    escala = case(
+        *[
+            (PersonaLiquidacion.devengado <= hasta, i)
+            for i, (_, _, hasta) in enumerate(escalas)
+            if hasta is not None
+        ],
+        else_=len(escalas) - 1,
+    ).label("escala")
+
+    query = select(
+        escala,
+        func.count().label("cantidad"),
+        func.coalesce(func.sum(PersonaLiquidacion.devengado), 0).label("total"),
+        func.count(PersonaLiquidacion.id_persona.distinct()).label("artistas"),
+    )
 
     if fecha_inicio:
         query = query.filter(PersonaLiquidacion.fecha_emision >= fecha_inicio)
     if fecha_fin:
         query = query.filter(PersonaLiquidacion.fecha_emision <= fecha_fin)
 
-    result = await db.execute(query)
-    liquidaciones = result.scalars().all()
-
-    # Clasificar en brackets
-    bracket_counts: Dict[str, int] = {}
-    bracket_sums: Dict[str, float] = {}
-    bracket_artists: Dict[str, set] = {}
-
-    for label, lo, hi in brackets:
-        bracket_counts[label] = 0
-        bracket_sums[label] = 0.0
-        bracket_artists[label] = set()
-
-    for pl in liquidaciones:
-        dev = float(pl.devengado)
-        for label, lo, hi in brackets:
-            if lo <= dev <= hi:
-                bracket_counts[label] += 1
-                bracket_sums[label] += dev
-                if pl.id_persona:
-                    bracket_artists[label].add(pl.id_persona)
-                break
-        else:
-            # Si no encaja en ningún bracket (devengado = 0 o negativo)
-            bracket_counts["Hasta 100"] += 1
-            bracket_sums["Hasta 100"] += dev
-            if pl.id_persona:
-                bracket_artists["Hasta 100"].add(pl.id_persona)
+    result = await db.execute(query.group_by(escala))
+    por_escala = {r.escala: r for r in result.all()}
 
     data = []
-    for label, lo, hi in brackets:
+    total_liquidaciones = 0
+    total_devengado = Decimal("0")
+    for i, (label, lo, hi) in enumerate(escalas):
+        r = por_escala.get(i)
+        cantidad = r.cantidad if r else 0
+        total = Decimal(r.total) if r else Decimal("0")
+        total_liquidaciones += cantidad
+        total_devengado += total
         data.append(
             {
                 "bracket": label,
                 "desde": lo,
-                "hasta": hi if hi != 99999999 else None,
-                "cantidad": bracket_counts[label],
-                "total_devengado": round(bracket_sums[label], 2),
-                "cantidad_artistas": len(bracket_artists[label]),
+                "hasta": hi,
+                "cantidad": cantidad,
+                "total_devengado": round(float(total), 2),
+                "cantidad_artistas": r.artistas if r else 0,
             }
         )
 
-    # También incluir fila "Sin ingresos" (devengado = 0)
-    # ya está incluida en "Hasta 100"
-
     meta = {
-        "total_liquidaciones": len(liquidaciones),
-        "total_devengado_general": round(
-            sum(float(pl.devengado) for pl in liquidaciones), 2
-        ),
+        "total_liquidaciones": total_liquidaciones,
+        "total_devengado_general": round(float(total_devengado), 2),
         "fecha_inicio": fecha_inicio.isoformat() if fecha_inicio else None,
         "fecha_fin": fecha_fin.isoformat() if fecha_fin else None,
     }
@@ -748,25 +785,88 @@ async def get_reporte_mincult(
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-async def get_resumen_liquidaciones(
-    db: AsyncSession,
+# Importes de la liquidación que se suman en la fila de totales (ROLLUP)
+_IMPORTES_LIQUIDACION = (
+    "devengado",
+    "tributario",
+    "comision_bancaria",
+    "gasto_empresa",
+    "importe",
+    "neto_pagar",
+    "importe_caguayo",
+    "tributario_monto",
+)
+
+
+def _consulta_resumen_liquidaciones(
     fecha_inicio: Optional[date] = None,
     fecha_fin: Optional[date] = None,
     id_cliente: Optional[int] = None,
-    tipo_concepto: Optional[int] = None,
-) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-    """Obtiene resumen de liquidaciones con cliente, moneda, productos."""
+):
+    """Una sola consulta: una fila por liquidación con sus productos en un
+    `jsonb_agg` y, al final, la fila de totales de `GROUP BY ROLLUP`. Las
+    sumas se hacen en NUMERIC, sin pasar por float."""
+    productos = (
+        select(
+            ProductosEnLiquidacion.id_liquidacion,
+            func.jsonb_agg(
+                aggregate_order_by(
+                    func.jsonb_build_object(
+                        "codigo",
+                        func.coalesce(Productos.codigo, ""),
+                        "nombre",
+                        func.coalesce(Productos.nombre, ""),
+                        "cantidad",
+                        ProductosEnLiquidacion.cantidad,
+                        "precio",
+                        ProductosEnLiquidacion.precio,
+                    ),
+                    ProductosEnLiquidacion.id_producto_en_liquidacion,
+                ),
+                type_=JSONB,
+            ).label("productos"),
+        )
+        .join(
+            Productos,
+            ProductosEnLiquidacion.id_producto == Productos.id_producto,
+            isouter=True,
+        )
+        .group_by(ProductosEnLiquidacion.id_liquidacion)
+        .subquery("productos_liquidacion")
+    )
+
+    # Columnas de cada fila; en la fila de totales quedan en NULL
+    columnas = (
+        Liquidacion.id_liquidacion,
+        Liquidacion.codigo,
+        Liquidacion.fecha_emision,
+        Liquidacion.fecha_liquidacion,
+        Cliente.nombre.label("cliente_nombre"),
+        Cliente.nit.label("cliente_nit"),
+        Cliente.codigo.label("cliente_codigo"),
+        Moneda.nombre.label("moneda_nombre"),
+        Moneda.simbolo.label("moneda_simbolo"),
+        Liquidacion.porcentaje_caguayo,
+        Liquidacion.tipo_pago,
+        Liquidacion.liquidada,
+        productos.c.productos,
+    )
     query = (
         select(
-            Liquidacion,
-            Cliente.nombre.label("cliente_nombre"),
-            Cliente.nit.label("cliente_nit"),
-            Cliente.codigo.label("cliente_codigo"),
-            Moneda.nombre.label("moneda_nombre"),
-            Moneda.simbolo.label("moneda_simbolo"),
+            *columnas,
+            *(
+                func.coalesce(func.sum(getattr(Liquidacion, c)), 0).label(c)
+                for c in _IMPORTES_LIQUIDACION
+            ),
+            func.grouping(Liquidacion.id_liquidacion).label("es_total"),
         )
         .join(Cliente, Liquidacion.id_cliente == Cliente.id_cliente)
         .join(Moneda, Liquidacion.id_moneda == Moneda.id_moneda)
+        .join(
+            productos,
+            productos.c.id_liquidacion == Liquidacion.id_liquidacion,
+            isouter=True,
+        )
     )
 
     if fecha_inicio:
@@ -776,88 +876,54 @@ async def get_resumen_liquidaciones(
     if id_cliente is not None:
         query = query.filter(Liquidacion.id_cliente == id_cliente)
 
-    query = query.order_by(Liquidacion.fecha_emision.desc())
-    result = await db.execute(query)
-    rows = result.all()
+    return query.group_by(func.rollup(tuple_(*columnas))).order_by(
+        func.grouping(Liquidacion.id_liquidacion),
+        Liquidacion.fecha_emision.desc(),
+    )
+
+
+async def get_resumen_liquidaciones(
+    db: AsyncSession,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    id_cliente: Optional[int] = None,
+    tipo_concepto: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Obtiene resumen de liquidaciones con cliente, moneda, productos."""
+    result = await db.execute(
+        _consulta_resumen_liquidaciones(fecha_inicio, fecha_fin, id_cliente)
+    )
 
     data = []
-    totales_acum = {
-        "total_devengado": 0.0,
-        "total_tributario": 0.0,
-        "total_comision_bancaria": 0.0,
-        "total_gasto_empresa": 0.0,
-        "total_importe": 0.0,
-        "total_neto_pagar": 0.0,
-        "total_importe_caguayo": 0.0,
-        "total_tributario_monto": 0.0,
-    }
+    totales_acum = {f"total_{c}": 0.0 for c in _IMPORTES_LIQUIDACION}
+    for r in result.all():
+        if r.es_total:
+            totales_acum = {
+                f"total_{c}": float(getattr(r, c)) for c in _IMPORTES_LIQUIDACION
+            }
+            continue
 
-    for r in rows:
-        liq: Liquidacion = r[0]
-
-        # Obtener productos asociados
-        prod_query = (
-            select(
-                ProductosEnLiquidacion,
-                Productos.nombre.label("producto_nombre"),
-                Productos.codigo.label("producto_codigo"),
-            )
-            .join(
-                Productos,
-                ProductosEnLiquidacion.id_producto == Productos.id_producto,
-                isouter=True,
-            )
-            .filter(ProductosEnLiquidacion.id_liquidacion == liq.id_liquidacion)
-        )
-        prod_result = await db.execute(prod_query)
-        prod_rows = prod_result.all()
-
-        productos = []
-        for pr in prod_rows:
-            pel: ProductosEnLiquidacion = pr[0]
-            productos.append(
-                {
-                    "codigo": pr.producto_codigo or "",
-                    "nombre": pr.producto_nombre or "",
-                    "cantidad": pel.cantidad,
-                    "precio": float(pel.precio),
-                }
-            )
-
-        item = {
-            "id_liquidacion": liq.id_liquidacion,
-            "codigo": liq.codigo,
-            "fecha_emision": liq.fecha_emision,
-            "fecha_liquidacion": liq.fecha_liquidacion,
-            "cliente_nombre": r.cliente_nombre,
-            "cliente_nit": r.cliente_nit or "",
-            "cliente_codigo": r.cliente_codigo,
-            "moneda": f"{r.moneda_simbolo} ({r.moneda_nombre})"
-            if r.moneda_nombre
-            else "",
-            "devengado": float(liq.devengado),
-            "tributario": float(liq.tributario),
-            "comision_bancaria": float(liq.comision_bancaria),
-            "gasto_empresa": float(liq.gasto_empresa),
-            "importe": float(liq.importe),
-            "neto_pagar": float(liq.neto_pagar),
-            "porcentaje_caguayo": float(liq.porcentaje_caguayo),
-            "importe_caguayo": float(liq.importe_caguayo),
-            "tributario_monto": float(liq.tributario_monto),
-            "tipo_pago": liq.tipo_pago,
-            "liquidada": liq.liquidada,
-            "productos": productos,
-        }
-        data.append(item)
-
-        totales_acum["total_devengado"] += item["devengado"]
-        totales_acum["total_tributario"] += item["tributario"]
-        totales_acum["total_comision_bancaria"] += item["comision_bancaria"]
-        totales_acum["total_gasto_empresa"] += item["gasto_empresa"]
-        totales_acum["total_importe"] += item["importe"]
-        totales_acum["total_neto_pagar"] += item["neto_pagar"]
-        totales_acum["total_importe_caguayo"] += item["importe_caguayo"]
-        totales_acum["total_tributario_monto"] += item["tributario_monto"]
+        data.append(
+            {
+                "id_liquidacion": r.id_liquidacion,
+                "codigo": r.codigo,
+                "fecha_emision": r.fecha_emision,
+                "fecha_liquidacion": r.fecha_liquidacion,
+                "cliente_nombre": r.cliente_nombre,
+                "cliente_nit": r.cliente_nit or "",
+                "cliente_codigo": r.cliente_codigo,
+                "moneda": f"{r.moneda_simbolo} ({r.moneda_nombre})"
+                if r.moneda_nombre
+                else "",
+                **{c: float(getattr(r, c)) for c in _IMPORTES_LIQUIDACION},
+                "porcentaje_caguayo": float(r.porcentaje_caguayo),
+                "tipo_pago": r.tipo_pago,
+                "liquidada": r.liquidada,
+                "productos": [
+                    {**p, "precio": float(p["precio"])} for p in r.productos or []
+                ],
+            }
+        )
 
     meta = {
         "total_items": len(data),
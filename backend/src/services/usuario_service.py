@@ -4,6 +4,8 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 from src.repository.base import CRUDBase
+from src.services.auth_cache import usuario_cache
+from src.services.password_executor import password_executor
 from src.models import Grupo, Usuario, GrupoFuncionalidad
 from src.dto import (
     GrupoCreate,
@@ -96,12 +98,14 @@ class GrupoService:
 
             await db.commit()
             await db.refresh(db_obj)
+            usuario_cache.invalidar_grupo(id)
             return await GrupoService._build_grupo_read(db, db_obj)
         return None
 
     @staticmethod
     async def delete(db: AsyncSession, id: int) -> bool:
         result = await grupo_repo.remove(db, id=id)
+        usuario_cache.invalidar_grupo(id)
         return result is not None
 
     @staticmethod
@@ -136,16 +140,20 @@ class UsuarioService:
         return f"{nombre.lower()}.{primer_apellido.lower()}"
 
     @staticmethod
-    def _generar_contrasenia() -> tuple[str, str]:
+    def _hashear(password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+    @staticmethod
+    async def _generar_contrasenia() -> tuple[str, str]:
         import random
         import string
 
         password_temporal = "".join(
             random.choices(string.ascii_lowercase + string.digits, k=8)
         )
-        contrasenia_hasheada = bcrypt.hashpw(
-            password_temporal.encode("utf-8"), bcrypt.gensalt()
-        ).decode("utf-8")
+        contrasenia_hasheada = await password_executor.ejecutar(
+            UsuarioService._hashear, password_temporal
+        )
         return contrasenia_hasheada, password_temporal
 
     @staticmethod
@@ -156,12 +164,12 @@ class UsuarioService:
         )
 
         if data.contrasenia:
-            contrasenia = bcrypt.hashpw(
-                data.contrasenia.encode("utf-8"), bcrypt.gensalt()
-            ).decode("utf-8")
+            contrasenia = await password_executor.ejecutar(
+                UsuarioService._hashear, data.contrasenia
+            )
             password_temporal = data.contrasenia
         else:
-            contrasenia, password_temporal = UsuarioService._generar_contrasenia()
+            contrasenia, password_temporal = await UsuarioService._generar_contrasenia()
 
         # Crear objeto con todos los datos
         usuario_data = {
@@ -331,6 +339,7 @@ class UsuarioService:
             return None
 
         updated = await usuario_repo.update(db, db_obj=db_obj, obj_in=data)
+        usuario_cache.invalidar_usuario(id)
 
         # Recargar para obtener las relaciones
         statement = (
@@ -376,4 +385,5 @@ class UsuarioService:
     @staticmethod
     async def delete(db: AsyncSession, id: int) -> bool:
         result = await usuario_repo.remove(db, id=id)
+        usuario_cache.invalidar_usuario(id)
         return result is not None
@@ -2,15 +2,12 @@ import logging
 from typing import Optional
 from fastapi import Header, Depends, HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.orm import sessionmaker
-from src.database.connection import get_session, AUTH_DATABASE, _get_engine_for_db
+from src.database.connection import get_session, AUTH_DATABASE, engine_registry
 from src.services.auth_service import decode_token
 
 logger = logging.getLogger(__name__)
 
-_auth_async_session = sessionmaker(
-    _get_engine_for_db(AUTH_DATABASE), class_=AsyncSession, expire_on_commit=False
-)
+_auth_async_session = engine_registry.get_session_factory(AUTH_DATABASE)
 
 
 async def _get_nit_from_token(
@@ -1,22 +1,27 @@
 import logging
+from typing import Optional
 
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.connection import get_session
+from src.database.connection import get_auth_session, get_session
 from src.dto.auth_dto import UsuarioInfo
 from src.services.auth_service import get_current_user
+from src.services.replicacion_service import ReplicacionService
 
 logger = logging.getLogger(__name__)
 
 
 async def require_auth(
+    request: Request,
     authorization: str = Header(...),
     db_auth: AsyncSession = Depends(get_session),
 ) -> UsuarioInfo:
     """FastAPI dependency that requires a valid JWT Bearer token.
 
-    Returns UsuarioInfo if the token is valid.
+    Returns UsuarioInfo if the token is valid. Reuses the JWT payload decoded
+    by database_middleware and the cached user, so warm requests do not hit
+    the database.
     Raises HTTPException(401) if the token is missing, malformed, invalid or expired.
     """
     if not authorization.startswith("Bearer "):
@@ -27,7 +32,8 @@ async def require_auth(
         )
 
     token = authorization.replace("Bearer ", "")
-    usuario = await get_current_user(db_auth, token)
+    payload = getattr(request.state, "jwt_payload", None)
+    usuario = await get_current_user(db_auth, token, payload)
 
     if not usuario:
         logger.warning("Intento de acceso con token inválido o expirado")
@@ -37,3 +43,33 @@ async def require_auth(
         )
 
     return usuario
+
+
+async def get_usuario_casa_matriz(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    db_auth: AsyncSession = Depends(get_auth_session),
+) -> UsuarioInfo:
+    """Auth obligatoria para lo que abarca todas las sucursales (reportes
+    consolidados, /health/*).
+
+    401 sin token válido; 403 si el usuario no pertenece a la casa matriz
+    (su dependencia no usa la BD central).
+    """
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Token de autenticación requerido")
+    token = authorization.replace("Bearer ", "")
+    payload = getattr(request.state, "jwt_payload", None)
+    usuario = await get_current_user(db_auth, token, payload)
+    if not usuario:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+    if (
+        usuario.dependencia is None
+        or usuario.dependencia.base_datos != ReplicacionService.CENTRAL_DB
+    ):
+        logger.warning(f"Usuario '{usuario.alias}' sin acceso de casa matriz")
+        raise HTTPException(
+            status_code=403,
+            detail="Solo la casa matriz puede consultar todas las sucursales",
+        )
+    return usuario
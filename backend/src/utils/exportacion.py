@@ -0,0 +1,84 @@
+"""Exportación en streaming (CSV / JSON Lines) de los previews de reportes.
+
+Las filas se leen de un `AsyncResult` abierto con cursor del servidor
+(`yield_per`) y se serializan en bloques que `StreamingResponse` envía según
+llegan. Nunca hay en memoria más de un lote de filas ni más de un bloque de
+salida, así que el consumo no depende del tamaño del reporte y el primer
+byte sale con el primer lote.
+"""
+
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncResult
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_EXPORTACION = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+# Patrón para validar `?format=` en los endpoints
+PATRON_FORMATO = f"^({'|'.join(FORMATOS_EXPORTACION)})$"
+
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _valor_csv(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return "" if valor is None else valor
+
+
+def _csv(filas: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_valor_csv(v) for v in fila] for fila in filas)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _jsonl(columnas: Sequence[str], filas: Sequence[Sequence[Any]]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_valor_json)
+        + "\n"
+        for fila in filas
+    ).encode("utf-8")
+
+
+async def _bloques(result: AsyncResult, formato: str) -> AsyncIterator[bytes]:
+    columnas = list(result.keys())
+    try:
+        if formato == "csv":
+            yield _csv([columnas])
+        # Con yield_per, partitions() entrega un lote del cursor a la vez
+        async for lote in result.partitions():
+            yield _csv(lote) if formato == "csv" else _jsonl(columnas, lote)
+    except Exception:
+        # Los encabezados ya se enviaron: solo queda cortar la respuesta
+        logger.error("Error en la exportación en streaming", exc_info=True)
+        raise
+    finally:
+        await result.close()
+
+
+def respuesta_exportacion(
+    result: AsyncResult, formato: str, nombre: str
+) -> StreamingResponse:
+    """StreamingResponse con las filas de `result` en `formato` (csv|jsonl)."""
+    return StreamingResponse(
+        _bloques(result, formato),
+        media_type=FORMATOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f"attachment; filename={nombre}.{formato}"},
+    )
@@ -16,7 +16,7 @@ class AppLogger:
         usuario_id: Optional[int] = None,
         usuario_nombre: Optional[str] = None,
     ):
-        """Guarda un log de negocio"""
+        """Encola un log de negocio (lo escribe log_writer en segundo plano)"""
         log_data = {
             "nivel": nivel,
             "tipo": tipo,
@@ -26,17 +26,10 @@ class AppLogger:
             "usuario_nombre": usuario_nombre,
         }
 
-        try:
-            from src.database.connection import get_session
-            from src.models.log import LogEntry
+        from src.services.log_writer import log_writer
 
-            async for db in get_session():
-                db_obj = LogEntry(**log_data)
-                db.add(db_obj)
-                await db.commit()
-                break
-        except Exception as e:
-            logger.error(f"Error saving business log: {e}")
+        if not await log_writer.enviar_async(log_data):
+            logger.warning(f"Log de negocio descartado: {mensaje}")
 
     @staticmethod
     async def log_action(
@@ -88,7 +81,7 @@ class AppLogger:
         usuario_id: Optional[int] = None,
         usuario_nombre: Optional[str] = None,
     ):
-        """Guarda un log de error del frontend"""
+        """Encola un log de error del frontend"""
         log_data = {
             "nivel": "ERROR",
             "tipo": "FRONTEND",
@@ -100,14 +93,7 @@ class AppLogger:
             "usuario_nombre": usuario_nombre,
         }
 
-        try:
-            from src.database.connection import get_session
-            from src.models.log import LogEntry
+        from src.services.log_writer import log_writer
 
-            async for db in get_session():
-                db_obj = LogEntry(**log_data)
-                db.add(db_obj)
-                await db.commit()
-                break
-        except Exception as e:
-            logger.error(f"Error saving frontend log: {e}")
+        if not await log_writer.enviar_async(log_data):
+            logger.warning(f"Log de frontend descartado: {mensaje}")
@@ -195,7 +195,7 @@ def generar_pdf_movimientos_dependencia(
     )
 
     headers = ["FECHA", "OPERACIÓN", "PRODUCTO", "TIPO", "CANTIDAD"]
-    data = [
+    data = (
         [
             str(m.get("fecha", "")),
             str(m.get("operacion", "")),
@@ -204,9 +204,10 @@ def generar_pdf_movimientos_dependencia(
             format_quantity(m.get("cantidad", 0)),
         ]
         for m in movimientos
-    ]
+    )
 
-    template.add_table(
+    # Puede tener miles de filas: se maqueta por páginas sin tabla gigante
+    template.add_table_chunked(
         headers,
         data,
         numeric_columns=[4],
@@ -257,7 +258,7 @@ def generar_pdf_movimientos_producto(
     )
 
     headers = ["FECHA", "OPERACIÓN", "TIPO", "CANTIDAD"]
-    data = [
+    data = (
         [
             str(m.get("fecha", "")),
             str(m.get("operacion", "")),
@@ -265,9 +266,9 @@ def generar_pdf_movimientos_producto(
             format_quantity(m.get("cantidad", 0)),
         ]
         for m in movimientos
-    ]
+    )
 
-    template.add_table(
+    template.add_table_chunked(
         headers,
         data,
         numeric_columns=[3],
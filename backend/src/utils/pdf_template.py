@@ -7,8 +7,11 @@ paginación, firmas y sección de notas, optimizada para bajo consumo
 de tinta (estética monocromática y minimalista).
 """
 
+import os
+import tempfile
 from io import BytesIO
-from typing import Dict, List, Optional
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 from datetime import datetime
 
 from reportlab.lib.pagesizes import letter, landscape
@@ -16,6 +19,7 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
 from reportlab.lib.colors import white, black
 from reportlab.platypus import (
+    Flowable,
     SimpleDocTemplate,
     Table,
     TableStyle,
@@ -43,6 +47,105 @@ TOTALS_BG = white  # white background for totals row
 TOTALS_LINE = black  # totals line in black
 HR_COLOR = black  # horizontal rule in black
 
+# ─── Large reports ─────────────────────────────────────────────────────
+# Rows laid out per Table in add_table_chunked (about one page)
+CHUNK_ROWS = 60
+# Rows inspected to detect numeric columns in add_table_chunked
+TYPE_SAMPLE_ROWS = 50
+# PDFs bigger than this are kept in a temporary file instead of memory
+PDF_SPOOL_BYTES = int(os.getenv("PDF_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+
+class PDFSpooledFile(tempfile.SpooledTemporaryFile):
+    """Rendered PDF that lives on disk once it exceeds ``PDF_SPOOL_BYTES``.
+
+    Offers ``getvalue()`` like ``BytesIO`` so callers need not care which
+    one ``PDFTemplate.build`` returned.
+    """
+
+    def getvalue(self) -> bytes:
+        position = self.tell()
+        self.seek(0)
+        try:
+            return self.read()
+        finally:
+            self.seek(position)
+
+
+class _ChunkedTable(Flowable):
+    """Table laid out page by page from an iterator of styled rows.
+
+    It never reports that it fits, so ReportLab always calls ``split``.
+    Each split builds a ``Table`` with the header and just enough pending
+    rows, keeps the part that fits on the current page and re-inserts
+    itself after it. Rows are pulled from the iterator only when needed, so
+    memory holds about one page of rows regardless of the report size.
+    """
+
+    def __init__(
+        self,
+        template: "PDFTemplate",
+        header: list,
+        rows: Iterator[list],
+        col_widths: List[float],
+        totals_row: Optional[list],
+        chunk_rows: int,
+    ) -> None:
+        super().__init__()
+        self._template = template
+        self._header = header
+        self._rows = rows
+        self._col_widths = col_widths
+        self._totals_row = totals_row
+        self._chunk_rows = chunk_rows
+        self._pending: list = []
+        self._exhausted = False
+
+    def _fill(self, count: int) -> None:
+        while len(self._pending) < count and not self._exhausted:
+            try:
+                self._pending.append(next(self._rows))
+            except StopIteration:
+                self._exhausted = True
+
+    def _table(self) -> Table:
+        data = [self._header] + self._pending
+        has_totals = self._exhausted and self._totals_row is not None
+        if has_totals:
+            data.append(self._totals_row)
+        table = Table(data, colWidths=self._col_widths, repeatRows=1)
+        table.setStyle(
+            self._template._build_table_style(len(data), len(self._header), has_totals)
+        )
+        return table
+
+    def wrap(self, availWidth, availHeight):
+        self._fill(1)
+        if not self._pending and self._totals_row is None:
+            return availWidth, 0
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        wanted = self._chunk_rows
+        while True:
+            self._fill(wanted)
+            table = self._table()
+            parts = table.split(availWidth, availHeight)
+            if not parts:
+                return []
+            # ReportLab marks a flowable pushed to the next page and fails if
+            # it is pushed again; this one comes back on every page
+            self.__dict__.pop("_postponed", None)
+            if len(parts) == 2:
+                # parts[0] holds the header plus the rows that fit here
+                del self._pending[: parts[0]._nrows - 1]
+                return [parts[0], self]
+            if self._exhausted:
+                self._pending = []
+                self._totals_row = None
+                return [table]
+            wanted += self._chunk_rows
+
 
 class PDFTemplate:
     """Reusable PDF template for professional report generation.
@@ -57,7 +160,7 @@ class PDFTemplate:
         self.landscape_mode = landscape_mode
         self.page_size = landscape(letter) if landscape_mode else letter
 
-        self.buffer = BytesIO()
+        self.buffer = PDFSpooledFile(max_size=PDF_SPOOL_BYTES)
         self.doc = SimpleDocTemplate(
             self.buffer,
             pagesize=self.page_size,
@@ -285,36 +388,17 @@ class PDFTemplate:
         if col_widths is None:
             col_widths = [available_width / len(headers)] * len(headers)
 
-        # Wrap header cells
-        styled_headers = [
-            Paragraph(f"<b>{self._escape(h)}</b>", self.styles["TableHeader"])
-            for h in headers
+        # Wrap header and data cells
+        styled_headers = self._styled_header(headers)
+        styled_data = [
+            self._styled_row(row, numeric_columns, code_columns) for row in data
         ]
 
-        # Wrap data cells
-        styled_data: list = []
-        for row in data:
-            styled_row: list = []
-            for ci, val in enumerate(row):
-                safe = self._escape(val)
-                if ci in code_columns:
-                    style = self.styles["TableCellCode"]
-                elif ci in numeric_columns:
-                    style = self.styles["TableCellNumber"]
-                else:
-                    style = self.styles["TableCell"]
-                styled_row.append(Paragraph(safe, style))
-            styled_data.append(styled_row)
-
         # Assemble final table grid
         table_data = [styled_headers] + styled_data
 
         if totals_row:
-            styled_totals = [
-                Paragraph(f"<b>{self._escape(v)}</b>", self.styles["TotalsRow"])
-                for v in totals_row
-            ]
-            table_data.append(styled_totals)
+            table_data.append(self._styled_totals(totals_row))
 
         num_rows = len(table_data)
         num_cols = len(headers)
@@ -327,6 +411,84 @@ class PDFTemplate:
         self.elements.append(table)
         self.elements.append(Spacer(1, 6))
 
+    def add_table_chunked(
+        self,
+        headers: List[str],
+        rows: Iterable[Sequence[str]],
+        col_widths: Optional[List[float]] = None,
+        totals_row: Optional[List[str]] = None,
+        numeric_columns: Optional[List[int]] = None,
+        code_columns: Optional[List[int]] = None,
+        chunk_rows: int = CHUNK_ROWS,
+    ) -> None:
+        """Add a table fed by an iterator, laid out one page at a time.
+
+        Same look and parameters as :meth:`add_table`, meant for reports with
+        thousands of rows. ``rows`` is consumed lazily while the PDF is
+        built: each page gets its own ``Table`` (header repeated) with the
+        rows that fit, instead of one giant table that ReportLab has to
+        measure and re-split on every page. Numeric columns are detected
+        from the first ``TYPE_SAMPLE_ROWS`` rows.
+        """
+        rows = iter(rows)
+        sample = list(islice(rows, TYPE_SAMPLE_ROWS))
+        if not sample:
+            return
+
+        self._has_content = True
+
+        if numeric_columns is None:
+            numeric_columns = self._detect_numeric_columns(sample)
+        if code_columns is None:
+            code_columns = self._detect_code_columns(headers)
+
+        available_width = self.page_size[0] - 40  # 20+20 margins
+        if col_widths is None:
+            col_widths = [available_width / len(headers)] * len(headers)
+
+        styled_rows = (
+            self._styled_row(row, numeric_columns, code_columns)
+            for row in chain(sample, rows)
+        )
+        self.elements.append(
+            _ChunkedTable(
+                self,
+                self._styled_header(headers),
+                styled_rows,
+                col_widths,
+                self._styled_totals(totals_row) if totals_row else None,
+                chunk_rows,
+            )
+        )
+        self.elements.append(Spacer(1, 6))
+
+    def _styled_header(self, headers: List[str]) -> list:
+        return [
+            Paragraph(f"<b>{self._escape(h)}</b>", self.styles["TableHeader"])
+            for h in headers
+        ]
+
+    def _styled_row(
+        self, row: Sequence[str], numeric_columns: List[int], code_columns: List[int]
+    ) -> list:
+        styled_row: list = []
+        for ci, val in enumerate(row):
+            safe = self._escape(val)
+            if ci in code_columns:
+                style = self.styles["TableCellCode"]
+            elif ci in numeric_columns:
+                style = self.styles["TableCellNumber"]
+            else:
+                style = self.styles["TableCell"]
+            styled_row.append(Paragraph(safe, style))
+        return styled_row
+
+    def _styled_totals(self, totals_row: List[str]) -> list:
+        return [
+            Paragraph(f"<b>{self._escape(v)}</b>", self.styles["TotalsRow"])
+            for v in totals_row
+        ]
+
     @staticmethod
     def _detect_numeric_columns(data: List[List[str]]) -> List[int]:
         """Return column indices whose non-empty values look numeric."""
@@ -498,7 +660,11 @@ class PDFTemplate:
     # ── Build ─────────────────────────────────────────────────────────────
 
     def build(self) -> BytesIO:
-        """Render the PDF and return the byte buffer."""
+        """Render the PDF and return the byte buffer.
+
+        PDFs larger than ``PDF_SPOOL_BYTES`` come back as a
+        :class:`PDFSpooledFile` backed by a temporary file.
+        """
         self._build_header()
 
         if not self._has_content:
@@ -514,8 +680,13 @@ class PDFTemplate:
             onFirstPage=self._add_page_number,
             onLaterPages=self._add_page_number,
         )
-        self.buffer.seek(0)
-        return self.buffer
+        if self.buffer.tell() > PDF_SPOOL_BYTES:
+            # Already spilled to a temporary file: hand it over as is
+            self.buffer.seek(0)
+            return self.buffer
+        pdf = BytesIO(self.buffer.getvalue())
+        self.buffer.close()
+        return pdf
 
     # ── Internal helpers ──────────────────────────────────────────────────
 
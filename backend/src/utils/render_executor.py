@@ -0,0 +1,258 @@
+"""Ejecución de los generar_pdf_* fuera del event loop.
+
+ReportLab es CPU puro: construir un PDF grande dentro del handler async
+bloquea al resto de requests. `render_executor.render(fn, *args)` ejecuta la
+función en un pool de procesos (o de hilos, con REPORT_EXECUTOR=thread),
+limita cuántos renders corren a la vez y corta por tiempo según el reporte.
+
+En modo proceso `fn` y sus argumentos se serializan con pickle: deben ser
+funciones de módulo y datos simples (dicts, listas, fechas, Decimal).
+
+Un timeout solo abandona la espera: el render sigue ocupando su lugar en el
+límite de concurrencia hasta que el pool lo termina de verdad. En modo
+proceso el pool con un render abandonado se retira (los nuevos van a uno
+nuevo) y sus workers se matan en cuanto solo le quedan renders abandonados.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Set
+
+from src.core.exceptions import AppError
+
+logger = logging.getLogger(__name__)
+
+MODO_PROCESO = "process"
+MODO_HILO = "thread"
+
+# Tamaño de los bloques con que StreamingResponse envía el PDF
+CHUNK_SIZE = 64 * 1024
+
+# Segundos máximos (espera + render) por reporte; el resto usa REPORT_TIMEOUT
+TIMEOUTS_POR_REPORTE: Dict[str, float] = {
+    "generar_pdf_liquidaciones": 180,
+    "generar_pdf_movimientos_dependencia": 180,
+    "generar_pdf_movimientos_producto": 120,
+    "generar_pdf_desempeno": 120,
+}
+
+
+class RenderTimeoutError(AppError):
+    def __init__(self, reporte: str, timeout: float):
+        super().__init__(
+            message=f"El reporte tardó más de {timeout:.0f}s en generarse",
+            status_code=504,
+        )
+        self.reporte = reporte
+
+
+class PDFBuffer(BytesIO):
+    """BytesIO que se itera en bloques de CHUNK_SIZE y no por líneas."""
+
+    def __iter__(self):
+        return iter(lambda: self.read(CHUNK_SIZE), b"")
+
+
+def _renderizar(fn: Callable[..., BytesIO], args: tuple, kwargs: dict) -> bytes:
+    """Se ejecuta en el worker: devuelve bytes para no serializar el BytesIO."""
+    return fn(*args, **kwargs).getvalue()
+
+
+class RenderExecutor:
+    def __init__(
+        self,
+        modo: str = MODO_PROCESO,
+        max_workers: int = 2,
+        max_concurrencia: Optional[int] = None,
+        timeout: float = 60.0,
+    ):
+        self.modo = modo
+        self.max_workers = max_workers
+        self.max_concurrencia = max_concurrencia or max_workers
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.en_cola = 0
+        self.en_curso = 0
+        self.max_en_cola = 0
+        self.completados = 0
+        self.timeouts = 0
+        self.errores = 0
+        self.total_render = 0.0
+        # Trabajos enviados y no terminados -> pool en que corren
+        self._trabajos: Dict[Future, Executor] = {}
+        self._abandonados: Set[Future] = set()
+        self._retirados: Set[Executor] = set()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.modo == MODO_HILO:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="pdf-render"
+                )
+            else:
+                # spawn: no heredar hilos ni conexiones abiertas del proceso web
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
+
+    def _get_semaforo(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaforo is None or self._loop is not loop:
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+            self._loop = loop
+        return self._semaforo
+
+    def timeout_para(self, fn: Callable) -> float:
+        return TIMEOUTS_POR_REPORTE.get(getattr(fn, "__name__", ""), self.timeout)
+
+    async def render(
+        self,
+        fn: Callable[..., BytesIO],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> PDFBuffer:
+        """Ejecuta `fn(*args, **kwargs)` en el pool y devuelve el PDF."""
+        timeout = timeout if timeout is not None else self.timeout_para(fn)
+        try:
+            contenido = await asyncio.wait_for(self._render(fn, args, kwargs), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Timeout ({timeout}s) generando {fn.__name__}")
+            raise RenderTimeoutError(fn.__name__, timeout)
+        return PDFBuffer(contenido)
+
+    async def _render(self, fn: Callable, args: tuple, kwargs: dict) -> bytes:
+        semaforo = self._get_semaforo()
+        self.en_cola += 1
+        self.max_en_cola = max(self.max_en_cola, self.en_cola)
+        try:
+            await semaforo.acquire()
+        finally:
+            self.en_cola -= 1
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            futuro = executor.submit(_renderizar, fn, args, kwargs)
+        except Exception:
+            semaforo.release()
+            raise
+        self.en_curso += 1
+        self._trabajos[futuro] = executor
+        inicio = time.perf_counter()
+
+        def _terminado(f: Future) -> None:
+            # Corre en un hilo del pool: el estado se actualiza en el loop
+            try:
+                loop.call_soon_threadsafe(self._liberar, f, semaforo, inicio)
+            except RuntimeError:
+                pass  # loop cerrado
+
+        # Antes de wrap_future: el lugar se libera antes de que vuelva el await
+        futuro.add_done_callback(_terminado)
+        try:
+            return await asyncio.wrap_future(futuro)
+        except BrokenProcessPool:
+            # Un worker murió (p. ej. sin memoria): recrear el pool
+            if self._executor is executor:
+                self._executor = None
+            raise
+        except asyncio.CancelledError:
+            if not futuro.done():
+                self._abandonar(futuro)
+            raise
+
+    def _liberar(self, futuro: Future, semaforo: asyncio.Semaphore, inicio: float):
+        """El render terminó (o murió) en el pool: recién ahora libera su lugar."""
+        self._trabajos.pop(futuro, None)
+        if futuro in self._abandonados:
+            self._abandonados.discard(futuro)
+        elif not futuro.cancelled():
+            if futuro.exception() is None:
+                self.completados += 1
+            else:
+                self.errores += 1
+        self.total_render += time.perf_counter() - inicio
+        self.en_curso -= 1
+        semaforo.release()
+        self._terminar_retirados()
+
+    def _abandonar(self, futuro: Future) -> None:
+        """Nadie espera ya el render (timeout): en modo proceso se retira su pool."""
+        self._abandonados.add(futuro)
+        executor = self._trabajos.get(futuro)
+        if self.modo == MODO_HILO or executor is None:
+            return  # un hilo no se puede matar: ocupa su lugar hasta terminar
+        if self._executor is executor:
+            self._executor = None
+        self._retirados.add(executor)
+        self._terminar_retirados()
+
+    def _terminar_retirados(self) -> None:
+        """Mata los workers de los pools retirados que ya no tienen renders
+        esperados por nadie; los abandonados terminan con BrokenProcessPool."""
+        for executor in list(self._retirados):
+            activos = [
+                f
+                for f, e in self._trabajos.items()
+                if e is executor and f not in self._abandonados
+            ]
+            if activos:
+                continue
+            self._retirados.discard(executor)
+            procesos = list((getattr(executor, "_processes", None) or {}).values())
+            for proceso in procesos:
+                proceso.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if procesos:
+                logger.warning(
+                    f"Pool de render reciclado: {len(procesos)} worker(s) terminados"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        promedio = self.total_render / self.completados if self.completados else 0.0
+        return {
+            "modo": self.modo,
+            "max_workers": self.max_workers,
+            "max_concurrencia": self.max_concurrencia,
+            "en_cola": self.en_cola,
+            "en_curso": self.en_curso,
+            "max_en_cola": self.max_en_cola,
+            "completados": self.completados,
+            "timeouts": self.timeouts,
+            "errores": self.errores,
+            "abandonados": len(self._abandonados),
+            "render_promedio_ms": round(promedio * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        for executor in self._retirados:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._retirados.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+render_executor = RenderExecutor(
+    modo=os.getenv("REPORT_EXECUTOR", MODO_PROCESO),
+    max_workers=int(os.getenv("REPORT_WORKERS", "2")),
+    max_concurrencia=int(os.getenv("REPORT_MAX_CONCURRENCY", "0")) or None,
+    timeout=float(os.getenv("REPORT_TIMEOUT", "60")),
+)
@@ -0,0 +1,371 @@
+"""Caché en disco de los reportes generados (PDF y previews JSON).
+
+Cada artefacto se guarda bajo el sha256 de: base de datos del tenant, tipo de
+reporte, filtros normalizados y una versión de los datos. La versión es la
+suma de los contadores de `report_version` de las tablas que lee el reporte;
+un trigger diferido incrementa el contador de una tabla en cada transacción
+que la modifica, así que cualquier escritura produce claves nuevas y los
+artefactos viejos dejan de usarse hasta que el LRU por tamaño los elimina.
+
+La versión se lee antes que los datos: con READ COMMITTED una escritura
+concurrente solo puede hacer que un artefacto sea más nuevo que su versión,
+nunca más viejo.
+
+La clave viaja como ETag (débil: un PDF regenerado tras la evicción trae otra
+fecha de emisión) y con If-None-Match coincidente se responde 304 sin leer
+datos ni disco.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.connection import _current_db
+
+logger = logging.getLogger(__name__)
+
+# Tablas de las que depende cada reporte (las que consulta reportes_service)
+TABLAS_POR_REPORTE: Dict[str, tuple] = {
+    "proveedores-dependencia": (
+        "clientes",
+        "clientes_persona_natural",
+        "clientes_persona_juridica",
+        "cliente_tcp",
+        "dependencia",
+    ),
+    "existencias": ("dependencia", "productos", "stock_dependencia"),
+    "movimientos-dependencia": (
+        "dependencia",
+        "movimiento",
+        "productos",
+        "tipo_movimiento",
+    ),
+    "movimientos-producto": (
+        "dependencia",
+        "movimiento",
+        "productos",
+        "tipo_movimiento",
+    ),
+    "clientes": ("clientes", "clientes_persona_juridica"),
+    "proyectos": (
+        "clientes",
+        "contrato",
+        "estado_contrato",
+        "moneda",
+        "tipo_contrato",
+    ),
+    "desempeno": ("clientes", "etapas", "persona_etapa", "solicitud_servicio"),
+    "onat": ("clientes", "clientes_persona_natural", "moneda", "persona_liquidacion"),
+    "mincult": ("persona_liquidacion",),
+    "liquidaciones": (
+        "clientes",
+        "liquidacion",
+        "moneda",
+        "productos",
+        "productos_en_liquidacion",
+    ),
+}
+
+# Segundos antes de volver a consultar report_version en una BD que no la tiene
+REINTENTO_VERSION = 300
+
+# Al superar max_bytes se eliminan los menos usados hasta quedar en este 90 %
+_OBJETIVO_EVICCION = 0.9
+
+# Temporales huérfanos (escritura interrumpida) más viejos que esto se borran
+_EDAD_TEMPORAL = 3600
+
+_SQL_VERSION = text(
+    "SELECT COALESCE(SUM(version), 0) FROM report_version WHERE tabla IN :tablas"
+).bindparams(bindparam("tablas", expanding=True))
+
+
+def _a_json(datos: Any) -> bytes:
+    """Serializa igual que JSONResponse para que el hit sea idéntico al miss."""
+    return json.dumps(
+        jsonable_encoder(datos),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _sin_debil(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    buscado = _sin_debil(etag)
+    return any(_sin_debil(e) == buscado for e in if_none_match.split(","))
+
+
+class ConsultaReporte:
+    """Resultado de `ReportCache.consultar` para un request.
+
+    Si `respuesta` no es None (304 o artefacto en disco) el endpoint la
+    devuelve tal cual; si no, genera el contenido y llama a `responder`.
+    """
+
+    def __init__(
+        self,
+        cache: "ReportCache",
+        clave: Optional[str],
+        extension: str,
+        media_type: str,
+        headers: Dict[str, str],
+    ):
+        self.cache = cache
+        self.clave = clave
+        self.extension = extension
+        self.media_type = media_type
+        self.headers = headers
+        self.respuesta: Optional[Response] = None
+
+    @property
+    def desde_cache(self) -> bool:
+        return self.respuesta is not None
+
+    async def responder(self, contenido: bytes) -> Response:
+        if self.clave is not None:
+            try:
+                await asyncio.to_thread(
+                    self.cache.escribir, self.clave, self.extension, contenido
+                )
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el reporte en caché: {e}")
+        return Response(contenido, media_type=self.media_type, headers=self.headers)
+
+    async def responder_json(self, datos: Any) -> Response:
+        return await self.responder(_a_json(datos))
+
+
+class ReportCache:
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None
+        self._sin_versionado: Dict[str, float] = {}
+        self.aciertos = 0
+        self.no_modificados = 0
+        self.fallos = 0
+        self.sin_version = 0
+        self.evictados = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return self.max_bytes > 0
+
+    # ------------------------------------------------------------------
+    # Claves y versión de datos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def clave(
+        db_name: str, reporte: str, filtros: dict, version: int, extension: str = ""
+    ) -> str:
+        normalizados = {
+            k: v.strip() if isinstance(v, str) else v
+            for k, v in filtros.items()
+            if v is not None and not (isinstance(v, str) and not v.strip())
+        }
+        contenido = json.dumps(
+            [db_name, reporte, extension, normalizados, version],
+            sort_keys=True,
+            default=str,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    async def version_datos(
+        self, db: AsyncSession, tablas: Iterable[str]
+    ) -> Optional[int]:
+        """Versión de los datos de `tablas` o None si la BD no tiene versionado."""
+        db_name = _current_db.get()
+        reintento = self._sin_versionado.get(db_name)
+        if reintento is not None and time.monotonic() < reintento:
+            return None
+        try:
+            result = await db.execute(_SQL_VERSION, {"tablas": list(tablas)})
+            return int(result.scalar_one())
+        except Exception as e:
+            # Sin la migración de report_version: se sirve sin caché
+            await db.rollback()
+            self._sin_versionado[db_name] = time.monotonic() + REINTENTO_VERSION
+            logger.warning(f"Caché de reportes deshabilitada en '{db_name}': {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Disco
+    # ------------------------------------------------------------------
+
+    def _ruta(self, clave: str, extension: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}{extension}"
+
+    def leer(self, clave: str, extension: str) -> Optional[bytes]:
+        ruta = self._ruta(clave, extension)
+        try:
+            contenido = ruta.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            # El mtime es el "último uso" que ordena la evicción
+            os.utime(ruta)
+        except FileNotFoundError:
+            pass
+        return contenido
+
+    def escribir(self, clave: str, extension: str, contenido: bytes) -> None:
+        if len(contenido) > self.max_bytes:
+            return
+        ruta = self._ruta(clave, extension)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(
+            f".{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        temporal.write_bytes(contenido)
+        # Atómico: un lector concurrente ve el archivo completo o ninguno
+        os.replace(temporal, ruta)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._uso_disco()
+            else:
+                self._bytes += len(contenido)
+            if self._bytes > self.max_bytes:
+                self._evictar()
+
+    def _archivos(self) -> list:
+        archivos = []
+        if not self.directorio.is_dir():
+            return archivos
+        ahora = time.time()
+        for sub in os.scandir(self.directorio):
+            if not sub.is_dir():
+                continue
+            for entrada in os.scandir(sub.path):
+                try:
+                    st = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                if entrada.name.startswith("."):
+                    if ahora - st.st_mtime > _EDAD_TEMPORAL:
+                        self._eliminar(entrada.path)
+                    continue
+                archivos.append((st.st_mtime, st.st_size, entrada.path))
+        return archivos
+
+    def _uso_disco(self) -> int:
+        return sum(tamano for _, tamano, _ in self._archivos())
+
+    @staticmethod
+    def _eliminar(ruta: str) -> None:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+    def _evictar(self) -> None:
+        # Se recorre el directorio en vez de confiar en el contador: con
+        # varios workers de uvicorn todos escriben en la misma carpeta.
+        archivos = sorted(self._archivos())
+        total = sum(tamano for _, tamano, _ in archivos)
+        objetivo = int(self.max_bytes * _OBJETIVO_EVICCION)
+        for _, tamano, ruta in archivos:
+            if total <= objetivo:
+                break
+            self._eliminar(ruta)
+            total -= tamano
+            self.evictados += 1
+        self._bytes = total
+
+    def limpiar(self) -> None:
+        with self._lock:
+            for _, _, ruta in self._archivos():
+                self._eliminar(ruta)
+            self._bytes = 0
+
+    # ------------------------------------------------------------------
+    # Uso desde los endpoints
+    # ------------------------------------------------------------------
+
+    async def consultar(
+        self,
+        db: AsyncSession,
+        reporte: str,
+        filtros: dict,
+        if_none_match: Optional[str] = None,
+        *,
+        extension: str = ".json",
+        media_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ConsultaReporte:
+        headers = dict(headers or {})
+        consulta = ConsultaReporte(self, None, extension, media_type, headers)
+        if not self.habilitado:
+            return consulta
+        version = await self.version_datos(db, TABLAS_POR_REPORTE[reporte])
+        if version is None:
+            self.sin_version += 1
+            return consulta
+
+        consulta.clave = self.clave(
+            _current_db.get(), reporte, filtros, version, extension
+        )
+        etag = f'W/"{consulta.clave}"'
+        # no-cache: el navegador guarda la copia pero revalida siempre (304)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, no-cache"
+
+        if etag_coincide(if_none_match, etag):
+            self.no_modificados += 1
+            consulta.respuesta = Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": headers["Cache-Control"]},
+            )
+            return consulta
+
+        contenido = await asyncio.to_thread(self.leer, consulta.clave, extension)
+        if contenido is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+            consulta.respuesta = Response(
+                contenido, media_type=media_type, headers=headers
+            )
+        return consulta
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "habilitado": self.habilitado,
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "uso_mb": round((self._bytes or 0) / (1024 * 1024), 1),
+            "aciertos": self.aciertos,
+            "no_modificados": self.no_modificados,
+            "fallos": self.fallos,
+            "sin_version": self.sin_version,
+            "evictados": self.evictados,
+        }
+
+
+report_cache = ReportCache(
+    directorio=os.getenv("REPORT_CACHE_DIR", "/tmp/caguayo_reportes"),
+    max_bytes=int(float(os.getenv("REPORT_CACHE_MAX_MB", "512")) * 1024 * 1024),
+)
@@ -1,11 +1,77 @@
+import os
+
+# Los tests de reportes mockean la BD: caché en disco apagada salvo que se active
+os.environ.setdefault("REPORT_CACHE_MAX_MB", "0")
+
 import pytest
 import pytest_asyncio
+from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
 from src.database.connection import DATABASE_URL, get_session, get_auth_session
 
 
+class BDPrueba:
+    """BD SQLite en memoria con solo las tablas que necesita un test."""
+
+    def __init__(self):
+        # StaticPool: una sola conexión, la misma BD desde cualquier sesión
+        self.engine = create_async_engine(
+            "sqlite+aiosqlite://",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        self.sesiones = sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    async def preparar(self, tablas=(), sql=(), filas=()):
+        async with self.engine.begin() as conn:
+            if tablas:
+                await conn.run_sync(
+                    SQLModel.metadata.create_all,
+                    tables=[getattr(t, "__table__", t) for t in tablas],
+                )
+            for sentencia in sql:
+                if isinstance(sentencia, str):
+                    sentencia = (sentencia, None)
+                await conn.execute(text(sentencia[0]), sentencia[1])
+        if filas:
+            async with self.sesiones() as session:
+                session.add_all(list(filas))
+                await session.commit()
+
+    async def session(self):
+        """Sesión para app.dependency_overrides[get_session]."""
+        async with self.sesiones() as session:
+            yield session
+
+
+@pytest.fixture
+async def bd_sqlite():
+    """Fábrica de BDs SQLite en memoria; se cierran al terminar el test.
+
+    ``base = await bd_sqlite(tablas=[Modelo, ...], sql=[...], filas=[...])``
+    crea las tablas de los modelos, ejecuta las sentencias (texto o
+    ``(texto, parámetros)``) y guarda las filas (instancias de los modelos).
+    Se pueden crear varias por test (una por sucursal).
+    """
+    bases = []
+
+    async def _crear(tablas=(), sql=(), filas=()) -> BDPrueba:
+        base = BDPrueba()
+        bases.append(base)
+        await base.preparar(tablas, sql, filas)
+        return base
+
+    yield _crear
+    for base in bases:
+        await base.engine.dispose()
+
+
 @pytest_asyncio.fixture
 async def db_session():
     """Async DB session conectada al DATABASE_URL real."""
@@ -0,0 +1,152 @@
+"""
+Tests del cache de usuarios autenticados (src/services/auth_cache.py).
+
+Verifican que:
+1. get_current_user consulta la BD solo la primera vez para un token.
+2. logout, update de usuario y update de grupo invalidan el cache.
+3. Las entradas no sobreviven a la sesión ni al TTL.
+"""
+
+import sys
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.dto.auth_dto import GrupoInfo, UsuarioInfo
+from src.services.auth_cache import UsuarioCache, usuario_cache
+from src.services.auth_service import create_access_token, get_current_user, logout
+
+# src.services re-exporta la instancia `auth_service`, que oculta al módulo
+auth_module = sys.modules["src.services.auth_service"]
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpio():
+    usuario_cache.limpiar()
+    yield
+    usuario_cache.limpiar()
+
+
+def _usuario_info(id_usuario: int = 1, id_grupo: int = 1) -> UsuarioInfo:
+    return UsuarioInfo(
+        id_usuario=id_usuario,
+        ci="00000000000",
+        nombre="Ana",
+        primer_apellido="Pérez",
+        alias="aperez",
+        grupo=GrupoInfo(id_grupo=id_grupo, nombre="ADMIN"),
+    )
+
+
+def _db_con_sesion(token: str):
+    """Sesión mockeada con una Sesion vigente, el usuario y su grupo."""
+    sesion = SimpleNamespace(
+        token=token,
+        fecha_expiracion=datetime.now(timezone.utc).replace(tzinfo=None)
+        + timedelta(minutes=10),
+    )
+    usuario = SimpleNamespace(
+        id_usuario=1,
+        ci="00000000000",
+        nombre="Ana",
+        primer_apellido="Pérez",
+        segundo_apellido=None,
+        alias="aperez",
+        cargo=None,
+        id_dependencia=None,
+        id_grupo=1,
+    )
+    grupo = SimpleNamespace(id_grupo=1, nombre="ADMIN")
+
+    result = MagicMock()
+    result.first.return_value = sesion
+    db = MagicMock()
+    db.exec = AsyncMock(return_value=result)
+    db.get = AsyncMock(side_effect=[usuario, grupo])
+    db.delete = AsyncMock()
+    db.commit = AsyncMock()
+    return db
+
+
+async def test_segundo_request_no_consulta_la_bd():
+    token = create_access_token({"sub": "1", "base_datos": "x"})
+    db = _db_con_sesion(token)
+
+    primero = await get_current_user(db, token)
+    consultas = db.exec.await_count + db.get.await_count
+    segundo = await get_current_user(db, token)
+
+    assert primero.id_usuario == 1
+    assert segundo == primero
+    assert db.exec.await_count + db.get.await_count == consultas
+
+
+async def test_reutiliza_payload_decodificado():
+    token = create_access_token({"sub": "1", "base_datos": "x"})
+    usuario_cache.set(token, _usuario_info())
+    with patch.object(auth_module, "decode_token") as decode:
+        usuario = await get_current_user(MagicMock(), token, {"sub": "1"})
+    decode.assert_not_called()
+    assert usuario.alias == "aperez"
+
+
+async def test_logout_invalida_el_token():
+    token = create_access_token({"sub": "1", "base_datos": "x"})
+    usuario_cache.set(token, _usuario_info())
+    db = _db_con_sesion(token)
+
+    assert await logout(db, token) is True
+    assert usuario_cache.get(token) is None
+
+
+def test_invalidar_usuario_y_grupo():
+    cache = UsuarioCache(ttl=60)
+    cache.set("t1", _usuario_info(id_usuario=1, id_grupo=1))
+    cache.set("t2", _usuario_info(id_usuario=2, id_grupo=1))
+    cache.set("t3", _usuario_info(id_usuario=3, id_grupo=2))
+
+    cache.invalidar_usuario(1)
+    assert cache.get("t1") is None
+    assert cache.get("t2") is not None
+
+    cache.invalidar_grupo(1)
+    assert cache.get("t2") is None
+    assert cache.get("t3") is not None
+
+
+def test_no_sobrevive_a_la_sesion_ni_al_ttl():
+    cache = UsuarioCache(ttl=60)
+    vencida = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+    cache.set("vencida", _usuario_info(), vencida)
+    assert cache.get("vencida") is None
+
+    cache.set("t", _usuario_info())
+    with patch("src.services.auth_cache.time.monotonic", return_value=1e12):
+        assert cache.get("t") is None
+
+
+async def test_update_usuario_invalida_el_cache():
+    from src.services.usuario_service import UsuarioService, usuario_repo
+
+    usuario_cache.set("t", _usuario_info(id_usuario=7))
+    result = MagicMock()
+    result.first.return_value = SimpleNamespace(grupo=None, dependencia=None)
+    db = MagicMock()
+    db.exec = AsyncMock(return_value=result)
+    actualizado = SimpleNamespace(
+        id_usuario=7,
+        ci="1",
+        nombre="Ana",
+        primer_apellido="Pérez",
+        segundo_apellido=None,
+        cargo="Económica",
+        alias="aperez",
+        id_grupo=1,
+        id_dependencia=None,
+    )
+    with patch.object(usuario_repo, "update", AsyncMock(return_value=actualizado)):
+        await UsuarioService.update(db, 7, MagicMock())
+
+    assert usuario_cache.get("t") is None
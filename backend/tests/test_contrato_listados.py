@@ -0,0 +1,307 @@
+"""
+Tests de los listados de contratos y facturas (src/services/contrato_service.py).
+
+Verifican que:
+1. Las relaciones se cargan con una consulta por tabla, sin importar cuántas
+   filas tenga la página (antes: 4 db.get por contrato).
+2. La paginación por cursor (`despues_de`) recorre todo sin repetir filas y
+   el endpoint devuelve X-Next-Cursor solo con páginas completas.
+3. Los items de las facturas se agrupan por factura con su producto.
+4. Los items disponibles de un contrato salen de una sola consulta, con el
+   filtro de moneda y el precio alternativo resueltos en SQL (un precio de
+   compra alternativo nulo o en 0 deja el del item).
+
+Se usa una BD SQLite en memoria con solo las tablas necesarias.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from main import app
+from src.database.connection import get_session
+from src.models import (
+    Anexo,
+    Cliente,
+    Contrato,
+    Convenio,
+    EstadoContrato,
+    Factura,
+    ItemAnexo,
+    Moneda,
+    PrecioItemAnexo,
+    Productos,
+    TipoContrato,
+)
+from src.models.item_factura import ItemFactura
+from src.services.contrato_service import ContratoService, FacturaService
+
+TABLAS = [
+    Anexo,
+    Cliente,
+    Contrato,
+    Convenio,
+    EstadoContrato,
+    Factura,
+    ItemAnexo,
+    ItemFactura,
+    Moneda,
+    PrecioItemAnexo,
+    Productos,
+    TipoContrato,
+]
+
+
+def _filas() -> list:
+    filas = [
+        EstadoContrato(id_estado_contrato=1, nombre="Activo"),
+        TipoContrato(id_tipo_contrato=1, nombre="Compraventa"),
+        Moneda(id_moneda=1, nombre="Peso", denominacion="CUP", simbolo="$"),
+    ]
+    for i in (1, 2):
+        filas.append(
+            Cliente(
+                id_cliente=i,
+                nombre=f"Cliente {i}",
+                nit=f"NIT{i}",
+                codigo=f"C{i}",
+                tipo_relacion="CLIENTE",
+                estado="ACTIVO",
+            )
+        )
+    for i in range(1, 26):
+        filas.append(
+            Contrato(
+                id_contrato=i,
+                id_cliente=1 + i % 2,
+                nombre=f"Contrato {i}",
+                id_estado=1,
+                fecha=date(2026, 1, 1),
+                vigencia=date(2027, 1, 1),
+                id_tipo_contrato=1,
+                id_moneda=1,
+            )
+        )
+    filas.append(
+        Productos(
+            id_producto=1,
+            id_subcategoria=1,
+            nombre="Producto 1",
+            moneda_compra=1,
+            precio_compra=Decimal("1"),
+            moneda_venta=1,
+            precio_venta=Decimal("2"),
+            precio_minimo=Decimal("1.5"),
+        )
+    )
+    for i in (1, 2, 3):
+        filas.append(Factura(id_factura=i, id_contrato=1, codigo_factura=f"F{i}"))
+    for id_factura in (1, 1, 3):
+        filas.append(
+            ItemFactura(
+                id_factura=id_factura,
+                id_producto=1,
+                cantidad=1,
+                precio_compra=Decimal("1"),
+                precio_venta=Decimal("2"),
+                id_moneda=1,
+            )
+        )
+    # Convenio del cliente 2 (contrato 1, en CUP) y otro del cliente 1
+    for id_convenio, id_cliente in ((1, 2), (2, 1)):
+        filas.append(
+            Convenio(
+                id_convenio=id_convenio,
+                id_cliente=id_cliente,
+                nombre_convenio=f"Convenio {id_convenio}",
+                fecha=date(2026, 1, 1),
+                vigencia=date(2027, 1, 1),
+                id_tipo_convenio=1,
+            )
+        )
+        filas.append(
+            Anexo(
+                id_anexo=id_convenio,
+                id_convenio=id_convenio,
+                nombre_anexo=f"Anexo {id_convenio}",
+                fecha=date(2026, 1, 1),
+            )
+        )
+    # 1: en CUP; 2: en USD con dos precios en CUP; 3: en USD sin precio
+    # en CUP; 4: de otro cliente
+    for id_item, id_anexo, id_moneda in (
+        (1, 1, 1),
+        (2, 1, 2),
+        (3, 1, 2),
+        (4, 2, 1),
+    ):
+        filas.append(
+            ItemAnexo(
+                id_item_anexo=id_item,
+                id_anexo=id_anexo,
+                id_producto=1,
+                precio_compra=Decimal("10"),
+                precio_venta=Decimal("20"),
+                id_moneda=id_moneda,
+            )
+        )
+    for id_precio, id_item, id_moneda, venta, compra in (
+        (1, 2, 1, "300", None),
+        (2, 2, 1, "999", "1"),
+        (3, 3, 3, "50", "40"),
+    ):
+        filas.append(
+            PrecioItemAnexo(
+                id_precio_item_anexo=id_precio,
+                id_item_anexo=id_item,
+                id_moneda=id_moneda,
+                precio_venta=Decimal(venta),
+                precio_compra=Decimal(compra) if compra else None,
+            )
+        )
+    return filas
+
+
+@pytest.fixture
+async def sesiones(bd_sqlite):
+    base = await bd_sqlite(tablas=TABLAS, filas=_filas())
+    return base.engine, base.sesiones
+
+
+def _contar_consultas(engine) -> list:
+    consultas = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    return consultas
+
+
+async def test_contratos_una_consulta_por_tabla(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        contratos = await ContratoService.get_all(db, limit=25)
+
+    assert len(contratos) == 25
+    assert contratos[0].id_contrato == 25
+    assert contratos[0].cliente.nombre == "Cliente 2"
+    assert contratos[0].estado.nombre == "Activo"
+    assert contratos[0].moneda.simbolo == "$"
+    # contratos + estado, tipo, moneda y cliente
+    assert len(consultas) == 5
+
+
+async def test_paginacion_por_cursor(sesiones):
+    _, factory = sesiones
+    vistos = []
+    despues_de = None
+    async with factory() as db:
+        while True:
+            pagina = await ContratoService.get_all(
+                db, limit=10, id_cliente=1, despues_de=despues_de
+            )
+            vistos.extend(c.id_contrato for c in pagina)
+            if len(pagina) < 10:
+                break
+            despues_de = pagina[-1].id_contrato
+
+    assert vistos == list(range(24, 0, -2))
+
+
+async def test_facturas_agrupan_items_con_producto(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        facturas = await FacturaService.get_by_contrato(db, 1)
+
+    por_id = {f.id_factura: f for f in facturas}
+    assert len(por_id[1].items) == 2
+    assert por_id[2].items == []
+    assert por_id[3].items[0].producto.nombre == "Producto 1"
+    # facturas + items + productos
+    assert len(consultas) == 3
+
+
+def test_endpoint_devuelve_x_next_cursor(sesiones):
+    _, factory = sesiones
+
+    async def _override_get_session():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _override_get_session
+    try:
+        client = TestClient(app)
+        primera = client.get("/api/v1/contratos", params={"limit": 20})
+        segunda = client.get(
+            "/api/v1/contratos",
+            params={"limit": 20, "despues_de": primera.headers["x-next-cursor"]},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert primera.status_code == 200
+    assert primera.headers["x-next-cursor"] == "6"
+    assert [c["id_contrato"] for c in segunda.json()] == [5, 4, 3, 2, 1]
+    assert "x-next-cursor" not in segunda.headers
+
+
+async def test_items_disponibles_en_una_consulta(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        items = await ContratoService.get_items_disponibles(db, 1)
+
+    assert [i.id_item_anexo for i in items] == [1, 2]
+    assert items[0].precio_venta == Decimal("20")
+    # Primer precio alternativo en CUP; sin precio_compra se usa el del item
+    assert items[1].precio_venta == Decimal("300")
+    assert items[1].precio_compra == Decimal("10")
+    assert items[1].id_moneda == 1
+    assert items[1].producto.nombre == "Producto 1"
+    assert len(consultas) == 1
+
+
+async def test_items_disponibles_precio_compra_en_cero_usa_el_del_item(sesiones):
+    _, factory = sesiones
+
+    async with factory() as db:
+        await db.execute(
+            text(
+                "UPDATE precio_item_anexo SET precio_compra = 0"
+                " WHERE id_precio_item_anexo = 1"
+            )
+        )
+        items = await ContratoService.get_items_disponibles(db, 1)
+
+    assert items[1].precio_venta == Decimal("300")
+    assert items[1].precio_compra == Decimal("10")
+
+
+def test_items_disponibles_endpoint_en_streaming(sesiones):
+    _, factory = sesiones
+
+    async def _override_get_session():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _override_get_session
+    try:
+        client = TestClient(app)
+        respuesta = client.get("/api/v1/contratos/1/items-disponibles")
+        vacia = client.get("/api/v1/contratos/999/items-disponibles")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert respuesta.status_code == 200
+    assert [i["id_item_anexo"] for i in respuesta.json()] == [1, 2]
+    assert respuesta.json()[1]["precio_venta"] == "300.0000"
+    assert vacia.json() == []
@@ -0,0 +1,171 @@
+"""
+Tests de las estadísticas del dashboard (src/services/dashboard_service.py).
+
+Verifican, con datos conocidos, que DashboardService.get_stats devuelve:
+1. Los conteos de productos, clientes, categorías y monedas.
+2. Los totales de ventas por estado, hoy/ayer, el crecimiento y el ticket
+   promedio.
+3. Los productos agotados, la valoración del inventario y la lista de stock
+   bajo (stock sumado de todas las dependencias, umbral incluido).
+4. Sin ventas el ticket promedio es 0 (sin dividir por cero).
+
+La BD es SQLite en memoria; las listas de últimas ventas, clientes recientes
+y top productos no se cargan aquí.
+"""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.models import (
+    Categorias,
+    Cliente,
+    EstadoVenta,
+    Moneda,
+    Productos,
+    StockDependencia,
+    Ventas,
+)
+from src.repository.ventas_clientes_repo import ventas_cliente_repo, ventas_repo
+from src.services.dashboard_service import DashboardService
+
+# (id_producto, precio_compra, precio_venta, stock por dependencia)
+PRODUCTOS = [
+    (1, "2", "3", (30, 20)),
+    (2, "5", "8", (4,)),
+    (3, "100", "200", ()),
+    (4, "1", "1.5", (6, 4)),
+]
+
+# (días atrás, estado, total)
+VENTAS = [
+    (0, EstadoVenta.COMPLETADA, "100"),
+    (0, EstadoVenta.PENDIENTE, "50"),
+    (1, EstadoVenta.COMPLETADA, "60"),
+    (3, EstadoVenta.COMPLETADA, "40"),
+    (5, EstadoVenta.ANULADA, "30"),
+]
+
+
+def _filas() -> list:
+    filas = [
+        Moneda(id_moneda=1, nombre="Peso", denominacion="CUP", simbolo="$"),
+        Moneda(id_moneda=2, nombre="Dólar", denominacion="USD", simbolo="US$"),
+    ]
+    filas += [Categorias(id_categoria=i, nombre=f"Categoría {i}") for i in (1, 2, 3)]
+    filas += [
+        Cliente(
+            id_cliente=i,
+            nombre=f"Cliente {i}",
+            nit=f"NIT{i}",
+            codigo=f"C{i}",
+            tipo_relacion="CLIENTE",
+            estado="ACTIVO",
+        )
+        for i in (1, 2)
+    ]
+    for id_producto, compra, venta, stocks in PRODUCTOS:
+        filas.append(
+            Productos(
+                id_producto=id_producto,
+                codigo=f"P{id_producto}",
+                id_subcategoria=1,
+                nombre=f"Producto {id_producto}",
+                moneda_compra=1,
+                precio_compra=Decimal(compra),
+                moneda_venta=1,
+                precio_venta=Decimal(venta),
+                precio_minimo=Decimal(compra),
+            )
+        )
+        filas += [
+            StockDependencia(id_producto=id_producto, id_dependencia=d, stock=s)
+            for d, s in enumerate(stocks, 1)
+        ]
+    for i, (dias, estado, total) in enumerate(VENTAS, 1):
+        filas.append(
+            Ventas(
+                id_venta=i,
+                id_cliente=1,
+                fecha=datetime.combine(date.today() - timedelta(days=dias), time(10)),
+                total=Decimal(total),
+                estado=estado,
+            )
+        )
+    return filas
+
+
+@pytest.fixture
+async def db(bd_sqlite):
+    base = await bd_sqlite(
+        tablas=[Categorias, Cliente, Moneda, Productos, StockDependencia, Ventas],
+        filas=_filas(),
+    )
+    async with base.sesiones() as session:
+        yield session
+
+
+async def test_stats_desde_datos_conocidos(db):
+    with (
+        patch.object(ventas_repo, "get_multi", AsyncMock(return_value=[])),
+        patch.object(ventas_cliente_repo, "get_multi", AsyncMock(return_value=[])),
+        patch.object(
+            DashboardService, "_get_top_productos", AsyncMock(return_value=[])
+        ),
+    ):
+        stats = (await DashboardService.get_stats(db)).model_dump()
+
+    conteos = ("total_productos", "total_clientes", "total_categorias", "total_monedas")
+    assert {k: stats[k] for k in conteos} == dict(zip(conteos, (4, 2, 3, 2)))
+
+    assert stats["total_ventas"] == 5
+    assert stats["ventas_pendientes"] == 1
+    assert stats["ventas_completadas"] == 3
+    assert stats["ventas_anuladas"] == 1
+    assert stats["ventas_hoy"] == Decimal("150")
+    assert stats["ventas_hoy_cantidad"] == 2
+    assert stats["ventas_ayer"] == Decimal("60")
+    assert stats["ventas_crecimiento_porcentaje"] == 150.0
+    assert stats["ticket_promedio"] == Decimal("56")
+
+    # Stock: P1 50, P2 4, P3 0 (sin filas), P4 10
+    assert stats["productos_agotados"] == 1
+    assert stats["valor_inventario_compra"] == Decimal("130")
+    assert stats["valor_inventario_venta"] == Decimal("197")
+    stock_bajo = [
+        (p["id_producto"], p["cantidad"]) for p in stats["productos_stock_bajo"]
+    ]
+    assert stock_bajo == [(2, 4), (3, 0), (4, 10)]
+
+
+async def test_stock_bajo_respeta_umbral_y_limite(db):
+    productos = await DashboardService._get_productos_stock_bajo(db, umbral=4, limit=1)
+
+    assert [(p.id_producto, p.codigo, p.cantidad) for p in productos] == [(2, "P2", 4)]
+    assert productos[0].precio_venta == Decimal("8")
+
+
+async def test_sin_ventas_ticket_promedio_cero():
+    fila = SimpleNamespace(
+        total_ventas=0,
+        monto_total=0,
+        ventas_hoy_cantidad=0,
+        ventas_hoy=0,
+        ventas_ayer=0,
+        ventas_pendientes=None,
+        ventas_completadas=None,
+        ventas_anuladas=None,
+    )
+    session = MagicMock()
+    session.exec = AsyncMock(return_value=MagicMock(one=lambda: fila))
+    ahora = datetime.now()
+
+    resumen = await DashboardService._get_resumen_ventas(
+        session, ahora, ahora, ahora, ahora
+    )
+
+    assert resumen["ticket_promedio"] == Decimal("0")
+    assert resumen["ventas_pendientes"] == 0
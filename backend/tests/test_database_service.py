@@ -0,0 +1,183 @@
+"""
+Tests de la replicación de tablas de referencia desde la BD central
+(DatabaseService.replicar_datos_desde_central).
+
+Verifican que:
+1. TABLAS_CENTRALES lista cada tabla después de las tablas a las que
+   referencia, y la réplica completa vacía hijas antes que padres y copia
+   padres antes que hijas.
+2. La réplica incremental envía solo las filas cuya huella md5 cambió o no
+   existe en la sucursal y borra las que ya no están en la central.
+3. Ante un error se hace rollback en la sucursal y se cierran ambas
+   conexiones.
+4. POST /dependencias/{id}/replicar replica siempre en modo incremental y
+   devuelve el informe por tabla.
+
+Las conexiones psycopg2 son mocks: no hace falta PostgreSQL.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.database.connection import get_session
+from src.services.database_service import TABLAS_CENTRALES, DatabaseService
+
+TABLAS = [tabla for tabla, _, _ in TABLAS_CENTRALES]
+
+
+@pytest.fixture
+def conexiones():
+    central, local = MagicMock(name="central"), MagicMock(name="local")
+    central.cursor.return_value.mogrify.return_value = b"SELECT cambiadas"
+    local.cursor.return_value.rowcount = 2
+
+    def _conectar(base_datos):
+        return central if base_datos == "caguayosa" else local
+
+    with patch.object(DatabaseService, "_conectar", side_effect=_conectar):
+        yield central, local
+
+
+def _sentencias(cur):
+    return [c.args for c in cur.execute.call_args_list]
+
+
+def test_tablas_centrales_padres_antes_que_hijas():
+    tabla_de_pk = {pk: tabla for tabla, pk, _ in TABLAS_CENTRALES}
+    for i, (tabla, pk, columnas) in enumerate(TABLAS_CENTRALES):
+        padres = {tabla_de_pk[c] for c in columnas if c in tabla_de_pk and c != pk}
+        assert padres <= set(TABLAS[:i]), tabla
+
+
+def test_replica_completa_borra_hijas_primero_y_copia_padres_primero(conexiones):
+    central, local = conexiones
+    local_cur = local.cursor.return_value
+
+    informe = DatabaseService.replicar_datos_desde_central("sucursal_a")
+
+    assert _sentencias(local_cur) == [
+        (f"DELETE FROM {tabla}",) for tabla in reversed(TABLAS)
+    ]
+    copias = [c.args[0] for c in local_cur.copy_expert.call_args_list]
+    assert [c.split()[1] for c in copias] == TABLAS
+    assert informe["modo"] == "completa"
+    assert list(informe["tablas"]) == TABLAS
+    assert informe["tablas"]["moneda"]["filas"] == 2
+    local.commit.assert_called_once()
+    central.set_session.assert_called_once_with(
+        readonly=True, isolation_level="REPEATABLE READ"
+    )
+
+
+def test_huellas_md5_por_fila():
+    cur = MagicMock()
+    cur.fetchall.return_value = [(1, "h1"), (2, "h2")]
+
+    huellas = DatabaseService._huellas(
+        cur, "moneda", "id_moneda", ("id_moneda", "nombre")
+    )
+
+    assert huellas == {1: "h1", 2: "h2"}
+    cur.execute.assert_called_once_with(
+        "SELECT id_moneda, md5(ROW(id_moneda, nombre)::text) FROM moneda"
+    )
+
+
+def test_replica_incremental_envia_cambios_y_borra_sobrantes(conexiones):
+    central, local = conexiones
+    central_cur, local_cur = central.cursor.return_value, local.cursor.return_value
+    # (central, sucursal) por tabla; el resto coincide en ambos lados
+    huellas = {
+        "moneda": ({1: "a", 2: "b", 3: "c"}, {1: "a", 2: "x", 4: "d"}),
+        "provincia": ({5: "p"}, {5: "p", 7: "q"}),
+    }
+
+    def _huellas(cur, tabla, pk, columnas):
+        origen, destino = huellas.get(tabla, ({1: "z"}, {1: "z"}))
+        return origen if cur is central_cur else destino
+
+    with patch.object(DatabaseService, "_huellas", side_effect=_huellas):
+        informe = DatabaseService.replicar_datos_desde_central(
+            "sucursal_a", incremental=True
+        )
+
+    # Solo moneda tiene filas que enviar: la 2 (modificada) y la 3 (nueva)
+    central_cur.mogrify.assert_called_once_with(
+        "SELECT id_moneda, nombre, denominacion, simbolo FROM moneda "
+        "WHERE id_moneda = ANY(%s)",
+        ([2, 3],),
+    )
+    sentencias = _sentencias(local_cur)
+    temporales = [s[0] for s in sentencias if s[0].startswith("CREATE TEMP")]
+    assert len(temporales) == 1 and "_replica_moneda" in temporales[0]
+    # Los borrados van al final, hijas antes que padres
+    assert sentencias[-2:] == [
+        ("DELETE FROM provincia WHERE id_provincia = ANY(%s)", ([7],)),
+        ("DELETE FROM moneda WHERE id_moneda = ANY(%s)", ([4],)),
+    ]
+    assert informe["modo"] == "incremental"
+    assert informe["tablas"]["moneda"]["filas"] == 2
+    assert informe["tablas"]["moneda"]["borradas"] == 1
+    assert informe["tablas"]["provincia"]["filas"] == 0
+    assert informe["tablas"]["provincia"]["borradas"] == 1
+    local.commit.assert_called_once()
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_error_hace_rollback_y_cierra_conexiones(conexiones, incremental):
+    central, local = conexiones
+    cambios = {"moneda": ({1: "a"}, {})}
+
+    def _huellas(cur, tabla, pk, columnas):
+        origen, destino = cambios.get(tabla, ({}, {}))
+        return origen if cur is central.cursor.return_value else destino
+
+    with (
+        patch.object(DatabaseService, "_huellas", side_effect=_huellas),
+        patch.object(
+            DatabaseService, "_copiar", side_effect=RuntimeError("copy falló")
+        ),
+        pytest.raises(RuntimeError, match="copy falló"),
+    ):
+        DatabaseService.replicar_datos_desde_central("sucursal_a", incremental)
+
+    local.rollback.assert_called_once()
+    local.commit.assert_not_called()
+    central.close.assert_called_once()
+    local.close.assert_called_once()
+
+
+def test_endpoint_replicar_dependencia_solo_incremental():
+    session = MagicMock()
+    session.get = AsyncMock(return_value=SimpleNamespace(base_datos="sucursal_a"))
+
+    async def _session():
+        yield session
+
+    informe = {"base_datos": "sucursal_a", "modo": "x", "tablas": {}, "total_ms": 1}
+    app.dependency_overrides[get_session] = _session
+    try:
+        with patch.object(
+            DatabaseService,
+            "replicar_datos_desde_central",
+            return_value=informe,
+        ) as replicar:
+            client = TestClient(app)
+            respuesta = client.post("/api/v1/dependencias/3/replicar")
+            # La réplica completa no se ofrece sobre una BD en uso
+            client.post(
+                "/api/v1/dependencias/3/replicar", params={"incremental": "false"}
+            )
+    finally:
+        app.dependency_overrides.pop(get_session, None)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json() == informe
+    assert [c.args for c in replicar.call_args_list] == [
+        ("sucursal_a", True),
+        ("sucursal_a", True),
+    ]
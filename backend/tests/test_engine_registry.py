@@ -0,0 +1,117 @@
+"""
+Tests del registro de engines por base de datos (src/database/connection.py).
+
+Verifican que:
+1. Los engines de sucursal y sus fábricas de sesiones se reutilizan.
+2. Al superar el presupuesto global se desalojan engines ociosos con dispose().
+3. Si todos los engines están en uso se responde 503 en lugar de abrir más
+   conexiones de las permitidas.
+4. Las métricas de espera del pool se acumulan por engine.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.core.exceptions import AppError
+from src.database.connection import (
+    DATABASE_URL,
+    DB_ECHO,
+    EngineRegistry,
+    MeteredQueuePool,
+    PoolMetrics,
+    _current_db,
+    engine,
+    engine_registry,
+    get_session,
+)
+
+
+def _registry(max_connections: int = 20) -> EngineRegistry:
+    """Registro con BD central de capacidad 10 y sucursales de capacidad 5."""
+    registry = EngineRegistry(
+        max_connections=max_connections, pool_size=3, max_overflow=2
+    )
+    registry.registrar_fijo("central", DATABASE_URL, pool_size=5, max_overflow=5)
+    return registry
+
+
+def test_engine_por_defecto_sin_echo_y_con_pool_medido():
+    assert DB_ECHO is False
+    assert engine.echo is False
+    assert isinstance(engine.pool, MeteredQueuePool)
+
+
+def test_engine_de_sucursal_se_reutiliza():
+    registry = _registry()
+    a = registry.get("sucursal_a")
+    assert registry.get("sucursal_a") is a
+    assert a.pool.size() == 3
+    assert a.url.database == "sucursal_a"
+    assert registry.capacidad_en_uso() == 15
+
+
+async def test_desaloja_el_engine_menos_usado_al_superar_presupuesto():
+    registry = _registry(max_connections=20)
+    registry.get("sucursal_a")
+    b = registry.get("sucursal_b")
+    registry.get("sucursal_a")  # a pasa a ser el más reciente
+
+    with patch.object(type(b), "dispose", new_callable=AsyncMock) as dispose:
+        registry.get("sucursal_c")
+        stats = registry.stats()
+        await registry.dispose_all()
+
+    assert "sucursal_b" not in stats["bases"]
+    assert registry.evictions == 1
+    assert dispose.await_count >= 1
+    assert "sucursal_a" in stats["bases"]
+
+
+def test_nunca_desaloja_la_bd_central():
+    registry = _registry(max_connections=15)
+    registry.get("sucursal_a")
+    with patch.object(registry, "_dispose"):
+        registry.get("sucursal_b")
+    bases = registry.stats()["bases"]
+    assert "central" in bases
+    assert "sucursal_a" not in bases
+
+
+def test_presupuesto_agotado_con_engines_en_uso_responde_503():
+    registry = _registry(max_connections=15)
+    a = registry.get("sucursal_a")
+    with patch.object(a.pool, "checkedout", return_value=1):
+        with pytest.raises(AppError) as exc:
+            registry.get("sucursal_b")
+    assert exc.value.status_code == 503
+    assert "sucursal_a" in registry.stats()["bases"]
+
+
+def test_metricas_de_espera():
+    metrics = PoolMetrics()
+    metrics.registrar(0.002)
+    metrics.registrar(0.004)
+    metrics.registrar(1.0, timeout=True)
+    datos = metrics.as_dict()
+    assert datos["checkouts"] == 2
+    assert datos["timeouts"] == 1
+    assert datos["wait_avg_ms"] == pytest.approx(3.0)
+    assert datos["wait_max_ms"] == pytest.approx(4.0)
+
+
+def test_fabrica_de_sesiones_cacheada_por_engine():
+    registry = _registry()
+    fabrica = registry.get_session_factory("sucursal_a")
+    assert registry.get_session_factory("sucursal_a") is fabrica
+    assert fabrica.kw["bind"] is registry.get("sucursal_a")
+    assert registry.get_session_factory("sucursal_b") is not fabrica
+
+
+async def test_get_session_reutiliza_la_fabrica():
+    with patch("src.database.connection.sessionmaker") as sm:
+        for _ in range(3):
+            agen = get_session()
+            await agen.__anext__()
+            await agen.aclose()
+    sm.assert_not_called()
+    assert _current_db.get() in engine_registry.stats()["bases"]
@@ -0,0 +1,134 @@
+"""
+Tests del reparto FIFO de ventas en item_anexo (ExistenciaService).
+
+Verifican que:
+1. La venta se reparte por anexo e item en orden, con una sola lectura
+   bloqueante y un solo UPDATE aunque consuma varias filas.
+2. El modo por lotes reparte varios productos en las mismas dos consultas.
+3. Con stock insuficiente no se escribe nada.
+4. La lectura usa FOR UPDATE (o SKIP LOCKED) en PostgreSQL.
+
+Se usa una BD SQLite en memoria (que ignora FOR UPDATE) para el reparto.
+"""
+
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from src.models import ItemAnexo
+from src.repository.contratos_repo import item_anexo_repo
+from src.services.existencia_service import ExistenciaService
+
+# (id_item_anexo, id_anexo, id_producto, entrada, vendido)
+ITEMS = [
+    (1, 2, 10, 5, 0),
+    (2, 1, 10, 3, 1),
+    (3, 1, 10, 4, 4),
+    (4, 3, 10, 10, 0),
+    (5, 1, 20, 6, 0),
+]
+
+
+@pytest.fixture
+async def sesiones(bd_sqlite):
+    base = await bd_sqlite(
+        tablas=[ItemAnexo],
+        filas=[
+            ItemAnexo(
+                id_item_anexo=id_item,
+                id_anexo=id_anexo,
+                id_producto=id_producto,
+                entrada=entrada,
+                vendido=vendido,
+                precio_compra=Decimal("1"),
+                precio_venta=Decimal("2"),
+                id_moneda=1,
+            )
+            for id_item, id_anexo, id_producto, entrada, vendido in ITEMS
+        ],
+    )
+    return base.engine, base.sesiones
+
+
+def _contar_consultas(engine) -> list:
+    consultas = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    return consultas
+
+
+async def _vendidos(factory) -> dict:
+    async with factory() as db:
+        items = (await db.exec(select(ItemAnexo))).all()
+        return {i.id_item_anexo: i.vendido for i in items}
+
+
+async def test_reparte_en_orden_fifo(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        actualizados = await ExistenciaService.registrar_venta_en_anexo(db, 10, 9)
+
+    # Anexo 1 (item 2: 2 libres), anexo 2 (item 1: 5), anexo 3 (item 4: 2)
+    assert [(a["id_item_anexo"], a["vendido_en_esta"]) for a in actualizados] == [
+        (2, 2),
+        (1, 5),
+        (4, 2),
+    ]
+    assert await _vendidos(factory) == {1: 5, 2: 3, 3: 4, 4: 2, 5: 0}
+    assert len([c for c in consultas if "ORDER BY item_anexo.id_producto" in c]) == 1
+    assert len([c for c in consultas if c.startswith("UPDATE")]) == 1
+
+
+async def test_lote_de_varios_productos(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        cargado = await db.get(ItemAnexo, 5)
+        actualizados = await ExistenciaService.registrar_ventas_en_anexo(
+            db, [(20, 2), (10, 1), (20, 3)], commit=False
+        )
+        # El objeto ya cargado en la sesión queda expirado, no con el valor viejo
+        await db.refresh(cargado)
+        assert cargado.vendido == 5
+        await db.commit()
+
+    assert {a["id_item_anexo"]: a["vendido"] for a in actualizados} == {2: 2, 5: 5}
+    assert await _vendidos(factory) == {1: 0, 2: 2, 3: 4, 4: 0, 5: 5}
+    assert len([c for c in consultas if c.startswith("UPDATE")]) == 1
+
+
+async def test_stock_insuficiente_no_escribe(sesiones):
+    _, factory = sesiones
+
+    async with factory() as db:
+        with pytest.raises(ValueError, match="producto 20: quedan 1 uds"):
+            await ExistenciaService.registrar_ventas_en_anexo(db, [(10, 1), (20, 7)])
+
+    assert await _vendidos(factory) == {i[0]: i[4] for i in ITEMS}
+
+
+@pytest.mark.parametrize(
+    "saltar_bloqueados, sufijo",
+    [(False, "FOR UPDATE"), (True, "FOR UPDATE SKIP LOCKED")],
+)
+async def test_lectura_bloqueante_en_postgres(saltar_bloqueados, sufijo):
+    db = MagicMock()
+    db.exec = AsyncMock()
+
+    await item_anexo_repo.bloquear_disponibles(
+        db, [10, 20], saltar_bloqueados=saltar_bloqueados
+    )
+
+    sql = str(db.exec.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert sql.endswith(sufijo)
+    assert "ORDER BY item_anexo.id_producto ASC, item_anexo.id_anexo ASC" in sql
@@ -0,0 +1,145 @@
+"""
+Tests de la exportación en streaming de los previews (?format=csv|jsonl).
+
+Verifican que:
+1. Los previews de movimientos devuelven todas las filas en CSV (con
+   encabezado) o JSON Lines, como adjunto y sin pasar por la caché.
+2. La consulta se ejecuta con cursor del servidor (`yield_per`) y las filas
+   salen en varios bloques.
+3. Un formato desconocido se rechaza con 422.
+
+La BD es SQLite en memoria con las columnas que usan las consultas.
+"""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import column, event, select, table
+
+from main import app
+from src.database.connection import get_session
+from src.routes import reportes_router
+from src.services import reportes_service
+from src.utils.exportacion import _bloques
+
+FILAS = 25
+PARAMS = {"id_dependencia": 1, "fecha_inicio": "2024-01-01", "fecha_fin": "2024-12-31"}
+
+
+def _sql() -> list:
+    inicio = datetime(2024, 3, 1, 10, 0)
+    return [
+        "CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, nombre TEXT)",
+        "CREATE TABLE tipo_movimiento (id_tipo_movimiento INTEGER PRIMARY KEY,"
+        " tipo TEXT, factor INT)",
+        "CREATE TABLE movimiento (id_movimiento INTEGER PRIMARY KEY,"
+        " id_tipo_movimiento INT, id_dependencia INT, id_producto INT,"
+        " cantidad INT, fecha DATETIME)",
+        "INSERT INTO productos VALUES (1, 'Libro, edición \"A\"')",
+        "INSERT INTO tipo_movimiento VALUES (1, 'RECEPCION', 1), (2, 'VENTA', -1)",
+        (
+            "INSERT INTO movimiento (id_tipo_movimiento, id_dependencia,"
+            " id_producto, cantidad, fecha) VALUES (:t, 1, 1, :c, :f)",
+            [
+                {"t": 1 + i % 2, "c": i + 1, "f": inicio + timedelta(days=i)}
+                for i in range(FILAS)
+            ],
+        ),
+    ]
+
+
+@pytest.fixture
+async def base(bd_sqlite):
+    return await bd_sqlite(sql=_sql())
+
+
+@pytest.fixture
+def cliente(base):
+    opciones = []
+
+    @event.listens_for(base.engine.sync_engine, "before_execute", retval=False)
+    def _registrar(conn, clauseelement, multiparams, params, execution_options):
+        opciones.append(execution_options)
+
+    with TestClient(app) as client:
+        app.dependency_overrides[get_session] = base.session
+        with (
+            patch.object(reportes_router.AppLogger, "log_action"),
+            patch.object(reportes_service, "FILAS_POR_LOTE_EXPORTACION", 10),
+        ):
+            yield client, opciones
+        app.dependency_overrides.pop(get_session, None)
+
+
+def test_csv_con_encabezado_y_todas_las_filas(cliente):
+    client, opciones = cliente
+    with patch.object(reportes_router.report_cache, "consultar") as cache:
+        respuesta = client.get(
+            "/api/v1/reportes/movimientos-dependencia/preview",
+            params={**PARAMS, "format": "csv"},
+        )
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    assert "movimientos_dependencia_1.csv" in respuesta.headers["content-disposition"]
+    lineas = respuesta.text.splitlines()
+    assert lineas[0] == "fecha,operacion,producto,tipo,cantidad"
+    assert len(lineas) == FILAS + 1
+    # Orden por fecha descendente y comillas CSV en el nombre
+    assert (
+        lineas[1] == '2024-03-25T10:00:00,RECEPCION,"Libro, edición ""A""",Entrada,25'
+    )
+    cache.assert_not_called()
+    assert any(o.get("yield_per") == 10 for o in opciones)
+
+
+def test_jsonl_una_fila_por_linea(cliente):
+    client, _ = cliente
+    with client.stream(
+        "GET",
+        "/api/v1/reportes/movimientos-producto/preview",
+        params={**PARAMS, "id_producto": 1, "format": "jsonl"},
+    ) as respuesta:
+        cuerpo = respuesta.read()
+
+    assert respuesta.headers["content-type"] == "application/x-ndjson"
+    filas = [json.loads(linea) for linea in cuerpo.splitlines()]
+    assert len(filas) == FILAS
+    assert filas[-1] == {
+        "fecha": "2024-03-01T10:00:00",
+        "operacion": "RECEPCION",
+        "tipo": "Entrada",
+        "cantidad": 1,
+    }
+    assert {f["tipo"] for f in filas} == {"Entrada", "Salida"}
+
+
+def test_formato_desconocido_422(cliente):
+    client, _ = cliente
+    respuesta = client.get(
+        "/api/v1/reportes/movimientos-dependencia/preview",
+        params={**PARAMS, "format": "xml"},
+    )
+    assert respuesta.status_code == 422
+
+
+async def test_un_bloque_por_lote_del_cursor(bd_sqlite):
+    base = await bd_sqlite(
+        sql=[
+            "CREATE TABLE t (x INT)",
+            ("INSERT INTO t VALUES (:x)", [{"x": i} for i in range(FILAS)]),
+        ]
+    )
+    async with base.engine.connect() as conn:
+        t = table("t", column("x"))
+        result = await conn.stream(
+            select(t).order_by(t.c.x).execution_options(yield_per=10)
+        )
+        bloques = [b async for b in _bloques(result, "csv")]
+
+    # Encabezado + lotes de 10, 10 y 5 filas
+    assert [b.count(b"\n") for b in bloques] == [1, 10, 10, 5]
+    assert bloques[0] == b"x\r\n"
@@ -0,0 +1,69 @@
+"""
+Tests de los endpoints de salud (main.py).
+
+Verifican que:
+1. /health responde sin autenticación (sondas de vida).
+2. /health/db, /health/reportes y /health/auth, que nombran las bases de
+   todos los tenants, exigen un usuario autenticado de la casa matriz.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.database.connection import get_auth_session
+from src.dto.auth_dto import DependenciaInfo, UsuarioInfo
+
+RUTAS = ["/health/db", "/health/reportes", "/health/auth"]
+
+
+def _usuario(base_datos):
+    return UsuarioInfo(
+        id_usuario=1,
+        ci="1",
+        nombre="Ana",
+        primer_apellido="Pérez",
+        alias="ana",
+        dependencia=DependenciaInfo(
+            id_dependencia=1, nombre="D", base_datos=base_datos
+        ),
+    )
+
+
+@pytest.fixture
+def cliente():
+    async def _sin_bd():
+        yield None
+
+    app.dependency_overrides[get_auth_session] = _sin_bd
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_auth_session, None)
+
+
+def test_health_es_publico(cliente):
+    respuesta = cliente.get("/health")
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"status": "healthy"}
+
+
+@pytest.mark.parametrize(
+    "headers, usuario, estado",
+    [
+        ({}, None, 401),
+        ({"Authorization": "Bearer vencido"}, None, 401),
+        ({"Authorization": "Bearer token"}, _usuario("sucursal_a"), 403),
+        ({"Authorization": "Bearer token"}, _usuario("caguayosa"), 200),
+    ],
+    ids=["anonimo", "token_invalido", "sucursal", "casa_matriz"],
+)
+@pytest.mark.parametrize("ruta", RUTAS)
+def test_metricas_solo_para_casa_matriz(cliente, ruta, headers, usuario, estado):
+    with patch(
+        "src.utils.dependencies.get_current_user",
+        AsyncMock(return_value=usuario),
+    ):
+        respuesta = cliente.get(ruta, headers=headers)
+
+    assert respuesta.status_code == estado
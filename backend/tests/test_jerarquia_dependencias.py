@@ -0,0 +1,164 @@
+"""
+Tests de la jerarquía de dependencias (src/services/jerarquia_service.py).
+
+Verifican que:
+1. El subárbol y los ancestros salen de una sola consulta (WITH RECURSIVE).
+2. La validación de ciclos detecta al propio padre y a los descendientes, y
+   termina aunque los datos ya tengan un ciclo.
+3. La expansión de dependencias del login lee la jerarquía actual de la BD
+   (no la caché) y devuelve el subárbol en preorden.
+4. /dependencias/jerarquia devuelve hijos directos o el subárbol completo y
+   la caché se invalida al editar.
+
+Se usa una BD SQLite en memoria con solo las tablas necesarias.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from main import app
+from src.database.connection import get_session
+from src.models import (
+    Cuenta,
+    CuentaDependencia,
+    Dependencia,
+    Moneda,
+    Municipio,
+    Provincia,
+    TipoDependencia,
+)
+from src.services.auth_service import get_dependencia_with_hijos
+from src.services.jerarquia_service import JerarquiaService, jerarquia_cache
+
+# (id, padre):  1 ─┬─ 2 ─┬─ 4
+#                  │     └─ 5 ── 7
+#                  └─ 3
+#               6 (otra raíz)
+DEPENDENCIAS = [(1, None), (2, 1), (3, 1), (4, 2), (5, 2), (6, None), (7, 5)]
+
+TABLAS = [
+    Cuenta,
+    CuentaDependencia,
+    Dependencia,
+    Moneda,
+    Municipio,
+    Provincia,
+    TipoDependencia,
+]
+
+
+@pytest.fixture
+async def sesiones(bd_sqlite):
+    jerarquia_cache.invalidar()
+    base = await bd_sqlite(
+        tablas=TABLAS,
+        filas=[TipoDependencia(id_tipo_dependencia=1, nombre="Sucursal")]
+        + [
+            Dependencia(
+                id_dependencia=id_dependencia,
+                id_tipo_dependencia=1,
+                codigo_padre=padre,
+                nombre=f"Dependencia {id_dependencia}",
+                denominacion="D",
+                direccion="Calle 1",
+                telefono="555",
+                base_datos=f"db{id_dependencia}" if id_dependencia != 3 else None,
+            )
+            for id_dependencia, padre in DEPENDENCIAS
+        ],
+    )
+    yield base.engine, base.sesiones
+    jerarquia_cache.invalidar()
+
+
+def _contar_consultas(engine) -> list:
+    consultas = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    return consultas
+
+
+async def test_subarbol_y_ancestros_en_una_consulta(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        assert await JerarquiaService.descendientes_ids(db, 2) == [2, 4, 5, 7]
+        assert await JerarquiaService.ancestros_ids(db, 7) == [7, 5, 2, 1]
+
+    assert len(consultas) == 2
+    assert all("WITH RECURSIVE" in c for c in consultas)
+
+
+async def test_validacion_de_ciclos(sesiones):
+    _, factory = sesiones
+
+    async with factory() as db:
+        assert await JerarquiaService.formaria_ciclo(db, 2, 2)
+        assert await JerarquiaService.formaria_ciclo(db, 2, 7)
+        assert not await JerarquiaService.formaria_ciclo(db, 2, 3)
+        assert not await JerarquiaService.formaria_ciclo(db, 0, 7)
+        assert not await JerarquiaService.formaria_ciclo(db, 2, None)
+
+        # Un ciclo ya presente en los datos no deja el recorrido sin fin
+        await db.execute(
+            text("UPDATE dependencia SET codigo_padre = 7 WHERE id_dependencia = 1")
+        )
+        assert await JerarquiaService.ancestros_ids(db, 2) == [2, 1, 7, 5]
+        assert not await JerarquiaService.formaria_ciclo(db, 6, 2)
+
+
+async def test_login_lee_la_jerarquia_actual(sesiones):
+    engine, factory = sesiones
+    consultas = _contar_consultas(engine)
+
+    async with factory() as db:
+        primera = await get_dependencia_with_hijos(db, 1)
+        assert len(consultas) == 2  # subárbol + dependencias
+
+        # Con la caché cargada, un cambio que no pasó por este worker
+        # (réplica, otro proceso) se ve igual en el alcance del login
+        await jerarquia_cache.arbol(db)
+        await db.execute(
+            text("UPDATE dependencia SET codigo_padre = 6 WHERE id_dependencia = 5")
+        )
+        segunda = await get_dependencia_with_hijos(db, 2)
+        otra_raiz = await get_dependencia_with_hijos(db, 6)
+
+    assert [d.id_dependencia for d in primera] == [1, 2, 4, 5, 7, 3]
+    assert [d.id_dependencia for d in segunda] == [2, 4]
+    assert [d.id_dependencia for d in otra_raiz] == [6, 5, 7]
+
+
+def test_endpoint_jerarquia(sesiones):
+    _, factory = sesiones
+
+    async def _override_get_session():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _override_get_session
+    try:
+        client = TestClient(app)
+        raices = client.get("/api/v1/dependencias/jerarquia")
+        hijos = client.get("/api/v1/dependencias/jerarquia", params={"padre_id": 2})
+        subarbol = client.get(
+            "/api/v1/dependencias/jerarquia",
+            params={"padre_id": 1, "recursivo": True},
+        )
+        movida = client.put("/api/v1/dependencias/4", json={"codigo_padre": 3})
+        ciclo = client.put("/api/v1/dependencias/2", json={"codigo_padre": 7})
+        despues = client.get("/api/v1/dependencias/jerarquia", params={"padre_id": 3})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [d["id_dependencia"] for d in raices.json()] == [1, 6]
+    assert [d["id_dependencia"] for d in hijos.json()] == [4, 5]
+    assert [d["id_dependencia"] for d in subarbol.json()] == [2, 4, 5, 7, 3]
+    assert movida.status_code == 200
+    assert ciclo.status_code == 400
+    assert [d["id_dependencia"] for d in despues.json()] == [4]
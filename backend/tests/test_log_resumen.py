@@ -0,0 +1,204 @@
+"""
+Tests del resumen por hora y del mantenimiento de la tabla `log`.
+
+Verifican que:
+1. El INSERT de logs acumula `log_resumen_hora` en la misma sentencia
+   (upsert por hora, nivel y tipo), también con filas de distintas claves.
+2. /logs/stats suma los totales de los últimos 7 días desde el resumen y
+   los últimos errores siguen saliendo de `log`.
+3. POST /logs inserta por el mismo camino y difunde la fila insertada.
+4. El mantenimiento llama a las funciones SQL de particiones y una base con
+   error no detiene a las demás.
+
+La BD es SQLite en memoria (las funciones de PostgreSQL se verifican
+compilando la sentencia).
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from main import app
+from src.database.connection import get_session
+from src.models.log import LogEntry, LogResumenHora
+from src.services import log_mantenimiento
+from src.services.log_writer import sentencia_insertar_logs
+
+
+def test_insert_acumula_resumen_en_la_misma_sentencia():
+    filas = [
+        {
+            "nivel": "INFO",
+            "tipo": "REQUEST",
+            "mensaje": "a",
+            "timestamp": datetime.now(),
+        },
+        {
+            "nivel": "ERROR",
+            "tipo": "ERROR",
+            "mensaje": "b",
+            "timestamp": datetime.now(),
+        },
+    ]
+    sql = str(sentencia_insertar_logs(filas).compile(dialect=asyncpg.dialect()))
+
+    assert sql.startswith("WITH nuevos AS")
+    assert "INSERT INTO log_resumen_hora (hora, nivel, tipo, cantidad)" in sql
+    assert "ON CONFLICT (hora, nivel, tipo) DO UPDATE" in sql
+    assert "log_resumen_hora.cantidad + excluded.cantidad" in sql
+    # La hora del GROUP BY usa el mismo parámetro que la del SELECT
+    assert sql.count("date_trunc($1::VARCHAR, nuevos.timestamp)") == 2
+    assert sql.endswith("FROM nuevos ORDER BY nuevos.id")
+
+
+@pytest.mark.parametrize("request_primero", [False, True])
+def test_insert_con_filas_de_distintas_claves(request_primero):
+    negocio = {"nivel": "INFO", "tipo": "ACTION", "mensaje": "ventas: crear"}
+    request = {
+        "nivel": "WARNING",
+        "tipo": "REQUEST",
+        "mensaje": "GET /x",
+        "ip": "10.0.0.7",
+        "endpoint": "/x",
+        "method": "GET",
+        "status_code": 404,
+        "navegador": "curl",
+    }
+    filas = [request, negocio] if request_primero else [negocio, request]
+    for fila in filas:
+        fila["timestamp"] = datetime(2026, 10, 17, 9, 30)
+
+    compilada = sentencia_insertar_logs(filas).compile(dialect=asyncpg.dialect())
+
+    columnas = LogEntry.__table__.c.keys()[1:]
+    assert f"INSERT INTO log ({', '.join(columnas)})" in str(compilada)
+    # Los valores van en orden: una fila de 12 columnas tras otra
+    valores = [
+        v for k, v in compilada.construct_params().items() if k.startswith("param_")
+    ]
+    guardadas = [
+        dict(zip(columnas, valores[i : i + len(columnas)]))
+        for i in range(0, len(valores), len(columnas))
+    ]
+    assert len(guardadas) == 2
+    for fila, guardada in zip(filas, guardadas):
+        assert guardada == {c: fila.get(c) for c in columnas}
+
+
+@pytest.fixture
+async def base(bd_sqlite):
+    ahora = datetime.now()
+    return await bd_sqlite(
+        tablas=[LogEntry, LogResumenHora],
+        filas=[
+            LogResumenHora(
+                hora=ahora.replace(minute=0, second=0, microsecond=0),
+                nivel="INFO",
+                tipo="REQUEST",
+                cantidad=40,
+            ),
+            LogResumenHora(
+                hora=ahora - timedelta(days=2),
+                nivel="ERROR",
+                tipo="REQUEST",
+                cantidad=3,
+            ),
+            LogResumenHora(
+                hora=ahora - timedelta(days=3),
+                nivel="INFO",
+                tipo="BUSINESS",
+                cantidad=7,
+            ),
+            # Fuera de la ventana de 7 días
+            LogResumenHora(
+                hora=ahora - timedelta(days=9),
+                nivel="INFO",
+                tipo="REQUEST",
+                cantidad=1000,
+            ),
+            LogEntry(
+                timestamp=ahora - timedelta(hours=1),
+                nivel="ERROR",
+                tipo="REQUEST",
+                mensaje="falló",
+            ),
+        ],
+    )
+
+
+@pytest.fixture
+def cliente(base):
+    with TestClient(app) as client:
+        app.dependency_overrides[get_session] = base.session
+        yield client
+        app.dependency_overrides.pop(get_session, None)
+
+
+def test_stats_desde_resumen_por_hora(cliente):
+    respuesta = cliente.get("/api/v1/logs/stats")
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["total"] == 50
+    assert datos["por_nivel"] == {"INFO": 47, "ERROR": 3}
+    assert datos["por_tipo"] == {"REQUEST": 43, "BUSINESS": 7}
+    assert [e["mensaje"] for e in datos["ultimos_errores"]] == ["falló"]
+
+
+def test_crear_log_inserta_con_resumen_y_difunde(cliente):
+    fila = {"id": 9, "timestamp": datetime(2026, 10, 17, 9, 30), "mensaje": "m"}
+    with (
+        patch(
+            "src.routes.logger.insertar_logs", AsyncMock(return_value=[fila])
+        ) as insertar,
+        patch("src.routes.logger.broadcast_log", AsyncMock()) as broadcast,
+    ):
+        respuesta = cliente.post("/api/v1/logs", json={"mensaje": "m"})
+
+    assert respuesta.json() == {"success": True}
+    filas = insertar.await_args.args[1]
+    assert filas[0]["mensaje"] == "m" and "timestamp" in filas[0]
+    broadcast.assert_awaited_once_with(
+        {"id": 9, "timestamp": "2026-10-17T09:30:00", "mensaje": "m"}
+    )
+
+
+async def test_mantenimiento_llama_a_las_funciones_de_particion():
+    conn = MagicMock()
+    conn.execute = AsyncMock(
+        side_effect=[
+            MagicMock(scalars=lambda: ["log_p202612"]),
+            MagicMock(scalars=lambda: ["log_p202603", "log_p202604"]),
+        ]
+    )
+
+    resultado = await log_mantenimiento.mantener_particiones_log(conn, 2, 6)
+
+    assert resultado == {
+        "creadas": ["log_p202612"],
+        "eliminadas": ["log_p202603", "log_p202604"],
+    }
+    llamadas = [(str(c.args[0]), c.args[1]) for c in conn.execute.await_args_list]
+    assert llamadas == [
+        ("SELECT * FROM asegurar_particiones_log(:meses)", {"meses": 2}),
+        ("SELECT * FROM purgar_particiones_log(:meses)", {"meses": 6}),
+    ]
+
+
+async def test_mantenimiento_sigue_tras_una_base_con_error():
+    async def _mantener(db_name, meses_adelante, retencion_meses):
+        if db_name == "sucursal_rota":
+            raise RuntimeError("función no existe")
+        return {"creadas": [], "eliminadas": [f"{db_name}_vieja"]}
+
+    with patch.object(log_mantenimiento, "mantener_logs", side_effect=_mantener):
+        resultado = await log_mantenimiento.mantener_logs_en(
+            ["caguayosa", "sucursal_rota", "sucursal_a", "caguayosa"]
+        )
+
+    assert list(resultado) == ["caguayosa", "sucursal_rota", "sucursal_a"]
+    assert resultado["sucursal_rota"] == {"error": "función no existe"}
+    assert resultado["sucursal_a"]["eliminadas"] == ["sucursal_a_vieja"]
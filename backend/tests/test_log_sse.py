@@ -0,0 +1,92 @@
+"""
+Tests del hub de difusión de /logs/stream (src/services/log_sse.py).
+
+Verifican que:
+1. Un cliente lento pierde los eventos más antiguos y recibe `dropped`.
+2. Los filtros por nivel/tipo se aplican en el servidor.
+3. Last-Event-ID reanuda desde el historial.
+4. Sin eventos se envían heartbeats.
+"""
+
+import asyncio
+import json
+
+from src.services.log_sse import LogBroadcastHub
+
+
+def _log(i: int, nivel: str = "INFO", tipo: str = "REQUEST") -> dict:
+    return {"id": i, "nivel": nivel, "tipo": tipo, "mensaje": f"log {i}"}
+
+
+def _datos(frames):
+    return [
+        json.loads(f.split("data: ", 1)[1])
+        for f in frames
+        if f.startswith("id: ")
+    ]
+
+
+def test_cliente_lento_descarta_los_mas_antiguos():
+    hub = LogBroadcastHub(buffer_size=3)
+    cliente = hub.suscribir()
+    for i in range(10):
+        hub.publicar(_log(i))
+
+    frames = hub._drenar(cliente)
+    assert frames[0].startswith("event: dropped")
+    assert json.loads(frames[0].split("data: ")[1]) == {"dropped": 7}
+    assert [d["id"] for d in _datos(frames)] == [7, 8, 9]
+
+
+def test_publicar_no_depende_de_los_clientes():
+    hub = LogBroadcastHub(buffer_size=2)
+    lento = hub.suscribir()
+    rapido = hub.suscribir()
+    for i in range(5):
+        hub.publicar(_log(i))
+        if i % 2 == 0:
+            hub._drenar(rapido)
+    assert len(lento.buffer) == 2
+    assert lento.descartados == 3
+    assert rapido.descartados == 0
+
+
+def test_filtros_por_nivel_y_tipo():
+    hub = LogBroadcastHub()
+    errores = hub.suscribir(niveles=["error"])
+    negocio = hub.suscribir(tipos=["BUSINESS", "ACTION"])
+    hub.publicar(_log(1, nivel="INFO", tipo="REQUEST"))
+    hub.publicar(_log(2, nivel="ERROR", tipo="REQUEST"))
+    hub.publicar(_log(3, nivel="INFO", tipo="ACTION"))
+
+    assert [d["id"] for d in _datos(hub._drenar(errores))] == [2]
+    assert [d["id"] for d in _datos(hub._drenar(negocio))] == [3]
+
+
+def test_reanudar_con_last_event_id():
+    hub = LogBroadcastHub(backlog_size=5)
+    ids = [hub.publicar(_log(i)) for i in range(8)]
+
+    cliente = hub.suscribir(last_event_id=ids[5])
+    assert [d["id"] for d in _datos(hub._drenar(cliente))] == [6, 7]
+
+    # El id pedido ya salió del historial: se informan los perdidos
+    antiguo = hub.suscribir(last_event_id=ids[0])
+    frames = hub._drenar(antiguo)
+    assert json.loads(frames[0].split("data: ")[1]) == {"dropped": 2}
+    assert [d["id"] for d in _datos(frames)] == [3, 4, 5, 6, 7]
+
+
+async def test_stream_heartbeat_y_desuscripcion():
+    hub = LogBroadcastHub(heartbeat=0.01)
+    stream = hub.eventos()
+    assert await stream.__anext__() == "retry: 3000\n\n"
+    assert await stream.__anext__() == ": heartbeat\n\n"
+    assert hub.clientes == 1
+
+    hub.publicar(_log(1))
+    frame = await asyncio.wait_for(stream.__anext__(), 1)
+    assert frame.startswith("id: 1\n")
+
+    await stream.aclose()
+    assert hub.clientes == 0
@@ -0,0 +1,204 @@
+"""
+Tests del escritor de logs en segundo plano (src/services/log_writer.py).
+
+Verifican que:
+1. Los registros se escriben en lotes por tamaño y por intervalo.
+2. Los lotes se agrupan por base de datos.
+3. Con la cola llena los registros se descartan sin bloquear el request.
+4. detener() escribe todo lo pendiente.
+5. Los lotes mezclan registros de distintas fuentes (negocio, frontend,
+   request) y todas sus columnas se guardan, sea cual sea el orden.
+6. read_response_body no bufferiza respuestas grandes completas.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import insert, select
+from starlette.responses import StreamingResponse
+
+from src.middleware.logging import read_response_body
+from src.models.log import LogEntry
+from src.services.log_writer import LogWriter
+
+
+def _log(i: int) -> dict:
+    return {"nivel": "INFO", "tipo": "REQUEST", "mensaje": f"log {i}"}
+
+
+@pytest.fixture
+def escrituras():
+    """Sustituye la escritura en BD y registra (db_name, filas) de cada lote."""
+    lotes = []
+
+    async def _escribir(self, db_name, filas):
+        lotes.append((db_name, filas))
+
+    with patch.object(LogWriter, "_escribir", _escribir):
+        yield lotes
+
+
+async def test_agrupa_en_lotes_por_tamano(escrituras):
+    writer = LogWriter(batch_size=200, flush_interval_ms=1000)
+    for i in range(450):
+        assert writer.enviar(_log(i), db_name="central")
+    await writer.detener()
+
+    assert [len(filas) for _, filas in escrituras] == [200, 200, 50]
+    assert escrituras[0][1][0]["mensaje"] == "log 0"
+    assert "timestamp" in escrituras[0][1][0]
+
+
+async def test_escribe_por_intervalo(escrituras):
+    writer = LogWriter(batch_size=200, flush_interval_ms=20)
+    writer.enviar(_log(1), db_name="central")
+    await asyncio.sleep(0.1)
+
+    assert len(escrituras) == 1
+    await writer.detener()
+
+
+async def test_agrupa_por_base_de_datos(escrituras):
+    writer = LogWriter(batch_size=10, flush_interval_ms=1000)
+    for i in range(6):
+        writer.enviar(_log(i), db_name="sucursal_a" if i % 2 else "sucursal_b")
+    await writer.detener()
+
+    por_db = {db: len(filas) for db, filas in escrituras}
+    assert por_db == {"sucursal_a": 3, "sucursal_b": 3}
+
+
+async def test_descarta_con_cola_llena(escrituras):
+    writer = LogWriter(max_queue=5, batch_size=100, flush_interval_ms=1000)
+    aceptados = [writer.enviar(_log(i), db_name="central") for i in range(8)]
+    await writer.detener()
+
+    assert aceptados.count(True) == 5
+    assert writer.descartados == 3
+    assert sum(len(filas) for _, filas in escrituras) == 5
+
+
+async def test_no_acepta_registros_tras_detener(escrituras):
+    writer = LogWriter()
+    await writer.detener()
+    assert writer.enviar(_log(1), db_name="central") is False
+
+
+async def test_trunca_campos_largos():
+    writer = LogWriter()
+    _, fila = writer._preparar({"mensaje": "x" * 900, "nivel": "INFO"}, "central")
+    assert len(fila["mensaje"]) == 500
+
+
+# Un registro de cada fuente, con las claves que arma cada una
+LOG_NEGOCIO = {
+    "nivel": "INFO",
+    "tipo": "ACTION",
+    "mensaje": "ventas: crear",
+    "detalle": None,
+    "usuario_id": 1,
+    "usuario_nombre": "ana",
+}
+LOG_FRONTEND = {
+    "nivel": "ERROR",
+    "tipo": "FRONTEND",
+    "mensaje": "TypeError",
+    "navegador": "Firefox",
+    "ip": "10.0.0.9",
+}
+LOG_REQUEST = {
+    "nivel": "INFO",
+    "tipo": "REQUEST",
+    "mensaje": "POST /ventas",
+    "ip": "10.0.0.7",
+    "endpoint": "/api/v1/ventas",
+    "method": "POST",
+    "status_code": 201,
+    "navegador": "curl",
+    "usuario_id": 1,
+    "usuario_nombre": "ana",
+}
+
+
+@pytest.mark.parametrize(
+    "orden",
+    [
+        (LOG_NEGOCIO, LOG_FRONTEND, LOG_REQUEST),
+        (LOG_REQUEST, LOG_FRONTEND, LOG_NEGOCIO),
+    ],
+    ids=["negocio_primero", "request_primero"],
+)
+async def test_lote_mixto_guarda_todas_las_columnas(escrituras, bd_sqlite, orden):
+    writer = LogWriter(batch_size=10, flush_interval_ms=1000)
+    for log_data in orden:
+        writer.enviar(log_data, db_name="central")
+    await writer.detener()
+    [(_, filas)] = escrituras
+
+    base = await bd_sqlite(tablas=[LogEntry])
+    async with base.engine.begin() as conn:
+        # Mismo INSERT multi-fila que arma el escritor con el lote
+        await conn.execute(insert(LogEntry).values(filas))
+        guardadas = {
+            fila.mensaje: fila._mapping
+            for fila in (await conn.execute(select(LogEntry.__table__))).all()
+        }
+
+    for log_data in orden:
+        guardada = guardadas[log_data["mensaje"]]
+        for columna in LogEntry.__table__.c.keys():
+            if columna not in ("id", "timestamp"):
+                assert guardada[columna] == log_data.get(columna), columna
+    assert guardadas["POST /ventas"]["endpoint"] == "/api/v1/ventas"
+    assert guardadas["ventas: crear"]["status_code"] is None
+
+
+async def test_insert_multifila_y_difusion():
+    writer = LogWriter()
+    fila = {"id": 1, "mensaje": "m"}
+    fila_bd = MagicMock(_mapping={**fila, "timestamp": MagicMock()})
+    result = MagicMock()
+    result.all.return_value = [fila_bd, fila_bd]
+    session = MagicMock()
+    session.exec = AsyncMock(return_value=result)
+    session.commit = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+
+    with (
+        patch(
+            "src.services.log_writer.engine_registry.get_session_factory",
+            return_value=MagicMock(return_value=session),
+        ),
+        patch("src.services.log_sse.broadcast_log", AsyncMock()) as broadcast,
+    ):
+        await writer._escribir("central", [_log(1), _log(2)])
+
+    assert session.exec.await_count == 1
+    assert writer.escritos == 2
+    assert broadcast.await_count == 2
+
+
+async def test_read_response_body_respeta_el_limite():
+    async def cuerpo():
+        for _ in range(10):
+            yield b"x" * 1000
+
+    response = StreamingResponse(cuerpo())
+    leido, response = await read_response_body(response, limite=2500)
+    assert leido == b""
+    enviado = b"".join([chunk async for chunk in response.body_iterator])
+    assert len(enviado) == 10000
+
+
+async def test_read_response_body_devuelve_cuerpo_pequeno():
+    async def cuerpo():
+        yield json.dumps({"detail": "No encontrado"}).encode()
+
+    response = StreamingResponse(cuerpo(), status_code=404)
+    leido, response = await read_response_body(response)
+    assert json.loads(leido)["detail"] == "No encontrado"
+    enviado = b"".join([chunk async for chunk in response.body_iterator])
+    assert enviado == leido
@@ -1,10 +1,16 @@
 import pytest
 from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 from sqlmodel import select
 from src.services.movimiento_service import MovimientoService
 from src.services.existencia_service import ExistenciaService
 from src.models.movimiento import Movimiento, TipoMovimiento
 from src.models.producto import Productos
+from src.repository import movimiento_repo
+from src.repository.contratos_repo import item_anexo_repo
+from src.repository.existencia_repo import existencia_repo
+from src.repository.stock_repo import stock_repo
 
 
 async def test_confirmar_entrada_salida(db_session):
@@ -124,3 +130,208 @@ async def test_confirmar_stock_insuficiente_rechaza(db_session):
         await MovimientoService.confirmar_movimiento(db_session, mov.id_movimiento)
 
     await MovimientoService.cancelar_movimiento(db_session, mov.id_movimiento)
+
+
+async def test_saldo_stock_dependencia_confirmar_y_cancelar(db_session):
+    """stock_dependencia suma al confirmar y revierte al cancelar."""
+    from src.repository.stock_repo import stock_repo
+    from src.models import Dependencia
+
+    producto_id = 203
+    cantidad = 5
+
+    producto = await db_session.get(Productos, producto_id)
+    if not producto:
+        pytest.skip(f"Producto id={producto_id} no existe en esta BD")
+
+    deps = (await db_session.exec(select(Dependencia).limit(1))).first()
+    if not deps:
+        pytest.skip("No hay dependencias en la BD")
+    dep_id = deps.id_dependencia
+
+    tipo_compra = (
+        await db_session.exec(
+            select(TipoMovimiento).where(TipoMovimiento.tipo == "compra")
+        )
+    ).one()
+
+    saldo_inicial = await stock_repo.get_stock(db_session, producto_id, dep_id)
+
+    mov = Movimiento(
+        id_tipo_movimiento=tipo_compra.id_tipo_movimiento,
+        id_dependencia=dep_id,
+        id_producto=producto_id,
+        cantidad=cantidad,
+        fecha=datetime.now(),
+        estado="pendiente",
+    )
+    db_session.add(mov)
+    await db_session.commit()
+
+    await MovimientoService.confirmar_movimiento(db_session, mov.id_movimiento)
+    assert (
+        await stock_repo.get_stock(db_session, producto_id, dep_id)
+        == saldo_inicial + cantidad
+    )
+
+    await MovimientoService.cancelar_movimiento(db_session, mov.id_movimiento)
+    assert await stock_repo.get_stock(db_session, producto_id, dep_id) == saldo_inicial
+
+
+async def test_confirmar_lote_resultados_por_item(db_session):
+    """Lote: la compra suma antes que el ajuste de salida; el ajuste sin stock
+    y el id inexistente fallan sin impedir el resto."""
+    from src.repository.stock_repo import stock_repo
+    from src.models import Dependencia
+
+    producto_id = 203
+
+    producto = await db_session.get(Productos, producto_id)
+    if not producto:
+        pytest.skip(f"Producto id={producto_id} no existe en esta BD")
+    existencia = await ExistenciaService.get_existencia_producto(
+        db_session, producto_id
+    )
+    if existencia["usa_konsignacion"]:
+        pytest.skip(f"Producto id={producto_id} es de consignación")
+
+    deps = (await db_session.exec(select(Dependencia).limit(1))).first()
+    if not deps:
+        pytest.skip("No hay dependencias en la BD")
+    dep_id = deps.id_dependencia
+
+    tipos = {
+        t.tipo: t
+        for t in (
+            await db_session.exec(
+                select(TipoMovimiento).where(
+                    TipoMovimiento.tipo.in_(["compra", "AJUSTE_QUITAR"])
+                )
+            )
+        ).all()
+    }
+    saldo_inicial = await stock_repo.get_stock(db_session, producto_id, dep_id)
+
+    movs = [
+        Movimiento(
+            id_tipo_movimiento=tipos[tipo].id_tipo_movimiento,
+            id_dependencia=dep_id,
+            id_producto=producto_id,
+            cantidad=cantidad,
+            fecha=datetime.now(),
+            estado="pendiente",
+        )
+        for tipo, cantidad in (
+            ("compra", 7),
+            ("AJUSTE_QUITAR", 3),
+            ("AJUSTE_QUITAR", 99999),
+        )
+    ]
+    db_session.add_all(movs)
+    await db_session.commit()
+    ids = [m.id_movimiento for m in movs]
+
+    lote = await MovimientoService.confirmar_movimientos(db_session, ids + [ids[0], -1])
+
+    assert lote.confirmados == 2
+    assert lote.fallidos == 2
+    resultados = {r.id_movimiento: r for r in lote.resultados}
+    assert resultados[ids[0]].estado == "confirmado"
+    assert resultados[ids[1]].estado == "confirmado"
+    assert resultados[ids[2]].estado == "pendiente"
+    assert "Stock insuficiente" in resultados[ids[2]].error
+    assert resultados[-1].error == "Movimiento no encontrado"
+    assert (
+        await stock_repo.get_stock(db_session, producto_id, dep_id)
+        == saldo_inicial + 7 - 3
+    )
+
+    for id_mov in ids:
+        await MovimientoService.cancelar_movimiento(db_session, id_mov)
+
+
+def _mov(id_movimiento, tipo, factor, id_producto, cantidad):
+    return SimpleNamespace(
+        id_movimiento=id_movimiento,
+        estado="pendiente",
+        tipo_movimiento=SimpleNamespace(tipo=tipo, factor=factor),
+        producto=SimpleNamespace(nombre=f"Producto {id_producto}"),
+        id_producto=id_producto,
+        id_dependencia=1,
+        cantidad=cantidad,
+        id_anexo=None,
+        id_factura=None,
+        id_venta_efectivo=None,
+    )
+
+
+async def test_confirmar_lote_valida_en_orden_sin_bd():
+    """Validación voraz en el orden recibido (sin PostgreSQL): cada movimiento
+    ve lo que aportan o consumen los aceptados antes; el rechazado sigue
+    comprometiendo su cantidad."""
+    movs = [
+        _mov(1, "AJUSTE_QUITAR", -1, 10, 4),  # 5 disponibles -> ok
+        _mov(2, "AJUSTE_QUITAR", -1, 10, 3),  # queda 1 -> falla
+        _mov(3, "compra", 1, 10, 6),  # suma 6
+        _mov(4, "AJUSTE_QUITAR", -1, 10, 2),  # 5 + 6 - 4 - 3 comprometidas = 4
+        _mov(5, "MERMA", -1, 10, 1),  # sin consignación no hay FIFO
+        _mov(6, "MERMA", -1, 20, 2),  # consignación: 3 -> ok
+        _mov(7, "MERMA", -1, 20, 2),  # queda 1 -> falla
+    ]
+    disponibilidad = {
+        (10, 1): {
+            "usa_konsignacion": False,
+            "stock_konsignacion": 0,
+            "stock_movimientos": 5,
+            "stock_comprometido": 0,
+        },
+        (20, 1): {
+            "usa_konsignacion": True,
+            "stock_konsignacion": 3,
+            "stock_movimientos": 0,
+            "stock_comprometido": 0,
+        },
+    }
+    db = MagicMock(commit=AsyncMock())
+
+    with (
+        patch.object(
+            movimiento_repo, "get_para_confirmar", AsyncMock(return_value=movs)
+        ),
+        patch.object(
+            existencia_repo,
+            "disponibilidad_lote",
+            AsyncMock(return_value=disponibilidad),
+        ),
+        patch.object(
+            item_anexo_repo,
+            "get_primeros_por_anexo_producto",
+            AsyncMock(return_value={}),
+        ),
+        patch.object(
+            ExistenciaService, "registrar_ventas_en_anexo", AsyncMock()
+        ) as fifo,
+        patch("src.services.movimiento_service.get_by_ids", AsyncMock(return_value={})),
+        patch(
+            "src.services.movimiento_service.ProductosEnLiquidacionService"
+            ".generate_codigos",
+            AsyncMock(return_value=[]),
+        ),
+        patch.object(stock_repo, "aplicar_movimientos", AsyncMock()) as aplicar,
+    ):
+        lote = await MovimientoService.confirmar_movimientos(
+            db, [m.id_movimiento for m in movs] + [-1]
+        )
+
+    resultados = {r.id_movimiento: r for r in lote.resultados}
+    assert [i for i, r in resultados.items() if r.confirmado] == [1, 3, 4, 6]
+    assert "Disponible: 1, Solicitado: 3" in resultados[2].error
+    assert "sin asignar" in resultados[5].error
+    assert "Disponible: 1, Solicitado: 2" in resultados[7].error
+    assert resultados[-1].error == "Movimiento no encontrado"
+    assert (lote.confirmados, lote.fallidos) == (4, 4)
+    fifo.assert_awaited_once_with(db, [(20, 2)], commit=False)
+    aplicar.assert_awaited_once_with(
+        db, [(10, 1, 4, -1), (10, 1, 6, 1), (10, 1, 2, -1), (20, 1, 2, -1)]
+    )
+    db.commit.assert_awaited_once()
@@ -0,0 +1,83 @@
+"""
+Tests del pool de bcrypt (src/services/password_executor.py).
+
+Verifican que:
+1. El hash y la verificación corren en los hilos del pool, no en el loop.
+2. La concurrencia está limitada y, con la cola llena, se rechaza al instante
+   con AuthSaturadaError (429 con Retry-After) sin llegar a encolar.
+3. El login responde 429 cuando el pool está saturado.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.services import auth_service
+from src.services.auth_service import get_password_hash_async, verify_password_async
+from src.services.password_executor import AuthSaturadaError, PasswordExecutor
+
+
+def _lento(segundos: float) -> str:
+    time.sleep(segundos)
+    return threading.current_thread().name
+
+
+async def test_hash_y_verificacion_en_el_pool():
+    executor = PasswordExecutor(max_workers=1)
+    try:
+        with patch("src.services.auth_service.password_executor", executor):
+            hash_ = await get_password_hash_async("secreta")
+            assert await verify_password_async("secreta", hash_)
+            assert not await verify_password_async("otra", hash_)
+        assert (await executor.ejecutar(_lento, 0)).startswith("bcrypt")
+    finally:
+        executor.shutdown()
+
+    assert executor.stats()["completados"] == 4
+
+
+async def test_limita_concurrencia_y_rechaza_con_cola_llena():
+    executor = PasswordExecutor(max_workers=1, max_cola=2, retry_after=5)
+    try:
+        tareas = [
+            asyncio.create_task(executor.ejecutar(_lento, 0.05)) for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        assert executor.stats()["en_curso"] == 1
+        assert executor.stats()["en_cola"] == 2
+
+        inicio = time.perf_counter()
+        with pytest.raises(AuthSaturadaError) as exc:
+            await executor.ejecutar(_lento, 0.05)
+        assert time.perf_counter() - inicio < 0.01
+        assert exc.value.status_code == 429
+        assert exc.value.headers == {"Retry-After": "5"}
+
+        await asyncio.gather(*tareas)
+        # Con la cola vacía se vuelve a aceptar
+        await executor.ejecutar(_lento, 0)
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["completados"] == 4
+    assert stats["rechazados"] == 1
+    assert stats["max_en_cola"] == 2
+
+
+def test_login_saturado_responde_429():
+    login = AsyncMock(side_effect=AuthSaturadaError(retry_after=3))
+    with patch.object(auth_service, "login", new=login):
+        respuesta = TestClient(app).post(
+            "/api/v1/auth/login",
+            json={"alias": "ana", "contrasenia": "x", "base_datos": "db1"},
+        )
+
+    assert respuesta.status_code == 429
+    assert respuesta.headers["retry-after"] == "3"
+    assert "Demasiados" in respuesta.json()["detail"]
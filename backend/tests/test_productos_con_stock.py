@@ -0,0 +1,123 @@
+"""
+Regresión N+1 en los listados de productos con stock de MovimientoService.
+
+Verifican que:
+1. get_productos_con_stock y get_productos_con_stock_por_dependencia resuelven
+   el anexo/convenio de origen con una sola consulta, sin importar cuántos
+   movimientos carecen de id_anexo/id_convenio.
+2. Contra la BD real, el número de sentencias SQL es fijo y pequeño.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import event
+
+from src.services.movimiento_service import MovimientoService
+
+
+def _movimientos_sin_origen(cantidad: int):
+    """Movimientos sintéticos sin anexo/convenio, repartidos en 10 productos."""
+    return [
+        SimpleNamespace(
+            id_producto=(i % 10) + 1,
+            id_anexo=None,
+            id_convenio=None,
+            cantidad=2,
+            producto=SimpleNamespace(
+                nombre=f"Producto {(i % 10) + 1}", descripcion=None, codigo=None
+            ),
+        )
+        for i in range(cantidad)
+    ]
+
+
+def _db_con_origenes():
+    """Sesión mockeada cuyo único exec devuelve el origen de cada producto."""
+    filas = [
+        SimpleNamespace(id_producto=p, id_anexo=100 + p, id_convenio=200 + p)
+        for p in range(1, 11)
+    ]
+    result = MagicMock()
+    result.all.return_value = filas
+    db = MagicMock()
+    db.exec = AsyncMock(return_value=result)
+    return db
+
+
+class TestProductosConStockSinNMasUno:
+    @pytest.mark.parametrize("n_movimientos", [1, 50, 1000])
+    async def test_get_productos_con_stock_una_consulta(self, n_movimientos):
+        db = _db_con_origenes()
+        movimientos = _movimientos_sin_origen(n_movimientos)
+
+        with patch(
+            "src.services.movimiento_service.movimiento_repo.get_productos_con_stock",
+            AsyncMock(return_value=movimientos),
+        ):
+            productos = await MovimientoService.get_productos_con_stock(db)
+
+        assert db.exec.await_count == 1
+        assert len(productos) == min(n_movimientos, 10)
+        for p in productos:
+            assert p["id_anexo"] == 100 + p["id_producto"]
+            assert p["id_convenio"] == 200 + p["id_producto"]
+        assert sum(p["cantidad"] for p in productos) == 2 * n_movimientos
+
+    @pytest.mark.parametrize("n_movimientos", [1, 50, 1000])
+    async def test_get_productos_con_stock_por_dependencia_una_consulta(
+        self, n_movimientos
+    ):
+        db = _db_con_origenes()
+        movimientos = _movimientos_sin_origen(n_movimientos)
+
+        with patch(
+            "src.services.movimiento_service.movimiento_repo."
+            "get_productos_con_stock_por_dependencia",
+            AsyncMock(return_value=movimientos),
+        ):
+            productos = await MovimientoService.get_productos_con_stock_por_dependencia(
+                db, id_dependencia=1
+            )
+
+        assert db.exec.await_count == 1
+        assert len(productos) == min(n_movimientos, 10)
+
+    async def test_movimientos_con_origen_no_consultan_item_anexo(self):
+        db = _db_con_origenes()
+        movimientos = _movimientos_sin_origen(5)
+        for m in movimientos:
+            m.id_anexo, m.id_convenio = 7, 8
+
+        with patch(
+            "src.services.movimiento_service.movimiento_repo.get_productos_con_stock",
+            AsyncMock(return_value=movimientos),
+        ):
+            productos = await MovimientoService.get_productos_con_stock(db)
+
+        db.exec.assert_not_awaited()
+        assert all(p["id_anexo"] == 7 and p["id_convenio"] == 8 for p in productos)
+
+
+async def test_productos_con_stock_sentencias_fijas_bd(db_session):
+    """Contra la BD real: movimientos + producto + item_anexo → máximo 3 sentencias."""
+    sentencias = []
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", _contar)
+    try:
+        await MovimientoService.get_productos_con_stock(db_session)
+        total_listado = len(sentencias)
+
+        sentencias.clear()
+        await MovimientoService.get_productos_con_stock_por_dependencia(db_session, 1)
+        total_dependencia = len(sentencias)
+    finally:
+        event.remove(engine, "before_cursor_execute", _contar)
+
+    assert total_listado <= 3, sentencias
+    assert total_dependencia <= 3, sentencias
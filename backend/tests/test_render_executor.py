@@ -0,0 +1,147 @@
+"""
+Tests del pool de generación de PDFs (src/utils/render_executor.py).
+
+Verifican que:
+1. Los PDF se generan fuera del event loop (hilo o proceso) y se devuelven
+   como buffer iterable por bloques.
+2. La concurrencia está limitada y la profundidad de la cola se mide.
+3. Un render que excede su timeout responde RenderTimeoutError (504) y sigue
+   ocupando su lugar hasta que termina en el pool; en modo proceso el worker
+   colgado se mata y el pool se recrea.
+"""
+
+import asyncio
+import threading
+import time
+from io import BytesIO
+
+import pytest
+
+from src.utils.pdf_generator import generar_pdf_existencias
+from src.utils.render_executor import (
+    CHUNK_SIZE,
+    MODO_HILO,
+    MODO_PROCESO,
+    PDFBuffer,
+    RenderExecutor,
+    RenderTimeoutError,
+)
+
+EXISTENCIAS = [
+    {"codigo": f"P{i:04d}", "descripcion": f"Producto {i}", "cantidad": i}
+    for i in range(50)
+]
+DEPENDENCIA = {"nombre": "Sucursal Centro", "direccion": "Calle 1"}
+
+
+def _lento(segundos: float) -> BytesIO:
+    time.sleep(segundos)
+    return BytesIO(threading.current_thread().name.encode())
+
+
+@pytest.mark.parametrize("modo", [MODO_HILO, MODO_PROCESO])
+async def test_genera_pdf_fuera_del_loop(modo):
+    executor = RenderExecutor(modo=modo, max_workers=1)
+    try:
+        pdf = await executor.render(
+            generar_pdf_existencias, EXISTENCIAS, DEPENDENCIA, "Ana Pérez"
+        )
+    finally:
+        executor.shutdown()
+
+    contenido = pdf.getvalue()
+    assert contenido.startswith(b"%PDF")
+    assert executor.stats()["completados"] == 1
+
+
+async def test_render_en_hilo_del_pool():
+    executor = RenderExecutor(modo=MODO_HILO, max_workers=1)
+    try:
+        pdf = await executor.render(_lento, 0)
+    finally:
+        executor.shutdown()
+    assert pdf.getvalue().startswith(b"pdf-render")
+
+
+async def test_limita_concurrencia_y_mide_la_cola():
+    executor = RenderExecutor(modo=MODO_HILO, max_workers=4, max_concurrencia=1)
+    try:
+        tareas = [asyncio.create_task(executor.render(_lento, 0.05)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert executor.stats()["en_curso"] == 1
+        assert executor.stats()["en_cola"] == 2
+        await asyncio.gather(*tareas)
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats["completados"] == 3
+    assert stats["max_en_cola"] == 2
+    assert stats["en_cola"] == 0
+
+
+async def test_timeout_por_reporte():
+    executor = RenderExecutor(modo=MODO_HILO, max_workers=1)
+    try:
+        with pytest.raises(RenderTimeoutError) as exc:
+            await executor.render(_lento, 0.5, timeout=0.05)
+    finally:
+        executor.shutdown()
+
+    assert exc.value.status_code == 504
+    assert executor.stats()["timeouts"] == 1
+
+
+async def _esperar(condicion, segundos: float = 10) -> None:
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite
+        await asyncio.sleep(0.02)
+
+
+async def test_timeout_retiene_el_lugar_hasta_que_termina():
+    executor = RenderExecutor(modo=MODO_HILO, max_workers=2, max_concurrencia=1)
+    try:
+        with pytest.raises(RenderTimeoutError):
+            await executor.render(_lento, 0.3, timeout=0.05)
+        # El hilo sigue trabajando: el lugar no se libera todavía
+        assert executor.stats()["en_curso"] == 1
+        assert executor.stats()["abandonados"] == 1
+
+        siguiente = asyncio.create_task(executor.render(_lento, 0))
+        await asyncio.sleep(0.05)
+        assert executor.stats()["en_cola"] == 1
+        await siguiente
+    finally:
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert (stats["en_curso"], stats["abandonados"]) == (0, 0)
+    assert (stats["completados"], stats["errores"], stats["timeouts"]) == (1, 0, 1)
+
+
+async def test_timeout_en_modo_proceso_recicla_el_pool():
+    executor = RenderExecutor(modo=MODO_PROCESO, max_workers=1)
+    try:
+        await executor.render(_lento, 0)  # arranca el worker
+        pool = executor._get_executor()
+        with pytest.raises(RenderTimeoutError):
+            await executor.render(_lento, 60, timeout=0.2)
+
+        # El worker colgado se termina en vez de correr sus 60 s
+        await _esperar(lambda: executor.stats()["en_curso"] == 0)
+        assert executor._get_executor() is not pool
+        pdf = await executor.render(_lento, 0)
+    finally:
+        executor.shutdown()
+
+    assert pdf.getvalue()
+    stats = executor.stats()
+    assert (stats["completados"], stats["errores"], stats["abandonados"]) == (2, 0, 0)
+
+
+def test_buffer_se_itera_por_bloques():
+    datos = b"\n".join([b"x" * 100] * 2000)
+    bloques = list(PDFBuffer(datos))
+    assert b"".join(bloques) == datos
+    assert all(len(b) == CHUNK_SIZE for b in bloques[:-1])
@@ -0,0 +1,168 @@
+"""
+Tests del acceso a otras sucursales (src/database/sucursales.py).
+
+Verifican que:
+1. La replicación aplica todas las operaciones en cada sucursal en una sola
+   transacción, excluye la BD central y una sucursal con error no afecta a
+   las demás (se revierte completa). Replicar la tabla dependencia invalida
+   la caché de jerarquía.
+2. Los movimientos de ajuste hacia otra base se crean en lote (un solo
+   INSERT en PostgreSQL) y cada id devuelto corresponde a su movimiento.
+3. Todo pasa por los engines de `engine_registry` (sin abrir conexiones
+   nuevas por llamada).
+
+Cada "base" es una BD SQLite en memoria.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, insert, text
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from src.database.connection import engine_registry
+from src.models import Movimiento, TipoMovimiento
+from src.services.jerarquia_service import jerarquia_cache
+from src.services.movimiento_service import MovimientoService
+from src.services.replicacion_service import ReplicacionService
+
+BASES = ("caguayosa", "sucursal_a", "sucursal_b", "sucursal_rota")
+
+
+def _sql(nombre: str) -> list:
+    sql = []
+    if nombre == "caguayosa":
+        sql.append(
+            "CREATE TABLE conexion_database (nombre_database TEXT,"
+            " host TEXT, puerto INT, usuario TEXT, contrasenia TEXT)"
+        )
+        sql += [
+            (
+                "INSERT INTO conexion_database VALUES"
+                " (:db, 'localhost', 5432, 'postgres', NULL)",
+                {"db": db},
+            )
+            for db in BASES
+        ]
+    sql.append("CREATE TABLE moneda (id_moneda INT, nombre TEXT)")
+    if nombre != "sucursal_rota":
+        sql.append(
+            "CREATE TABLE cuenta_dependencias (id_cuenta INT, id_dependencia INT)"
+        )
+    sql.append(
+        "INSERT INTO tipo_movimiento (id_tipo_movimiento, tipo, factor)"
+        " VALUES (7, 'AJUSTE_AGREGAR', 1)"
+    )
+    return sql
+
+
+@pytest.fixture
+async def engines(bd_sqlite):
+    engines = {}
+    for nombre in BASES:
+        base = await bd_sqlite(tablas=[Movimiento, TipoMovimiento], sql=_sql(nombre))
+        engines[nombre] = base.engine
+    with patch.object(engine_registry, "get", side_effect=engines.__getitem__):
+        yield engines
+
+
+async def _filas(engine, sql: str) -> list:
+    async with engine.connect() as conn:
+        return [tuple(r) for r in (await conn.execute(text(sql))).all()]
+
+
+async def test_replicar_lote_una_transaccion_por_sucursal(engines):
+    resultado = await ReplicacionService.replicar_lote(
+        [
+            ("moneda", {"id_moneda": 3, "nombre": "Euro"}, "INSERT", None),
+            ("moneda", {"nombre": "EUR"}, "UPDATE", {"id_moneda": 3}),
+            (
+                "cuenta_dependencias",
+                {"id_cuenta": 1, "id_dependencia": 9},
+                "INSERT",
+                None,
+            ),
+        ]
+    )
+
+    assert resultado == {"sucursal_a": True, "sucursal_b": True, "sucursal_rota": False}
+    for nombre in ("sucursal_a", "sucursal_b"):
+        assert await _filas(engines[nombre], "SELECT * FROM moneda") == [(3, "EUR")]
+        assert await _filas(engines[nombre], "SELECT * FROM cuenta_dependencias") == [
+            (1, 9)
+        ]
+    # La sucursal con error se revierte entera y la central no se toca
+    assert await _filas(engines["sucursal_rota"], "SELECT * FROM moneda") == []
+    assert await _filas(engines["caguayosa"], "SELECT * FROM moneda") == []
+
+
+async def test_replicar_dependencia_invalida_la_jerarquia(engines):
+    with patch.object(jerarquia_cache, "invalidar") as invalidar:
+        await ReplicacionService.replicar_moneda({"id_moneda": 4, "nombre": "MLC"})
+        invalidar.assert_not_called()
+        await ReplicacionService.replicar_dependencia(
+            {"nombre": "Nueva"}, "UPDATE", {"id_dependencia": 9}
+        )
+    invalidar.assert_called_once_with()
+
+
+async def test_delete_sin_condicion_no_se_replica(engines):
+    assert await ReplicacionService.replicar_moneda({}, "DELETE") == {}
+
+
+async def test_movimientos_en_otra_db_en_orden(engines):
+    consultas = []
+
+    @event.listens_for(engines["sucursal_a"].sync_engine, "before_cursor_execute")
+    def _registrar(conn, cursor, statement, *args):
+        consultas.append(statement)
+
+    creados = await MovimientoService.crear_movimientos_en_otra_db(
+        "sucursal_a",
+        [
+            {"id_dependencia": 2, "id_producto": 5, "cantidad": 4, "codigo": "A1"},
+            {"id_dependencia": 3, "id_producto": 5, "cantidad": 6, "codigo": "A1"},
+        ],
+    )
+
+    assert [c["cantidad"] for c in creados] == [4, 6]
+    # Cada id devuelto corresponde a la fila de su movimiento
+    cantidades = dict(
+        await _filas(
+            engines["sucursal_a"], "SELECT id_movimiento, cantidad FROM movimiento"
+        )
+    )
+    assert [cantidades[c["id_movimiento"]] for c in creados] == [4, 6]
+    filas = await _filas(
+        engines["sucursal_a"],
+        "SELECT id_tipo_movimiento, id_dependencia, cantidad, estado FROM movimiento",
+    )
+    assert filas == [(7, 2, 4, "pendiente"), (7, 3, 6, "pendiente")]
+    # SQLite no tiene columna centinela: para respetar el orden SQLAlchemy
+    # manda una fila por INSERT (en PostgreSQL va en uno, ver el test siguiente)
+    assert len([c for c in consultas if c.startswith("INSERT")]) == 2
+
+
+def test_insert_ordenado_va_en_un_lote_en_postgres():
+    sentencia = insert(Movimiento).returning(
+        Movimiento.id_movimiento, sort_by_parameter_order=True
+    )
+    sql = str(
+        sentencia.compile(
+            dialect=asyncpg.dialect(),
+            for_executemany=True,
+            column_keys=["id_tipo_movimiento", "cantidad", "estado"],
+        )
+    )
+    assert "FROM (VALUES" in sql and "ORDER BY sen_counter" in sql
+
+
+async def test_sin_tipo_ajuste_no_crea_nada(engines):
+    async with engines["sucursal_b"].begin() as conn:
+        await conn.execute(text("DELETE FROM tipo_movimiento"))
+
+    with pytest.raises(ValueError, match="AJUSTE_AGREGAR no encontrado"):
+        await MovimientoService.crear_movimiento_en_otra_db(
+            "sucursal_b", {"id_dependencia": 2, "id_producto": 5, "cantidad": 1}
+        )
+    assert await _filas(engines["sucursal_b"], "SELECT * FROM movimiento") == []
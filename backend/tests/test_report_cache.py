@@ -0,0 +1,239 @@
+"""
+Tests de la caché de reportes (src/utils/report_cache.py).
+
+Verifican que:
+1. La clave no depende del orden ni de filtros vacíos, y cambia con la
+   versión de los datos, la BD y el formato.
+2. El LRU por tamaño elimina primero los artefactos menos usados.
+3. Un preview repetido se sirve desde disco sin volver al servicio, con
+   If-None-Match responde 304 y una escritura (nueva versión) lo invalida.
+4. Sin la tabla report_version se sirve sin caché.
+
+La versión de los datos se lee de una BD SQLite en memoria.
+"""
+
+import os
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from main import app
+from src.database.connection import get_session
+from src.routes import reportes_router
+from src.utils.render_executor import PDFBuffer
+from src.utils.report_cache import ReportCache, etag_coincide
+
+EXISTENCIAS = [{"codigo": "P0001", "descripcion": "Producto 1", "cantidad": 5}]
+DEPENDENCIA = {"nombre": "Sucursal Centro", "direccion": "Calle 1"}
+
+
+@pytest.fixture
+async def sesiones(bd_sqlite):
+    base = await bd_sqlite(
+        sql=[
+            "CREATE TABLE report_version (tabla TEXT PRIMARY KEY, version INT)",
+            "INSERT INTO report_version VALUES ('productos', 1), ('movimiento', 1)",
+        ]
+    )
+    return base.sesiones
+
+
+async def _incrementar(factory, tabla: str) -> None:
+    async with factory() as session:
+        await session.execute(
+            text("UPDATE report_version SET version = version + 1 WHERE tabla = :t"),
+            {"t": tabla},
+        )
+        await session.commit()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  CLAVES Y ETAG
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def test_clave_normaliza_filtros():
+    base = ReportCache.clave("db1", "existencias", {"a": 1, "b": "x"}, 3)
+    assert base == ReportCache.clave(
+        "db1", "existencias", {"b": " x ", "a": 1, "c": None, "d": ""}, 3
+    )
+    assert base != ReportCache.clave("db1", "existencias", {"a": 1, "b": "x"}, 4)
+    assert base != ReportCache.clave("db2", "existencias", {"a": 1, "b": "x"}, 3)
+    assert base != ReportCache.clave(
+        "db1", "existencias", {"a": 1, "b": "x"}, 3, ".pdf"
+    )
+
+
+def test_etag_coincide():
+    etag = 'W/"abc"'
+    assert etag_coincide('W/"abc"', etag)
+    assert etag_coincide('"abc"', etag)
+    assert etag_coincide('"otro", W/"abc"', etag)
+    assert etag_coincide("*", etag)
+    assert not etag_coincide('"otro"', etag)
+    assert not etag_coincide(None, etag)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  DISCO Y LRU
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def test_escribir_y_leer(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=1024)
+    assert cache.leer("ab12", ".pdf") is None
+    cache.escribir("ab12", ".pdf", b"%PDF-1.4")
+    assert cache.leer("ab12", ".pdf") == b"%PDF-1.4"
+    assert (tmp_path / "ab" / "ab12.pdf").exists()
+    assert not [p for p in (tmp_path / "ab").iterdir() if p.name.startswith(".")]
+
+
+def test_lru_elimina_los_menos_usados(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=1000)
+    for i, clave in enumerate(["aa01", "bb02", "cc03"]):
+        cache.escribir(clave, ".json", b"x" * 300)
+        ruta = tmp_path / clave[:2] / f"{clave}.json"
+        os.utime(ruta, (time.time() - 100 + i, time.time() - 100 + i))
+
+    # Usar el más viejo lo convierte en el más reciente
+    assert cache.leer("aa01", ".json") is not None
+    cache.escribir("dd04", ".json", b"x" * 300)
+
+    assert cache.leer("bb02", ".json") is None
+    assert cache.leer("aa01", ".json") is not None
+    assert cache.leer("dd04", ".json") is not None
+    assert cache.evictados >= 1
+    assert cache.stats()["uso_mb"] <= 1000 / (1024 * 1024)
+
+
+def test_artefacto_mayor_que_la_cache_no_se_guarda(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=100)
+    cache.escribir("ee05", ".pdf", b"x" * 101)
+    assert cache.leer("ee05", ".pdf") is None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  CONSULTA CON VERSIÓN DE DATOS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+async def test_consultar_usa_la_version_de_datos(tmp_path, sesiones):
+    cache = ReportCache(str(tmp_path), max_bytes=1024 * 1024)
+    filtros = {"id_dependencia": 1}
+
+    async with sesiones() as db:
+        consulta = await cache.consultar(db, "existencias", filtros)
+        assert not consulta.desde_cache
+        respuesta = await consulta.responder_json({"items": EXISTENCIAS})
+        etag = respuesta.headers["etag"]
+
+    async with sesiones() as db:
+        consulta = await cache.consultar(db, "existencias", filtros)
+        assert consulta.desde_cache
+        assert consulta.respuesta.body == respuesta.body
+        assert consulta.respuesta.headers["etag"] == etag
+
+        consulta = await cache.consultar(db, "existencias", filtros, etag)
+        assert consulta.respuesta.status_code == 304
+
+    # Una tabla que el reporte no lee no lo invalida
+    await _incrementar(sesiones, "movimiento")
+    async with sesiones() as db:
+        assert (await cache.consultar(db, "existencias", filtros)).desde_cache
+
+    await _incrementar(sesiones, "productos")
+    async with sesiones() as db:
+        consulta = await cache.consultar(db, "existencias", filtros, etag)
+        assert not consulta.desde_cache
+        assert consulta.headers["ETag"] != etag
+
+    assert cache.aciertos == 2
+    assert cache.no_modificados == 1
+    assert cache.fallos == 2
+
+
+async def test_sin_tabla_de_versiones_no_cachea(tmp_path, bd_sqlite):
+    factory = (await bd_sqlite()).sesiones
+    cache = ReportCache(str(tmp_path), max_bytes=1024 * 1024)
+
+    async with factory() as db:
+        consulta = await cache.consultar(db, "existencias", {"id_dependencia": 1})
+        respuesta = await consulta.responder(b"{}")
+        # La sesión sigue utilizable tras el error
+        assert (await db.execute(text("SELECT 1"))).scalar_one() == 1
+
+    assert consulta.clave is None
+    assert "etag" not in respuesta.headers
+    assert cache.sin_version == 1
+    assert not any(tmp_path.iterdir())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  ENDPOINTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+@pytest.fixture
+def client_con_cache(tmp_path, sesiones):
+    async def _override_get_session():
+        async with sesiones() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = _override_get_session
+    cache = ReportCache(str(tmp_path), max_bytes=1024 * 1024)
+    with patch.object(reportes_router, "report_cache", cache):
+        yield TestClient(app), cache
+    app.dependency_overrides.clear()
+
+
+def test_preview_repetido_se_sirve_desde_cache(client_con_cache):
+    client, cache = client_con_cache
+    servicio = AsyncMock(return_value=(EXISTENCIAS, DEPENDENCIA))
+    url = "/api/v1/reportes/existencias/preview"
+
+    with patch.object(reportes_router, "get_existencias", new=servicio):
+        primera = client.get(url, params={"id_dependencia": 1})
+        segunda = client.get(url, params={"id_dependencia": 1})
+        no_modificada = client.get(
+            url,
+            params={"id_dependencia": 1},
+            headers={"If-None-Match": primera.headers["etag"]},
+        )
+        otra = client.get(url, params={"id_dependencia": 2})
+
+    assert primera.status_code == 200
+    assert primera.json()["total_items"] == 1
+    assert segunda.json() == primera.json()
+    assert segunda.headers["etag"] == primera.headers["etag"]
+    assert no_modificada.status_code == 304
+    assert otra.headers["etag"] != primera.headers["etag"]
+    assert servicio.await_count == 2
+
+
+def test_pdf_cacheado_conserva_content_disposition(client_con_cache):
+    client, cache = client_con_cache
+    servicio = AsyncMock(return_value=(EXISTENCIAS, DEPENDENCIA))
+    render = AsyncMock(side_effect=lambda *a, **k: PDFBuffer(b"%PDF"))
+    params = {"id_dependencia": 1, "notas": "Nota"}
+
+    with (
+        patch.object(reportes_router, "get_existencias", new=servicio),
+        patch.object(reportes_router.render_executor, "render", new=render),
+    ):
+        primera = client.get("/api/v1/reportes/existencias", params=params)
+        segunda = client.get("/api/v1/reportes/existencias", params=params)
+        otras_notas = client.get(
+            "/api/v1/reportes/existencias", params={**params, "notas": "Otra"}
+        )
+
+    assert primera.content == segunda.content == b"%PDF"
+    assert segunda.headers["content-type"] == "application/pdf"
+    assert (
+        segunda.headers["content-disposition"]
+        == "attachment; filename=existencias_1.pdf"
+    )
+    assert otras_notas.headers["etag"] != primera.headers["etag"]
+    assert render.await_count == 2
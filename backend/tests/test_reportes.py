@@ -20,17 +20,29 @@ Estrategia:
     duplicar código.
 """
 
+import re
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 from io import BytesIO
 from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
 
 from main import app
 from src.database.connection import get_session
 from src.dto.auth_dto import UsuarioInfo, DependenciaInfo, GrupoInfo
-from src.utils.pdf_template import PDFTemplate, format_quantity
+from src.models.servicio import PersonaLiquidacion
+from src.services.reportes_service import (
+    _consulta_resumen_liquidaciones,
+    get_reporte_mincult,
+    get_resumen_liquidaciones,
+)
+from src.utils import pdf_template
+from src.utils.pdf_template import PDFSpooledFile, PDFTemplate, format_quantity
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Referencia al módulo del router para parchear correctamente las funciones
@@ -642,6 +654,57 @@ class TestPDFTemplate:
         assert format_quantity("") == ""
         assert format_quantity(None) == "None"
 
+    @staticmethod
+    def _paginas(content: bytes) -> int:
+        return len(re.findall(rb"/Type /Page\b(?!s)", content))
+
+    @staticmethod
+    def _movimientos(n: int):
+        return (["2024-01-01", "VENTA", f"Producto {i}", str(i)] for i in range(n))
+
+    def test_template_chunked_mismas_paginas_que_add_table(self):
+        """``add_table_chunked`` consume un generador y pagina como ``add_table``."""
+        headers = ["FECHA", "OPERACIÓN", "PRODUCTO", "CANTIDAD"]
+        paginas = []
+        for chunked in (False, True):
+            template = PDFTemplate(title="MOVIMIENTOS", landscape_mode=True)
+            template.set_company_header(name="Caguayo Test")
+            filas = self._movimientos(400)
+            if chunked:
+                template.add_table_chunked(
+                    headers, filas, totals_row=["TOTAL", "", "", "1"]
+                )
+            else:
+                template.add_table(
+                    headers, list(filas), totals_row=["TOTAL", "", "", "1"]
+                )
+            paginas.append(self._paginas(template.build().read()))
+
+        assert paginas[0] > 1
+        assert paginas[1] == paginas[0]
+
+    def test_template_chunked_vacio_muestra_sin_datos(self):
+        """Un iterador vacío no agrega tabla (se muestra el estado vacío)."""
+        template = PDFTemplate(title="VACÍO")
+        template.set_company_header(name="Caguayo Test")
+        template.add_table_chunked(["A", "B"], iter(()))
+        assert template.elements == []
+        assert template.build().read().startswith(b"%PDF")
+
+    def test_template_pdf_grande_queda_en_disco(self):
+        """Por encima de ``PDF_SPOOL_BYTES`` se devuelve el archivo temporal."""
+        with patch.object(pdf_template, "PDF_SPOOL_BYTES", 1024):
+            template = PDFTemplate(title="MOVIMIENTOS")
+            template.set_company_header(name="Caguayo Test")
+            template.add_table_chunked(["A", "B", "C", "D"], self._movimientos(200))
+            result = template.build()
+
+        assert isinstance(result, PDFSpooledFile)
+        assert result._rolled, "El PDF debe haberse volcado a disco"
+        assert result.tell() == 0
+        assert result.read(4) == b"%PDF"
+        assert result.getvalue().startswith(b"%PDF")
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  DATOS DE PRUEBA – NUEVOS REPORTES (7 reportes × 2 endpoints c/u)
@@ -1211,3 +1274,156 @@ class TestPDFGenerationNuevos:
         assert response.status_code == 200
         assert response.headers.get("content-type", "").startswith("application/pdf")
         assert len(response.content) > 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  TEST 12 – Resumen de liquidaciones en una sola consulta
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestResumenLiquidacionesUnaConsulta:
+    """``get_resumen_liquidaciones`` hace un único ``execute`` y toma los totales
+    de la fila del ROLLUP (NUMERIC exacto) en vez de sumar floats."""
+
+    @staticmethod
+    def _fila(es_total: int, **valores):
+        importes = {
+            c: Decimal(valores.pop(c, "0"))
+            for c in (
+                "devengado",
+                "tributario",
+                "comision_bancaria",
+                "gasto_empresa",
+                "importe",
+                "neto_pagar",
+                "importe_caguayo",
+                "tributario_monto",
+            )
+        }
+        base = {
+            "id_liquidacion": None,
+            "codigo": None,
+            "fecha_emision": None,
+            "fecha_liquidacion": None,
+            "cliente_nombre": None,
+            "cliente_nit": None,
+            "cliente_codigo": None,
+            "moneda_nombre": None,
+            "moneda_simbolo": None,
+            "porcentaje_caguayo": None,
+            "tipo_pago": None,
+            "liquidada": None,
+            "productos": None,
+        }
+        return SimpleNamespace(**{**base, **importes, **valores, "es_total": es_total})
+
+    @pytest.mark.asyncio
+    async def test_una_consulta_y_totales_del_rollup(self):
+        filas = [
+            self._fila(
+                0,
+                id_liquidacion=1,
+                codigo="LIQ-1",
+                fecha_emision=date(2024, 6, 1),
+                cliente_nombre="Ana",
+                moneda_nombre="Peso",
+                moneda_simbolo="$",
+                porcentaje_caguayo=Decimal("10"),
+                tipo_pago="EFECTIVO",
+                liquidada=True,
+                productos=[
+                    {"codigo": "P1", "nombre": "Libro", "cantidad": 2, "precio": 1.5}
+                ],
+                importe="0.10",
+            ),
+            self._fila(
+                0,
+                id_liquidacion=2,
+                codigo="LIQ-2",
+                fecha_emision=date(2024, 5, 1),
+                cliente_nombre="Luis",
+                porcentaje_caguayo=Decimal("5"),
+                importe="0.20",
+            ),
+            self._fila(1, importe="0.30"),
+        ]
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(all=MagicMock(return_value=filas))
+
+        data, meta = await get_resumen_liquidaciones(db)
+
+        db.execute.assert_awaited_once()
+        assert [d["codigo"] for d in data] == ["LIQ-1", "LIQ-2"]
+        assert data[0]["productos"][0]["codigo"] == "P1"
+        assert data[0]["moneda"] == "$ (Peso)"
+        assert data[1]["productos"] == []
+        # 0.1 + 0.2 en float daría 0.30000000000000004
+        assert meta["totales"]["total_importe"] == 0.3
+        assert meta["total_items"] == 2
+
+    def test_sql_agrega_productos_y_usa_rollup(self):
+        sql = str(
+            _consulta_resumen_liquidaciones(date(2024, 1, 1)).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+        assert "jsonb_agg" in sql
+        assert "GROUP BY ROLLUP" in sql
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  TEST 13 – Escalas MINCULT calculadas en SQL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestMincultEscalasEnSQL:
+    """``get_reporte_mincult`` agrupa por escala en la BD (SQLite en memoria)."""
+
+    @pytest.fixture
+    async def db(self, bd_sqlite):
+        filas = [
+            (1, "0", date(2024, 1, 5)),
+            (1, "80.50", date(2024, 1, 6)),
+            (2, "100.50", date(2024, 2, 1)),
+            (3, "450", date(2024, 2, 2)),
+            (2, "25000", date(2024, 3, 1)),
+            (4, "99", date(2023, 12, 31)),
+        ]
+        base = await bd_sqlite(
+            tablas=[PersonaLiquidacion],
+            filas=[
+                PersonaLiquidacion(id_persona=p, devengado=Decimal(d), fecha_emision=f)
+                for p, d, f in filas
+            ],
+        )
+        async with base.sesiones() as session:
+            yield session
+
+    @pytest.mark.asyncio
+    async def test_diez_escalas_con_sumas_y_artistas(self, db):
+        data, meta = await get_reporte_mincult(db, fecha_inicio=date(2024, 1, 1))
+
+        assert len(data) == 10
+        por_escala = {d["bracket"]: d for d in data}
+        assert por_escala["Hasta 100"]["cantidad"] == 2
+        assert por_escala["Hasta 100"]["cantidad_artistas"] == 1
+        assert por_escala["De 101 a 500"]["cantidad"] == 2
+        assert por_escala["De 101 a 500"]["total_devengado"] == 550.5
+        assert por_escala["De 101 a 500"]["cantidad_artistas"] == 2
+        assert por_escala["Más de 20000"]["hasta"] is None
+        assert por_escala["Más de 20000"]["total_devengado"] == 25000
+        assert por_escala["De 501 a 1000"]["cantidad"] == 0
+        assert meta["total_liquidaciones"] == 5
+        assert meta["total_devengado_general"] == 25631.0
+
+    @pytest.mark.asyncio
+    async def test_escalas_configurables(self, db):
+        data, meta = await get_reporte_mincult(
+            db, escalas=[("Hasta 100", 0, 100), ("Más de 100", 101, None)]
+        )
+
+        assert [(d["bracket"], d["cantidad"]) for d in data] == [
+            ("Hasta 100", 3),
+            ("Más de 100", 3),
+        ]
+        assert meta["total_liquidaciones"] == 6
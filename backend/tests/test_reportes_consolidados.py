@@ -0,0 +1,250 @@
+"""
+Tests de los reportes consolidados (src/services/consolidado_service.py).
+
+Verifican que:
+1. La consulta se ejecuta en cada base de `conexion_database` y los totales
+   se suman por código de producto.
+2. Una base con error o que excede el timeout no invalida el resto: queda
+   informada y el resultado se marca como parcial, sin sumar sus filas.
+   Sin lista de sucursales no hay consolidado: se responde 503.
+3. El endpoint devuelve el consolidado con el estado de cada sucursal y
+   solo responde a usuarios autenticados de la casa matriz.
+
+Cada "base" es una BD SQLite en memoria.
+"""
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.database.connection import engine_registry, get_auth_session
+from src.dto.auth_dto import DependenciaInfo, UsuarioInfo
+from src.services import consolidado_service
+
+BASES = ("caguayosa", "sucursal_a", "sucursal_b", "sucursal_rota", "sucursal_lenta")
+
+STOCK = {
+    "caguayosa": [("P1", "Libro", 2)],
+    "sucursal_a": [("P1", "Libro", 5), ("P2", "Disco", 1)],
+    "sucursal_b": [("P2", "Disco", 4), ("P3", "Afiche", 7)],
+}
+
+
+class _Lenta:
+    """Engine cuya conexión nunca llega a abrirse a tiempo."""
+
+    def connect(self):
+        return self
+
+    async def __aenter__(self):
+        await asyncio.sleep(5)
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def _sql(nombre: str) -> list:
+    sql = [
+        "CREATE TABLE productos (id_producto INTEGER PRIMARY KEY, codigo TEXT,"
+        " nombre TEXT)",
+        "CREATE TABLE stock_dependencia (id_dependencia INT, id_producto INT,"
+        " stock INT)",
+    ]
+    for i, (codigo, nombre_p, stock) in enumerate(STOCK[nombre], 1):
+        sql.append(
+            (
+                "INSERT INTO productos VALUES (:i, :c, :n)",
+                {"i": i, "c": codigo, "n": nombre_p},
+            )
+        )
+        # Dos dependencias con stock del mismo producto en la base
+        sql.append(
+            (
+                "INSERT INTO stock_dependencia VALUES (:d, :p, :s)",
+                [
+                    {"d": 1, "p": i, "s": stock - stock // 2},
+                    {"d": 2, "p": i, "s": stock // 2},
+                ],
+            )
+        )
+    return sql
+
+
+@pytest.fixture
+async def engines(bd_sqlite):
+    engines = {}
+    for nombre in BASES[:-1]:
+        # sucursal_rota: sin tablas
+        base = await bd_sqlite(sql=_sql(nombre) if nombre in STOCK else ())
+        engines[nombre] = base.engine
+    todas = {**engines, "sucursal_lenta": _Lenta()}
+    sucursales = [{"nombre_database": b} for b in BASES]
+    with (
+        patch.object(engine_registry, "get", side_effect=todas.__getitem__),
+        patch.object(
+            consolidado_service.ReplicacionService,
+            "listar_sucursales",
+            return_value=sucursales,
+        ),
+    ):
+        yield engines
+
+
+async def test_suma_por_producto_y_resultado_parcial(engines):
+    resultado = await consolidado_service.get_existencias_consolidadas(timeout=0.2)
+
+    items = {i["codigo"]: i for i in resultado["items"]}
+    assert {c: i["cantidad"] for c, i in items.items()} == {"P1": 7, "P2": 5, "P3": 7}
+    assert items["P2"]["sucursales"] == ["sucursal_a", "sucursal_b"]
+    assert [i["descripcion"] for i in resultado["items"]] == [
+        "Afiche",
+        "Disco",
+        "Libro",
+    ]
+
+    estados = {s["base"]: s["estado"] for s in resultado["sucursales"]}
+    assert estados == {
+        "caguayosa": "ok",
+        "sucursal_a": "ok",
+        "sucursal_b": "ok",
+        "sucursal_rota": "error",
+        "sucursal_lenta": "timeout",
+    }
+    assert resultado["parcial"] is True
+
+
+async def test_consolidar_sin_fallos_no_es_parcial(engines):
+    resultado = await consolidado_service.consolidar(
+        ["sucursal_a", "sucursal_b", "sucursal_a"],
+        consolidado_service.consulta_existencias(),
+        ("cantidad",),
+        max_concurrencia=1,
+    )
+
+    assert resultado["parcial"] is False
+    assert [s["filas"] for s in resultado["sucursales"]] == [2, 2]
+    assert sum(i["cantidad"] for i in resultado["items"]) == 17
+
+
+async def test_sin_lista_de_sucursales_no_devuelve_consolidado_vacio():
+    with patch.object(
+        consolidado_service.ReplicacionService,
+        "listar_sucursales",
+        side_effect=ConnectionRefusedError("central caída"),
+    ):
+        with pytest.raises(consolidado_service.SucursalesNoDisponiblesError) as exc:
+            await consolidado_service.get_ventas_consolidadas()
+
+    assert exc.value.status_code == 503
+
+
+def test_consulta_ventas_filtra_fechas():
+    sql = str(consolidado_service.consulta_ventas(date(2026, 1, 1), date(2026, 1, 31)))
+    assert "ventas.estado" in sql
+    assert "ventas.fecha >=" in sql and "ventas.fecha <=" in sql
+
+
+def _usuario(base_datos):
+    return UsuarioInfo(
+        id_usuario=1,
+        ci="1",
+        nombre="Ana",
+        primer_apellido="Pérez",
+        alias="ana",
+        dependencia=DependenciaInfo(
+            id_dependencia=1, nombre="D", base_datos=base_datos
+        ),
+    )
+
+
+@pytest.fixture
+def cliente():
+    async def _sin_bd():
+        yield None
+
+    app.dependency_overrides[get_auth_session] = _sin_bd
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_auth_session, None)
+
+
+def test_endpoint_consolidado_existencias(cliente):
+    resultado = {
+        "items": [{"codigo": "P1", "descripcion": "Libro", "cantidad": Decimal(3)}],
+        "sucursales": [{"base": "sucursal_a", "estado": "timeout", "filas": 0}],
+        "parcial": True,
+    }
+    with (
+        patch(
+            "src.utils.dependencies.get_current_user",
+            AsyncMock(return_value=_usuario("caguayosa")),
+        ),
+        patch(
+            "src.routes.reportes_router.get_existencias_consolidadas",
+            return_value=resultado,
+        ) as consultar,
+        patch("src.routes.reportes_router.AppLogger.log_action"),
+    ):
+        respuesta = cliente.get(
+            "/api/v1/reportes/consolidado/existencias",
+            params={"timeout": 2},
+            headers={"Authorization": "Bearer token"},
+        )
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["parcial"] is True
+    assert datos["total_cantidad"] == 3
+    assert datos["sucursales"][0]["estado"] == "timeout"
+    consultar.assert_awaited_once_with(2.0)
+
+
+def test_endpoint_consolidado_sin_sucursales_responde_503(cliente):
+    with (
+        patch(
+            "src.utils.dependencies.get_current_user",
+            AsyncMock(return_value=_usuario("caguayosa")),
+        ),
+        patch(
+            "src.routes.reportes_router.get_existencias_consolidadas",
+            side_effect=consolidado_service.SucursalesNoDisponiblesError(),
+        ),
+    ):
+        respuesta = cliente.get(
+            "/api/v1/reportes/consolidado/existencias",
+            headers={"Authorization": "Bearer token"},
+        )
+
+    assert respuesta.status_code == 503
+
+
+@pytest.mark.parametrize(
+    "headers, usuario, estado",
+    [
+        ({}, None, 401),
+        ({"Authorization": "Bearer vencido"}, None, 401),
+        ({"Authorization": "Bearer token"}, _usuario("sucursal_a"), 403),
+    ],
+    ids=["anonimo", "token_invalido", "sucursal"],
+)
+@pytest.mark.parametrize("ruta", ["existencias", "ventas"])
+def test_endpoint_consolidado_exige_casa_matriz(
+    cliente, ruta, headers, usuario, estado
+):
+    with (
+        patch(
+            "src.utils.dependencies.get_current_user",
+            AsyncMock(return_value=usuario),
+        ),
+        patch("src.routes.reportes_router.get_existencias_consolidadas") as existencias,
+        patch("src.routes.reportes_router.get_ventas_consolidadas") as ventas,
+    ):
+        respuesta = cliente.get(f"/api/v1/reportes/consolidado/{ruta}", headers=headers)
+
+    assert respuesta.status_code == estado
+    existencias.assert_not_called()
+    ventas.assert_not_called()